@@ -19,6 +19,7 @@ from datetime import datetime, timedelta
 import pandas as pd
 
 from opennem import settings
+from opennem.aggregates.network_flows_v3 import run_flows_for_range_v3
 from opennem.core.profiler import ProfilerLevel, ProfilerRetentionTime, profile_task
 from opennem.db import get_database_engine
 from opennem.db.bulk_insert_csv import build_insert_query, generate_csv_from_records
@@ -453,11 +454,18 @@ def run_flow_updates_all_per_year(year_start: int, years: int = 1, network: Netw
 
         logger.info(f"Running flow_updates_per_year for {year} ({date_start} => {date_end})")
 
-        if not settings.dry_run:
-            run_and_store_flows_for_range(
-                date_start,
-                date_end,
-            )
+        if settings.dry_run:
+            continue
+
+        # v3 solves each day of the year in a single stacked solve
+        if settings.flows_and_emissions_v3:
+            run_flows_for_range_v3(date_start, date_end, network=network)
+            continue
+
+        run_and_store_flows_for_range(
+            date_start,
+            date_end,
+        )
 
 
 @profile_task(
@@ -19,6 +19,7 @@ from opennem.core.flow_solver import (
     RegionDemandEmissions,
     RegionFlow,
     solve_flow_emissions_for_interval,
+    solve_flow_emissions_for_interval_range,
 )
 from opennem.core.profiler import ProfilerLevel, ProfilerRetentionTime, profile_task
 from opennem.db import get_database_engine, get_scoped_session
@@ -37,8 +38,10 @@ class FlowsValidationError(Exception):
     pass
 
 
-def load_interconnector_intervals(interval: datetime, network: NetworkSchema) -> pd.DataFrame:
-    """Load interconnector flows for an interval.
+def load_interconnector_intervals(
+    interval: datetime, network: NetworkSchema, interval_end: datetime | None = None
+) -> pd.DataFrame:
+    """Load interconnector flows for an interval, or a range of intervals inclusive of interval_end.
 
     Returns
         pd.DataFrame: DataFrame containing interconnector flows for an interval.
@@ -54,6 +57,9 @@ def load_interconnector_intervals(interval: datetime, network: NetworkSchema) ->
     """
     engine = get_database_engine()
 
+    if not interval_end:
+        interval_end = interval
+
     query = """
         select
             fs.trading_interval at time zone '{timezone}' as trading_interval,
@@ -65,7 +71,8 @@ def load_interconnector_intervals(interval: datetime, network: NetworkSchema) ->
         left join facility f
             on fs.facility_code = f.code
         where
-            fs.trading_interval = '{date_start}'
+            fs.trading_interval >= '{date_start}'
+            and fs.trading_interval <= '{date_end}'
             and f.interconnector is True
             and f.network_id = '{network_id}'
         group by 1, 2, 3
@@ -74,6 +81,7 @@ def load_interconnector_intervals(interval: datetime, network: NetworkSchema) ->
 
     """.format(
         date_start=interval,
+        date_end=interval_end,
         timezone=network.timezone_database,
         network_id=network.code,
     )
@@ -305,6 +313,30 @@ def calculate_demand_region_for_interval(energy_and_emissions: pd.DataFrame, imp
     return df_with_demand
 
 
+def calculate_demand_region_for_intervals(
+    energy_and_emissions: pd.DataFrame, interconnector_data_net: pd.DataFrame
+) -> pd.DataFrame:
+    """Calculates demand for each region and interval from net interconnector flows
+
+    Range version of calculate_total_import_and_export_per_region_for_interval and
+    calculate_demand_region_for_interval that keeps intervals separate.
+    """
+    energy_imports = interconnector_data_net.groupby(["trading_interval", "interconnector_region_to"]).energy.sum()
+    energy_exports = interconnector_data_net.groupby(["trading_interval", "interconnector_region_from"]).energy.sum()
+
+    energy_imports.index.names = ["trading_interval", "network_region"]
+    energy_exports.index.names = ["trading_interval", "network_region"]
+
+    energy_flows = pd.DataFrame({"energy_imports": energy_imports, "energy_exports": energy_exports}).fillna(0).reset_index()
+
+    df_with_demand = energy_and_emissions.merge(energy_flows, on=["trading_interval", "network_region"], how="left")
+    df_with_demand[["energy_imports", "energy_exports"]] = df_with_demand[["energy_imports", "energy_exports"]].fillna(0)
+
+    df_with_demand["demand"] = df_with_demand["energy"] + df_with_demand["energy_imports"] - df_with_demand["energy_exports"]
+
+    return df_with_demand
+
+
 def persist_network_flows_and_emissions_for_interval(flow_results: pd.DataFrame) -> int:
     """persists the records to at_network_flows"""
     session = get_scoped_session()
@@ -429,9 +461,12 @@ def run_flows_for_last_intervals(interval_number: int, network: NetworkSchema) -
 
     first_interval = get_last_completed_interval_for_network(network=network)
 
-    for interval in [first_interval - timedelta(minutes=5 * i) for i in range(1, interval_number + 1)]:
-        logger.debug(f"Running flow for interval {interval}")
-        run_aggregate_flow_for_interval_v3(interval=interval, network=network, validate_results=False)
+    run_aggregate_flow_for_interval_range_v3(
+        interval_start=first_interval - timedelta(minutes=5 * interval_number),
+        interval_end=first_interval - timedelta(minutes=5),
+        network=network,
+        validate_results=False,
+    )
 
 
 def validate_network_flows(flow_records: pd.DataFrame, raise_exception: bool = True) -> None:
@@ -558,6 +593,71 @@ def run_aggregate_flow_for_interval_v3(interval: datetime, network: NetworkSchem
     return inserted_records
 
 
+def run_aggregate_flow_for_interval_range_v3(
+    interval_start: datetime, interval_end: datetime, network: NetworkSchema, validate_results: bool = True
+) -> int:
+    """Runs the flow solver for all intervals between interval_start and interval_end inclusive
+
+    Loads the whole range in two queries and solves every interval in a single
+    stacked solve rather than one interval at a time.
+    """
+    try:
+        energy_and_emissions = load_energy_and_emissions_for_intervals(
+            interval_start=interval_start, interval_end=interval_end, network=network
+        )
+        interconnector_data = load_interconnector_intervals(interval=interval_start, interval_end=interval_end, network=network)
+    except Exception as e:
+        logger.error(e)
+        return 0
+
+    interconnector_data_net = invert_interconnectors_invert_all_flows(interconnector_data)
+
+    region_net_demand = calculate_demand_region_for_intervals(
+        energy_and_emissions=energy_and_emissions, interconnector_data_net=interconnector_data_net
+    )
+
+    interconnector_data_for_solver = convert_dataframes_to_interconnector_format(
+        interconnector_df=interconnector_data_net, network=network
+    )
+    region_data_for_solver = convert_dataframe_to_energy_and_emissions_format(
+        region_demand_emissions_df=region_net_demand, network=network
+    )
+
+    network_flow_records = solve_flow_emissions_for_interval_range(
+        interconnector_data=interconnector_data_for_solver,
+        region_data=region_data_for_solver,
+    )
+
+    if validate_results:
+        validate_network_flows(flow_records=network_flow_records)
+
+    inserted_records = persist_network_flows_and_emissions_for_interval(network_flow_records)
+
+    logger.info(f"Inserted {inserted_records} records for {interval_start} => {interval_end} and network {network.code}")
+
+    return inserted_records
+
+
+def run_flows_for_range_v3(
+    date_start: datetime, date_end: datetime, network: NetworkSchema, chunk_size: timedelta = timedelta(days=1)
+) -> int:
+    """Run the flow solver over a date range in chunks. Used for backfills"""
+    inserted_records = 0
+    chunk_start = date_start
+    interval_size = timedelta(minutes=network.interval_size)
+
+    while chunk_start < date_end:
+        chunk_end = min(chunk_start + chunk_size, date_end) - interval_size
+
+        inserted_records += run_aggregate_flow_for_interval_range_v3(
+            interval_start=chunk_start, interval_end=chunk_end, network=network, validate_results=False
+        )
+
+        chunk_start += chunk_size
+
+    return inserted_records
+
+
 # debug entry point
 if __name__ == "__main__":
     # interval = datetime.fromisoformat("2023-07-04T06:00:00+10:00")
@@ -19,6 +19,7 @@ from opennem.api.export.queries import (
 )
 from opennem.api.facility.capacities import get_facility_capacities
 from opennem.api.stats.controllers import get_latest_interval_live, stats_factory
+from opennem.api.stats.power_buffer import power_buffer_fueltech_rows
 from opennem.api.stats.schema import DataQueryResult, OpennemDataSet
 from opennem.api.time import human_to_interval
 from opennem.controllers.output.schema import OpennemExportSeries
@@ -394,15 +395,19 @@ def power_week(
     if network_region_code and not re.match(_valid_region, network_region_code):
         raise OpenNEMInvalidNetworkRegion()
 
-    query = power_network_fueltech_query(
-        time_series=time_series,
-        networks_query=networks_query,
-        network_region=network_region_code,
-    )
+    # latest power is served from the power buffer when it covers the range
+    row = power_buffer_fueltech_rows(time_series, network_region=network_region_code, networks_query=networks_query)
 
-    with engine.connect() as c:
-        logger.debug(query)
-        row = list(c.execute(query))
+    if row is None:
+        query = power_network_fueltech_query(
+            time_series=time_series,
+            networks_query=networks_query,
+            network_region=network_region_code,
+        )
+
+        with engine.connect() as c:
+            logger.debug(query)
+            row = list(c.execute(query))
 
     stats = [DataQueryResult(interval=i[0], result=i[2], group_by=i[1] if len(i) > 1 else None) for i in row]
 
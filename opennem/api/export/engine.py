@@ -0,0 +1,207 @@
+"""
+Export execution engine
+
+Runs a set of export jobs where each job is an output path, the named queries it
+needs and a compose function that builds the stat set from the query results.
+
+    * identical queries (same controller and arguments) are run once and their
+      result shared between every job that needs them
+    * distinct queries run concurrently on a bounded thread pool so the database
+      load is capped at `export_workers` connections
+    * each output is composed and written as soon as all of its queries are done
+
+Query results are shared so compose functions must not modify them in place. Use
+`copy_stat_set` before appending to a shared result.
+"""
+import logging
+import threading
+from collections.abc import Callable
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any
+
+from pydantic import BaseModel
+
+from opennem import settings
+from opennem.api.export.controllers import NoResults
+from opennem.api.export.utils import write_output
+from opennem.api.stats.schema import OpennemDataSet
+
+logger = logging.getLogger("opennem.export.engine")
+
+
+class ExportEngineException(Exception):
+    pass
+
+
+def _freeze_argument(value: Any) -> Any:
+    """Hashable representation of a query argument"""
+    if isinstance(value, BaseModel):
+        return value.json()
+
+    if isinstance(value, list | tuple | set):
+        return tuple(_freeze_argument(i) for i in value)
+
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze_argument(v)) for k, v in value.items()))
+
+    return value
+
+
+@dataclass
+class ExportQuery:
+    """A controller call an export depends on"""
+
+    func: Callable[..., Any]
+    kwargs: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def key(self) -> tuple:
+        return (
+            self.func.__module__,
+            self.func.__qualname__,
+            tuple(sorted((k, _freeze_argument(v)) for k, v in self.kwargs.items())),
+        )
+
+    @property
+    def name(self) -> str:
+        return self.func.__name__
+
+    def run(self) -> Any:
+        return self.func(**self.kwargs)
+
+
+@dataclass
+class ExportJob:
+    """An output and the queries it is built from"""
+
+    path: str
+    inputs: dict[str, ExportQuery]
+    compose: Callable[[dict[str, Any]], OpennemDataSet | None]
+
+
+class ExportQueryCache:
+    """Runs each distinct query once and shares the future between callers"""
+
+    def __init__(self, executor: Executor) -> None:
+        self._executor = executor
+        self._futures: dict[tuple, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def submit(self, query: ExportQuery) -> Future:
+        key = query.key
+
+        with self._lock:
+            if key in self._futures:
+                self.hits += 1
+                return self._futures[key]
+
+            self.misses += 1
+            future = self._executor.submit(query.run)
+            self._futures[key] = future
+
+        return future
+
+
+def copy_stat_set(stat_set: OpennemDataSet) -> OpennemDataSet:
+    """Shallow copy of a stat set with its own data list so it can be appended to"""
+    return stat_set.copy(update={"data": list(stat_set.data)})
+
+
+def _query_result(query: ExportQuery, future: Future) -> Any:
+    """Result of a finished query or None if it failed"""
+    try:
+        return future.result()
+    except NoResults as e:
+        logger.info(f"No results for {query.name}: {e}")
+    except Exception as e:
+        logger.error(f"Export query {query.name} failed: {e}")
+
+    return None
+
+
+def run_export_jobs(
+    jobs: list[ExportJob],
+    max_workers: int | None = None,
+    writer: Callable[[str, OpennemDataSet], Any] = write_output,
+) -> int:
+    """Run export jobs, writing each output as soon as its queries have completed
+
+    Args:
+        jobs: export jobs to run
+        max_workers: number of queries run concurrently
+        writer: called with the path and composed stat set for each output
+
+    Returns:
+        number of outputs written
+
+    Raises:
+        ExportEngineException: if composing or writing any output failed. All other
+            outputs are still written.
+    """
+    max_workers = max_workers or settings.export_workers
+
+    if not jobs:
+        return 0
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="export_query")
+    cache = ExportQueryCache(executor)
+
+    job_futures: list[dict[str, Future]] = []
+    jobs_waiting_on: dict[Future, list[int]] = {}
+    remaining: list[int] = []
+
+    outputs_written = 0
+    failed_paths: list[str] = []
+
+    def _write_job(job_index: int) -> None:
+        nonlocal outputs_written
+
+        job = jobs[job_index]
+        results = {name: _query_result(job.inputs[name], future) for name, future in job_futures[job_index].items()}
+
+        try:
+            stat_set = job.compose(results)
+
+            if not stat_set:
+                logger.info(f"No stat set for {job.path}")
+                return None
+
+            writer(job.path, stat_set)
+            outputs_written += 1
+        except Exception as e:
+            logger.error(f"Error writing export {job.path}: {e}")
+            failed_paths.append(job.path)
+
+    try:
+        for job_index, job in enumerate(jobs):
+            futures = {name: cache.submit(query) for name, query in job.inputs.items()}
+            job_futures.append(futures)
+
+            unique_futures = set(futures.values())
+            remaining.append(len(unique_futures))
+
+            for future in unique_futures:
+                jobs_waiting_on.setdefault(future, []).append(job_index)
+
+        logger.info(f"Running {len(jobs)} export jobs with {cache.misses} queries ({cache.hits} shared)")
+
+        for job_index, job_remaining in enumerate(remaining):
+            if not job_remaining:
+                _write_job(job_index)
+
+        for future in as_completed(jobs_waiting_on):
+            for job_index in jobs_waiting_on[future]:
+                remaining[job_index] -= 1
+
+                if not remaining[job_index]:
+                    _write_job(job_index)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    if failed_paths:
+        raise ExportEngineException(f"Failed to write {len(failed_paths)} exports: {', '.join(failed_paths)}")
+
+    return outputs_written
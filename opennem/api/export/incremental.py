@@ -0,0 +1,185 @@
+"""
+Incremental exports
+
+Rather than rebuilding the current year daily energy sets from scratch on every
+run, load the previously written set, query only the days from the last value in
+the set and replace the tail of each series.
+
+The last day in a set is re-queried since it may have been incomplete. If the set
+of series ids or their intervals differ between the previous set and the patch
+the export falls back to a full rebuild.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+import pydantic
+
+from opennem import settings
+from opennem.api.export.engine import ExportJob, ExportQuery
+from opennem.api.stats.schema import OpennemDataHistory, OpennemDataSet, load_opennem_dataset_from_file
+from opennem.api.time import human_to_interval, human_to_period
+from opennem.controllers.output.schema import OpennemExportSeries
+from opennem.exporter.aws import OpennemDataSetSerializeS3
+
+logger = logging.getLogger("opennem.export.incremental")
+
+# incremental patches are only supported for daily series
+INCREMENTAL_INTERVAL = "1d"
+
+
+def load_exported_stat_set(path: str) -> OpennemDataSet | None:
+    """Load a previously written stat set from the local static folder or s3"""
+    try:
+        if settings.export_local:
+            return load_opennem_dataset_from_file(Path(settings.static_folder_path) / path.lstrip("/"))
+
+        s3_content = OpennemDataSetSerializeS3(settings.s3_bucket_path).load(path.lstrip("/"))
+        return pydantic.parse_obj_as(OpennemDataSet, s3_content)
+    except Exception as e:
+        logger.info(f"Could not load previous export {path}: {e}")
+
+    return None
+
+
+def get_incremental_start(stat_set: OpennemDataSet, year: int) -> datetime | None:
+    """The day to re-query from for a previously written set
+
+    This is the start of the day of the earliest last value across all series so that every series
+    has its tail replaced. Returns None if the set can't be patched"""
+    if not stat_set.data:
+        return None
+
+    histories = [i.history for i in stat_set.data]
+
+    if any(i.interval != INCREMENTAL_INTERVAL for i in histories):
+        return None
+
+    if any(i.start.year != year for i in histories):
+        return None
+
+    last = min(i.last for i in histories)
+
+    return last.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def get_incremental_time_series(time_series: OpennemExportSeries, start: datetime) -> OpennemExportSeries:
+    """Time series covering the days from start to the last complete day of a current year series
+
+    The period is all so that get_range keeps the start rather than counting back a period from the end"""
+    # matches the end of the range for the current year in OpennemExportSeries.get_range
+    end_day = time_series.end - timedelta(days=1)
+    end = datetime(
+        year=end_day.year,
+        month=end_day.month,
+        day=end_day.day,
+        hour=23,
+        minute=59,
+        second=59,
+        tzinfo=time_series.network.get_fixed_offset(),
+    )
+
+    return time_series.copy(
+        update={
+            "start": min(start, end.replace(hour=0, minute=0, second=0)),
+            "end": end,
+            "year": None,
+            "interval": human_to_interval(INCREMENTAL_INTERVAL),
+            "period": human_to_period("all"),
+        }
+    )
+
+
+def patch_stat_set(previous: OpennemDataSet, patch: OpennemDataSet, start: datetime) -> OpennemDataSet | None:
+    """Replace the tail of each series in previous from start with the series in patch
+
+    Returns None if the ids or intervals of the two sets differ"""
+    previous_series = {i.id: i for i in previous.data}
+    patch_series = {i.id: i for i in patch.data}
+
+    if len(previous_series) != len(previous.data) or previous_series.keys() != patch_series.keys():
+        logger.info("Series ids differ between previous set and patch")
+        return None
+
+    merged = []
+
+    for series in patch.data:
+        prior = previous_series[series.id].history
+        tail = series.history
+
+        if prior.interval != INCREMENTAL_INTERVAL or tail.interval != INCREMENTAL_INTERVAL:
+            return None
+
+        keep_count = (start.date() - prior.start.date()).days
+
+        # the patch series has its leading nulls trimmed
+        null_count = (tail.start.date() - start.date()).days
+
+        if keep_count < 0 or null_count < 0 or keep_count > len(prior.data):
+            logger.info(f"Intervals differ between previous set and patch for {series.id}")
+            return None
+
+        history = OpennemDataHistory(
+            start=prior.start,
+            last=tail.last,
+            interval=tail.interval,
+            data=prior.data[:keep_count] + [None] * null_count + tail.data,
+        )
+
+        merged.append(series.copy(update={"history": history}))
+
+    return patch.copy(update={"data": merged})
+
+
+@dataclass
+class IncrementalExport:
+    """Patches a previously written export
+
+    When the patch can't be applied needs_rebuild is set and nothing is written so the
+    full job can be run instead"""
+
+    full_job: ExportJob
+    previous: OpennemDataSet
+    time_series: OpennemExportSeries
+    needs_rebuild: bool = False
+
+    @property
+    def job(self) -> ExportJob:
+        """The full job with its queries limited to the incremental time series"""
+        inputs = {
+            name: ExportQuery(query.func, {**query.kwargs, "time_series": self.time_series})
+            if "time_series" in query.kwargs
+            else query
+            for name, query in self.full_job.inputs.items()
+        }
+
+        return ExportJob(path=self.full_job.path, inputs=inputs, compose=self.compose)
+
+    def compose(self, results: dict[str, Any]) -> OpennemDataSet | None:
+        patch = self.full_job.compose(results)
+
+        if patch:
+            if stat_set := patch_stat_set(self.previous, patch, self.time_series.start):
+                return stat_set
+
+        logger.info(f"Could not patch {self.full_job.path}. Rebuilding")
+        self.needs_rebuild = True
+
+        return None
+
+
+def build_incremental_export(job: ExportJob, time_series: OpennemExportSeries, year: int) -> IncrementalExport | None:
+    """Build an incremental export for a current year job or None if it needs a full rebuild"""
+    if not (previous := load_exported_stat_set(job.path)):
+        return None
+
+    if not (start := get_incremental_start(previous, year)):
+        return None
+
+    incremental_time_series = get_incremental_time_series(time_series, start)
+
+    logger.debug(f"Incremental export for {job.path} from {incremental_time_series.start}")
+
+    return IncrementalExport(full_job=job, previous=previous, time_series=incremental_time_series)
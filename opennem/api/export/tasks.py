@@ -14,7 +14,6 @@ import logging
 from datetime import datetime, timedelta
 
 from opennem.api.export.controllers import (
-    NoResults,
     demand_network_region_daily,
     demand_week,
     energy_fueltech_daily,
@@ -24,6 +23,8 @@ from opennem.api.export.controllers import (
     power_week,
     weather_daily,
 )
+from opennem.api.export.engine import ExportJob, ExportQuery, copy_stat_set, run_export_jobs
+from opennem.api.export.incremental import IncrementalExport, build_incremental_export
 from opennem.api.export.map import PriorityType, StatExport, StatType, get_export_map
 from opennem.api.export.utils import write_output
 from opennem.api.stats.controllers import get_scada_range, get_scada_range_optimized
@@ -180,6 +181,9 @@ def export_energy(
 
     logger.info(f"Running export_energy with {len(stats)} stats")
 
+    jobs: list[ExportJob] = []
+    incremental_exports: list[IncrementalExport] = []
+
     for energy_stat in stats:
         if energy_stat.stat_type != StatType.energy:
             continue
@@ -217,93 +221,97 @@ def export_energy(
                 logger.debug(f"Skipping since we only want latest and this is not the current year {energy_stat.year}")
                 continue
 
-            stat_set = energy_fueltech_daily(
-                time_series=time_series,
-                networks_query=energy_stat.networks,
-                network_region_code=energy_stat.network_region_query or energy_stat.network_region,
-            )
+        elif energy_stat.period and energy_stat.period.period_human == "all" and not latest:
+            time_series.period = human_to_period("all")
+            time_series.interval = human_to_interval("1M")
+            time_series.year = None
 
-            if not stat_set:
-                logger.error(
-                    f"No result from energy_fueltech_daily for {energy_stat.network} "
-                    "{energy_stat.period} {energy_stat.network_region}"
-                )
-                continue
+        else:
+            continue
 
-            logger.debug(
-                f"Got {len(stat_set.data)} sets for {energy_stat.network} {energy_stat.period}{energy_stat.network_region}"
-            )
+        energy_job = energy_export_job(
+            path=energy_stat.path,
+            time_series=time_series,
+            networks=energy_stat.networks,
+            network_region_code=energy_stat.network_region,
+            network_region_query=energy_stat.network_region_query or energy_stat.network_region,
+            include_interconnectors=bool(energy_stat.network.has_interconnectors and energy_stat.network_region),
+            bom_station=energy_stat.bom_station,
+        )
 
-            demand_energy_and_value = demand_network_region_daily(
-                time_series=time_series, network_region_code=energy_stat.network_region, networks=energy_stat.networks
-            )
-            stat_set.append_set(demand_energy_and_value)
+        # latest only needs the days since the last export
+        if latest and (incremental_export := build_incremental_export(energy_job, time_series, CURRENT_YEAR)):
+            incremental_exports.append(incremental_export)
+            jobs.append(incremental_export.job)
+            continue
 
-            if energy_stat.network.has_interconnectors and energy_stat.network_region:
-                interconnector_flows = energy_interconnector_flows_and_emissions_v2(
-                    time_series=time_series,
-                    network_region_code=energy_stat.network_region_query or energy_stat.network_region,
-                )
-                stat_set.append_set(interconnector_flows)
+        jobs.append(energy_job)
+
+    run_export_jobs(jobs)
+
+    if rebuild_jobs := [i.full_job for i in incremental_exports if i.needs_rebuild]:
+        logger.info(f"Rebuilding {len(rebuild_jobs)} energy exports that could not be patched")
+        run_export_jobs(rebuild_jobs)
+
+
+def energy_export_job(
+    path: str,
+    time_series: OpennemExportSeries,
+    networks: list[NetworkSchema] | None,
+    network_region_code: str | None,
+    network_region_query: str | None = None,
+    include_interconnectors: bool = False,
+    bom_station: str | None = None,
+    include_cpi: bool = False,
+) -> ExportJob:
+    """Export job for an energy stat set
+
+    Fueltech energy with demand, interconnector flows, weather and CPI appended"""
+    network_region_query = network_region_query or network_region_code
+
+    inputs = {
+        "energy": ExportQuery(
+            energy_fueltech_daily,
+            {"time_series": time_series, "networks_query": networks, "network_region_code": network_region_query},
+        ),
+        "demand": ExportQuery(
+            demand_network_region_daily,
+            {"time_series": time_series, "network_region_code": network_region_code, "networks": networks},
+        ),
+    }
+
+    if include_interconnectors:
+        inputs["interconnector_flows"] = ExportQuery(
+            energy_interconnector_flows_and_emissions_v2,
+            {"time_series": time_series, "network_region_code": network_region_query},
+        )
 
-            if energy_stat.bom_station:
-                try:
-                    weather_stats = weather_daily(
-                        time_series=time_series,
-                        station_code=energy_stat.bom_station,
-                        network_region=energy_stat.network_region,
-                    )
-                    stat_set.append_set(weather_stats)
-                except NoResults as e:
-                    logger.info(f"No results for weather result: {e}")
-                except Exception as e:
-                    logger.error(f"weather_stat exception: {e}")
-            else:
-                logger.info("Stat set has no bom station")
+    if bom_station:
+        inputs["weather"] = ExportQuery(
+            weather_daily,
+            {"time_series": time_series, "station_code": bom_station, "network_region": network_region_code},
+        )
 
-            write_output(energy_stat.path, stat_set)
+    if include_cpi:
+        inputs["cpi"] = ExportQuery(gov_stats_cpi)
 
-        elif energy_stat.period and energy_stat.period.period_human == "all" and not latest:
-            time_series.period = human_to_period("all")
-            time_series.interval = human_to_interval("1M")
-            time_series.year = None
-            time_series.interval = human_to_interval("1M")
+    return ExportJob(path=path, inputs=inputs, compose=compose_energy_stat_set)
 
-            stat_set = energy_fueltech_daily(
-                time_series=time_series,
-                networks_query=energy_stat.networks,
-                network_region_code=energy_stat.network_region_query or energy_stat.network_region,
-            )
 
-            if not stat_set:
-                continue
+def compose_energy_stat_set(results: dict[str, OpennemDataSet | None]) -> OpennemDataSet | None:
+    """Append the supporting sets to the fueltech energy set"""
+    energy_set = results.get("energy")
 
-            demand_energy_and_value = demand_network_region_daily(
-                time_series=time_series, network_region_code=energy_stat.network_region, networks=energy_stat.networks
-            )
-            stat_set.append_set(demand_energy_and_value)
+    if not energy_set:
+        return None
 
-            if energy_stat.network.has_interconnectors and energy_stat.network_region:
-                interconnector_flows = energy_interconnector_flows_and_emissions_v2(
-                    time_series=time_series,
-                    network_region_code=energy_stat.network_region_query or energy_stat.network_region,
-                )
-                stat_set.append_set(interconnector_flows)
+    # query results are shared between exports
+    stat_set = copy_stat_set(energy_set)
 
-            if energy_stat.bom_station:
-                try:
-                    weather_stats = weather_daily(
-                        time_series=time_series,
-                        station_code=energy_stat.bom_station,
-                        network_region=energy_stat.network_region,
-                    )
-                    stat_set.append_set(weather_stats)
-                except NoResults as e:
-                    logger.info(f"No weather results: {e}")
-                except Exception:
-                    pass
+    for set_name in ["demand", "interconnector_flows", "weather", "cpi"]:
+        stat_set.append_set(results.get(set_name))
 
-            write_output(energy_stat.path, stat_set)
+    return stat_set
 
 
 def export_all_monthly(networks: list[NetworkSchema] | None = None, network_region_code: str | None = None) -> None:
@@ -412,7 +420,7 @@ def export_all_daily(networks: list[NetworkSchema] | None = None, network_region
 
     session = get_scoped_session()
 
-    cpi = gov_stats_cpi()
+    jobs: list[ExportJob] = []
 
     for network in networks:
         network_regions_query = session.query(NetworkRegion).filter_by(export_set=True).filter_by(network_id=network.code)
@@ -444,41 +452,21 @@ def export_all_daily(networks: list[NetworkSchema] | None = None, network_region
                 period=human_to_period("all"),
             )
 
-            stat_set = energy_fueltech_daily(
-                time_series=time_series,
-                networks_query=networks,
-                network_region_code=network_region.code,
-            )
-
-            if not stat_set:
-                continue
-
-            demand_energy_and_value = demand_network_region_daily(
-                time_series=time_series, network_region_code=network_region.code, networks=networks
-            )
-            stat_set.append_set(demand_energy_and_value)
-
-            # Hard coded to NEM only atm but we'll put has_interconnectors
-            # in the metadata to automate all this
-            if network == NetworkNEM:
-                interconnector_flows = energy_interconnector_flows_and_emissions_v2(
+            jobs.append(
+                energy_export_job(
+                    path=f"v3/stats/au/{network_region.code}/daily.json",
                     time_series=time_series,
+                    networks=networks,
                     network_region_code=network_region.code,
+                    # Hard coded to NEM only atm but we'll put has_interconnectors
+                    # in the metadata to automate all this
+                    include_interconnectors=network == NetworkNEM,
+                    bom_station=get_network_region_weather_station(network_region.code),
+                    include_cpi=True,
                 )
-                stat_set.append_set(interconnector_flows)
-
-            if bom_station := get_network_region_weather_station(network_region.code):
-                with contextlib.suppress(Exception):
-                    weather_stats = weather_daily(
-                        time_series=time_series,
-                        station_code=bom_station,
-                        network_region=network_region.code,
-                    )
-                    stat_set.append_set(weather_stats)
-            if cpi:
-                stat_set.append_set(cpi)
+            )
 
-            write_output(f"v3/stats/au/{network_region.code}/daily.json", stat_set)
+    run_export_jobs(jobs)
 
 
 @profile_task(
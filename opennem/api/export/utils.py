@@ -10,7 +10,7 @@ from pydantic.main import BaseModel
 from opennem import settings
 from opennem.api.stats.schema import OpennemDataSet
 from opennem.exporter.aws import write_statset_to_s3, write_to_s3
-from opennem.exporter.local import write_to_local
+from opennem.exporter.local import write_statset_to_local, write_to_local
 
 logger = logging.getLogger(__name__)
 
@@ -26,24 +26,29 @@ def write_output(
     if settings.export_local:
         is_local = True
 
-    if hasattr(stat_set, "json"):
-        indent = None
+    byte_count = 0
+
+    # data sets are serialized by the writers so unchanged sets can be skipped
+    if isinstance(stat_set, OpennemDataSet):
+        if is_local:
+            return write_statset_to_local(stat_set, path, exclude_unset=exclude_unset, exclude=exclude)
+
+        return write_statset_to_s3(stat_set, path, exclude_unset=exclude_unset, exclude=exclude)
 
-        if settings.debug:
-            indent = 4
+    indent = None
 
+    if settings.debug:
+        indent = 4
+
+    if hasattr(stat_set, "json"):
         write_content = stat_set.json(exclude_unset=exclude_unset, indent=indent, exclude=exclude)
     else:
         write_content = json.dumps(stat_set)
 
-    byte_count = 0
-
     if is_local:
         byte_count = write_to_local(path, write_content)
     elif isinstance(stat_set, str):
         byte_count = write_to_s3(stat_set, path)
-    elif isinstance(stat_set, OpennemDataSet):
-        byte_count = write_statset_to_s3(stat_set, path, exclude_unset=exclude_unset, exclude=exclude)
     elif isinstance(stat_set, BaseModel):
         byte_count = write_to_s3(write_content, path)
     else:
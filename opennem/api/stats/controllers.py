@@ -1,9 +1,8 @@
 import logging
-from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from textwrap import dedent
-from typing import Any
 
+import numpy as np
 from datetime_truncate import truncate as date_trunc
 from fastapi.exceptions import HTTPException
 from sqlalchemy import text as sql
@@ -17,9 +16,9 @@ from opennem.queries.utils import duid_to_case
 from opennem.schema.network import NetworkAEMORooftop, NetworkAEMORooftopBackfill, NetworkAPVI, NetworkSchema
 from opennem.schema.time import TimeInterval
 from opennem.schema.units import UnitDefinition
-from opennem.utils.cache import cache_scada_result
+from opennem.utils.cache import cache_balancing_result, cache_latest_interval_result, cache_scada_result
 from opennem.utils.dates import get_last_completed_interval_for_network
-from opennem.utils.numbers import cast_trailing_nulls, trim_nulls
+from opennem.utils.numbers import trim_null_array
 from opennem.utils.timezone import is_aware, make_aware
 from opennem.utils.version import get_version
 
@@ -28,6 +27,56 @@ from .schema import DataQueryResult, OpennemData, OpennemDataHistory, OpennemDat
 logger = logging.getLogger(__name__)
 
 
+def group_stats_columns(stats: list[DataQueryResult]) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    """
+    Group query results by group_by in a single pass
+
+    Returns the interval sorted (intervals, values) object arrays for each group. Where a
+    group has more than one result for an interval the last one wins. Results without a
+    group_by are dropped.
+    """
+    rows = [i for i in stats if i.group_by]
+
+    if not rows:
+        return {}
+
+    group_index: dict[str, int] = {}
+
+    group_ids = np.fromiter(
+        (group_index.setdefault(i.group_by, len(group_index)) for i in rows), dtype=np.int64, count=len(rows)  # type: ignore
+    )
+
+    intervals_sorted = sorted({i.interval for i in rows})
+    interval_positions = {dt: position for position, dt in enumerate(intervals_sorted)}
+
+    interval_ids = np.fromiter((interval_positions[i.interval] for i in rows), dtype=np.int64, count=len(rows))
+
+    values = np.empty(len(rows), dtype=object)
+    values[:] = [i.result for i in rows]
+
+    # stable sort by group then interval so duplicate intervals keep their query order
+    order = np.lexsort((interval_ids, group_ids))
+    group_ids, interval_ids, values = group_ids[order], interval_ids[order], values[order]
+
+    # keep the last result in each run of (group, interval)
+    keep = np.ones(len(rows), dtype=bool)
+    keep[:-1] = (group_ids[1:] != group_ids[:-1]) | (interval_ids[1:] != interval_ids[:-1])
+    group_ids, interval_ids, values = group_ids[keep], interval_ids[keep], values[keep]
+
+    intervals = np.empty(len(intervals_sorted), dtype=object)
+    intervals[:] = intervals_sorted
+
+    group_codes = list(group_index.keys())
+    boundaries = np.flatnonzero(np.diff(group_ids)) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(group_ids)]))
+
+    return {
+        group_codes[group_ids[start]]: (intervals[interval_ids[start:end]], values[start:end])
+        for start, end in zip(starts, ends, strict=True)
+    }
+
+
 def stats_factory(
     stats: list[DataQueryResult],
     units: UnitDefinition,
@@ -58,27 +107,17 @@ def stats_factory(
 
     group_codes = list({i.group_by for i in stats if i.group_by})
 
-    stats_grouped = []
-
-    for group_code in group_codes:
-        data_grouped: dict[datetime, Any] = {}
-
-        for stat in stats:
-            if stat.group_by != group_code:
-                continue
+    stats_columns = group_stats_columns(stats)
 
-            if stat.interval not in data_grouped:
-                data_grouped[stat.interval] = None
-
-            # if stat.result:
-            data_grouped[stat.interval] = stat.result
+    stats_grouped = []
 
-        data_sorted = OrderedDict(sorted(data_grouped.items()))
+    cast_trailing = bool((not units.name.startswith("temperature") or (units.cast_nulls is True)) and (cast_nulls is True))
 
-        data_value = list(data_sorted.values())
+    for group_code in group_codes:
+        group_intervals, group_values = stats_columns[group_code]
 
         # Skip null series
-        if exclude_nulls and not [i for i in data_value if i]:
+        if exclude_nulls and not any(group_values):
             continue
 
         # @TODO possible bring this back
@@ -86,22 +125,15 @@ def stats_factory(
         # if sum([i for i in data_value if i]) == 0:
         # continue
 
-        # Cast trailing nulls
-        if (not units.name.startswith("temperature") or (units.cast_nulls is True)) and (cast_nulls is True):
-            data_value = cast_trailing_nulls(data_value)
-
-        data_trimmed = dict(zip(data_sorted.keys(), data_value, strict=True))
+        # Cast trailing nulls and trim
+        offset, data_values = trim_null_array(group_values, cast_trailing=cast_trailing)
 
-        data_trimmed = trim_nulls(data_trimmed)
-
-        # Find start/end dates
-        dates = list(data_trimmed.keys())
-
-        if not dates:
+        if not len(data_values):
             return None
 
-        start = min(dates)
-        end = max(dates)
+        # Find start/end dates
+        start = group_intervals[offset]
+        end = group_intervals[offset + len(data_values) - 1]
 
         # should probably make sure these are the same TZ
         if localize:
@@ -134,14 +166,11 @@ def stats_factory(
             start = date_trunc(start, truncate_to="month")
             end = date_trunc(end, truncate_to="month")
 
-        # free
-        dates = []
-
         history = OpennemDataHistory(
             start=start,
             last=end,
             interval=interval.interval_human,
-            data=data_trimmed.values(),
+            data=data_values.tolist(),
         )
 
         data = OpennemData(
@@ -271,6 +300,7 @@ def networks_to_in(networks: list[NetworkSchema]) -> str:
     return ", ".join(codes)
 
 
+@cache_latest_interval_result
 def get_latest_interval_live(network: NetworkSchema) -> datetime:
     """Get the latest live interval for a network"""
     query = sql(
@@ -437,6 +467,7 @@ def get_scada_range(
     return scada_range
 
 
+@cache_balancing_result
 def get_balancing_range(
     network: NetworkSchema | None = None,
     network_region: str | None = None,
@@ -0,0 +1,471 @@
+"""
+Latest power snapshot
+
+Rolling ring buffer of the last `power_buffer_days` of network interval power by
+facility, used to serve the latest week power outputs (export_power and the
+power API routes) without querying facility_scada on every request.
+
+    * the crawl pipeline calls `update_power_buffer` as each dispatch scada
+      interval lands, which queries only the intervals since the last update
+      and publishes the buffer to redis
+    * crawls that backfill or revise facility_scada, such as the next day
+      dispatch and the archive crawlers, call `update_power_buffer` with the
+      start of the revised range so that those intervals are re-queried
+    * readers use `get_power_buffer` which keeps an in-process copy and only
+      reloads it from redis when a newer version has been published
+
+Region and fueltech totals are aggregated from the facility columns on read and
+produce the same rows as `power_network_fueltech_query` and
+`power_facility_query`. A buffer that has not been updated within
+`power_buffer_max_lag_minutes` is not used so that callers fall back to the
+database.
+"""
+import json
+import logging
+import threading
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+import numpy as np
+import redis
+from sqlalchemy import text as sql
+
+from opennem import settings
+from opennem.controllers.output.schema import OpennemExportSeries
+from opennem.db import get_database_engine
+from opennem.schema.network import NetworkSchema
+
+logger = logging.getLogger("opennem.api.stats.power_buffer")
+
+REDIS_POWER_BUFFER_KEY = "opennem:power_buffer"
+
+# intervals before the latest that are re-queried on each update since they can be revised
+POWER_BUFFER_REQUERY_INTERVALS = 3
+
+# fueltechs excluded from the fueltech totals, matches power_network_fueltech_query for NEM and WEM
+POWER_BUFFER_FUELTECHS_EXCLUDED = {"exports", "imports", "interconnector", "solar_rooftop"}
+
+
+@dataclass
+class PowerBufferFacility:
+    code: str
+    network_region: str | None
+    fueltech_id: str | None
+    emissions_factor_co2: float | None
+
+
+@dataclass
+class PowerRingBuffer:
+    """Power by facility for the series of intervals stepping back from `latest` to `start`
+
+    Values are stored as a 2d array of intervals (oldest first) by facilities with
+    NaN for missing values"""
+
+    network_code: str
+    start: datetime
+    latest: datetime
+    step: timedelta
+    facilities: list[PowerBufferFacility]
+    values: np.ndarray
+    updated_at: datetime
+    version: int = 0
+    _facility_index: dict[str, int] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self) -> None:
+        self._facility_index = {f.code: i for i, f in enumerate(self.facilities)}
+
+    @classmethod
+    def empty(
+        cls, network_code: str, latest: datetime, step: timedelta, days: int, facilities: list[PowerBufferFacility]
+    ) -> "PowerRingBuffer":
+        num_intervals = timedelta(days=days) // step + 1
+
+        return cls(
+            network_code=network_code,
+            start=latest - step * (num_intervals - 1),
+            latest=latest,
+            step=step,
+            facilities=facilities,
+            values=np.full((num_intervals, len(facilities)), np.nan),
+            updated_at=latest,
+        )
+
+    def can_advance_to(self, latest: datetime) -> bool:
+        """The buffer can be shifted forward to a new latest interval that lies on its series"""
+        return latest >= self.latest and (latest - self.latest) % self.step == timedelta(0)
+
+    def advance_to(self, latest: datetime) -> None:
+        """Shift the window forward, dropping the oldest intervals"""
+        shift = (latest - self.latest) // self.step
+
+        if not shift:
+            return
+
+        if shift >= len(self.values):
+            self.values = np.full(self.values.shape, np.nan)
+        else:
+            self.values = np.concatenate([self.values[shift:], np.full((shift, self.values.shape[1]), np.nan)])
+
+        self.start += self.step * shift
+        self.latest = latest
+
+    def set_values(self, records: list[tuple[datetime, str, float | None]]) -> int:
+        """Set (interval, facility_code, power) records, returning the number stored
+
+        Records outside the window or for unknown facilities are skipped"""
+        stored = 0
+
+        for interval, facility_code, power in records:
+            offset = interval - self.start
+
+            if offset < timedelta(0) or offset % self.step:
+                continue
+
+            position = offset // self.step
+            column = self._facility_index.get(facility_code)
+
+            if position >= len(self.values) or column is None:
+                continue
+
+            self.values[position, column] = np.nan if power is None else float(power)
+            stored += 1
+
+        return stored
+
+    def covers(self, start: datetime, interval_size: int) -> bool:
+        return self.step == timedelta(minutes=interval_size) and start >= self.start
+
+    def _window(self, start: datetime, end: datetime) -> tuple[list[datetime], slice]:
+        first = max(0, -((self.start - start) // self.step))
+        last = min(len(self.values) - 1, (end - self.start) // self.step)
+
+        intervals = [self.start + self.step * i for i in range(first, last + 1)]
+
+        return intervals, slice(first, last + 1)
+
+    def fueltech_rows(
+        self, start: datetime, end: datetime, network_region: str | None = None
+    ) -> list[tuple[datetime, str, float, float, float]]:
+        """Rows of (interval, fueltech, power, emissions, emissions intensity) as returned by
+        power_network_fueltech_query"""
+        intervals, window = self._window(start, end)
+
+        if not intervals:
+            return []
+
+        values = self.values[window]
+        groups: dict[str, list[int]] = {}
+
+        for column, facility in enumerate(self.facilities):
+            if not facility.fueltech_id or facility.fueltech_id in POWER_BUFFER_FUELTECHS_EXCLUDED:
+                continue
+
+            if network_region and facility.network_region != network_region:
+                continue
+
+            groups.setdefault(facility.fueltech_id, []).append(column)
+
+        rows = []
+
+        for fueltech_id, columns in groups.items():
+            fueltech_values = values[:, columns]
+            has_data = ~np.isnan(fueltech_values).all(axis=0)
+
+            # only facilities with a value in the range are gap filled
+            if not has_data.any():
+                continue
+
+            fueltech_values = fueltech_values[:, has_data]
+            factors = np.array(
+                [
+                    np.nan if self.facilities[c].emissions_factor_co2 is None else self.facilities[c].emissions_factor_co2
+                    for c in np.array(columns)[has_data]
+                ]
+            )
+
+            power = np.nansum(fueltech_values, axis=1)
+            emissions = np.nansum(fueltech_values * factors, axis=1)
+
+            rows += [
+                (interval, fueltech_id, interval_power, interval_emissions, round(interval_emissions / interval_power, 4))
+                if interval_power > 0
+                else (interval, fueltech_id, interval_power, 0, 0)
+                for interval, interval_power, interval_emissions in zip(
+                    intervals, power.tolist(), emissions.tolist(), strict=True
+                )
+            ]
+
+        return rows
+
+    def facility_rows(self, facility_codes: list[str], start: datetime, end: datetime) -> list[tuple[datetime, float, str]]:
+        """Rows of (interval, power, facility_code) as returned by power_facility_query"""
+        intervals, window = self._window(start, end)
+        rows = []
+
+        for facility_code in facility_codes:
+            column = self._facility_index.get(facility_code)
+
+            if column is None:
+                continue
+
+            facility_values = self.values[window, column]
+
+            if np.isnan(facility_values).all():
+                continue
+
+            rows += [
+                (interval, float(value), facility_code)
+                for interval, value in zip(intervals, np.nan_to_num(facility_values, nan=0.0), strict=True)
+            ]
+
+        return rows
+
+    def meta(self) -> dict:
+        return {
+            "network_code": self.network_code,
+            "start": self.start.isoformat(),
+            "latest": self.latest.isoformat(),
+            "step": self.step.total_seconds(),
+            "facilities": [[f.code, f.network_region, f.fueltech_id, f.emissions_factor_co2] for f in self.facilities],
+            "shape": list(self.values.shape),
+            "updated_at": self.updated_at.isoformat(),
+            "version": self.version,
+        }
+
+    @classmethod
+    def from_meta(cls, meta: dict, values: bytes) -> "PowerRingBuffer":
+        return cls(
+            network_code=meta["network_code"],
+            start=datetime.fromisoformat(meta["start"]),
+            latest=datetime.fromisoformat(meta["latest"]),
+            step=timedelta(seconds=meta["step"]),
+            facilities=[PowerBufferFacility(*f) for f in meta["facilities"]],
+            values=np.frombuffer(zlib.decompress(values), dtype=np.float64).reshape(meta["shape"]).copy(),
+            updated_at=datetime.fromisoformat(meta["updated_at"]),
+            version=meta["version"],
+        )
+
+
+def _query_facilities(network: NetworkSchema) -> list[PowerBufferFacility]:
+    engine = get_database_engine()
+
+    query = sql(
+        """
+        select f.code, f.network_region, f.fueltech_id, f.emissions_factor_co2
+        from facility f
+        where f.network_id = :network_id
+        order by f.code
+    """
+    ).bindparams(network_id=network.code)
+
+    with engine.connect() as c:
+        return [
+            PowerBufferFacility(
+                code=code,
+                network_region=network_region,
+                fueltech_id=fueltech_id,
+                emissions_factor_co2=float(emissions_factor) if emissions_factor is not None else None,
+            )
+            for code, network_region, fueltech_id, emissions_factor in c.execute(query)
+        ]
+
+
+def _query_power(network: NetworkSchema, since: datetime) -> list[tuple[datetime, str, float | None]]:
+    engine = get_database_engine()
+
+    query = sql(
+        """
+        select fs.trading_interval, fs.facility_code, fs.generated
+        from facility_scada fs
+        where
+            fs.network_id = :network_id
+            and fs.is_forecast is false
+            and fs.trading_interval >= :since
+    """
+    ).bindparams(network_id=network.code, since=since)
+
+    with engine.connect() as c:
+        return [(interval.astimezone(network.get_fixed_offset()), code, power) for interval, code, power in c.execute(query)]
+
+
+_redis_client: redis.Redis | None = None
+_power_buffers: dict[str, PowerRingBuffer] = {}
+_power_buffer_lock = threading.Lock()
+
+
+def _redis() -> redis.Redis:
+    global _redis_client
+
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.cache_url, socket_timeout=2, socket_connect_timeout=1)
+
+    return _redis_client
+
+
+def _redis_key(network: NetworkSchema) -> str:
+    return f"{REDIS_POWER_BUFFER_KEY}:{network.code}"
+
+
+def publish_power_buffer(network: NetworkSchema, buffer: PowerRingBuffer) -> None:
+    """Publish a buffer to redis for other processes"""
+    content = zlib.compress(np.ascontiguousarray(buffer.values).tobytes(), 1)
+
+    _redis().hset(_redis_key(network), mapping={"version": buffer.version, "meta": json.dumps(buffer.meta()), "values": content})
+
+
+def load_power_buffer(network: NetworkSchema, newer_than: int | None = None) -> PowerRingBuffer | None:
+    """Load the buffer published to redis if its version is newer than newer_than
+
+    Only the version is read if there is no newer buffer"""
+    key = _redis_key(network)
+    version = _redis().hget(key, "version")
+
+    if version is None or (newer_than is not None and int(version) <= newer_than):
+        return None
+
+    meta_content, values = _redis().hmget(key, ["meta", "values"])
+
+    if not meta_content or not values:
+        return None
+
+    return PowerRingBuffer.from_meta(json.loads(meta_content), values)
+
+
+def _is_fresh(buffer: PowerRingBuffer, now: datetime) -> bool:
+    return now - buffer.updated_at <= timedelta(minutes=settings.power_buffer_max_lag_minutes)
+
+
+def update_power_buffer(
+    network: NetworkSchema, now: datetime | None = None, since: datetime | None = None
+) -> PowerRingBuffer | None:
+    """Add the intervals stored since the last update to the buffer and publish it
+
+    Seeds the buffer with the full window if there is none or it is too far behind.
+    Intervals from since are re-queried, for backfills that revise intervals already
+    in the buffer"""
+    if not settings.power_buffer_enabled:
+        return None
+
+    now = now or datetime.now(network.get_fixed_offset())
+    step = timedelta(minutes=network.interval_size)
+    latest = now.replace(minute=now.minute - now.minute % network.interval_size, second=0, microsecond=0)
+
+    with _power_buffer_lock:
+        buffer = _power_buffers.get(network.code)
+
+        try:
+            if published := load_power_buffer(network, newer_than=buffer.version if buffer else None):
+                buffer = published
+        except redis.RedisError as e:
+            logger.warning(f"Could not load power buffer for {network.code}: {e}")
+
+        previous_version = buffer.version if buffer else 0
+        seed = not buffer or not buffer.can_advance_to(latest) or latest - buffer.latest >= buffer.latest - buffer.start
+
+        if buffer and not seed:
+            requery_since = buffer.latest - buffer.step * POWER_BUFFER_REQUERY_INTERVALS
+
+            if since:
+                requery_since = min(requery_since, since)
+
+            buffer.advance_to(latest)
+            since = max(requery_since, buffer.start)
+            records = _query_power(network, since=since)
+
+            # new facilities since the buffer was seeded
+            if {r[1] for r in records} - set(buffer._facility_index):
+                logger.info(f"New facilities in {network.code} power buffer. Reseeding")
+                seed = True
+
+        if seed:
+            logger.info(f"Seeding power buffer for {network.code} with {settings.power_buffer_days} days")
+            buffer = PowerRingBuffer.empty(
+                network.code, latest=latest, step=step, days=settings.power_buffer_days, facilities=_query_facilities(network)
+            )
+            since = buffer.start
+            records = _query_power(network, since=since)
+
+        stored = buffer.set_values(records)
+        buffer.updated_at = now
+        buffer.version = previous_version + 1
+
+        logger.debug(f"Power buffer for {network.code} updated with {stored} records from {since}")
+
+        _power_buffers[network.code] = buffer
+
+        try:
+            publish_power_buffer(network, buffer)
+        except redis.RedisError as e:
+            logger.warning(f"Could not publish power buffer for {network.code}: {e}")
+
+    return buffer
+
+
+def get_power_buffer(network: NetworkSchema, start: datetime | None = None) -> PowerRingBuffer | None:
+    """A fresh power buffer for network covering start, or None if the database should be queried"""
+    if not settings.power_buffer_enabled:
+        return None
+
+    buffer = _power_buffers.get(network.code)
+
+    try:
+        if published := load_power_buffer(network, newer_than=buffer.version if buffer else None):
+            with _power_buffer_lock:
+                buffer = _power_buffers[network.code] = published
+    except redis.RedisError as e:
+        logger.debug(f"Could not load power buffer for {network.code}: {e}")
+
+    if not buffer or not _is_fresh(buffer, datetime.now(network.get_fixed_offset())):
+        return None
+
+    if start and not buffer.covers(start, network.interval_size):
+        return None
+
+    return buffer
+
+
+def _buffer_for_time_series(
+    time_series: OpennemExportSeries, networks_query: list[NetworkSchema] | None = None
+) -> tuple[PowerRingBuffer, datetime, datetime] | None:
+    network = time_series.network
+
+    # the buffer only holds the network itself. subnetworks are rooftop which is excluded from power
+    network_codes = {network.code} | {n.code for n in network.subnetworks or []}
+
+    if networks_query and not {n.code for n in networks_query} <= network_codes:
+        return None
+
+    if time_series.interval.interval != network.interval_size:
+        return None
+
+    date_range = time_series.get_range()
+
+    if not (buffer := get_power_buffer(network, start=date_range.start)):
+        return None
+
+    return buffer, date_range.start, date_range.end
+
+
+def power_buffer_fueltech_rows(
+    time_series: OpennemExportSeries,
+    network_region: str | None = None,
+    networks_query: list[NetworkSchema] | None = None,
+) -> list[tuple] | None:
+    """Fueltech power rows for a time series from the power buffer or None if it can't serve it"""
+    if not (buffer_range := _buffer_for_time_series(time_series, networks_query)):
+        return None
+
+    buffer, start, end = buffer_range
+
+    return buffer.fueltech_rows(start, end, network_region=network_region)
+
+
+def power_buffer_facility_rows(time_series: OpennemExportSeries, facility_codes: list[str]) -> list[tuple] | None:
+    """Facility power rows for a time series from the power buffer or None if it can't serve it"""
+    if not (buffer_range := _buffer_for_time_series(time_series)):
+        return None
+
+    buffer, start, end = buffer_range
+
+    return buffer.facility_rows(facility_codes, start, end)
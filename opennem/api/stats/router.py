@@ -1,7 +1,7 @@
 import logging
 from datetime import date, datetime, timedelta
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import RedirectResponse
 from fastapi_cache.decorator import cache
 from sqlalchemy.engine.base import Engine
@@ -26,8 +26,10 @@ from opennem.utils.dates import get_last_completed_interval_for_network, get_tod
 from opennem.utils.time import human_to_timedelta
 
 from .controllers import get_scada_range, get_scada_range_optimized, stats_factory
+from .power_buffer import power_buffer_facility_rows
 from .queries import energy_facility_query, network_fueltech_demand_query, power_facility_query
 from .schema import DataQueryResult, OpennemDataSet
+from .stream import StatsResponseFormat, cache_unless_streaming, is_streaming_format, iter_query_rows, stream_rows_response
 
 logger = logging.getLogger(__name__)
 
@@ -41,7 +43,7 @@ router = APIRouter()
     response_model_exclude_unset=True,
     description="Get the power outputs for a station",
 )
-@cache(expire=60 * 5)
+@cache_unless_streaming(expire=60 * 5)
 async def power_station(
     station_code: str | None = None,
     network_code: str | None = None,
@@ -51,6 +53,7 @@ async def power_station(
     interval_human: str | None = None,
     period_human: str | None = None,
     period: str | None = None,  # type: ignore
+    response_format: StatsResponseFormat = Query(StatsResponseFormat.json, alias="format"),
     session: Session = Depends(get_database_session),
     engine: Engine = Depends(get_database_engine),  # type: ignore
 ) -> OpennemDataSet:
@@ -128,12 +131,25 @@ async def power_station(
 
     logger.debug(time_series)
 
-    query = power_facility_query(time_series, station.facility_codes)
+    results = power_buffer_facility_rows(time_series, station.facility_codes)
 
-    logger.debug(query)
+    if is_streaming_format(response_format):
+        return stream_rows_response(  # type: ignore
+            [results]
+            if results is not None
+            else iter_query_rows(engine, power_facility_query(time_series, station.facility_codes)),
+            columns=["interval", "power", "facility_code"],
+            response_format=response_format,
+            network=network,
+        )
 
-    with engine.connect() as c:
-        results = list(c.execute(query))
+    if results is None:
+        query = power_facility_query(time_series, station.facility_codes)
+
+        logger.debug(query)
+
+        with engine.connect() as c:
+            results = list(c.execute(query))
 
     stats = [DataQueryResult(interval=i[0], result=i[1], group_by=i[2] if len(i) > 1 else None) for i in results]
 
@@ -172,7 +188,7 @@ async def power_station(
     response_model=OpennemDataSet,
     response_model_exclude_unset=True,
 )
-@cache(expire=60 * 60 * 12)
+@cache_unless_streaming(expire=60 * 60 * 12)
 async def energy_station(
     engine: Engine = Depends(get_database_engine),  # type: ignore
     session: Session = Depends(get_database_session),
@@ -182,6 +198,7 @@ async def energy_station(
     station_code: str | None = None,
     interval: str | None = None,
     period: str | None = None,
+    response_format: StatsResponseFormat = Query(StatsResponseFormat.json, alias="format"),
 ) -> OpennemDataSet:
     """
     Get energy output for a station (list of facilities)
@@ -268,6 +285,14 @@ async def energy_station(
 
     logger.debug(query)
 
+    if is_streaming_format(response_format):
+        return stream_rows_response(  # type: ignore
+            iter_query_rows(engine, query),
+            columns=["interval", "facility_code", "energy", "market_value", "emissions"],
+            response_format=response_format,
+            network=network,
+        )
+
     with engine.connect() as c:
         row = list(c.execute(query))
 
@@ -736,11 +761,12 @@ def fueltech_demand_mix(
     response_model=OpennemDataSet,
     response_model_exclude_unset=True,
 )
-@cache(expire=60 * 5)
+@cache_unless_streaming(expire=60 * 5)
 async def price_network_endpoint(
     network_code: str,
     network_region_code: str | None = None,
     forecasts: bool = False,
+    response_format: StatsResponseFormat = Query(StatsResponseFormat.json, alias="format"),
     engine: Engine = Depends(get_database_engine),
 ) -> OpennemDataSet:
     """Returns network and network region price info for interval which defaults to network
@@ -805,6 +831,14 @@ async def price_network_endpoint(
         forecast=forecasts,
     )
 
+    if is_streaming_format(response_format):
+        return stream_rows_response(  # type: ignore
+            iter_query_rows(engine, query),
+            columns=["interval", "network_id", "network_region", "price"],
+            response_format=response_format,
+            network=network,
+        )
+
     with engine.begin() as c:
         logger.debug(query)
         row = list(c.execute(query))
@@ -0,0 +1,100 @@
+"""
+Fast path serializer for OpennemDataSet exports
+
+pydantic `.json()` walks every value in every history series through `_get_value`
+before handing the tree to the json encoder, which dominates export time for large
+sets. Data sets built internally are already validated and their series formatted,
+so this builds the same tree directly and passes the series lists through untouched.
+
+The tree is encoded with the model json_dumps so the output is byte-identical to
+`OpennemDataSet.json()`.
+"""
+import logging
+from collections.abc import Set
+from typing import Any
+
+from pydantic import BaseModel
+
+from opennem.api.stats.schema import OpennemDataSet
+from opennem.exporter.manifest import content_hash
+from opennem.schema.core import PropertyBaseModel
+
+logger = logging.getLogger("opennem.api.stats.serialize")
+
+_model_properties_cache: dict[type, list[str]] = {}
+
+
+def _model_properties(model_class: type[PropertyBaseModel]) -> list[str]:
+    if model_class not in _model_properties_cache:
+        _model_properties_cache[model_class] = model_class.get_properties()
+
+    return _model_properties_cache[model_class]
+
+
+def _value_to_tree(value: Any, exclude_unset: bool) -> Any:
+    if isinstance(value, BaseModel):
+        return _model_to_tree(value, exclude_unset=exclude_unset, nested=True)
+
+    if isinstance(value, dict):
+        return {k: _value_to_tree(v, exclude_unset) for k, v in value.items()}
+
+    if isinstance(value, list | tuple):
+        # series of numbers or strings are passed straight through to the encoder
+        if value and isinstance(value[0], BaseModel | dict | list | tuple):
+            return [_value_to_tree(v, exclude_unset) for v in value]
+
+        return value
+
+    return value
+
+
+def _model_to_tree(model: BaseModel, exclude_unset: bool, exclude: Set[str] | None = None, nested: bool = False) -> dict:
+    """Mirrors the field selection in pydantic BaseModel._iter"""
+    # nested models are serialized by pydantic through .dict() which, for PropertyBaseModel,
+    # attaches the property values to the model first
+    if nested and isinstance(model, PropertyBaseModel):
+        if properties := _model_properties(type(model)):
+            model.__dict__.update({prop: getattr(model, prop) for prop in properties})
+
+    keys = model.__fields_set__ if exclude_unset else model.__dict__.keys()
+
+    return {
+        key: _value_to_tree(value, exclude_unset)
+        for key, value in model.__dict__.items()
+        if key in keys and not (exclude and key in exclude)
+    }
+
+
+def stat_set_to_dict(stat_set: OpennemDataSet, exclude_unset: bool = False, exclude: Set[str] | None = None) -> dict:
+    """Build the dict pydantic would serialize for a data set without walking the series values"""
+    return _model_to_tree(stat_set, exclude_unset=exclude_unset, exclude=exclude)
+
+
+def serialize_stat_set(
+    stat_set: OpennemDataSet,
+    exclude_unset: bool = False,
+    indent: int | None = None,
+    exclude: set | dict | None = None,
+) -> str:
+    """Serialize a trusted, internally built data set to JSON
+
+    Equivalent to `stat_set.json(exclude_unset=exclude_unset, indent=indent, exclude=exclude)`.
+    Nested exclude specs fall back to pydantic.
+    """
+    if exclude is not None and not isinstance(exclude, Set):
+        return stat_set.json(exclude_unset=exclude_unset, indent=indent, exclude=exclude)
+
+    tree = stat_set_to_dict(stat_set, exclude_unset=exclude_unset, exclude=exclude)
+
+    return stat_set.__config__.json_dumps(tree, default=stat_set.__json_encoder__, indent=indent)
+
+
+def stat_set_content_hash(stat_set: OpennemDataSet, content: str) -> str:
+    """Hash of a serialized data set without its created_at value, which changes on every build
+
+    Takes the content that is written so a data set is only serialized once. The created_at key
+    comes before any nested model in the document so the first occurrence is the top level one
+    """
+    created_at = stat_set.__config__.json_dumps(stat_set.created_at, default=stat_set.__json_encoder__)
+
+    return content_hash(content.replace(f'"created_at": {created_at}', '"created_at": null', 1))
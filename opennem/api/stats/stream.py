@@ -0,0 +1,201 @@
+"""
+Streaming response formats for stats endpoints
+
+Rather than building an OpennemDataSet for the whole request in memory, the
+query rows are read through a server side cursor in batches and written to the
+client as they are produced, one row per record:
+
+    * ndjson - one JSON object per line
+    * csv - header row followed by the records
+    * arrow - Arrow IPC stream with a record batch per cursor batch. Requires
+      pyarrow to be installed
+
+Memory use per request is bounded by the batch size. Streaming responses are
+never cached.
+"""
+import csv
+import inspect
+import io
+import json
+import logging
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from datetime import datetime
+from decimal import Decimal
+from enum import StrEnum
+from functools import wraps
+from typing import Any
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from fastapi_cache.decorator import cache
+from sqlalchemy.engine.base import Engine
+from starlette import status
+
+from opennem.schema.network import NetworkSchema
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
+
+logger = logging.getLogger("opennem.api.stats.stream")
+
+# rows read from the cursor and written per batch
+STREAM_BATCH_SIZE = 5000
+
+
+class StatsResponseFormat(StrEnum):
+    json = "json"
+    ndjson = "ndjson"
+    csv = "csv"
+    arrow = "arrow"
+
+
+STREAM_MEDIA_TYPES = {
+    StatsResponseFormat.ndjson: "application/x-ndjson",
+    StatsResponseFormat.csv: "text/csv",
+    StatsResponseFormat.arrow: "application/vnd.apache.arrow.stream",
+}
+
+
+def is_streaming_format(response_format: Any) -> bool:
+    return response_format in STREAM_MEDIA_TYPES
+
+
+def cache_unless_streaming(expire: int) -> Callable:
+    """fastapi_cache cache decorator for endpoints with a `response_format` argument
+
+    Requests for a streaming format skip the cache"""
+
+    def _decorator(func: Callable) -> Callable:
+        cached = cache(expire=expire)(func)
+        func_parameters = inspect.signature(func).parameters
+
+        @wraps(cached)
+        async def _cache_unless_streaming_wrapper(*args: Any, **kwargs: Any) -> Any:
+            if is_streaming_format(kwargs.get("response_format")):
+                # drop the request and response arguments injected for the cache
+                return await func(*args, **{k: v for k, v in kwargs.items() if k in func_parameters})
+
+            return await cached(*args, **kwargs)
+
+        return _cache_unless_streaming_wrapper
+
+    return _decorator
+
+
+def iter_query_rows(engine: Engine, query: Any, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Sequence[Sequence]]:
+    """Batches of rows for a query read through a server side cursor"""
+    with engine.connect() as c:
+        result = c.execution_options(stream_results=True, max_row_buffer=batch_size).execute(query)
+
+        yield from result.partitions(batch_size)
+
+
+def _localize_value(value: Any, network: NetworkSchema | None) -> Any:
+    if isinstance(value, datetime):
+        # queries selected at time zone return naive network times
+        if value.tzinfo is None and network:
+            return value.replace(tzinfo=network.get_fixed_offset())
+
+        return value
+
+    if isinstance(value, Decimal):
+        return float(value)
+
+    return value
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+
+    return value
+
+
+def _ndjson_batches(batches: Iterable[Sequence[Sequence]], columns: list[str]) -> Iterator[bytes]:
+    for batch in batches:
+        yield "".join(
+            json.dumps({column: _json_value(value) for column, value in zip(columns, row, strict=True)}) + "\n" for row in batch
+        ).encode("utf-8")
+
+
+def _csv_batches(batches: Iterable[Sequence[Sequence]], columns: list[str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+
+    for batch in batches:
+        writer.writerows([[_json_value(value) for value in row] for row in batch])
+        yield buffer.getvalue().encode("utf-8")
+
+        buffer.seek(0)
+        buffer.truncate()
+
+    if content := buffer.getvalue():
+        yield content.encode("utf-8")
+
+
+def _arrow_batches(batches: Iterable[Sequence[Sequence]], columns: list[str]) -> Iterator[bytes]:
+    sink = io.BytesIO()
+    writer = None
+
+    for batch in batches:
+        data = {column: list(values) for column, values in zip(columns, zip(*batch, strict=True), strict=True)}
+
+        # the schema is inferred from the first batch
+        if writer is None:
+            record_batch = pyarrow.RecordBatch.from_pydict(data)
+            writer = pyarrow.ipc.new_stream(sink, record_batch.schema)
+        else:
+            record_batch = pyarrow.RecordBatch.from_pydict(data, schema=writer.schema)
+
+        writer.write_batch(record_batch)
+
+        yield sink.getvalue()
+
+        sink.seek(0)
+        sink.truncate()
+
+    if writer is not None:
+        writer.close()
+
+        if content := sink.getvalue():
+            yield content
+
+
+_FORMAT_WRITERS: dict[StatsResponseFormat, Callable[[Iterable[Sequence[Sequence]], list[str]], Iterator[bytes]]] = {
+    StatsResponseFormat.ndjson: _ndjson_batches,
+    StatsResponseFormat.csv: _csv_batches,
+    StatsResponseFormat.arrow: _arrow_batches,
+}
+
+
+def stream_rows_response(
+    batches: Iterable[Sequence[Sequence]],
+    columns: list[str],
+    response_format: StatsResponseFormat,
+    network: NetworkSchema | None = None,
+) -> StreamingResponse:
+    """Streaming response writing each batch of rows as it is produced
+
+    Args:
+        batches: batches of rows, usually from iter_query_rows
+        columns: names of the row columns
+        response_format: one of the streaming formats
+        network: used to localize naive datetimes in the rows
+    """
+    if not is_streaming_format(response_format):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Not a streaming format: {response_format}")
+
+    if response_format == StatsResponseFormat.arrow and not HAVE_PYARROW:
+        raise HTTPException(status_code=status.HTTP_406_NOT_ACCEPTABLE, detail="Arrow format is not available")
+
+    localized_batches = ([[_localize_value(value, network) for value in row] for row in batch] for batch in batches)
+
+    return StreamingResponse(
+        _FORMAT_WRITERS[response_format](localized_batches, columns), media_type=STREAM_MEDIA_TYPES[response_format]
+    )
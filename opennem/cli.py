@@ -15,12 +15,14 @@ from opennem.core.crawlers.cli import cmd_crawl_cli
 from opennem.db.load_fixtures import load_bom_stations_json, load_fixtures, load_fueltechs
 from opennem.exporter.geojson import export_facility_geojson
 from opennem.exporter.historic import export_historic_intervals
+from opennem.exporter.parquet import HAVE_PYARROW, PARQUET_TABLES, export_parquet, get_parquet_export_start
 from opennem.importer.all import run_all
 from opennem.importer.db import import_all_facilities
 from opennem.importer.db import init as db_init
 from opennem.importer.mms import mms_export
 from opennem.importer.opennem import opennem_import
 from opennem.parsers.aemo.cli import cmd_data_cli
+from opennem.schema.network import NetworkNEM, NetworkWEM
 from opennem.workers.daily import all_runner, daily_runner
 from opennem.workers.energy import run_energy_update_archive, run_energy_update_days
 
@@ -111,6 +113,24 @@ def cmd_export_all() -> None:
     export_energy(priority=PriorityType.monthly)
 
 
+@click.command()
+@click.option("--network", "network_codes", multiple=True, type=click.Choice(["NEM", "WEM"]))
+@click.option("--table", "tables", multiple=True, type=click.Choice(list(PARQUET_TABLES.keys())))
+@click.option("--days", required=False, type=int, default=None, help="Export partitions covering the last days only")
+@click.option("--local", "is_local", is_flag=True, default=False)
+def cmd_export_parquet(network_codes: tuple[str], tables: tuple[str], days: int | None, is_local: bool) -> None:
+    """
+    Exports the bulk parquet datasets. Requires the parquet extra (pyarrow)
+    """
+    if not HAVE_PYARROW:
+        raise click.ClickException("Parquet exports require pyarrow. Install with the parquet extra: opennem-backend[parquet]")
+
+    networks = [{"NEM": NetworkNEM, "WEM": NetworkWEM}[code] for code in network_codes]
+    start = get_parquet_export_start(days, networks[0] if networks else NetworkNEM) if days else None
+
+    export_parquet(networks=networks, tables=list(tables), start=start, is_local=is_local)
+
+
 @click.group()
 def cmd_weather() -> None:
     pass
@@ -152,14 +172,16 @@ def cmd_task_all() -> None:
 
 @click.command()
 @click.option("--weeks", required=False, type=int, default=None)
-def cmd_task_historic(weeks: int | None) -> None:
+@click.option("--force", is_flag=True, default=False, help="Rebuild weeks that are unchanged")
+def cmd_task_historic(weeks: int | None, force: bool) -> None:
     """
     Runs the historic exports for number of weeks
 
     Args:
         weeks (int | None): number of weeks to run
+        force (bool): rebuild weeks that are final and unchanged
     """
-    export_historic_intervals(limit=weeks)
+    export_historic_intervals(limit=weeks, force=force)
 
 
 main.add_command(cmd_data_cli, name="data")
@@ -181,6 +203,7 @@ cmd_export.add_command(cmd_export_all, name="all")
 cmd_export.add_command(cmd_export_power, name="power")
 cmd_export.add_command(cmd_export_energy, name="energy")
 cmd_export.add_command(cmd_export_energy_monthly, name="energy_monthly")
+cmd_export.add_command(cmd_export_parquet, name="parquet")
 
 cmd_db.add_command(cmd_db_init, name="init")
 cmd_db.add_command(cmd_db_fixtures, name="fixtures")
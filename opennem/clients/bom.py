@@ -1,6 +1,10 @@
 """OpenNEM BoM Client
 
+Observations for a single station are fetched with `get_bom_observations`. For
+many stations `get_bom_observations_many` fetches them concurrently with the
+async http client, within its per host connection limit.
 """
+import asyncio
 import logging
 from datetime import UTC, datetime
 from typing import Any
@@ -11,6 +15,7 @@ from pydantic import validator
 
 from opennem.schema.core import BaseConfig
 from opennem.utils.http import attach_proxy, mount_retry_adaptor, mount_timeout_adaptor, retry_strategy_on_permission_denied
+from opennem.utils.http_async import AsyncHTTPClient, run_sync
 from opennem.utils.random_agent import get_random_agent
 
 logger = logging.getLogger("opennem.clients.bom")
@@ -118,6 +123,28 @@ class BOMParsingException(Exception):
     pass
 
 
+def parse_bom_observations(resp_object: Any, observation_url: str, station_code: str) -> BOMObservationReturn:
+    """Validate a BOM observation JSON response into a schema"""
+    if not isinstance(resp_object, dict) or "observations" not in resp_object:
+        raise BOMParsingException(f"Invalid BOM return for {observation_url}")
+
+    _oo = resp_object["observations"]
+
+    observations = BOMObservationReturn(
+        **{
+            "station_code": station_code,
+            "state": _oo["header"][0]["state_time_zone"],
+            "observations": [
+                {**i, "state": _oo["header"][0]["state_time_zone"]}
+                for i in _oo["data"]
+                if "air_temp" in i and i["air_temp"] is not None
+            ],
+        }
+    )
+
+    return observations
+
+
 def get_bom_observations(observation_url: str, station_code: str) -> BOMObservationReturn:
     """Requests a BOM observation JSON endpoint and returns a schema"""
     _headers = get_bom_request_headers()
@@ -138,24 +165,44 @@ def get_bom_observations(observation_url: str, station_code: str) -> BOMObservat
             f"Error parsing BOM response: bad json. Status: {resp.status_code}. Content length: {len(resp.content)}"
         ) from None
 
-    if "observations" not in resp_object:
-        raise BOMParsingException(f"Invalid BOM return for {observation_url}")
+    return parse_bom_observations(resp_object, observation_url, station_code)
 
-    _oo = resp_object["observations"]
 
-    observations = BOMObservationReturn(
-        **{
-            "station_code": station_code,
-            "state": _oo["header"][0]["state_time_zone"],
-            "observations": [
-                {**i, "state": _oo["header"][0]["state_time_zone"]}
-                for i in _oo["data"]
-                if "air_temp" in i and i["air_temp"] is not None
-            ],
-        }
-    )
+async def fetch_bom_observations(client: AsyncHTTPClient, observation_url: str, station_code: str) -> BOMObservationReturn:
+    """Requests a BOM observation JSON endpoint with the async client and returns a schema"""
+    logger.info(f"Fetching {observation_url}")
 
-    return observations
+    resp = await client.get(observation_url, headers=get_bom_request_headers())
+
+    if resp.is_error:
+        raise Exception(f"BoM client request exception: {resp.status_code}")
+
+    try:
+        resp_object = resp.json()
+    except Exception:
+        raise BOMParsingException(
+            f"Error parsing BOM response: bad json. Status: {resp.status_code}. Content length: {len(resp.content)}"
+        ) from None
+
+    return parse_bom_observations(resp_object, observation_url, station_code)
+
+
+def get_bom_observations_many(
+    stations: list[tuple[str, str]], client: AsyncHTTPClient | None = None
+) -> list[BOMObservationReturn | Exception]:
+    """Requests observations for (observation_url, station_code) pairs concurrently
+
+    Returns the observations for each station in order, or the exception if the
+    station failed"""
+
+    async def _fetch_all() -> list[BOMObservationReturn | Exception]:
+        async with client or AsyncHTTPClient() as _client:
+            return await asyncio.gather(
+                *[fetch_bom_observations(_client, url, station_code) for url, station_code in stations],
+                return_exceptions=True,
+            )
+
+    return run_sync(_fetch_all())
 
 
 if __name__ == "__main__":
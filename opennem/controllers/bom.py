@@ -1,16 +1,34 @@
 import logging
-from datetime import datetime
+from datetime import UTC, datetime
+from textwrap import dedent
 from zoneinfo import ZoneInfo
 
+from sqlalchemy import text as sql
 from sqlalchemy.dialects.postgresql import insert
 
 from opennem.clients.bom import BOMObservationReturn
 from opennem.controllers.schema import ControllerReturn
 from opennem.db import get_database_engine, get_scoped_session
+from opennem.db.bulk_insert_csv import BulkInsertException, bulkload_records
 from opennem.db.models.opennem import BomObservation
 
 logger = logging.getLogger(__name__)
 
+BOM_OBSERVATION_UPDATE_FIELDS = [
+    "temp_apparent",
+    "temp_air",
+    "press_qnh",
+    "wind_dir",
+    "wind_spd",
+    "wind_gust",
+    "cloud",
+    "cloud_type",
+    "humidity",
+]
+
+# how far back to look for the last stored observation of each station
+BOM_LAST_OBSERVATION_LOOKBACK_DAYS = 7
+
 
 def store_bom_observation_intervals(observations: BOMObservationReturn) -> ControllerReturn:
     """Store BOM Observations"""
@@ -82,3 +100,88 @@ def store_bom_observation_intervals(observations: BOMObservationReturn) -> Contr
     cr.inserted_records = cr.processed_records
 
     return cr
+
+
+def get_bom_last_observation_times(station_codes: list[str]) -> dict[str, datetime]:
+    """Latest stored observation time for each station, in one query"""
+    if not station_codes:
+        return {}
+
+    query = sql(
+        dedent(
+            f"""
+            select station_id, max(observation_time)
+            from bom_observation
+            where
+                station_id = any(:station_codes)
+                and observation_time > now() - interval '{BOM_LAST_OBSERVATION_LOOKBACK_DAYS} days'
+            group by station_id
+            """
+        )
+    )
+
+    engine = get_database_engine()
+
+    with engine.connect() as c:
+        return dict(c.execute(query, {"station_codes": station_codes}).fetchall())  # type: ignore
+
+
+def store_bom_observations_bulk(observation_sets: list[BOMObservationReturn]) -> ControllerReturn:
+    """Store observations for many stations in one bulk upsert
+
+    Observations older than the last one stored for their station are skipped"""
+    cr = ControllerReturn(total_records=sum(len(i.observations) for i in observation_sets))
+
+    last_observation_times = get_bom_last_observation_times([i.station_code for i in observation_sets if i.station_code])
+
+    # keyed by primary key as an upsert can't update the same row twice
+    records_to_store: dict[tuple[str, datetime], dict] = {}
+
+    for observations in observation_sets:
+        last_observation_time = last_observation_times.get(observations.station_code)  # type: ignore
+
+        for obs in observations.observations:
+            if not obs.observation_time:
+                continue
+
+            if last_observation_time and obs.observation_time < last_observation_time:
+                continue
+
+            observation_time = obs.observation_time.astimezone(UTC)
+
+            records_to_store[(observations.station_code, observation_time)] = {  # type: ignore
+                "station_id": observations.station_code,
+                "observation_time": observation_time,
+                "temp_apparent": obs.apparent_t,
+                "temp_air": obs.air_temp,
+                "press_qnh": obs.press_qnh,
+                "wind_dir": obs.wind_dir,
+                "wind_spd": obs.wind_spd_kmh,
+                "wind_gust": obs.gust_kmh,
+                "cloud": obs.cloud,
+                "cloud_type": obs.cloud_type,
+                "humidity": obs.rel_hum,
+            }
+
+    cr.processed_records = len(records_to_store)
+
+    if records_to_store:
+        cr.server_latest = max(i["observation_time"] for i in records_to_store.values()).astimezone(ZoneInfo("Australia/Sydney"))
+        logger.debug(f"server_latest is {cr.server_latest}")
+
+    logger.info(f"Storing {cr.processed_records} of {cr.total_records} BOM observations for {len(observation_sets)} stations")
+
+    if not records_to_store:
+        return cr
+
+    try:
+        bulkload_records(BomObservation, list(records_to_store.values()), BOM_OBSERVATION_UPDATE_FIELDS)  # type: ignore
+    except BulkInsertException as e:
+        logger.error(f"Error: {e}")
+        cr.errors = cr.processed_records
+        cr.error_detail.append(str(e))
+        return cr
+
+    cr.inserted_records = cr.processed_records
+
+    return cr
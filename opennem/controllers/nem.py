@@ -134,7 +134,7 @@ def unit_scada_generate_facility_scada(
 
 
 def generate_facility_scada(
-    records: list[dict[str, Any] | MMSBaseClass],
+    records: list[dict[str, Any] | MMSBaseClass] | pd.DataFrame,
     network: NetworkSchema = NetworkNEM,
     interval_field: str = "settlementdate",
     facility_code_field: str = "duid",
@@ -142,10 +142,13 @@ def generate_facility_scada(
     energy_field: str | None = None,
     is_forecast: bool = False,
 ) -> list[dict[str, Any]]:
-    """Optimized facility scada generator"""
+    """Optimized facility scada generator. Takes records or a table dataframe"""
     created_at = datetime.now()
 
-    df = pd.DataFrame().from_records(records)
+    if isinstance(records, pd.DataFrame):
+        df = records.copy(deep=False)
+    else:
+        df = pd.DataFrame().from_records(records)
 
     column_renames = {
         interval_field: "trading_interval",
@@ -540,7 +543,7 @@ def process_unit_scada_optimized(table: AEMOTableSchema) -> ControllerReturn:
     cr = ControllerReturn(total_records=len(table.records))
 
     records = generate_facility_scada(
-        table.records,  # type:ignore
+        table.to_frame(set_index=False),
         interval_field="settlementdate",
         facility_code_field="duid",
         power_field="scadavalue",
@@ -557,7 +560,7 @@ def process_unit_solution(table: AEMOTableSchema) -> ControllerReturn:
     cr = ControllerReturn(total_records=len(table.records))
 
     records = generate_facility_scada(
-        table.records,
+        table.to_frame(set_index=False),
         interval_field="settlementdate",
         facility_code_field="duid",
         power_field="initialmw",
@@ -574,7 +577,7 @@ def process_meter_data_gen_duid(table: AEMOTableSchema) -> ControllerReturn:
     cr = ControllerReturn(total_records=len(table.records))
 
     records = generate_facility_scada(
-        table.records,
+        table.to_frame(set_index=False),
         interval_field="interval_datetime",
         facility_code_field="duid",
         power_field="mwh_reading",
@@ -591,7 +594,7 @@ def process_rooftop_actual(table: AEMOTableSchema) -> ControllerReturn:
     cr = ControllerReturn(total_records=len(table.records))
 
     records = generate_facility_scada(
-        table.records,
+        table.to_frame(set_index=False),
         interval_field="interval_datetime",
         facility_code_field="regionid",
         power_field="power",
@@ -612,7 +615,7 @@ def process_rooftop_forecast(table: AEMOTableSchema) -> ControllerReturn:
     cr = ControllerReturn(total_records=len(table.records))
 
     records = generate_facility_scada(
-        table.records,  # type: ignore
+        table.to_frame(set_index=False),
         interval_field="interval_datetime",
         facility_code_field="regionid",
         power_field="powermean",
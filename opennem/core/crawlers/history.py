@@ -1,9 +1,11 @@
 """" Reads and stores crawler history """
 import logging
 from dataclasses import dataclass, field
-from datetime import datetime
+from datetime import datetime, timedelta
 from textwrap import dedent
+from typing import Any
 
+import numpy as np
 from datetime_truncate import truncate as date_trunc
 from sqlalchemy import text as sql
 from sqlalchemy.dialects.postgresql import insert
@@ -28,55 +30,41 @@ class CrawlHistoryGap:
     interval: datetime
 
 
+def _dedupe_histories(histories: list[CrawlHistoryEntry]) -> list[CrawlHistoryEntry]:
+    """A multi-row upsert can't touch the same row twice so keep the last entry for each interval"""
+    return list({ch.interval: ch for ch in histories}.values())
+
+
 def set_crawler_history(crawler_name: str, histories: list[CrawlHistoryEntry]) -> int:
-    """Sets the crawler history"""
+    """Sets the crawler history in a single multi-row upsert"""
+    if not histories:
+        return 0
+
     engine = get_database_engine()
     session = get_scoped_session()
 
+    histories = _dedupe_histories(histories)
     history_intervals = [i.interval for i in histories]
 
-    logger.debug(f"Have {len(history_intervals)} history intervals for {crawler_name}")
-
-    date_max = max(history_intervals)
-    date_min = min(history_intervals)
-
-    logger.debug(f"crawler {crawler_name} date range: {date_min}, {date_max}")
-
-    stmt = sql(
-        """
-        select
-            interval
-        from crawl_history
-        where
-            interval >= :date_max
-            and interval <= :date_min
-    """
+    logger.debug(
+        f"crawler {crawler_name} setting {len(histories)} history intervals: {min(history_intervals)}, {max(history_intervals)}"
     )
 
-    query = stmt.bindparams(date_max=date_max, date_min=date_min)
-
-    with engine.connect() as c:
-        results = list(c.execute(query))
-
-    existing_intervals = [i[0] for i in results]
-
-    logger.debug(f"Got {len(existing_intervals)} existing intervals for crawler {crawler_name}")
+    processed_time = get_today_opennem()
 
     # Persist the crawl history records
-    crawl_history_records: list[dict[str, datetime | str | int | None]] = []
-
-    for ch in histories:
-        crawl_history_records.append(
-            {
-                "source": "nemweb",
-                "crawler_name": crawler_name,
-                "network_id": "NEM",
-                "interval": ch.interval,
-                "inserted_records": ch.records,
-                "crawled_time": None,
-                "processed_time": get_today_opennem(),
-            }
-        )
+    crawl_history_records: list[dict[str, datetime | str | int | None]] = [
+        {
+            "source": "nemweb",
+            "crawler_name": crawler_name,
+            "network_id": "NEM",
+            "interval": ch.interval,
+            "inserted_records": ch.records,
+            "crawled_time": None,
+            "processed_time": processed_time,
+        }
+        for ch in histories
+    ]
 
     # insert
     stmt = insert(CrawlHistory).values(crawl_history_records)
@@ -95,14 +83,53 @@ def set_crawler_history(crawler_name: str, histories: list[CrawlHistoryEntry]) -
         session.commit()
     except Exception as e:
         logger.error(f"set_crawler_history error updating records: {e}")
+        return 0
     finally:
         session.rollback()
         session.close()
-        engine.dispose()
+
+    mark_crawler_intervals_seen(crawler_name, [i.interval for i in histories if i.records is not None])
 
     return len(histories)
 
 
+class CrawlHistoryBuffer:
+    """Buffers crawl history entries for a crawler and writes them in one upsert
+
+    Usage:
+
+        with CrawlHistoryBuffer(crawler_name) as history:
+            for entry in entries:
+                ...
+                history.add(entry.aemo_interval_date, records)
+    """
+
+    def __init__(self, crawler_name: str) -> None:
+        self.crawler_name = crawler_name
+        self._entries: list[CrawlHistoryEntry] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __enter__(self) -> "CrawlHistoryBuffer":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.flush()
+
+    def add(self, interval: datetime, records: int | None = None) -> None:
+        self._entries.append(CrawlHistoryEntry(interval=interval, records=records))
+
+    def flush(self) -> int:
+        """Write the buffered entries and clear the buffer"""
+        if not self._entries:
+            return 0
+
+        entries, self._entries = self._entries, []
+
+        return set_crawler_history(crawler_name=self.crawler_name, histories=entries)
+
+
 def get_crawler_history(crawler_name: str, interval: TimeInterval, days: int = 3) -> list[datetime]:
     """Gets the crawler history"""
     engine = get_database_engine()
@@ -144,36 +171,184 @@ def get_crawler_history(crawler_name: str, interval: TimeInterval, days: int = 3
     return models
 
 
+@dataclass
+class CrawlerSeenIntervals:
+    """Bitmap of the intervals that have crawl history for a crawler
+
+    Covers the series of intervals stepping back from `latest` to `start` in
+    steps of `step`, oldest first, the same series that
+    `get_crawler_missing_intervals` checks."""
+
+    start: datetime
+    latest: datetime
+    step: timedelta
+    seen: np.ndarray
+    loaded_at: datetime
+
+    @classmethod
+    def empty(cls, latest: datetime, step: timedelta, days: int, loaded_at: datetime) -> "CrawlerSeenIntervals":
+        num_intervals = timedelta(days=days) // step + 1
+        start = latest - step * (num_intervals - 1)
+
+        return cls(start=start, latest=latest, step=step, seen=np.zeros(num_intervals, dtype=bool), loaded_at=loaded_at)
+
+    def can_advance_to(self, latest: datetime) -> bool:
+        """The bitmap can be shifted forward to a new latest interval that lies on its series"""
+        return latest >= self.latest and (latest - self.latest) % self.step == timedelta(0)
+
+    def advance_to(self, latest: datetime) -> None:
+        """Shift the window forward, dropping the oldest intervals"""
+        shift = (latest - self.latest) // self.step
+
+        if not shift:
+            return
+
+        if shift >= len(self.seen):
+            self.seen = np.zeros(len(self.seen), dtype=bool)
+        else:
+            self.seen = np.concatenate([self.seen[shift:], np.zeros(shift, dtype=bool)])
+
+        self.start += self.step * shift
+        self.latest = latest
+
+    def mark(self, intervals: list[datetime]) -> None:
+        for interval in intervals:
+            offset = interval - self.start
+
+            if offset < timedelta(0) or offset % self.step:
+                continue
+
+            position = offset // self.step
+
+            if position < len(self.seen):
+                self.seen[position] = True
+
+    def missing(self) -> list[datetime]:
+        """Missing intervals, latest first"""
+        return [self.start + self.step * int(i) for i in np.flatnonzero(~self.seen)[::-1]]
+
+
+# in-process cache of seen intervals keyed by crawler name
+_crawler_seen_intervals: dict[str, CrawlerSeenIntervals] = {}
+
+# reload the seen intervals from the database after this long to pick up
+# history written by other processes
+CRAWLER_SEEN_INTERVALS_TTL = timedelta(hours=1)
+
+
+def mark_crawler_intervals_seen(crawler_name: str, intervals: list[datetime]) -> None:
+    """Mark intervals as crawled in the in-process cache"""
+    seen_intervals = _crawler_seen_intervals.get(crawler_name)
+
+    if seen_intervals:
+        seen_intervals.mark(intervals)
+
+
+def clear_crawler_seen_intervals(crawler_name: str | None = None) -> None:
+    """Clear the in-process seen interval cache for a crawler, or all crawlers"""
+    if crawler_name:
+        _crawler_seen_intervals.pop(crawler_name, None)
+    else:
+        _crawler_seen_intervals.clear()
+
+
+def _query_crawler_seen_intervals(crawler_name: str, days: int, since: datetime | None = None) -> tuple[datetime, list[datetime]]:
+    """Returns the latest nemweb interval and the intervals with history after `since` in one round trip"""
+    engine = get_database_engine()
+
+    stmt = sql(
+        """
+        select
+            nemweb_latest_interval() as latest_interval,
+            array(
+                select ch.interval::timestamp
+                from crawl_history ch
+                where
+                    ch.crawler_name = :crawler_name
+                    and ch.interval >= nemweb_latest_interval() - interval :days
+                    and ch.interval > coalesce(cast(:since as timestamp), '-infinity'::timestamp)
+                    and ch.interval <= nemweb_latest_interval()
+                    and ch.inserted_records is not null
+            ) as seen_intervals
+    """
+    )
+
+    query = stmt.bindparams(crawler_name=crawler_name, days=f"{days} days", since=since)
+
+    with engine.connect() as c:
+        latest_interval, seen_intervals = c.execute(query).one()
+
+    return latest_interval, seen_intervals or []
+
+
+def _get_crawler_missing_intervals_cached(crawler_name: str, interval: TimeInterval, days: int) -> list[datetime]:
+    """Missing intervals from the in-process seen bitmap, topping it up with intervals crawled since it was built"""
+    step = interval.get_timedelta()
+    now = get_today_opennem()
+    seen_intervals = _crawler_seen_intervals.get(crawler_name)
+
+    if (
+        seen_intervals
+        and seen_intervals.step == step
+        and len(seen_intervals.seen) == timedelta(days=days) // step + 1
+        and now - seen_intervals.loaded_at < CRAWLER_SEEN_INTERVALS_TTL
+    ):
+        latest_interval, new_intervals = _query_crawler_seen_intervals(crawler_name, days=days, since=seen_intervals.latest)
+
+        if seen_intervals.can_advance_to(latest_interval):
+            seen_intervals.advance_to(latest_interval)
+            seen_intervals.mark(new_intervals)
+
+            return seen_intervals.missing()
+
+    latest_interval, new_intervals = _query_crawler_seen_intervals(crawler_name, days=days)
+
+    seen_intervals = CrawlerSeenIntervals.empty(latest=latest_interval, step=step, days=days, loaded_at=now)
+    seen_intervals.mark(new_intervals)
+
+    _crawler_seen_intervals[crawler_name] = seen_intervals
+
+    return seen_intervals.missing()
+
+
 def get_crawler_missing_intervals(
     crawler_name: str,
     interval: TimeInterval,
     days: int = 365 * 3,
+    use_cache: bool = True,
 ) -> list[datetime]:
-    """Gets the crawler missing intervals going back a period of days"""
+    """Gets the crawler missing intervals going back a period of days
+
+    Sub-hour intervals are answered from an in-process bitmap of seen intervals
+    for the crawler which is topped up with only the history written since the
+    last call. Other intervals use a set difference against the
+    (crawler_name, interval) index."""
+    if use_cache and interval.interval < 60:
+        return _get_crawler_missing_intervals_cached(crawler_name, interval=interval, days=days)
+
     engine = get_database_engine()
 
     stmt = sql(
         """
-        with intervals as (
-            select
-                interval
-            from generate_series(
-                nemweb_latest_interval() - interval :days,
-                nemweb_latest_interval(),
-                interval  :interval_size
-            ) AS interval
-        )
+        select
+            intervals.interval
+        from generate_series(
+            nemweb_latest_interval() - interval :days,
+            nemweb_latest_interval(),
+            interval :interval_size
+        ) as intervals (interval)
+
+        except
 
         select
-            intervals.interval,
-            case when ch.inserted_records is NULL then FALSE else TRUE end as has_record
-        from intervals
-        left join (
-            select * from crawl_history
-            where crawler_name = :crawler_name
-            and interval <= nemweb_latest_interval() and interval >= nemweb_latest_interval() - interval :days
-        ) as ch on ch.interval = intervals.interval
-        where ch.inserted_records is null
+            ch.interval::timestamp
+        from crawl_history ch
+        where
+            ch.crawler_name = :crawler_name
+            and ch.interval >= nemweb_latest_interval() - interval :days
+            and ch.interval <= nemweb_latest_interval()
+            and ch.inserted_records is not null
+
         order by 1 desc;
     """
     )
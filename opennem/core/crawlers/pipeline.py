@@ -0,0 +1,159 @@
+"""
+Staged crawler pipeline
+
+Runs the fetch and parse stages of a crawl concurrently while handing results
+back to a single writer in the order the items were submitted:
+
+    * fetch - thread pool, network bound
+    * parse - process pool, CPU bound. Workers are started from a forkserver
+      since forking a process that is running fetch threads can deadlock.
+      Daemonic processes, such as huey process workers, can't have children
+      so parse on a thread pool there instead
+    * write - the caller iterating the results, in order
+
+The number of items in flight is bounded by `max_pending` so a large backlog
+never holds more than that many downloaded and parsed results in memory. New
+items are only submitted as the writer consumes results (back-pressure).
+"""
+import logging
+import multiprocessing
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Generic, TypeVar
+
+from opennem import settings
+
+logger = logging.getLogger("opennem.crawler.pipeline")
+
+ItemT = TypeVar("ItemT")
+
+
+class CrawlPipelineException(Exception):
+    pass
+
+
+def _get_parse_mp_context() -> Any:
+    """Start method for parse workers. Never fork since the pipeline has running fetch threads"""
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+
+    return multiprocessing.get_context("spawn")
+
+
+@dataclass
+class PipelineResult(Generic[ItemT]):
+    """The outcome of running a single item through the fetch and parse stages"""
+
+    item: ItemT
+    result: Any = None
+    error: Exception | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _run_item_stages(
+    item: ItemT,
+    fetch: Callable[[ItemT], Any],
+    parse: Callable[[Any], Any] | None,
+    parse_executor: Executor | None,
+) -> PipelineResult[ItemT]:
+    """Fetch an item and hand the content off to the parse stage.
+
+    Runs on a fetch worker thread, which blocks on the parse future so that the
+    fetch pool size also caps the number of items queued for parsing."""
+    try:
+        content = fetch(item)
+
+        if parse is None or content is None:
+            return PipelineResult(item=item, result=content)
+
+        if parse_executor:
+            result = parse_executor.submit(parse, content).result()
+        else:
+            result = parse(content)
+
+        return PipelineResult(item=item, result=result)
+    except Exception as e:
+        logger.error(f"Pipeline error on {item}: {e}")
+        return PipelineResult(item=item, error=e)
+
+
+def run_ordered_pipeline(
+    items: Iterable[ItemT],
+    fetch: Callable[[ItemT], Any],
+    parse: Callable[[Any], Any] | None = None,
+    fetch_workers: int | None = None,
+    parse_workers: int | None = None,
+    max_pending: int | None = None,
+) -> Iterator[PipelineResult[ItemT]]:
+    """Run items through fetch and parse concurrently, yielding results in input order.
+
+    Args:
+        items: items to process, usually dirlisting entries
+        fetch: called on a worker thread for each item, returns the content to parse
+        parse: called in a worker process with the fetched content. Must be a picklable
+            module level function. Content of None skips the parse stage.
+        fetch_workers: number of fetch threads
+        parse_workers: number of parse processes, or threads when running in a daemonic
+            process. 0 parses on the fetch threads.
+        max_pending: maximum number of items in flight ahead of the writer
+
+    Yields:
+        PipelineResult for each item in the order they were passed in. Errors in the
+        fetch or parse stage are captured on the result rather than raised so a single
+        bad file does not stop the crawl.
+    """
+    fetch_workers = fetch_workers if fetch_workers is not None else settings.crawler_fetch_workers
+    parse_workers = parse_workers if parse_workers is not None else settings.crawler_parse_workers
+    max_pending = max_pending if max_pending is not None else settings.crawler_max_pending
+
+    if fetch_workers < 1:
+        raise CrawlPipelineException("Require at least one fetch worker")
+
+    if max_pending < 1:
+        raise CrawlPipelineException("Require a max_pending of at least one")
+
+    parse_executor: Executor | None = None
+
+    if parse and parse_workers > 0:
+        if multiprocessing.current_process().daemon:
+            logger.debug("Running in a daemonic process, parsing on threads")
+            parse_executor = ThreadPoolExecutor(max_workers=parse_workers, thread_name_prefix="crawl_parse")
+        else:
+            parse_executor = ProcessPoolExecutor(max_workers=parse_workers, mp_context=_get_parse_mp_context())
+
+    fetch_executor = ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix="crawl_fetch")
+
+    pending: deque[Future[PipelineResult[ItemT]]] = deque()
+    items_iter = iter(items)
+
+    def _submit_next() -> bool:
+        try:
+            item = next(items_iter)
+        except StopIteration:
+            return False
+
+        pending.append(fetch_executor.submit(_run_item_stages, item, fetch, parse, parse_executor))
+        return True
+
+    try:
+        while len(pending) < max_pending and _submit_next():
+            pass
+
+        while pending:
+            result = pending.popleft().result()
+
+            # refill the window before handing the result to the writer so the
+            # workers stay busy while it writes
+            _submit_next()
+
+            yield result
+    finally:
+        fetch_executor.shutdown(wait=True, cancel_futures=True)
+
+        if parse_executor:
+            parse_executor.shutdown(wait=True, cancel_futures=True)
@@ -1,89 +1,201 @@
+"""
+OpenNEM downloader
+
+Downloads URLs and opens local files, handling zips and zips of zips.
+
+The streaming API yields the members of an archive one at a time as file-like
+streams along with their metadata, so large archives such as the MMSDM monthly
+zips are never held in memory in full:
+
+    * responses are spooled to a temporary file once they exceed
+      DOWNLOAD_SPOOL_MAX_BYTES, local files are memory mapped
+    * with the archive cache enabled downloads are read from the cache, see
+      opennem.utils.archive
+    * nested zips are spooled once each and their members streamed from there
+    * members are decompressed as they are read
+
+    for member in iter_url_members(url):
+        parse(member.stream)
+
+Member streams are only valid until the next member is requested.
+
+`url_downloader` and `file_opener` return the concatenated content of every
+member as bytes for callers that need it all at once.
+"""
+import io
 import logging
-from io import BytesIO
+import mmap
+import shutil
+import zipfile
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
 from pathlib import Path
+from tempfile import SpooledTemporaryFile
+from typing import IO, Any
 from zipfile import ZipFile
 
 from opennem import settings
-from opennem.utils.archive import _handle_zip, chain_streams
+from opennem.utils.archive import get_archive_cache
 from opennem.utils.http import http
-from opennem.utils.mime import mime_from_content, mime_from_url
+from opennem.utils.url import get_filename_from_url
 
 logger = logging.getLogger("opennem.downloader")
 
+# responses and nested zips larger than this are spooled to disk rather than held in memory
+DOWNLOAD_SPOOL_MAX_BYTES = 32 * 1024 * 1024
 
-def url_downloader(url: str) -> bytes:
-    """Downloads a URL and returns content, handling embedded zips and other MIME's"""
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class ArchiveMember:
+    """A file in a download or archive, with nested zip members flattened
+
+    path includes the names of the containing archives, ie. outer.zip/inner.zip/file.csv"""
+
+    name: str
+    path: str
+    file_size: int | None
+    compressed_size: int | None
+    modified: datetime | None
+    stream: IO[bytes]
+
+
+@contextmanager
+def open_url(url: str) -> Iterator[IO[bytes]]:
+    """Downloads a URL into a seekable stream, spooled to disk for large responses"""
+    if archive_cache := get_archive_cache():
+        with open_file(archive_cache.fetch(url)) as fh:
+            yield fh
+
+        return
 
     logger.debug(f"Downloading: {url}")
 
-    r = http.get(url, verify=settings.http_verify_ssl)
+    with http.get(url, verify=settings.http_verify_ssl, stream=True) as r:
+        if not r.ok:
+            raise Exception(f"Bad link returned {r.status_code}: {url}")
 
-    if not r.ok:
-        raise Exception(f"Bad link returned {r.status_code}: {url}")
+        with SpooledTemporaryFile(max_size=DOWNLOAD_SPOOL_MAX_BYTES, prefix=settings.tmp_file_prefix) as fh:
+            for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                fh.write(chunk)
 
-    content = BytesIO(r.content)
+            fh.seek(0)
 
-    file_mime = mime_from_content(content)
+            yield fh  # type: ignore
 
-    if not file_mime:
-        file_mime = mime_from_url(url)
 
-    # @TODO handle all this in utils/archive.py
-    # and make it all generic to handle other
-    # mime types
-    if file_mime == "application/zip":
-        with ZipFile(content) as zf:
-            if len(zf.namelist()) == 1:
-                return zf.open(zf.namelist()[0]).read()
+class _MappedFile(io.RawIOBase):
+    """Read only file-like view of a memory map"""
 
-            c = []
-            stream_count = 0
+    def __init__(self, mapped: mmap.mmap) -> None:
+        self._mapped = mapped
 
-            for filename in zf.namelist():
-                if filename.endswith(".zip"):
-                    c.append(_handle_zip(zf.open(filename), "r"))
-                    stream_count += 1
-                else:
-                    c.append(zf.open(filename))
+    def readable(self) -> bool:
+        return True
 
-            return chain_streams(c).read()
+    def seekable(self) -> bool:
+        return True
 
-    return content.getvalue()
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        try:
+            self._mapped.seek(offset, whence)
+        except ValueError as e:
+            # file objects raise OSError, which zipfile expects
+            raise OSError(str(e)) from e
 
+        return self._mapped.tell()
+
+    def tell(self) -> int:
+        return self._mapped.tell()
+
+    def readinto(self, b: Any) -> int:
+        data = self._mapped.read(len(b))
+        b[: len(data)] = data
+        return len(data)
 
-def file_opener(path: Path) -> bytes:
-    """Opens a local file, handling embedded zips and other MIME's"""
 
+@contextmanager
+def open_file(path: Path) -> Iterator[IO[bytes]]:
+    """Opens a local file as a memory mapped stream"""
     logger.debug(f"Opening file: {path}")
 
     if not path.is_file():
         raise Exception(f"File not found: {path}")
 
-    content: BytesIO | None = None
-
     with path.open("rb") as fh:
-        content = BytesIO(fh.read())
+        # empty files can't be mapped
+        if not path.stat().st_size:
+            yield fh
+            return
+
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield _MappedFile(mapped)  # type: ignore
+
+
+def iter_zip_members(fh: IO[bytes], path: str = "") -> Iterator[ArchiveMember]:
+    """Members of a zip file, descending into nested zips"""
+    with ZipFile(fh) as zf:
+        for info in zf.infolist():
+            if info.is_dir():
+                continue
+
+            member_path = f"{path}/{info.filename}" if path else info.filename
+
+            with zf.open(info) as member_fh:
+                if info.filename.lower().endswith(".zip"):
+                    # zip members only seek forward cheaply, so spool nested zips once
+                    with SpooledTemporaryFile(max_size=DOWNLOAD_SPOOL_MAX_BYTES) as nested_fh:
+                        shutil.copyfileobj(member_fh, nested_fh, DOWNLOAD_CHUNK_SIZE)  # type: ignore
+                        nested_fh.seek(0)
+
+                        yield from iter_zip_members(nested_fh, path=member_path)  # type: ignore
+
+                    continue
+
+                yield ArchiveMember(
+                    name=Path(info.filename).name,
+                    path=member_path,
+                    file_size=info.file_size,
+                    compressed_size=info.compress_size,
+                    modified=datetime(*info.date_time),
+                    stream=member_fh,
+                )
+
 
-    file_mime = mime_from_content(content)
+def iter_archive_members(fh: IO[bytes], name: str) -> Iterator[ArchiveMember]:
+    """Members of a zip, or the stream itself as a single member if it isn't a zip"""
+    if zipfile.is_zipfile(fh):
+        fh.seek(0)
+        yield from iter_zip_members(fh, path=name)
+        return
 
-    # @TODO handle all this in utils/archive.py
-    # and make it all generic to handle other
-    # mime types
-    if file_mime == "application/zip":
-        with ZipFile(content) as zf:
-            if len(zf.namelist()) == 1:
-                return zf.open(zf.namelist()[0]).read()
+    fh.seek(0, 2)
+    size = fh.tell()
+    fh.seek(0)
 
-            c = []
-            stream_count = 0
+    yield ArchiveMember(name=name, path=name, file_size=size, compressed_size=None, modified=None, stream=fh)
 
-            for filename in zf.namelist():
-                if filename.endswith(".zip"):
-                    c.append(_handle_zip(zf.open(filename), "r"))
-                    stream_count += 1
-                else:
-                    c.append(zf.open(filename))
 
-            return chain_streams(c).read()
+def iter_url_members(url: str) -> Iterator[ArchiveMember]:
+    """Downloads a URL and yields each file in it, handling embedded zips"""
+    with open_url(url) as fh:
+        yield from iter_archive_members(fh, name=get_filename_from_url(url) or url)
 
-    return content.getvalue()
+
+def iter_file_members(path: Path) -> Iterator[ArchiveMember]:
+    """Opens a local file and yields each file in it, handling embedded zips"""
+    with open_file(path) as fh:
+        yield from iter_archive_members(fh, name=path.name)
+
+
+def url_downloader(url: str) -> bytes:
+    """Downloads a URL and returns content, handling embedded zips and other MIME's"""
+    return b"".join(member.stream.read() for member in iter_url_members(url))
+
+
+def file_opener(path: Path) -> bytes:
+    """Opens a local file, handling embedded zips and other MIME's"""
+    return b"".join(member.stream.read() for member in iter_file_members(path))
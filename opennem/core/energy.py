@@ -10,7 +10,6 @@ Uses an average in 30 minute buckets
 import logging
 from collections.abc import Generator
 from datetime import date, datetime, timedelta
-from typing import Any
 
 import numpy as np
 import pandas as pd
@@ -89,63 +88,6 @@ def __trading_energy_generator(df: pd.DataFrame, date: date, duid_id: str, power
     return return_cols
 
 
-def __trading_energy_generator_hour(
-    df: pd.DataFrame, hour: datetime, duid_id: str, power_field: str = "generated"
-) -> pd.DataFrame:
-    return_cols = []
-
-    t_start = hour.replace(minute=5)
-
-    for TI in range(2):
-        t_i = t_start + timedelta(0, 1800 * TI)
-        t_f = t_start + timedelta(0, 1800 * (TI + 1))
-
-        _query = f"'{t_i}' <= trading_interval <= '{t_f}' and facility_code == '{duid_id}'"
-
-        d_ti = df.query(_query)
-
-        energy_value = None
-        trading_interval = None
-
-        # rooftop 30m intervals - AEMO rooftop is going to go in a separate network
-        # so this won't be required
-        if (d_ti.fueltech_id.all() == "solar_rooftop") and (d_ti[power_field].count() == 1):
-            energy_value = d_ti[power_field].sum() / 2
-            # ooofff - this delta comes back off as part of NEM offset
-            trading_interval = d_ti.index[0] + timedelta(minutes=5)
-        # interpolate if it isn't padded out
-        elif d_ti[power_field].count() != 7:
-            index_interpolated = pd.date_range(start=t_i, end=t_f, freq="5min", tz=NetworkNEM.get_timezone())
-
-            d_ti = d_ti.reset_index()
-            d_ti = d_ti.set_index("trading_interval")
-            d_ti = d_ti.reindex(index_interpolated)
-            d_ti["facility_code"] = duid_id
-            d_ti[power_field] = d_ti[power_field].replace(np.NaN, 0)
-
-            if d_ti[power_field].count() != 7:
-                logger.warning("Interpolated frame didn't match generated count")
-
-        try:
-            if d_ti.fueltech_id.all() != "solar_rooftop":
-                energy_value = __trapezium_integration(d_ti, power_field)
-                trading_interval = d_ti.index[-2]
-        except ValueError as e:
-            logger.error(f"Error with {duid_id} at {t_i} {t_f}: {e}")
-
-        if not d_ti.index.empty:
-            return_cols.append(
-                {
-                    "trading_interval": trading_interval,
-                    "network_id": "NEM",
-                    "facility_code": duid_id,
-                    "eoi_quantity": energy_value,
-                }
-            )
-
-    return return_cols
-
-
 def get_day_range(df: pd.DataFrame) -> Generator[date, None, None]:
     """Get the day range for a dataframe"""
     min_date = (df.index.min() + timedelta(days=1)).date()
@@ -190,20 +132,86 @@ def _energy_aggregate_compat(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def _energy_aggregate_hours(df: pd.DataFrame) -> pd.DataFrame:
-    """v3 version of energy_sum for compat"""
-    energy_genrecs = []
+ENERGY_AGGREGATE_COLUMNS = ["trading_interval", "network_id", "facility_code", "eoi_quantity"]
 
+# number of 5 minute readings in a half hour trading interval, not counting the leading edge
+_TRADING_INTERVAL_READINGS = 6
+
+
+def _energy_aggregate_hours(df: pd.DataFrame, power_column: str = "generated") -> pd.DataFrame:
+    """v3 version of energy_sum for compat
+
+    Integrates each facility over the two half hour trading intervals in each
+    hour of the frame. Trading intervals start at 5 past the hour and include
+    both edge readings (7 readings) with missing readings treated as zero.
+    Every facility gets a value for every trading interval.
+
+    Vectorized - each reading is weighted into the trading intervals it is part
+    of and summed per (facility, trading interval) in one pass."""
     hours = list(get_hour_range(df))
 
-    for hour in hours:
-        logger.info(f"Running for hour: {hour}")
-        for duid in sorted(df.facility_code.unique()):
-            energy_genrecs += list(__trading_energy_generator_hour(df, hour, duid))
+    if not hours or df.empty:
+        return pd.DataFrame([], columns=ENERGY_AGGREGATE_COLUMNS)
 
-    df = pd.DataFrame(energy_genrecs, columns=["trading_interval", "network_id", "facility_code", "eoi_quantity"])
+    interval_start = hours[0].replace(minute=5)
+    num_buckets = len(hours) * 2
+    reading_interval = pd.Timedelta(minutes=5)
 
-    return df
+    facility_codes = np.array(sorted(df.facility_code.unique()), dtype=object)
+
+    offsets = df.index - interval_start
+    positions = np.asarray(offsets // reading_interval, dtype=np.int64)
+
+    readings = pd.DataFrame(
+        {
+            "facility": np.searchsorted(facility_codes, df.facility_code.to_numpy()),
+            "position": positions,
+            "value": pd.to_numeric(df[power_column]).fillna(0).to_numpy(dtype=np.float64),
+        }
+    )
+
+    # only readings on the 5 minute grid within the hour range, last one wins on duplicates
+    on_grid = np.asarray(offsets % reading_interval == pd.Timedelta(0)) & (positions >= 0)
+    readings = readings[on_grid & (positions <= num_buckets * _TRADING_INTERVAL_READINGS)]
+    readings = readings.drop_duplicates(subset=["facility", "position"], keep="last")
+
+    facility = readings.facility.to_numpy()
+    position = readings.position.to_numpy()
+    value = readings.value.to_numpy()
+
+    # a reading on a bucket edge is weighted 1 in both buckets it bounds, otherwise 2
+    is_edge = position % _TRADING_INTERVAL_READINGS == 0
+    bucket = position // _TRADING_INTERVAL_READINGS
+
+    in_bucket = bucket < num_buckets
+    in_previous_bucket = is_edge & (bucket > 0)
+
+    keys = np.concatenate(
+        [
+            facility[in_bucket] * num_buckets + bucket[in_bucket],
+            facility[in_previous_bucket] * num_buckets + bucket[in_previous_bucket] - 1,
+        ]
+    )
+    weights = np.concatenate([value[in_bucket] * np.where(is_edge[in_bucket], 1, 2), value[in_previous_bucket]])
+
+    energy = np.bincount(keys, weights=weights, minlength=len(facility_codes) * num_buckets) * 0.5 / 12
+
+    # order by hour, facility then trading interval
+    energy = energy.reshape(len(facility_codes), len(hours), 2).transpose(1, 0, 2)
+
+    bucket_intervals = interval_start + pd.to_timedelta(np.arange(num_buckets) * 30 + 25, unit="min")
+
+    trading_intervals = bucket_intervals.to_numpy().reshape(len(hours), 1, 2).repeat(len(facility_codes), axis=1)
+
+    return pd.DataFrame(
+        {
+            "trading_interval": trading_intervals.ravel(),
+            "network_id": "NEM",
+            "facility_code": np.tile(facility_codes.repeat(2), len(hours)),
+            "eoi_quantity": energy.ravel(),
+        },
+        columns=ENERGY_AGGREGATE_COLUMNS,
+    )
 
 
 def _trapezium_integration_variable(d_ti: pd.Series) -> float | None:
@@ -244,39 +252,86 @@ def _trapezium_integration_variable(d_ti: pd.Series) -> float | None:
 
 
 def _energy_aggregate(df: pd.DataFrame, power_column: str = "generated", zero_fill: bool = False) -> pd.DataFrame:
-    """v3 version of energy aggregate for energy_sum - iterates over time bucekts with edges"""
-    in_cap = {}
-    capture: dict[str, Any] = {}
-    values = []
-    dt: datetime | None = None
-    reading_stops: list[int] = [0, 30]
-
-    for index, value in df.iterrows():
-        i, network_id, duid = index
-
-        if duid not in capture:
-            capture[duid] = []
-            in_cap[duid] = True
-
-        if in_cap[duid]:
-            capture[duid].append(value[power_column])
-
-            if dt:
-                energy = _trapezium_integration_variable(pd.Series(capture[duid]))
-                values.append((dt, network_id, duid, energy))
+    """v3 version of energy aggregate for energy_sum - buckets with edges
 
-            in_cap[duid] = False
-            capture[duid] = []
+    Readings are processed in frame order. For each facility a bucket closes on
+    its first reading and on each reading following a bucket stop (on the hour
+    and half hour). A bucket includes the readings from the previous close up to
+    and including the closing reading and is integrated with the rules of
+    `_trapezium_integration_variable`. Buckets are labelled with the most recent
+    bucket stop seen across all facilities and are skipped until one is seen.
 
-        if i.minute in reading_stops:
-            dt = i
-            capture[duid].append(value[power_column])
-            in_cap[duid] = True
-
-        else:
-            capture[duid].append(value[power_column])
+    Vectorized using cumulative sums over the readings grouped by facility."""
+    reading_stops: list[int] = [0, 30]
 
-    return pd.DataFrame(values, columns=["trading_interval", "network_id", "facility_code", "eoi_quantity"])
+    if df.empty:
+        return pd.DataFrame([], columns=ENERGY_AGGREGATE_COLUMNS)
+
+    intervals = df.index.get_level_values(0)
+    network_ids = df.index.get_level_values(1).to_numpy()
+    facility_codes = df.index.get_level_values(2).to_numpy()
+    values = pd.to_numeric(df[power_column]).to_numpy(dtype=np.float64)
+
+    num_readings = len(df)
+    reading_positions = np.arange(num_readings)
+    is_stop = np.isin(intervals.minute, reading_stops)
+
+    # label for each reading is the last bucket stop before it in frame order
+    last_stop = np.maximum.accumulate(np.where(is_stop, reading_positions, -1))
+    label_position = np.concatenate([[-1], last_stop[:-1]])
+
+    # group readings by facility keeping frame order within each facility
+    facility_groups, _ = pd.factorize(facility_codes, use_na_sentinel=False)
+    order = np.argsort(facility_groups, kind="stable")
+
+    grouped_facility = facility_groups[order]
+    grouped_values = values[order]
+    group_start = np.concatenate([[True], grouped_facility[1:] != grouped_facility[:-1]])
+    previous_is_stop = np.concatenate([[False], is_stop[order][:-1]])
+
+    closes = np.flatnonzero(group_start | previous_is_stop)
+
+    # a bucket runs from the previous close to this one, the first bucket is only its reading
+    bucket_starts = np.where(group_start[closes], closes, np.concatenate([[0], closes[:-1]]))
+    bucket_ends = closes
+
+    is_valid = ~np.isnan(grouped_values)
+    valid_counts = np.concatenate([[0], np.cumsum(is_valid)])
+    valid_sums = np.concatenate([[0.0], np.cumsum(np.where(is_valid, grouped_values, 0.0))])
+
+    grouped_positions = np.arange(num_readings)
+    previous_valid = np.maximum.accumulate(np.where(is_valid, grouped_positions, -1))
+    next_valid = np.minimum.accumulate(np.where(is_valid, grouped_positions, num_readings)[::-1])[::-1]
+
+    count = valid_counts[bucket_ends + 1] - valid_counts[bucket_starts]
+    total = valid_sums[bucket_ends + 1] - valid_sums[bucket_starts]
+    first = grouped_values[np.minimum(next_valid[bucket_starts], num_readings - 1)]
+    last = grouped_values[np.maximum(previous_valid[bucket_ends], 0)]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        energy = np.select(
+            [count == 0, count == 1, (count <= 3) & (total == 0), count <= 3],
+            [np.nan, first * 0.5, 0.0, 0.5 * total / count],
+            default=0.5 * (2 * total - first - last) / ((count - 1) * 2),
+        )
+
+    # back to frame order, only buckets after a stop has been seen
+    close_readings = order[closes]
+    has_label = label_position[close_readings] >= 0
+    output_order = np.argsort(close_readings[has_label], kind="stable")
+
+    close_readings = close_readings[has_label][output_order]
+    energy = energy[has_label][output_order]
+
+    return pd.DataFrame(
+        {
+            "trading_interval": intervals[label_position[close_readings]],
+            "network_id": network_ids[close_readings],
+            "facility_code": facility_codes[close_readings],
+            "eoi_quantity": energy,
+        },
+        columns=ENERGY_AGGREGATE_COLUMNS,
+    )
 
 
 def shape_energy_dataframe(gen_series: list[dict], network: NetworkSchema = NetworkNEM) -> pd.DataFrame:
@@ -297,7 +352,10 @@ def shape_energy_dataframe(gen_series: list[dict], network: NetworkSchema = Netw
     df.generated = pd.to_numeric(df.generated)
 
     # timezone from network
-    df.trading_interval = df.apply(lambda x: pd.Timestamp(x.trading_interval, tz=network.get_fixed_offset()), axis=1)
+    if df.trading_interval.dt.tz is None:
+        df.trading_interval = df.trading_interval.dt.tz_localize(network.get_fixed_offset())
+    else:
+        df.trading_interval = df.trading_interval.dt.tz_convert(network.get_fixed_offset())
 
     return df
 
@@ -321,7 +379,7 @@ def energy_sum(
             if len(list(get_hour_range(df))) == 0:
                 logger.warning(f"energy_sum error for network {network.code}: Got no hours from hour range")
 
-            df = _energy_aggregate_hours(df)
+            df = _energy_aggregate_hours(df, power_column=power_column)
         else:
             df = _energy_aggregate(df)
 
@@ -38,6 +38,39 @@ Region = NewType("Region", str)
 RegionFlow = NewType("RegionFlow", str)
 
 
+def _build_position_map(values: list) -> dict:
+    """Map each value to its position"""
+    return {value: position for position, value in enumerate(values)}
+
+
+def _keyed_array(
+    records: list,
+    code_attr: str,
+    field: str,
+    intervals: list[datetime],
+    codes: list[str],
+) -> np.ndarray:
+    """Build a dense (interval, code) array of a record field. Missing entries are NaN"""
+    interval_positions = _build_position_map(intervals)
+    code_positions = _build_position_map(codes)
+
+    result = np.full((len(intervals), len(codes)), np.nan, dtype=np.float64)
+
+    for record in records:
+        interval_position = interval_positions.get(record.interval)
+        code_position = code_positions.get(getattr(record, code_attr))
+
+        if interval_position is None or code_position is None:
+            continue
+
+        value = getattr(record, field)
+
+        if value is not None:
+            result[interval_position, code_position] = value
+
+    return result
+
+
 # Region demand and emissions structures
 @dataclass
 class RegionDemandEmissions:
@@ -79,18 +112,58 @@ class NetworkRegionsDemandEmissions:
     def __init__(self, network: NetworkSchema, data: list[RegionDemandEmissions]):
         self.data = data
         self.network = network
+        self._build_index()
 
     def __repr__(self) -> str:
         return f"<RegionNetEmissionsDemandForNetwork region_code={self.network.code} regions={len(self.data)}>"
 
+    def _build_index(self) -> None:
+        """Index regions by (interval, region_code). Later records win, as with the previous filter lookup"""
+        self._index: dict[tuple[datetime, str], RegionDemandEmissions] = {(i.interval, i.region_code): i for i in self.data}
+        self._indexed_data = self.data
+        self._indexed_len = len(self.data)
+
+    def _get_index(self) -> dict[tuple[datetime, str], RegionDemandEmissions]:
+        # data is public so rebuild if it was replaced or appended to
+        if self._indexed_data is not self.data or self._indexed_len != len(self.data):
+            self._build_index()
+
+        return self._index
+
     def get_region(self, interval: datetime, region: Region) -> RegionDemandEmissions:
         """Get region by code"""
-        region_result = list(filter(lambda x: x.interval == interval and x.region_code == region, self.data))
+        region_result = self._get_index().get((interval, region))
 
         if not region_result:
             raise FlowSolverException(f"Region {region} not found in network {self.network.code}")
 
-        return region_result.pop()
+        return region_result
+
+    @property
+    def intervals(self) -> list[datetime]:
+        """Sorted unique intervals"""
+        return sorted({i for i, _ in self._get_index()})
+
+    @property
+    def region_codes(self) -> list[Region]:
+        """Sorted unique region codes"""
+        return sorted({Region(r) for _, r in self._get_index()})
+
+    def get_array(self, field: str, intervals: list[datetime] | None = None, regions: list[Region] | None = None) -> np.ndarray:
+        """Get a field for all regions as an (interval, region) array
+
+        Args:
+            field: energy_mwh, emissions_t or generated_mw
+            intervals: row order, defaults to self.intervals
+            regions: column order, defaults to self.region_codes
+        """
+        return _keyed_array(
+            list(self._get_index().values()),
+            code_attr="region_code",
+            field=field,
+            intervals=intervals if intervals is not None else self.intervals,
+            codes=regions if regions is not None else self.region_codes,
+        )
 
     def to_dict(self) -> list[dict]:
         """Return flow results as a dictionary"""
@@ -144,12 +217,65 @@ class NetworkInterconnectorEnergyEmissions:
     def __init__(self, network: NetworkSchema, data: list[InterconnectorNetEmissionsEnergy]):
         self.data = data
         self.network = network
+        self._build_index()
+
+    def _build_index(self) -> None:
+        """Index interconnectors by (interval, region_flow) tracking keys with more than one record"""
+        self._index: dict[tuple[datetime, str], InterconnectorNetEmissionsEnergy] = {}
+        self._duplicate_keys: set[tuple[datetime, str]] = set()
+
+        for i in self.data:
+            key = (i.interval, i.region_flow)
+
+            if key in self._index:
+                self._duplicate_keys.add(key)
+
+            self._index[key] = i
+
+        self._indexed_data = self.data
+        self._indexed_len = len(self.data)
+
+    def _get_index(self) -> dict[tuple[datetime, str], InterconnectorNetEmissionsEnergy]:
+        # data is public so rebuild if it was replaced or appended to
+        if self._indexed_data is not self.data or self._indexed_len != len(self.data):
+            self._build_index()
+
+        return self._index
+
+    @property
+    def intervals(self) -> list[datetime]:
+        """Sorted unique intervals"""
+        return sorted({i for i, _ in self._get_index()})
+
+    @property
+    def region_flows(self) -> list[RegionFlow]:
+        """Sorted unique region flows"""
+        return sorted({RegionFlow(r) for _, r in self._get_index()})
+
+    def get_array(
+        self, field: str, intervals: list[datetime] | None = None, region_flows: list[RegionFlow] | None = None
+    ) -> np.ndarray:
+        """Get a field for all interconnectors as an (interval, region_flow) array
+
+        Args:
+            field: energy_mwh or generated_mw
+            intervals: row order, defaults to self.intervals
+            region_flows: column order, defaults to self.region_flows
+        """
+        return _keyed_array(
+            list(self._get_index().values()),
+            code_attr="region_flow",
+            field=field,
+            intervals=intervals if intervals is not None else self.intervals,
+            codes=region_flows if region_flows is not None else self.region_flows,
+        )
 
     def get_interconnector(
         self, interval: datetime, region_flow: RegionFlow, default: int = 0
     ) -> InterconnectorNetEmissionsEnergy:
         """Get interconnector by region flow"""
-        interconnector_result = list(filter(lambda x: x.interval == interval and x.region_flow == region_flow, self.data))
+        key = (interval, region_flow)
+        interconnector_result = self._get_index().get(key)
 
         if not interconnector_result:
             if default:
@@ -163,10 +289,10 @@ class NetworkInterconnectorEnergyEmissions:
                 f"Interconnector {interval} {region_flow} not found in network {self.network.code}. Available options: {avaliable_options}"
             )
 
-        if len(interconnector_result) > 1:
+        if key in self._duplicate_keys:
             raise FlowSolverException(f"Interconnector {interval} {region_flow} has multiple results")
 
-        return interconnector_result.pop()
+        return interconnector_result
 
     def to_dict(self) -> list[dict]:
         """Return flow results as a dictionary"""
@@ -463,18 +589,190 @@ def solve_flow_emissions_for_interval(
     return response_model
 
 
+@dataclass
+class FlowSolverTopology:
+    """Regions and directed interconnector flows for a network
+
+    Defines the layout of the linear system solved for each interval. The
+    unknowns are the consumed emissions of each region followed by the
+    emissions carried by each flow."""
+
+    regions: list[Region]
+    region_flows: list[RegionFlow]
+
+    @property
+    def size(self) -> int:
+        return len(self.regions) + len(self.region_flows)
+
+    def flow_region_positions(self) -> tuple[np.ndarray, np.ndarray]:
+        """Positions in regions of the source and destination region of each flow"""
+        region_positions = _build_position_map(self.regions)
+
+        flow_from = np.array([region_positions[i.split("->")[0]] for i in self.region_flows], dtype=np.intp)
+        flow_to = np.array([region_positions[i.split("->")[1]] for i in self.region_flows], dtype=np.intp)
+
+        return flow_from, flow_to
+
+
+def build_flow_topology(region_flows: list[RegionFlow], regions: list[Region] | None = None) -> FlowSolverTopology:
+    """Build the solver topology from a networks interconnector flows
+
+    Regions are taken from the interconnector ends, plus any additional regions
+    passed in. A network without interconnectors has no flows to solve."""
+    flow_regions = {r for region_flow in region_flows for r in region_flow.split("->")}
+
+    return FlowSolverTopology(
+        regions=sorted({Region(r) for r in flow_regions | set(regions or [])}),
+        region_flows=sorted(set(region_flows)),
+    )
+
+
+def build_flow_emissions_system(
+    topology: FlowSolverTopology,
+    region_demand: np.ndarray,
+    region_emissions: np.ndarray,
+    flow_energy: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Build the stacked (N, R + F, R + F) system for N intervals, R regions and F flows
+
+    For each region r the consumed emissions c_r are its generated emissions plus
+    imported minus exported emissions:
+
+        c_r + sum(f_k for k out of r) - sum(f_k for k into r) = emissions_r
+
+    and each flow carries the consumed emissions intensity of its source region:
+
+        f_k - (energy_k / demand_source) * c_source = 0
+
+    Args:
+        topology: regions and flows for the network
+        region_demand: (N, R) demand energy for each region
+        region_emissions: (N, R) generated emissions for each region
+        flow_energy: (N, F) energy for each directed flow
+
+    Returns:
+        a: (N, R + F, R + F) coefficients
+        b: (N, R + F) right hand side
+    """
+    num_intervals = region_demand.shape[0]
+    num_regions = len(topology.regions)
+    num_flows = len(topology.region_flows)
+    flow_from, flow_to = topology.flow_region_positions()
+    flow_rows = np.arange(num_flows) + num_regions
+
+    a = np.zeros((num_intervals, topology.size, topology.size), dtype=np.float64)
+    a[:, np.arange(topology.size), np.arange(topology.size)] = 1
+
+    # region balance equations
+    a[:, flow_from, flow_rows] += 1
+    a[:, flow_to, flow_rows] -= 1
+
+    # flow intensity equations, flows out of a region without demand carry no emissions
+    source_demand = region_demand[:, flow_from]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        flow_share = np.where(source_demand > 0, flow_energy / source_demand, 0.0)
+
+    a[:, flow_rows, flow_from] = -flow_share
+
+    b = np.zeros((num_intervals, topology.size), dtype=np.float64)
+    b[:, :num_regions] = region_emissions
+
+    return a, b
+
+
+def solve_flow_emissions_system(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Solve a stacked system in one call. Falls back to least squares if any interval is singular"""
+    try:
+        return np.linalg.solve(a, b[..., np.newaxis])[..., 0]
+    except np.linalg.LinAlgError:
+        logger.warning("Singular flow solver system, falling back to least squares")
+
+    return (np.linalg.pinv(a) @ b[..., np.newaxis])[..., 0]
+
+
 def solve_flow_emissions_for_interval_range(
     interconnector_data: NetworkInterconnectorEnergyEmissions,
     region_data: NetworkRegionsDemandEmissions,
-) -> FlowSolverResult:
+    topology: FlowSolverTopology | None = None,
+    trace_flows: bool = False,
+) -> pd.DataFrame:
     """
     Solve flow emissions for interval range
+
+    Computes the emissions of every flow for every interval in one vectorized
+    pass. The topology is built from the interconnector flows in the data unless
+    passed in.
+
+    By default each flow carries the emissions intensity of its source region,
+    its emissions over its demand, which is the same model as
+    solve_flow_emissions_for_interval. With trace_flows the stacked flow
+    emissions system is solved instead so that imports into flow-through regions
+    are traced, which gives different results.
+
+    Returns a frame with the imports and exports for each region and interval
+    in the shape of at_network_flows:
+
+        trading_interval network_id network_region energy_imports energy_exports emissions_imports emissions_exports ...
     """
+    if not topology:
+        topology = build_flow_topology(interconnector_data.region_flows, regions=region_data.region_codes)
 
-    intervals = list({i.interval for i in interconnector_data.data})
+    intervals = sorted(set(region_data.intervals) | set(interconnector_data.intervals))
 
     logger.debug(f"Called with {len(intervals)} intervals")
 
+    region_demand = np.nan_to_num(region_data.get_array("energy_mwh", intervals=intervals, regions=topology.regions))
+    region_emissions = np.nan_to_num(region_data.get_array("emissions_t", intervals=intervals, regions=topology.regions))
+    flow_energy = np.nan_to_num(
+        interconnector_data.get_array("energy_mwh", intervals=intervals, region_flows=topology.region_flows)
+    )
+
+    num_regions = len(topology.regions)
+    flow_from, flow_to = topology.flow_region_positions()
+    flow_emissions = np.zeros_like(flow_energy)
+
+    if topology.region_flows and intervals:
+        if trace_flows:
+            a, b = build_flow_emissions_system(topology, region_demand, region_emissions, flow_energy)
+            flow_emissions = solve_flow_emissions_system(a, b)[:, num_regions:]
+        else:
+            # regions without demand export no emissions
+            with np.errstate(divide="ignore", invalid="ignore"):
+                region_intensity = np.where(region_demand > 0, region_emissions / region_demand, 0.0)
+
+            flow_emissions = flow_energy * region_intensity[:, flow_from]
+
+    # sum flows into (interval, region) imports and exports
+    region_totals = {
+        "energy_imports": flow_to,
+        "energy_exports": flow_from,
+        "emissions_imports": flow_to,
+        "emissions_exports": flow_from,
+    }
+    columns: dict[str, np.ndarray] = {}
+
+    for column, positions in region_totals.items():
+        values = flow_energy if column.startswith("energy") else flow_emissions
+        totals = np.zeros((len(intervals), num_regions), dtype=np.float64)
+        np.add.at(totals, (slice(None), positions), values)
+        columns[column] = totals.ravel()
+
+    result = pd.DataFrame(
+        {
+            "trading_interval": np.repeat(np.array(intervals, dtype=object), num_regions),
+            "network_id": region_data.network.code,
+            "network_region": np.tile(np.array(topology.regions, dtype=object), len(intervals)),
+            **columns,
+        }
+    )
+
+    # @TODO merge market value
+    result["market_value_exports"] = 0.0
+    result["market_value_imports"] = 0.0
+
+    return result
+
 
 # debugger entry point
 if __name__ == "__main__":
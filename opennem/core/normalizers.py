@@ -8,9 +8,14 @@ in data from various sources.
 import itertools
 import logging
 import re
+import sys
+from collections.abc import Sequence
 from decimal import Decimal
 from re import Pattern
 
+import numpy as np
+import pandas as pd
+
 from opennem.core.station_names import station_map_name
 
 logger = logging.getLogger("opennem.core.normalizers")
@@ -418,6 +423,23 @@ def normalize_duid(duid: str | None) -> str | None:
     return duid_ascii
 
 
+def normalize_duid_column(duids: Sequence[str | None] | np.ndarray) -> np.ndarray:
+    """Normalize a whole column of DUIDs in a single pass
+
+    Only the distinct values are normalized through normalize_duid and every
+    occurence of a DUID in the returned object array shares the same interned string
+    """
+    codes, uniques = pd.factorize(np.asarray(duids, dtype=object))
+
+    normalized = [normalize_duid(i) for i in uniques]
+    normalized = [sys.intern(i) if i else i for i in normalized]
+
+    # missing values have a code of -1 which indexes this trailing entry
+    normalized.append(normalize_duid(None))
+
+    return np.asarray(normalized, dtype=object)[codes]
+
+
 def name_normalizer(name: str) -> str:
     name_normalized = ""
 
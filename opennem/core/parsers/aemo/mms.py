@@ -4,21 +4,27 @@ Parse AEMO MMS CSV format which can have multiple tables and definitions per CSV
 """
 
 import csv
+import dataclasses
+import io
 import logging
+from collections.abc import Generator, Iterator, Sequence
+from dataclasses import dataclass
 from datetime import datetime
+from functools import cache
 from pathlib import Path
-from typing import Any
+from typing import IO, Any
+from zipfile import ZipFile
 
-from pydantic import BaseModel, Field, validator
-from pydantic.error_wrappers import ValidationError
+import numpy as np
+from pydantic import BaseModel, validator
 from pydantic.fields import PrivateAttr
 
-from opennem.core.downloader import url_downloader
-from opennem.core.normalizers import normalize_duid
-from opennem.schema.aemo.mms import MMSBaseClass, get_mms_schema_for_table
+from opennem.core.downloader import iter_url_members
+from opennem.core.normalizers import normalize_duid_column
+from opennem.schema.aemo.mms import TABLE_TO_SCHEMA_MAP, MMSBaseClass, get_mms_schema_for_table
 from opennem.schema.core import BaseConfig
 from opennem.schema.network import NetworkNEM
-from opennem.utils.dates import parse_date
+from opennem.utils.dates import parse_date_column
 from opennem.utils.version import get_version
 
 _HAVE_PANDAS = False
@@ -34,16 +40,386 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 
+class AEMOParserException(Exception):
+    pass
+
+
+AEMO_ROW_HEADER_TYPES = ["C", "I", "D"]
+
+MMS_DATE_FIELDS = ["settlementdate", "tradinginterval", "lastchanged", "interval_datetime"]
+
+MMS_DUID_FIELDS = ["duid"]
+
+# default number of records in each streamed batch
+MMS_STREAM_BATCH_SIZE = 50_000
+
+# number of records added through add_record that are buffered before being stored as a chunk
+MMS_RECORD_BUFFER_SIZE = 10_000
+
+
+@dataclass
+class AEMOTableBatch:
+    """A fixed-size columnar batch of records for a single MMS table
+
+    Each field is held as an array. Fields that are numeric in the table MMS
+    schema are float64 and everything else is kept as an object array of
+    strings until the batch is normalized by normalize_mms_batch
+    """
+
+    namespace: str
+    name: str
+    fieldnames: list[str]
+    columns: dict[str, Any]
+    url_source: str | None = None
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.namespace}_{self.name}"
+
+    @property
+    def nbytes(self) -> int:
+        return sum(i.nbytes for i in self.columns.values())
+
+    def __len__(self) -> int:
+        if not self.columns:
+            return 0
+
+        return len(next(iter(self.columns.values())))
+
+    def to_frame(self) -> Any:
+        """Return a pandas dataframe for the batch"""
+        if not _HAVE_PANDAS:
+            return None
+
+        return pd.DataFrame(self.columns, columns=self.fieldnames, copy=False)
+
+
+def _get_mms_schema_field_types(schema: Any) -> dict[str, tuple[Any, bool]]:
+    """Get the field types and whether they are required for an MMS schema"""
+    if dataclasses.is_dataclass(schema):
+        return {
+            i.name: (i.type, i.default is dataclasses.MISSING and i.default_factory is dataclasses.MISSING)  # type: ignore
+            for i in dataclasses.fields(schema)
+            if not i.name.startswith("_")
+        }
+
+    if hasattr(schema, "__fields__"):
+        return {name: (i.outer_type_, i.required) for name, i in schema.__fields__.items()}
+
+    return {}
+
+
+@cache
+def get_mms_numeric_fields(table_name: str) -> frozenset[str]:
+    """Get the numeric fields of an MMS table from its schema
+
+    Column types are taken from the schema rather than guessed from values so
+    that text codes which look numeric keep their leading zeros and a column
+    has the same type in every batch. Tables without a schema have no numeric
+    fields and all their values are kept as strings.
+    """
+    schema = TABLE_TO_SCHEMA_MAP.get(table_name.upper())
+
+    if not schema:
+        return frozenset()
+
+    return frozenset(
+        fieldname for fieldname, (field_type, _) in _get_mms_schema_field_types(schema).items() if field_type in [float, int]
+    )
+
+
+def _mms_column_to_array(fieldname: str, values: Sequence[Any], numeric: bool = False) -> np.ndarray:
+    """Convert a column of raw MMS values into a typed numpy array
+
+    Numeric columns are float64 with blank values as nan. Everything else is
+    kept as an object array"""
+    if not numeric or fieldname in MMS_DATE_FIELDS or fieldname in MMS_DUID_FIELDS:
+        return np.array(values, dtype=object)
+
+    try:
+        return np.array([np.nan if i is None or i == "" else i for i in values], dtype=np.float64)
+    except (ValueError, TypeError):
+        pass
+
+    logger.debug(f"Invalid numeric values in field {fieldname}")
+
+    return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+
+
+def _concat_columns(arrays: list[Any]) -> Any:
+    """Concatenate chunks of a column into a single array"""
+    if len(arrays) == 1:
+        return arrays[0]
+
+    if all(isinstance(i, np.ndarray) for i in arrays):
+        return np.concatenate(arrays)
+
+    # extension arrays such as tz-aware datetimes
+    return pd.concat([pd.Series(i, copy=False) for i in arrays], ignore_index=True).array
+
+
+def _column_to_list(column: Any) -> list[Any]:
+    """Return python values for a column. Missing numeric values are None"""
+    if hasattr(column, "to_pydatetime"):
+        return list(column.to_pydatetime())
+
+    if isinstance(column, np.ndarray) and column.dtype.kind == "f":
+        values = column.astype(object)
+        values[np.isnan(column)] = None
+        return values.tolist()
+
+    if isinstance(column, np.ndarray):
+        return column.tolist()
+
+    return list(column)
+
+
+class AEMOTableStore:
+    """Struct-of-arrays record store for an MMS table
+
+    Records are appended as chunks of columns and kept as a list of chunks.
+    Merging stores only extends the chunk list and columns are concatenated
+    once when they are read.
+    """
+
+    def __init__(self, fieldnames: list[str], numeric_fields: frozenset[str] = frozenset()) -> None:
+        self.fieldnames: list[str] = list(fieldnames)
+        self.numeric_fields = numeric_fields
+        self._chunks: list[dict[str, Any]] = []
+        self._chunk_lengths: list[int] = []
+        self._pending_rows: list[list[Any]] = []
+
+        # running totals so sizes don't require a scan of the chunks
+        self._num_records = 0
+        self._nbytes = 0
+
+    def __len__(self) -> int:
+        return self._num_records + len(self._pending_rows)
+
+    @property
+    def num_chunks(self) -> int:
+        self._flush_pending()
+        return len(self._chunks)
+
+    @property
+    def nbytes(self) -> int:
+        self._flush_pending()
+        return self._nbytes
+
+    def _add_fieldnames(self, fieldnames: list[str]) -> None:
+        for fieldname in fieldnames:
+            if fieldname not in self.fieldnames:
+                self.fieldnames.append(fieldname)
+
+    def append(self, columns: dict[str, Any]) -> int:
+        """Append a chunk of columns and return the number of records added"""
+        self._flush_pending()
+
+        if not columns:
+            return 0
+
+        column_lengths = {len(i) for i in columns.values()}
+
+        if len(column_lengths) != 1:
+            raise AEMOParserException("Column lengths in chunk do not match")
+
+        num_records = column_lengths.pop()
+
+        if num_records < 1:
+            return 0
+
+        self._add_fieldnames(list(columns.keys()))
+        self._chunks.append(columns)
+        self._chunk_lengths.append(num_records)
+        self._num_records += num_records
+        self._nbytes += sum(i.nbytes for i in columns.values())
+
+        return num_records
+
+    def append_row(self, values: list[Any]) -> None:
+        """Append a single row of values ordered by fieldnames. Rows are buffered into chunks"""
+        if len(values) != len(self.fieldnames):
+            raise AEMOParserException("Length mismatch between record and fields")
+
+        self._pending_rows.append(values)
+
+        if len(self._pending_rows) >= MMS_RECORD_BUFFER_SIZE:
+            self._flush_pending()
+
+    def _flush_pending(self) -> None:
+        if not self._pending_rows:
+            return
+
+        rows = self._pending_rows
+        self._pending_rows = []
+
+        columns = {
+            fieldname: _mms_column_to_array(fieldname, column_values, numeric=fieldname in self.numeric_fields)
+            for fieldname, column_values in zip(self.fieldnames, zip(*rows, strict=True), strict=True)
+        }
+
+        self.append(columns)
+
+    def extend(self, other: "AEMOTableStore") -> int:
+        """Merge the chunks of another store into this one"""
+        other._flush_pending()
+        self._flush_pending()
+
+        self._add_fieldnames(other.fieldnames)
+        self._chunks.extend(other._chunks)
+        self._chunk_lengths.extend(other._chunk_lengths)
+        self._num_records += other._num_records
+        self._nbytes += other._nbytes
+
+        return len(other)
+
+    def _chunk_column(self, chunk_index: int, fieldname: str) -> Any:
+        chunk = self._chunks[chunk_index]
+
+        if fieldname in chunk:
+            return chunk[fieldname]
+
+        return np.full(self._chunk_lengths[chunk_index], None, dtype=object)
+
+    def columns(self) -> dict[str, Any]:
+        """Return the full columns of the store, concatenating chunks on first read"""
+        self._flush_pending()
+
+        if not self._chunks:
+            return {fieldname: np.array([], dtype=object) for fieldname in self.fieldnames}
+
+        if len(self._chunks) > 1 or set(self._chunks[0].keys()) != set(self.fieldnames):
+            merged = {
+                fieldname: _concat_columns([self._chunk_column(idx, fieldname) for idx in range(len(self._chunks))])
+                for fieldname in self.fieldnames
+            }
+
+            self._chunks = [merged]
+            self._chunk_lengths = [self._num_records]
+            self._nbytes = sum(i.nbytes for i in merged.values())
+
+        return self._chunks[0]
+
+    def iter_records(self, values_only: bool = False) -> Generator[dict[str, Any] | list[Any], None, None]:
+        """Iterate the store as records, building a single chunk of python values at a time"""
+        self._flush_pending()
+
+        for chunk_index in range(len(self._chunks)):
+            chunk_values = [_column_to_list(self._chunk_column(chunk_index, i)) for i in self.fieldnames]
+
+            for row in zip(*chunk_values, strict=True):
+                if values_only:
+                    yield list(row)
+                else:
+                    yield dict(zip(self.fieldnames, row, strict=True))
+
+    def get_record(self, index: int, values_only: bool = False) -> dict[str, Any] | list[Any]:
+        """Get a single record by index"""
+        self._flush_pending()
+
+        num_records = len(self)
+
+        if index < 0:
+            index += num_records
+
+        if index < 0 or index >= num_records:
+            raise IndexError("record index out of range")
+
+        for chunk_index, chunk_length in enumerate(self._chunk_lengths):
+            if index < chunk_length:
+                row = [_column_to_list(self._chunk_column(chunk_index, i)[index : index + 1])[0] for i in self.fieldnames]
+                return row if values_only else dict(zip(self.fieldnames, row, strict=True))
+
+            index -= chunk_length
+
+        raise IndexError("record index out of range")
+
+    def to_frame(self) -> Any:
+        """Return a pandas dataframe backed by the store columns"""
+        if not _HAVE_PANDAS:
+            return None
+
+        return pd.DataFrame(self.columns(), columns=self.fieldnames, copy=False)
+
+
+class AEMOTableRecords(Sequence):
+    """Read-only sequence view of the records in an AEMOTableStore"""
+
+    def __init__(self, store: AEMOTableStore, values_only: bool = False) -> None:
+        self._store = store
+        self._values_only = values_only
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def __iter__(self) -> Iterator[dict[str, Any] | list[Any]]:
+        return self._store.iter_records(values_only=self._values_only)
+
+    def __getitem__(self, index: int | slice) -> Any:  # type: ignore
+        if isinstance(index, slice):
+            return [self._store.get_record(i, values_only=self._values_only) for i in range(*index.indices(len(self)))]
+
+        return self._store.get_record(index, values_only=self._values_only)
+
+    def __repr__(self) -> str:
+        return f"<AEMOTableRecords {len(self)} records>"
+
+
+def validate_mms_columns(columns: dict[str, Any], schema: Any) -> dict[str, Any]:
+    """Validate a batch of columns against an MMS schema
+
+    Coerces columns to the schema field types and drops the rows where a
+    required field is missing or could not be parsed.
+    """
+    num_records = len(next(iter(columns.values()))) if columns else 0
+    valid_mask = np.ones(num_records, dtype=bool)
+
+    for fieldname, (field_type, field_required) in _get_mms_schema_field_types(schema).items():
+        if fieldname not in columns:
+            if field_required:
+                logger.warning(f"Missing required field {fieldname} for schema {schema.__name__}")
+                valid_mask[:] = False
+
+            continue
+
+        column = columns[fieldname]
+
+        if field_type is datetime:
+            if not isinstance(getattr(column, "dtype", None), pd.DatetimeTZDtype):
+                column = parse_date_column(column, network=NetworkNEM)
+
+        elif field_type in [float, int]:
+            if not (isinstance(column, np.ndarray) and column.dtype == np.float64):
+                column = pd.to_numeric(pd.Series(column, copy=False), errors="coerce").to_numpy(dtype=np.float64)
+
+        columns[fieldname] = column
+
+        if field_required:
+            valid_mask &= ~pd.isna(column)
+
+    if valid_mask.all():
+        return columns
+
+    logger.debug(f"Dropped {num_records - valid_mask.sum()} invalid records for schema {schema.__name__}")
+
+    return {fieldname: column[valid_mask] for fieldname, column in columns.items()}
+
+
 # pylint: disable=no-self-argument
 class AEMOTableSchema(BaseConfig):
     name: str
     namespace: str
     fieldnames: list[str]
-    records: list[dict[str, Any] | list] = Field(default_factory=list)
 
     # optionally it has a schema
     _record_schema: MMSBaseClass | None = PrivateAttr()
 
+    # array backed record store
+    _store: AEMOTableStore | None = PrivateAttr(default=None)
+
+    # records were added as lists of values
+    _values_only: bool = PrivateAttr(default=False)
+
     # the url this table was taken from if any
     url_source: str | None = None
 
@@ -66,6 +442,26 @@ class AEMOTableSchema(BaseConfig):
 
         return None
 
+    @property
+    def store(self) -> AEMOTableStore:
+        if self._store is None:
+            self._store = AEMOTableStore(self.fieldnames, numeric_fields=get_mms_numeric_fields(self.full_name))
+
+        return self._store
+
+    @property
+    def num_records(self) -> int:
+        return len(self.store)
+
+    @property
+    def nbytes(self) -> int:
+        return self.store.nbytes
+
+    @property
+    def records(self) -> AEMOTableRecords:
+        """Sequence view of the table records. Records are built on access from the store"""
+        return AEMOTableRecords(self.store, values_only=self._values_only)
+
     @validator("name")
     def validate_name(cls, table_name: str) -> str:
         _table_name = table_name.strip().lower()
@@ -92,58 +488,53 @@ class AEMOTableSchema(BaseConfig):
 
         return True
 
-    def add_record(self, record: dict | MMSBaseClass, values_only: bool = False) -> bool:
-        if isinstance(record, dict) and hasattr(self, "_record_schema") and self._record_schema:
-            _record = None
+    def add_batch(self, batch: AEMOTableBatch | dict[str, Any]) -> int:
+        """Add a batch of columns to the table, validating it against the schema if set"""
+        columns = batch.columns if isinstance(batch, AEMOTableBatch) else batch
 
-            if not isinstance(record, dict):
-                raise Exception(f"Could not add record, not a dict: {record}")
-
-            try:
-                _record = self._record_schema(**record)  # type: ignore
-            except ValidationError as e:
-                val_errors = e.errors()
-                logger.debug(record)
+        if hasattr(self, "_record_schema") and self._record_schema:
+            columns = validate_mms_columns(dict(columns), self._record_schema)
 
-                for ve in val_errors:
-                    ve_fieldname = ve["loc"][0]
-                    ve_val = ""
+        return self.store.append(columns)
 
-                    if record and isinstance(record, dict) and ve_fieldname in record:
-                        ve_val = record[ve_fieldname]
-                        logger.debug(f"Error: {ve_val}")
+    def add_record(self, record: dict | list | MMSBaseClass, values_only: bool = False) -> bool:
+        if values_only:
+            self._values_only = True
 
-                return False
+        if isinstance(record, MMSBaseClass):
+            record = dataclasses.asdict(record)
 
-            except Exception as e:
-                logger.error(f"Record error: {e}")
-                return False
+        elif isinstance(record, BaseModel):
+            record = record.dict()
 
-            if values_only:
-                self.records.append(list(_record.values()))
-            else:
-                self.records.append(_record)
+        if isinstance(record, dict):
+            record = [record.get(i) for i in self.store.fieldnames]
 
-        else:
-            if values_only and isinstance(record, dict):
-                self.records.append(list(record.values()))
-            elif values_only and isinstance(record, list):
-                self.records.append(record)
-            else:
-                self.records.append(record)
+        try:
+            self.store.append_row(record)
+        except AEMOParserException as e:
+            logger.error(f"Record error: {e}")
+            return False
 
         return True
 
-    def to_frame(self) -> Any:
+    def extend(self, table: "AEMOTableSchema") -> int:
+        """Merge the records of another table into this one"""
+        if table._values_only:
+            self._values_only = True
+
+        return self.store.extend(table.store)
+
+    def to_frame(self, set_index: bool = True) -> Any:
         """Return a pandas dataframe for the table"""
         if not _HAVE_PANDAS:
             return None
 
         _index_keys = []
 
-        _df = pd.DataFrame(self.records)
+        _df = self.store.to_frame()
 
-        if hasattr(self, "_record_schema") and self._record_schema:
+        if set_index and hasattr(self, "_record_schema") and self._record_schema:
             if hasattr(self._record_schema, "_primary_keys"):
                 _index_keys = self._record_schema._primary_keys  # type: ignore
 
@@ -157,14 +548,17 @@ class AEMOTableSchema(BaseConfig):
         return _df
 
     def to_csv(self, filename: str) -> None:
-        logger.info(f"Writing table {self.full_name} with {len(self.records)} records")
+        logger.info(f"Writing table {self.full_name} with {len(self.store)} records")
 
-        with open(filename, "w") as fh:
-            csvwriter = csv.DictWriter(fh, fieldnames=self.fieldnames)
-            csvwriter.writeheader()
+        _df = self.to_frame(set_index=False)
 
-            for record in self.records:
-                csvwriter.writerow(dict(zip(self.fieldnames, record, strict=True)))
+        # format the few distinct interval dates once rather than per row
+        for column_name in _df.columns:
+            if isinstance(_df[column_name].dtype, pd.DatetimeTZDtype):
+                codes, uniques = pd.factorize(_df[column_name])
+                _df[column_name] = np.append(np.array([str(i) for i in uniques.to_pydatetime()], dtype=object), "")[codes]
+
+        _df.to_csv(filename, index=False)
 
         logger.info(f"Wrote records to {self.full_name}")
 
@@ -177,6 +571,37 @@ class AEMOTableSet(BaseModel):
     generated: datetime = datetime.now()
     tables: list[AEMOTableSchema] = []
 
+    # lookup indexes by full name and by short name
+    _tables_by_full_name: dict[str, AEMOTableSchema] = PrivateAttr(default_factory=dict)
+    _tables_by_name: dict[str, AEMOTableSchema] = PrivateAttr(default_factory=dict)
+
+    def __init__(self, **data: Any) -> None:
+        super().__init__(**data)
+        self._reindex_tables()
+
+    def _index_table(self, table: AEMOTableSchema) -> None:
+        self._tables_by_full_name[table.full_name] = table
+        self._tables_by_name[table.name] = table
+
+    def _reindex_tables(self) -> None:
+        self._tables_by_full_name = {}
+        self._tables_by_name = {}
+
+        for table in self.tables:
+            self._index_table(table)
+
+    def _lookup_table(self, table_name: str) -> AEMOTableSchema | None:
+        # tables appended to the list directly aren't indexed yet
+        if len(self._tables_by_full_name) != len(self.tables):
+            self._reindex_tables()
+
+        if table_name in self._tables_by_full_name:
+            return self._tables_by_full_name[table_name]
+
+        # if not found search by name only
+        # @NOTE this might lead to bugs
+        return self._tables_by_name.get(table_name)
+
     @property
     def table_names(self) -> list[str]:
         _names: list[str] = []
@@ -186,172 +611,259 @@ class AEMOTableSet(BaseModel):
 
         return _names
 
-    def has_table(self, table_name: str) -> bool:
-        found_table: bool = False
+    @property
+    def table_record_counts(self) -> dict[str, int]:
+        """Number of records in each table by full name"""
+        return {i.full_name: i.num_records for i in self.tables}
 
-        if not self.tables:
-            return False
+    @property
+    def table_sizes(self) -> dict[str, int]:
+        """Size in bytes of the record store of each table by full name"""
+        return {i.full_name: i.nbytes for i in self.tables}
 
-        if len(self.tables) < 1:
-            return False
+    def has_table(self, table_name: str) -> bool:
+        return self._lookup_table(table_name) is not None
 
-        table_lookup = list(filter(lambda t: t.full_name == table_name, self.tables))
+    def add_table(self, table: AEMOTableSchema, values_only: bool = False) -> bool:
+        _existing_table = self._lookup_table(table.full_name)
 
-        if len(table_lookup) > 0:
-            return True
+        if _existing_table and _existing_table.full_name == table.full_name:
+            _existing_table.extend(table)
+        else:
+            self.tables.append(table)
+            self._index_table(table)
 
-        # if not found search by name only
-        # @NOTE this might lead to bugs
-        table_lookup = list(filter(lambda t: t.name == table_name, self.tables))
+        return True
 
-        if len(table_lookup) > 0:
-            return True
+    def add_batch(self, batch: AEMOTableBatch, parse_table_schemas: bool = False) -> AEMOTableSchema:
+        """Add a streamed batch to the table set, creating the table if required"""
+        table = self._lookup_table(batch.full_name)
 
-        return found_table
+        if not table or table.full_name != batch.full_name:
+            table = AEMOTableSchema(
+                name=batch.name,
+                namespace=batch.namespace,
+                fieldnames=batch.fieldnames,
+                url_source=batch.url_source,
+            )
 
-    def add_table(self, table: AEMOTableSchema, values_only: bool = False) -> bool:
-        _existing_table = self.get_table(table.full_name)
+            # do we have a custom shema for the table?
+            if parse_table_schemas:
+                table_schema = get_mms_schema_for_table(table.full_name)
+
+                if table_schema:
+                    table.set_schema(table_schema)
 
-        if _existing_table:
-            for r in table.records:
-                _existing_table.add_record(r, values_only=values_only)
-        else:
             self.tables.append(table)
+            self._index_table(table)
 
-        return True
+        table.add_batch(batch)
+
+        return table
 
     def get_table(self, table_name: str) -> AEMOTableSchema | None:
-        if not self.has_table(table_name):
-            return None
+        table = self._lookup_table(table_name)
 
-        table_lookup = list(filter(lambda t: t.full_name == table_name, self.tables))
+        if not table:
+            logger.debug("Looking up table: {} amongst ({})".format(table_name, ", ".join([i.name for i in self.tables])))
 
-        if table_lookup:
-            return table_lookup.pop()
+        return table
 
-        table_lookup = list(filter(lambda t: t.name == table_name, self.tables))
 
-        if table_lookup:
-            return table_lookup.pop()
+def normalize_mms_batch(batch: AEMOTableBatch) -> AEMOTableBatch:
+    """Normalize the date and DUID columns of a batch in place
 
-        logger.debug("Looking up table: {} amongst ({})".format(table_name, ", ".join([i.name for i in self.tables])))
+    Date fields become tz-aware datetime64 arrays in the NEM timezone and DUID
+    fields become interned string arrays. Values match what parse_date and
+    normalize_duid produce row by row.
+    """
+    for fieldname in batch.fieldnames:
+        if fieldname in MMS_DATE_FIELDS:
+            batch.columns[fieldname] = parse_date_column(batch.columns[fieldname], network=NetworkNEM)
 
-        return None
+        elif fieldname in MMS_DUID_FIELDS:
+            batch.columns[fieldname] = normalize_duid_column(batch.columns[fieldname])
 
+    return batch
 
-class AEMOParserException(Exception):
-    pass
 
+def _mms_rows_to_batch(
+    namespace: str,
+    name: str,
+    fieldnames: list[str],
+    rows: list[list[str]],
+    url: str | None = None,
+    normalize: bool = True,
+) -> AEMOTableBatch:
+    """Transpose a list of MMS data rows into a columnar batch"""
+    if rows:
+        numeric_fields = get_mms_numeric_fields(f"{namespace}_{name}")
 
-AEMO_ROW_HEADER_TYPES = ["C", "I", "D"]
+        columns = {
+            fieldname: _mms_column_to_array(fieldname, column_values, numeric=fieldname in numeric_fields)
+            for fieldname, column_values in zip(fieldnames, zip(*rows, strict=True), strict=True)
+        }
+    else:
+        columns = {fieldname: np.array([], dtype=object) for fieldname in fieldnames}
 
-MMS_DATE_FIELDS = ["settlementdate", "tradinginterval", "lastchanged", "interval_datetime"]
+    batch = AEMOTableBatch(namespace=namespace, name=name, fieldnames=fieldnames, columns=columns, url_source=url)
 
-MMS_DUID_FIELDS = ["duid"]
+    if normalize:
+        batch = normalize_mms_batch(batch)
 
+    return batch
 
-def parse_aemo_mms_csv(
-    content: str,
-    table_set: AEMOTableSet | None = None,
+
+def parse_aemo_mms_stream(
+    fh: IO[bytes] | IO[str],
     namespace_filter: list[str] | None = None,
-    parse_table_schemas: bool = False,
-    skip_records: bool = False,
+    batch_size: int = MMS_STREAM_BATCH_SIZE,
     url: str | None = None,
-    values_only: bool = False,
-) -> AEMOTableSet:
+    encoding: str = "utf-8",
+    normalize: bool = True,
+    skip_records: bool = False,
+) -> Generator[AEMOTableBatch, None, None]:
     """
-    Parse AEMO CSV's into schemas and return a table set
+    Streaming AEMO MMS CSV parser
 
-    Exception raised on error and logs malformed CSVs
-    """
+    Reads from a binary file-like object (file handles, zip members, http streams) and
+    follows the C/I/D record framing yielding columnar batches of at most batch_size records
+    for each table. Only a single batch of rows is held in memory at any time.
 
-    if not table_set:
-        table_set = AEMOTableSet()
+    Batches are yielded in file order. A table that spans multiple batches or files will
+    yield multiple batches with the same full_name and a table without records yields a
+    single empty batch. With normalize set the date and DUID columns of each batch are
+    converted with normalize_mms_batch.
+    """
+    if batch_size < 1:
+        raise AEMOParserException("Batch size must be at least 1")
 
-    content_split = content.splitlines()
+    text_stream = fh if isinstance(fh, io.TextIOBase) else io.TextIOWrapper(fh, encoding=encoding, newline="")  # type: ignore
 
-    # @NOTE more efficient csv parsing
-    datacsv = csv.reader(content_split)
+    table_namespace: str | None = None
+    table_name: str | None = None
+    table_fields: list[str] = []
+    table_field_count = 0
+    table_batches = 0
+    rows: list[list[str]] = []
 
-    # init all the parser vars
-    table_current = None
+    try:
+        for row in csv.reader(text_stream):  # type: ignore
+            if not row:
+                continue
 
-    for row in datacsv:
-        if not row or type(row) is not list or len(row) < 1:
-            continue
+            record_type = row[0]
 
-        record_type = row[0].strip().upper()
+            # fast path for data rows which are the bulk of every file
+            if record_type != "D":
+                record_type = record_type.strip().upper()
 
-        if record_type not in AEMO_ROW_HEADER_TYPES:
-            logger.info(f"Skipping row, invalid type: {record_type}")
-            continue
+            if record_type == "D":
+                if not table_name or skip_records:
+                    continue
 
-        # new table set
-        # @TODO switch to match
-        match record_type:
-            case "C":
-                # @TODO csv meta stored in table
-                if table_current:
-                    table_set.add_table(table_current, values_only=values_only)
-
-            # new table
-            case "I":
-                if table_current:
-                    table_set.add_table(table_current, values_only=values_only)
-
-                table_namespace = row[1]
-                table_name = row[2]
-                table_fields = [i.lower() for i in row[4:]]
+                values = row[4:]
 
-                if namespace_filter and table_namespace.lower() not in namespace_filter:
-                    table_current = None
+                if len(values) != table_field_count:
+                    logger.error("Malformed AEMO csv - length mismatch between records and fields")
                     continue
 
-                table_current = AEMOTableSchema(
-                    name=table_name,
-                    namespace=table_namespace,
-                    fields=table_fields,
-                    fieldnames=table_fields,
-                    url_source=url,
-                )
+                rows.append(values)
 
-                # do we have a custom shema for the table?
-                if parse_table_schemas:
-                    table_schema = get_mms_schema_for_table(table_current.full_name)
+                if len(rows) >= batch_size:
+                    yield _mms_rows_to_batch(table_namespace, table_name, table_fields, rows, url=url, normalize=normalize)  # type: ignore
+                    table_batches += 1
+                    rows = []
 
-                    if table_schema:
-                        table_current.set_schema(table_schema)
+                continue
 
-            # new record
-            case "D":
-                if skip_records:
-                    continue
+            if record_type not in AEMO_ROW_HEADER_TYPES:
+                logger.info(f"Skipping row, invalid type: {record_type}")
+                continue
 
-                if not table_current:
-                    logger.error("Have a record but not currently in a table")
-                    continue
+            # C and I records both close the current table
+            if table_name and (rows or not table_batches):
+                yield _mms_rows_to_batch(table_namespace, table_name, table_fields, rows, url=url, normalize=normalize)  # type: ignore
 
-                values = row[4:]
+            rows = []
+            table_namespace = table_name = None
+            table_batches = 0
 
-                if len(values) != len(table_current.fieldnames):
-                    logger.error("Malformed AEMO csv - length mismatch between records and fields")
+            if record_type == "I":
+                if namespace_filter and row[1].lower() not in namespace_filter:
                     continue
 
-                record = dict(zip(table_current.fieldnames, values, strict=True))
+                table_namespace = row[1].strip().lower()
+                table_name = row[2].strip().lower()
+                table_fields = [i.lower() for i in row[4:]]
+                table_field_count = len(table_fields)
+
+        if table_name and (rows or not table_batches):
+            yield _mms_rows_to_batch(table_namespace, table_name, table_fields, rows, url=url, normalize=normalize)  # type: ignore
+
+    finally:
+        # don't close the underlying stream, that is up to the caller
+        if isinstance(text_stream, io.TextIOWrapper) and text_stream is not fh:
+            text_stream.detach()
+
+
+def parse_aemo_mms_zip(
+    file_obj: IO[bytes],
+    namespace_filter: list[str] | None = None,
+    batch_size: int = MMS_STREAM_BATCH_SIZE,
+    url: str | None = None,
+    normalize: bool = True,
+) -> Generator[AEMOTableBatch, None, None]:
+    """Stream batches from every CSV member of a zip file, descending into nested zips"""
+    with ZipFile(file_obj) as zf:
+        for member in zf.namelist():
+            member_suffix = Path(member).suffix.lower()
+
+            if member_suffix not in [".csv", ".zip"]:
+                continue
+
+            with zf.open(member) as member_fh:
+                if member_suffix == ".zip":
+                    yield from parse_aemo_mms_zip(
+                        member_fh, namespace_filter=namespace_filter, batch_size=batch_size, url=url, normalize=normalize
+                    )
+                else:
+                    yield from parse_aemo_mms_stream(
+                        member_fh, namespace_filter=namespace_filter, batch_size=batch_size, url=url, normalize=normalize
+                    )
+
+
+def parse_aemo_mms_csv(
+    content: str | bytes | IO[bytes] | IO[str],
+    table_set: AEMOTableSet | None = None,
+    namespace_filter: list[str] | None = None,
+    parse_table_schemas: bool = False,
+    skip_records: bool = False,
+    url: str | None = None,
+    values_only: bool = False,
+) -> AEMOTableSet:
+    """
+    Parse AEMO CSV's into schemas and return a table set
+
+    Content can be a string, bytes or a file-like object which is streamed
+    into the array backed table stores. Exception raised on error and logs
+    malformed CSVs
+    """
 
-                for field, fieldvalue in record.items():
-                    if field in MMS_DATE_FIELDS:
-                        fieldvalue_parsed = parse_date(fieldvalue, network=NetworkNEM)
-                        record[field] = fieldvalue_parsed
+    if not table_set:
+        table_set = AEMOTableSet()
+
+    if isinstance(content, str):
+        content = io.StringIO(content, newline="")
 
-                    if field in MMS_DUID_FIELDS:
-                        fieldvalue_parsed = normalize_duid(fieldvalue)
-                        record[field] = fieldvalue_parsed
+    elif isinstance(content, bytes):
+        content = io.BytesIO(content)
 
-                table_current.add_record(record, values_only=values_only)
+    for batch in parse_aemo_mms_stream(content, namespace_filter=namespace_filter, url=url, skip_records=skip_records):
+        table = table_set.add_batch(batch, parse_table_schemas=parse_table_schemas)
 
-            case _:
-                logger.error(f"Invalid AEMO record type: {record_type}")
+        if values_only:
+            table._values_only = True
 
     return table_set
 
@@ -359,22 +871,30 @@ def parse_aemo_mms_csv(
 def parse_aemo_url(
     url: str, table_set: AEMOTableSet | None = None, skip_records: bool = False, values_only: bool = False
 ) -> AEMOTableSet:
-    """Parse a single AEMO URL into an AEMOTableSet"""
+    """Parse a single AEMO URL into an AEMOTableSet
+
+    Each file in the download, including files in nested zips, is streamed into the
+    table set in turn rather than decompressed into memory all at once"""
 
     if not table_set:
         table_set = AEMOTableSet()
 
+    content_size = 0
+
     try:
-        csv_content = url_downloader(url)
+        for member in iter_url_members(url):
+            if not member.file_size:
+                continue
+
+            content_size += member.file_size
+
+            table_set = parse_aemo_mms_csv(member.stream, table_set, skip_records=skip_records, url=url, values_only=values_only)
     except Exception as e:
         raise Exception(f"Could not fetch AEMO url {url}: {e}") from None
 
-    if not csv_content:
+    if not content_size:
         raise Exception(f"Could not parse URL: {url}")
 
-    csv_content_decoded = csv_content.decode("utf-8")
-    table_set = parse_aemo_mms_csv(csv_content_decoded, table_set, skip_records=skip_records, url=url, values_only=values_only)
-
     # Count number of records
     total_records = 0
 
@@ -417,8 +937,8 @@ def parse_aemo_file(file: str, table_set: AEMOTableSet | None = None, values_onl
     if file_path.suffix.lower() not in [".csv"]:
         raise Exception(f"Not a CSV file {file_path}")
 
-    with file_path.open() as fh:
-        table_set = parse_aemo_mms_csv(fh.read(), table_set=table_set, values_only=values_only)
+    with file_path.open("rb") as fh:
+        table_set = parse_aemo_mms_csv(fh, table_set=table_set, values_only=values_only)
 
     return table_set
 
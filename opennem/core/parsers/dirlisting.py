@@ -8,11 +8,15 @@ Currently supports:
 
     * IIS default listings and variations
     * Extracing metadata from AEMO filenames
+    * Incremental listings that return only the entries added since the last
+      listing of a URL, see `get_dirlisting_changes`
 """
 
+import hashlib
 import html
 import logging
 import re
+from collections.abc import Iterable
 from datetime import datetime
 from enum import Enum
 from operator import attrgetter
@@ -21,21 +25,28 @@ from typing import Any
 from urllib.parse import urljoin
 from zoneinfo import ZoneInfo
 
-from pydantic import ValidationError, validator
-from pyquery import PyQuery as pq
+import redis
+from pydantic import PrivateAttr, ValidationError, validator
 
+from opennem import settings
 from opennem.core.downloader import url_downloader
 from opennem.core.normalizers import is_number, strip_double_spaces
 from opennem.core.parsers.aemo.filenames import parse_aemo_filename
 from opennem.schema.core import BaseConfig
+from opennem.utils.http import http
 
 logger = logging.getLogger("opennem.parsers.dirlisting")
 
-__iis_line_match = re.compile(
-    r"(?P<modified_date>.*[AM|PM])\ {2,}(?P<file_size>(\d{1,}|\<dir\>))\ "
-    r"<a href=['\"]?(?P<link>[^'\" >]+)['\"]>(?P<filename>[^\<]+)"
+# matches an entry in an IIS listing, either a single line or anywhere in the page
+_iis_entry_match = re.compile(
+    r"(?P<modified_date>[A-Za-z]+,\s+[A-Za-z]+\s+\d{1,2},\s+\d{4}\s+\d{1,2}:\d{2}(?:\s+[AP]M)?)\s+"
+    r"(?P<file_size>\d+|&lt;dir&gt;|<dir>)\s+"
+    r"<a href=['\"]?(?P<link>[^'\" >]+)['\"]?>(?P<filename>[^<]+)</a>",
+    re.IGNORECASE,
 )
 
+DIRLISTING_CURSOR_KEY_PREFIX = "opennem:dirlisting_cursor"
+
 
 # AEMO files have a created timestamp in their filenames. This extracts it.
 _aemo_created_date_match = re.compile(r"\_(?P<date_created>\d{12})\_")
@@ -128,6 +139,31 @@ class DirectoryListing(BaseConfig):
     timezone: str | None
     entries: list[DirlistingEntry] = []
 
+    # set on incremental listings when the server returned not modified
+    not_modified: bool = False
+
+    # indexes of entry positions, rebuilt when entries change
+    _indexed_entries: list[DirlistingEntry] | None = PrivateAttr(None)
+    _indexed_count: int = PrivateAttr(0)
+    _interval_index: dict[datetime, list[int]] = PrivateAttr(default_factory=dict)
+    _filename_index: dict[str, int] = PrivateAttr(default_factory=dict)
+
+    def _build_indexes(self) -> None:
+        if self._indexed_entries is self.entries and self._indexed_count == len(self.entries):
+            return
+
+        self._interval_index = {}
+        self._filename_index = {}
+
+        for position, entry in enumerate(self.entries):
+            if entry.aemo_interval_date:
+                self._interval_index.setdefault(entry.aemo_interval_date, []).append(position)
+
+            self._filename_index.setdefault(entry.filename.name, position)
+
+        self._indexed_entries = self.entries
+        self._indexed_count = len(self.entries)
+
     @property
     def count(self) -> int:
         return len(self.entries)
@@ -157,11 +193,30 @@ class DirectoryListing(BaseConfig):
 
         return _entries[:limit]
 
-    def get_files_modified_in(self, intervals: list[datetime]) -> list[DirlistingEntry]:
-        return list(filter(lambda x: x.modified_date in intervals, self.entries))
+    def get_files_modified_in(self, intervals: Iterable[datetime]) -> list[DirlistingEntry]:
+        intervals = set(intervals)
+
+        return [i for i in self.entries if i.modified_date in intervals]
+
+    def get_files_aemo_intervals(self, intervals: Iterable[datetime]) -> list[DirlistingEntry]:
+        """Entries for AEMO interval dates, in listing order"""
+        self._build_indexes()
+
+        positions: set[int] = set()
 
-    def get_files_aemo_intervals(self, intervals: list[datetime]) -> list[DirlistingEntry]:
-        return list(filter(lambda x: x.aemo_interval_date in intervals, self.entries))
+        for interval in set(intervals):
+            positions.update(self._interval_index.get(interval, []))
+
+        return [self.entries[i] for i in sorted(positions)]
+
+    def get_entry(self, filename: str) -> DirlistingEntry | None:
+        """Entry by filename"""
+        self._build_indexes()
+
+        if (position := self._filename_index.get(filename)) is None:
+            return None
+
+        return self.entries[position]
 
     def get_files_modified_since(self, modified_date: datetime) -> list[DirlistingEntry]:
         modified_since: list[DirlistingEntry] = []
@@ -185,21 +240,11 @@ class DirectoryListing(BaseConfig):
         return modified_since
 
 
-def parse_dirlisting_line(dirlisting_line: str) -> DirlistingEntry | None:
-    """Parses a single line from a dirlisting page"""
-    if not dirlisting_line:
-        return None
-
-    matches = re.search(__iis_line_match, dirlisting_line)
-
+def _entry_from_match(matches: re.Match) -> DirlistingEntry | None:
     model: DirlistingEntry | None = None
 
-    if not matches:
-        logger.error(f"Could not match dirlisting line: {dirlisting_line}")
-        return None
-
     try:
-        model = DirlistingEntry(**matches.groupdict())
+        model = DirlistingEntry(**{k: html.unescape(v) for k, v in matches.groupdict().items()})
     except ValidationError as e:
         logger.error(f"Error in validating dirlisting line: {e}")
     except ValueError as e:
@@ -208,31 +253,32 @@ def parse_dirlisting_line(dirlisting_line: str) -> DirlistingEntry | None:
     return model
 
 
-def get_dirlisting(url: str, timezone: str | None = None) -> DirectoryListing:
-    """Parse a directory listng into a list of DirlistingEntry models"""
-    dirlisting_content = url_downloader(url)
+def parse_dirlisting_line(dirlisting_line: str) -> DirlistingEntry | None:
+    """Parses a single line from a dirlisting page"""
+    if not dirlisting_line:
+        return None
 
-    resp = pq(dirlisting_content.decode("utf-8"))
+    matches = _iis_entry_match.search(dirlisting_line)
 
-    _dirlisting_models: list[DirlistingEntry] = []
+    if not matches:
+        logger.error(f"Could not match dirlisting line: {dirlisting_line}")
+        return None
 
-    pre_area = resp("pre")
+    return _entry_from_match(matches)
 
-    if not pre_area:
-        raise Exception("Invalid directory listing: no pre or bad html")
 
-    for i in [i for i in pre_area.html().split("<br/>") if i]:
-        # it catches the containing block so skip those
-        if not i:
-            continue
+def parse_dirlisting(url: str, content: bytes | str, timezone: str | None = None) -> DirectoryListing:
+    """Parse the content of a directory listing page in a single pass over the page"""
+    if isinstance(content, bytes):
+        content = content.decode("utf-8")
 
-        if "pre>" in i:
-            continue
+    if "<pre" not in content.lower():
+        raise Exception("Invalid directory listing: no pre or bad html")
 
-        if "To Parent Directory" in i:
-            continue
+    _dirlisting_models: list[DirlistingEntry] = []
 
-        model = parse_dirlisting_line(html.unescape(i.strip()))
+    for matches in _iis_entry_match.finditer(content):
+        model = _entry_from_match(matches)
 
         if model:
             # append the base URL to the model link
@@ -245,3 +291,119 @@ def get_dirlisting(url: str, timezone: str | None = None) -> DirectoryListing:
     logger.debug(f"Got back {len(listing_model.entries)} models")
 
     return listing_model
+
+
+def get_dirlisting(url: str, timezone: str | None = None) -> DirectoryListing:
+    """Parse a directory listng into a list of DirlistingEntry models"""
+    dirlisting_content = url_downloader(url)
+
+    return parse_dirlisting(url, dirlisting_content, timezone=timezone)
+
+
+class DirlistingCursor(BaseConfig):
+    """Position of the last listing of a URL
+
+    Stores the validators the server sent for a conditional get and the latest
+    modified date seen along with the filenames at that date"""
+
+    url: str
+    etag: str | None
+    last_modified: str | None
+    latest_modified_date: datetime | None
+    latest_filenames: list[str] = []
+
+    def is_new(self, entry: DirlistingEntry) -> bool:
+        if not self.latest_modified_date:
+            return True
+
+        if not entry.modified_date or entry.modified_date < self.latest_modified_date:
+            return False
+
+        return entry.modified_date > self.latest_modified_date or entry.filename.name not in self.latest_filenames
+
+
+_redis_client: Any = None
+
+
+def _redis() -> Any:
+    global _redis_client
+
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(
+            settings.cache_url, decode_responses=True, socket_timeout=2, socket_connect_timeout=1
+        )
+
+    return _redis_client
+
+
+def _cursor_key(url: str) -> str:
+    return f"{DIRLISTING_CURSOR_KEY_PREFIX}:{hashlib.md5(url.encode('utf-8')).hexdigest()}"
+
+
+def load_dirlisting_cursor(url: str) -> DirlistingCursor | None:
+    try:
+        cursor_content = _redis().get(_cursor_key(url))
+    except redis.RedisError as e:
+        logger.warning(f"Could not load dirlisting cursor for {url}: {e}")
+        return None
+
+    if not cursor_content:
+        return None
+
+    return DirlistingCursor.parse_raw(cursor_content)
+
+
+def save_dirlisting_cursor(cursor: DirlistingCursor) -> None:
+    try:
+        _redis().set(_cursor_key(cursor.url), cursor.json())
+    except redis.RedisError as e:
+        logger.warning(f"Could not save dirlisting cursor for {cursor.url}: {e}")
+
+
+def get_dirlisting_changes(url: str, timezone: str | None = None) -> tuple[DirectoryListing, DirlistingCursor | None]:
+    """Directory listing with only the entries added since the last listing of url
+
+    Uses a conditional get with the ETag and Last-Modified of the last listing so an
+    unchanged listing isn't downloaded or parsed. The first listing of a url, or one
+    with no stored cursor, returns every entry.
+
+    Returns the listing and the cursor for it. The cursor is not stored here, callers
+    save it with save_dirlisting_cursor once the entries have been processed so that a
+    failed crawl returns the same entries on the next listing. The cursor is None when
+    the listing is unchanged."""
+    cursor = load_dirlisting_cursor(url)
+    headers = {}
+
+    if cursor and cursor.etag:
+        headers["If-None-Match"] = cursor.etag
+
+    if cursor and cursor.last_modified:
+        headers["If-Modified-Since"] = cursor.last_modified
+
+    r = http.get(url, headers=headers, verify=settings.http_verify_ssl)
+
+    if r.status_code == 304:
+        logger.debug(f"Directory listing not modified: {url}")
+        return DirectoryListing(url=url, timezone=timezone, entries=[], not_modified=True), None
+
+    if not r.ok:
+        raise Exception(f"Bad link returned {r.status_code}: {url}")
+
+    listing = parse_dirlisting(url, r.content, timezone=timezone)
+
+    latest_modified_date = max([i.modified_date for i in listing.entries if i.modified_date], default=None)
+
+    next_cursor = DirlistingCursor(
+        url=url,
+        etag=r.headers.get("ETag"),
+        last_modified=r.headers.get("Last-Modified"),
+        latest_modified_date=latest_modified_date,
+        latest_filenames=[i.filename.name for i in listing.entries if i.modified_date == latest_modified_date],
+    )
+
+    if cursor:
+        listing.entries = [i for i in listing.entries if cursor.is_new(i)]
+
+    logger.debug(f"Got {len(listing.entries)} new entries for {url}")
+
+    return listing, next_cursor
@@ -23,6 +23,7 @@ from opennem import settings
 from opennem.clients.slack import slack_message
 from opennem.db import get_database_engine
 from opennem.db.models.opennem import NetworkRegion
+from opennem.exporter.manifest import get_export_write_stats
 from opennem.schema.network import NetworkSchema
 
 # from opennem.utils.timedelta import timedelta_to_string
@@ -215,10 +216,12 @@ def profile_task(
 
             # time_start = time.perf_counter()
             dtime_start = get_now()
+            export_stats_start = get_export_write_stats()
 
             run_task_output = task(*args, **kwargs)
 
             dtime_end = get_now()
+            export_stats_end = get_export_write_stats()
 
             if level and level.value < PROFILE_LEVEL.value:
                 logger.debug(f"Task {task.__name__} complete and returning since not level")
@@ -261,6 +264,13 @@ def profile_task(
                 except Exception as e:
                     logger.error(e)
 
+            # report exporter output writes made by the task
+            exports_written = export_stats_end.written - export_stats_start.written
+            exports_skipped = export_stats_end.skipped - export_stats_start.skipped
+
+            if exports_written or exports_skipped:
+                profile_message += f" (wrote {exports_written} outputs, skipped {exports_skipped} unchanged)"
+
             if send_slack:
                 slack_message(profile_message)
 
@@ -2,10 +2,12 @@
 
 """
 import logging
+from datetime import timedelta
 
 from pydantic import ValidationError
 
 from opennem import settings
+from opennem.api.stats.power_buffer import update_power_buffer
 from opennem.controllers.schema import ControllerReturn
 from opennem.core.crawlers.meta import CrawlStatTypes, crawler_set_meta, crawlers_get_all_meta
 from opennem.core.crawlers.schema import CrawlerDefinition, CrawlerSchedule, CrawlerSet
@@ -40,11 +42,22 @@ from opennem.crawlers.nemweb import (
     AEMONNemwebDispatchScadaArchive,
 )
 from opennem.crawlers.wem import WEMBalancing, WEMBalancingLive, WEMFacilityScada, WEMFacilityScadaLive
+from opennem.schema.network import NetworkNEM
 from opennem.utils.dates import get_today_opennem
 from opennem.utils.modules import load_all_crawler_definitions
 
 logger = logging.getLogger("opennem.crawler")
 
+# crawlers that backfill or revise NEM facility_scada intervals already in the power buffer
+POWER_BUFFER_REVISION_CRAWLERS = {
+    AEMONEMDispatchActualGEN.name,
+    AEMONEMNextDayDispatch.name,
+    AEMONEMDispatchActualGENArchvie.name,
+    AEMONEMNextDayDispatchArchvie.name,
+    AEMONNemwebDispatchScadaArchive.name,
+    AEMOMMSDispatchScada.name,
+}
+
 
 def load_crawlers(live_load: bool = False) -> CrawlerSet:
     """Loads all the crawler definitions from a module and returns a CrawlSet"""
@@ -172,22 +185,39 @@ def run_crawl(
 
         logger.info(f"Set last_processed to {crawler.last_processed} and server_latest to {cr.server_latest}")
 
+    if crawler.name in POWER_BUFFER_REVISION_CRAWLERS and cr.inserted_records:
+        refresh_power_buffer()
+
     return cr
 
 
+def refresh_power_buffer() -> None:
+    """Re-query the NEM power buffer window after facility_scada has been backfilled or revised"""
+    try:
+        update_power_buffer(network=NetworkNEM, since=get_today_opennem() - timedelta(days=settings.power_buffer_days))
+    except Exception as e:
+        logger.error(f"Could not refresh power buffer: {e}")
+
+
 def run_crawl_urls(urls: list[str]) -> None:
     """Crawl a lsit of urls
     @TODO support directories
     """
 
+    inserted_records = 0
+
     for url in urls:
         if url.lower().endswith(".zip") or url.lower().endswith(".csv"):
             try:
                 cr = parse_aemo_url_optimized(url)
                 logger.info(f"Parsed {url} and got {cr.inserted_records} inserted")
+                inserted_records += cr.inserted_records
             except Exception as e:
                 logger.error(e)
 
+    if inserted_records:
+        refresh_power_buffer()
+
 
 _CRAWLER_SET: CrawlerSet | None = None
 
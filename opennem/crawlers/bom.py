@@ -3,10 +3,9 @@
 """
 import logging
 from datetime import datetime
-from time import sleep
 
-from opennem.clients.bom import get_bom_observations
-from opennem.controllers.bom import store_bom_observation_intervals
+from opennem.clients.bom import BOMObservationReturn, get_bom_observations_many
+from opennem.controllers.bom import store_bom_observations_bulk
 from opennem.controllers.nem import ControllerReturn
 from opennem.core.bom import get_stations_priority
 from opennem.core.crawlers.schema import CrawlerDefinition, CrawlerPriority, CrawlerSchedule
@@ -17,33 +16,37 @@ logger = logging.getLogger("opennem.crawler.bom")
 def crawl_bom_capitals(
     crawler: CrawlerDefinition, last_crawled: bool = True, limit: bool = False, latest: bool = False
 ) -> ControllerReturn | None:
+    """Fetch observations for every capital station concurrently and store them in one bulk upsert"""
     bom_stations = get_stations_priority(limit=crawler.limit)
 
     if not bom_stations:
         logger.error("Did not return any weather stations from crawler")
-
-    cr: ControllerReturn | None = None
+        return None
 
     for bom_station in bom_stations:
-        try:
-            if not bom_station.feed_url:
-                logger.error(f"Station {bom_station.code} has no feed url - skipping ")
-                continue
+        if not bom_station.feed_url:
+            logger.error(f"Station {bom_station.code} has no feed url - skipping ")
+
+    bom_stations = [i for i in bom_stations if i.feed_url]
+
+    results = get_bom_observations_many([(i.feed_url, i.code) for i in bom_stations])  # type: ignore
+
+    observation_sets: list[BOMObservationReturn] = []
+
+    for bom_station, result in zip(bom_stations, results, strict=True):
+        if isinstance(result, Exception):
+            logger.info(f"Bom error for station {bom_station.name}: {result}")
+            continue
 
-            bom_observations = get_bom_observations(bom_station.feed_url, bom_station.code)
-            cr = store_bom_observation_intervals(bom_observations)
+        observation_sets.append(result)
 
-            if crawler.backoff and crawler.backoff > 0:
-                logger.info(f"Backing off for {crawler.backoff}")
-                sleep(crawler.backoff)
-        except Exception as e:
-            logger.info(f"Bom error for station {bom_station.name}: {e}")
+    if not observation_sets:
+        return None
 
-    if cr:
-        cr.last_modified = datetime.now()
-        return cr
+    cr = store_bom_observations_bulk(observation_sets)
+    cr.last_modified = datetime.now()
 
-    return None
+    return cr
 
 
 BOMCapitals = CrawlerDefinition(
@@ -52,6 +55,5 @@ BOMCapitals = CrawlerDefinition(
     name="au.bom.capitals",
     url="none",
     limit=None,
-    backoff=5,
     processor=crawl_bom_capitals,
 )
@@ -3,7 +3,7 @@ import logging
 from datetime import datetime
 
 from opennem.controllers.nem import ControllerReturn, store_aemo_tableset
-from opennem.core.crawlers.history import CrawlHistoryEntry, set_crawler_history
+from opennem.core.crawlers.history import CrawlHistoryBuffer
 from opennem.core.crawlers.schema import CrawlerDefinition, CrawlerPriority, CrawlerSchedule
 from opennem.core.parsers.aemo.filenames import AEMODataBucketSize
 from opennem.core.parsers.aemo.mms import parse_aemo_url
@@ -98,29 +98,30 @@ def process_mms_url(crawler: CrawlerDefinition) -> ControllerReturn | None:
         logger.error("No entries to fetch")
         return None
 
-    for entry in entries_to_fetch:
-        try:
-            # @NOTE optimization - if we're dealing with a large file unzip
-            # to disk and parse rather than in-memory. 100,000kb
-            if crawler.bulk_insert:
-                controller_returns = parse_aemo_url_optimized_bulk(entry.link, persist_to_db=True)
-            elif entry.file_size and entry.file_size > 100_000:
-                controller_returns = parse_aemo_url_optimized(entry.link)
-            else:
-                ts = parse_aemo_url(entry.link)
-                controller_returns = store_aemo_tableset(ts)
-
-            max_date = max(i.modified_date for i in entries_to_fetch if i.modified_date)
-
-            if not controller_returns.last_modified or max_date > controller_returns.last_modified:
-                controller_returns.last_modified = max_date
-
-            if entry.aemo_interval_date:
-                ch = CrawlHistoryEntry(interval=entry.aemo_interval_date, records=controller_returns.processed_records)
-                set_crawler_history(crawler_name=crawler.name, histories=[ch])
-
-        except Exception as e:
-            logger.error(f"Processing error: {e}")
+    # crawl history is buffered and written once all entries are processed
+    with CrawlHistoryBuffer(crawler.name) as crawl_history:
+        for entry in entries_to_fetch:
+            try:
+                # @NOTE optimization - if we're dealing with a large file unzip
+                # to disk and parse rather than in-memory. 100,000kb
+                if crawler.bulk_insert:
+                    controller_returns = parse_aemo_url_optimized_bulk(entry.link, persist_to_db=True)
+                elif entry.file_size and entry.file_size > 100_000:
+                    controller_returns = parse_aemo_url_optimized(entry.link)
+                else:
+                    ts = parse_aemo_url(entry.link)
+                    controller_returns = store_aemo_tableset(ts)
+
+                max_date = max(i.modified_date for i in entries_to_fetch if i.modified_date)
+
+                if not controller_returns.last_modified or max_date > controller_returns.last_modified:
+                    controller_returns.last_modified = max_date
+
+                if entry.aemo_interval_date:
+                    crawl_history.add(entry.aemo_interval_date, records=controller_returns.processed_records)
+
+            except Exception as e:
+                logger.error(f"Processing error: {e}")
 
     return controller_returns
 
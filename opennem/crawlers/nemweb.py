@@ -1,11 +1,14 @@
 """ Nemweb crawlers """
 import logging
+from functools import partial
 
 from opennem.controllers.nem import ControllerReturn, store_aemo_tableset
-from opennem.core.crawlers.history import CrawlHistoryEntry, get_crawler_missing_intervals, set_crawler_history
+from opennem.core.crawlers.history import CrawlHistoryBuffer, get_crawler_missing_intervals
+from opennem.core.crawlers.pipeline import run_ordered_pipeline
 from opennem.core.crawlers.schema import CrawlerDefinition, CrawlerPriority, CrawlerSchedule
+from opennem.core.downloader import url_downloader
 from opennem.core.parsers.aemo.filenames import AEMODataBucketSize
-from opennem.core.parsers.aemo.mms import parse_aemo_url
+from opennem.core.parsers.aemo.mms import AEMOTableSet, parse_aemo_mms_csv
 from opennem.core.parsers.aemo.nemweb import parse_aemo_url_optimized, parse_aemo_url_optimized_bulk
 from opennem.core.parsers.dirlisting import DirlistingEntry, get_dirlisting
 from opennem.core.time import get_interval, get_interval_by_size
@@ -57,6 +60,47 @@ def get_time_interval_for_crawler(crawler: CrawlerDefinition) -> TimeInterval:
     return time_interval
 
 
+def _use_optimized_parser(entry: DirlistingEntry, bulk_insert: bool = False) -> bool:
+    """Large files and bulk inserts are unzipped to disk and parsed from there rather than in-memory"""
+    # @NOTE optimization - if we're dealing with a large file unzip
+    # to disk and parse rather than in-memory. 100,000kb
+    return bulk_insert or bool(entry.file_size and entry.file_size > 100_000)
+
+
+def _fetch_nemweb_entry(entry: DirlistingEntry, bulk_insert: bool = False) -> tuple[str, bytes] | None:
+    """Fetch stage of the crawl pipeline. Returns None for entries handled by the optimized parsers"""
+    if _use_optimized_parser(entry, bulk_insert=bulk_insert):
+        return None
+
+    return entry.link, url_downloader(entry.link)
+
+
+def _parse_nemweb_content(content: tuple[str, bytes]) -> AEMOTableSet:
+    """Parse stage of the crawl pipeline. Runs in a worker process"""
+    url, csv_content = content
+
+    if not csv_content:
+        raise NemwebCrawlerException(f"Could not parse URL: {url}")
+
+    return parse_aemo_mms_csv(csv_content, url=url)
+
+
+def _store_nemweb_entry(entry: DirlistingEntry, table_set: AEMOTableSet | None, bulk_insert: bool = False) -> ControllerReturn:
+    """Write stage of the crawl pipeline"""
+    if table_set is not None:
+        return store_aemo_tableset(table_set)
+
+    if bulk_insert:
+        controller_returns = parse_aemo_url_optimized_bulk(entry.link, persist_to_db=True)
+    else:
+        controller_returns = parse_aemo_url_optimized(entry.link)
+
+    if not isinstance(controller_returns, ControllerReturn):
+        raise NemwebCrawlerException("Controller returns not a ControllerReturn")
+
+    return controller_returns
+
+
 def run_nemweb_aemo_crawl(
     crawler: CrawlerDefinition,
     run_fill: bool = True,
@@ -112,34 +156,41 @@ def run_nemweb_aemo_crawl(
 
     logger.info(f"Fetching {latest=} {len(entries_to_fetch)} entries")
 
-    controller_returns: ControllerReturn | None = None
+    # computed once for the whole crawl rather than per entry
+    max_date = max([i.modified_date for i in entries_to_fetch if i.modified_date], default=None)
+
+    controller_returns = ControllerReturn(last_modified=max_date)
+
+    fetch_entry = partial(_fetch_nemweb_entry, bulk_insert=crawler.bulk_insert)
+
+    # entries are downloaded and parsed concurrently and written here in order
+    # crawl history is buffered and written once at the end of the crawl
+    with CrawlHistoryBuffer(crawler.name) as crawl_history:
+        for pipeline_result in run_ordered_pipeline(entries_to_fetch, fetch=fetch_entry, parse=_parse_nemweb_content):
+            entry = pipeline_result.item
 
-    for entry in entries_to_fetch:
-        try:
-            # @NOTE optimization - if we're dealing with a large file unzip
-            # to disk and parse rather than in-memory. 100,000kb
-            if crawler.bulk_insert:
-                controller_returns = parse_aemo_url_optimized_bulk(entry.link, persist_to_db=True)
-            elif entry.file_size and entry.file_size > 100_000:
-                controller_returns = parse_aemo_url_optimized(entry.link)
-            else:
-                ts = parse_aemo_url(entry.link)
-                controller_returns = store_aemo_tableset(ts)
+            if not pipeline_result.ok:
+                logger.error(f"Processing error: {pipeline_result.error}")
+                controller_returns.errors += 1
+                continue
 
-            if not isinstance(controller_returns, ControllerReturn):
-                raise Exception("Controller returns not a ControllerReturn")
+            try:
+                entry_returns = _store_nemweb_entry(entry, pipeline_result.result, bulk_insert=crawler.bulk_insert)
 
-            max_date = max([i.modified_date for i in entries_to_fetch if i.modified_date])
+                controller_returns.inserted_records += entry_returns.inserted_records
+                controller_returns.processed_records += entry_returns.processed_records
 
-            if not controller_returns.last_modified or max_date > controller_returns.last_modified:
-                controller_returns.last_modified = max_date
+                if entry_returns.last_modified and (
+                    not controller_returns.last_modified or entry_returns.last_modified > controller_returns.last_modified
+                ):
+                    controller_returns.last_modified = entry_returns.last_modified
 
-            if entry.aemo_interval_date:
-                ch = CrawlHistoryEntry(interval=entry.aemo_interval_date, records=controller_returns.processed_records)
-                set_crawler_history(crawler_name=crawler.name, histories=[ch])
+                if entry.aemo_interval_date:
+                    crawl_history.add(entry.aemo_interval_date, records=entry_returns.processed_records)
 
-        except Exception as e:
-            logger.error(f"Processing error: {e}")
+            except Exception as e:
+                logger.error(f"Processing error: {e}")
+                controller_returns.errors += 1
 
     controller_returns.crawls_run = len(entries_to_fetch)
 
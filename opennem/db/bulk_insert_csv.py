@@ -7,10 +7,15 @@ Bulk inserts records using temporary tables and CSV imports with copy_from
 """
 import csv
 import logging
-from datetime import datetime
+import uuid
+from collections.abc import Generator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from io import StringIO
 from typing import Any, TypeVar
 
+import numpy as np
+import pandas as pd
 from sqlalchemy.sql.schema import Column, Table
 
 from opennem.db import get_database_engine
@@ -39,13 +44,33 @@ BULK_INSERT_CONFLICT_UPDATE = """
 """
 
 
-def build_insert_query(
-    table: Table,
-    update_cols: list[str | Column] = None,
-) -> str:
-    """
-    Builds the bulk insert query
-    """
+def get_table_schema_name(table: Table) -> str:
+    """Get the schema name for an ORM table from its table args"""
+    _ts: str = ""
+
+    if hasattr(table, "__table_args__"):
+        if isinstance(table.__table_args__, dict) and "schema" in table.__table_args__:  # type: ignore
+            _ts = table.__table_args__["schema"]  # type: ignore
+
+        # for table args that are a list of args find the schema def
+        if isinstance(table.__table_args__, tuple):  # type: ignore
+            for i in table.__table_args__:  # type: ignore
+                if isinstance(i, dict) and "schema" in i:  # type: ignore
+                    _ts = i["schema"]  # type: ignore
+
+        if not _ts:
+            logger.warning(f"Table schema not found for table: {table.__table__.name}")  # type: ignore
+
+    return _ts
+
+
+def get_tmp_table_suffix() -> str:
+    """Unique suffix for temporary tables so concurrent loads never collide"""
+    return uuid.uuid4().hex[:16]
+
+
+def build_conflict_clause(table: Table, update_cols: list[str | Column] | None = None) -> str:
+    """Builds the ON CONFLICT clause for a table updating update_cols"""
     on_conflict = "DO NOTHING"
 
     def get_column_name(column: str | Column) -> str:
@@ -70,29 +95,27 @@ def build_insert_query(
             update_values=", ".join([f"{n} = EXCLUDED.{n}" for n in update_col_names]),
         )
 
-    # Table schema
-    table_schema: str = ""
-    _ts: str = ""
+    return on_conflict
 
-    if hasattr(table, "__table_args__"):
-        if isinstance(table.__table_args__, dict) and "schema" in table.__table_args__:  # type: ignore
-            _ts = table.__table_args__["schema"]  # type: ignore
 
-        # for table args that are a list of args find the schema def
-        if isinstance(table.__table_args__, tuple):  # type: ignore
-            for i in table.__table_args__:  # type: ignore
-                if isinstance(i, dict) and "schema" in i:  # type: ignore
-                    _ts = i["schema"]  # type: ignore
+def build_insert_query(
+    table: Table,
+    update_cols: list[str | Column] = None,
+) -> str:
+    """
+    Builds the bulk insert query
+    """
+    on_conflict = build_conflict_clause(table, update_cols)
 
-        if not _ts:
-            logger.warning(f"Table schema not found for table: {table.__table__.name}")  # type: ignore
-        else:
-            table_schema = f"{_ts}."
+    # Table schema
+    table_schema: str = ""
+    _ts: str = get_table_schema_name(table)
 
-    # Temporary table name uniq
-    tmp_table_name: str = ""
+    if _ts:
+        table_schema = f"{_ts}."
 
-    tmp_table_name = datetime.strftime(datetime.now(), "%Y%m%d%H%M%S")
+    # Temporary table name uniq
+    tmp_table_name: str = get_tmp_table_suffix()
 
     if _ts:
         tmp_table_name = f"{_ts}_{tmp_table_name}"
@@ -173,38 +196,200 @@ def generate_bulkinsert_csv_from_records(
     return csv_buffer
 
 
-def bulkinsert_mms_items(
+# number of records serialized and copied at a time by the bulk loader
+BULK_LOAD_CHUNK_SIZE = 100_000
+
+BULK_LOAD_CREATE_TMP_TABLE = """
+    CREATE TEMP TABLE {tmp_table_name}
+    (LIKE {table_schema}{table_name} INCLUDING DEFAULTS)
+    ON COMMIT DROP
+"""
+
+BULK_LOAD_COPY = """
+    COPY {tmp_table_name} ({column_names})
+        FROM STDIN WITH (FORMAT CSV, HEADER FALSE, DELIMITER ',')
+"""
+
+BULK_LOAD_INSERT = """
+    INSERT INTO {table_schema}{table_name} ({column_names})
+        SELECT {column_names}
+        FROM {tmp_table_name}
+    ON CONFLICT {on_conflict}
+"""
+
+BULK_LOAD_TRUNCATE = "TRUNCATE {tmp_table_name}"
+
+
+class BulkInsertException(Exception):
+    pass
+
+
+@dataclass
+class BulkLoadResult:
+    """Result of a bulk load with the number of rows loaded from each chunk"""
+
+    table_name: str
+    chunk_row_counts: list[int] = field(default_factory=list)
+
+    @property
+    def num_chunks(self) -> int:
+        return len(self.chunk_row_counts)
+
+    @property
+    def total_rows(self) -> int:
+        return sum(self.chunk_row_counts)
+
+
+def _iter_record_chunks(records: list[dict] | pd.DataFrame, chunk_size: int) -> Generator[list[dict] | pd.DataFrame, None, None]:
+    """Split records or a dataframe into bounded chunks without copying the whole set"""
+    for chunk_start in range(0, len(records), chunk_size):
+        if isinstance(records, pd.DataFrame):
+            yield records.iloc[chunk_start : chunk_start + chunk_size]
+        else:
+            yield records[chunk_start : chunk_start + chunk_size]
+
+
+def serialize_records_chunk(chunk: list[dict] | pd.DataFrame, column_names: list[str]) -> StringIO:
+    """Serialize a chunk of records into a headerless CSV buffer for COPY
+
+    Columns are formatted from their numpy arrays by pandas. Timezone aware
+    datetime columns only have their distinct values formatted since there
+    are few intervals per chunk. Missing values become empty fields which
+    COPY reads as NULL.
+    """
+    df = chunk if isinstance(chunk, pd.DataFrame) else pd.DataFrame.from_records(chunk, columns=column_names)
+    df = df[column_names]
+
+    datetime_columns = [i for i in column_names if isinstance(df[i].dtype, pd.DatetimeTZDtype)]
+
+    if datetime_columns:
+        df = df.copy(deep=False)
+
+        for column_name in datetime_columns:
+            codes, uniques = pd.factorize(df[column_name])
+            formatted = np.array([i.isoformat() for i in uniques.to_pydatetime()] + [""], dtype=object)
+            df[column_name] = formatted[codes]
+
+    csv_buffer = StringIO()
+    df.to_csv(csv_buffer, header=False, index=False)
+    csv_buffer.seek(0)
+
+    return csv_buffer
+
+
+def bulkload_records(
     table: ORMTableType,
-    records: list[dict],
+    records: list[dict] | pd.DataFrame,
     update_fields: list[str | Column[Any]] | None = None,
-) -> int:
-    num_records = 0
+    chunk_size: int = BULK_LOAD_CHUNK_SIZE,
+) -> BulkLoadResult:
+    """
+    Bulk load records or a dataframe into a table in bounded chunks
 
-    if not records:
-        return 0
+    Uses a pooled connection and a uniquely named temp table. Each chunk is
+    serialized to CSV in a background thread while the previous chunk is being
+    copied and upserted, so serialization overlaps the database round trip.
+    All chunks are loaded in a single transaction.
+
+    Raises BulkInsertException on error
+    """
+    table_name = table.__table__.name  # type: ignore
+    result = BulkLoadResult(table_name=table_name)
+
+    if len(records) < 1:
+        return result
 
-    sql_query = build_insert_query(table, update_fields)
-    csv_content = generate_bulkinsert_csv_from_records(table, records, column_names=list(records[0].keys()))
+    if chunk_size < 1:
+        raise BulkInsertException("Chunk size must be at least 1")
+
+    table_column_names = [c.name for c in table.__table__.columns.values()]  # type: ignore
+    column_names = list(records.columns) if isinstance(records, pd.DataFrame) else list(records[0].keys())
+
+    for column_name in column_names:
+        if column_name not in table_column_names:
+            raise BulkInsertException(
+                "Column name from records not found in table: {}. Have {}".format(column_name, ", ".join(table_column_names))
+            )
+
+    table_schema_name = get_table_schema_name(table)
+    table_schema = f"{table_schema_name}." if table_schema_name else ""
+    tmp_table_name = f"__tmp_{table_name}_{get_tmp_table_suffix()}"
+    column_names_sql = ", ".join(column_names)
+
+    copy_query = BULK_LOAD_COPY.format(tmp_table_name=tmp_table_name, column_names=column_names_sql)
+    insert_query = BULK_LOAD_INSERT.format(
+        table_schema=table_schema,
+        table_name=table_name,
+        tmp_table_name=tmp_table_name,
+        column_names=column_names_sql,
+        on_conflict=build_conflict_clause(table, update_fields),
+    )
 
-    # @TODO check the scoping here
     engine = get_database_engine()
     conn = engine.raw_connection()
 
     try:
         cursor = conn.cursor()
-        cursor.copy_expert(sql_query, csv_content)
+        cursor.execute(
+            BULK_LOAD_CREATE_TMP_TABLE.format(tmp_table_name=tmp_table_name, table_schema=table_schema, table_name=table_name)
+        )
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="bulkload") as executor:
+            chunks = _iter_record_chunks(records, chunk_size)
+
+            def _submit_next() -> Future | None:
+                chunk = next(chunks, None)
+
+                if chunk is None:
+                    return None
+
+                return executor.submit(serialize_records_chunk, chunk, column_names)
+
+            pending = _submit_next()
+
+            while pending:
+                csv_buffer = pending.result()
+
+                # serialize the next chunk while this one goes over the wire
+                pending = _submit_next()
+
+                cursor.copy_expert(copy_query, csv_buffer)
+                cursor.execute(insert_query)
+                result.chunk_row_counts.append(cursor.rowcount)
+                cursor.execute(BULK_LOAD_TRUNCATE.format(tmp_table_name=tmp_table_name))
+
         conn.commit()
-        num_records = len(records)
-        logger.info(f"Bulk inserted {len(records)} records")
-    except Exception as generic_error:
-        if hasattr(generic_error, "hide_parameters"):
-            generic_error.hide_parameters = True  # type: ignore
-        logger.error(generic_error)
+    except Exception as e:
+        conn.rollback()
+
+        if hasattr(e, "hide_parameters"):
+            e.hide_parameters = True  # type: ignore
+
+        raise BulkInsertException(f"Error bulk loading into {table_name}: {e}") from None
     finally:
-        engine.dispose()
+        # returns the connection to the pool
         conn.close()
 
-    return num_records
+    logger.info(f"Bulk loaded {result.total_rows} records into {table_name} in {result.num_chunks} chunks")
+
+    return result
+
+
+def bulkinsert_mms_items(
+    table: ORMTableType,
+    records: list[dict] | pd.DataFrame,
+    update_fields: list[str | Column[Any]] | None = None,
+) -> int:
+    if records is None or len(records) < 1:
+        return 0
+
+    try:
+        result = bulkload_records(table, records, update_fields)
+    except BulkInsertException as e:
+        logger.error(e)
+        return 0
+
+    return len(records) if result.num_chunks else 0
 
 
 def pad_column_null(records: list[dict], column_name: str) -> list[dict]:
@@ -0,0 +1,30 @@
+# pylint: disable=no-member
+"""
+crawl_history crawler_name interval index
+
+Revision ID: 3a8e1c9d2b47
+Revises: 60f042e69758
+Create Date: 2023-07-18 10:12:41.204512
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3a8e1c9d2b47"
+down_revision = "60f042e69758"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "idx_crawl_history_crawler_name_interval",
+        "crawl_history",
+        ["crawler_name", "interval"],
+        unique=False,
+        postgresql_using="btree",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_crawl_history_crawler_name_interval", table_name="crawl_history", postgresql_using="btree")
@@ -103,6 +103,15 @@ class CrawlHistory(Base):
 
     __tablename__ = "crawl_history"
 
+    __table_args__ = (
+        Index(
+            "idx_crawl_history_crawler_name_interval",
+            "crawler_name",
+            "interval",
+            postgresql_using="btree",
+        ),
+    )
+
     source = Column(Enum(CrawlerSource), nullable=False, primary_key=True, default=CrawlerSource.nemweb)
     crawler_name = Column(Text, nullable=False, primary_key=True)
 
@@ -3,6 +3,7 @@ OpenNEM S3 Bucket Module
 
 Writes OpennemDataSet's to AWS S3 buckets
 """
+import gzip
 import json
 import logging
 from typing import Any
@@ -12,6 +13,14 @@ from botocore.exceptions import ClientError
 
 from opennem import settings
 from opennem.api.stats.schema import OpennemDataSet
+from opennem.api.stats.serialize import serialize_stat_set, stat_set_content_hash
+from opennem.exporter.manifest import (
+    content_hash,
+    encode_export_content,
+    export_encoding_mode,
+    get_export_manifest,
+    record_export_write,
+)
 from opennem.utils.url import urljoin
 
 logger = logging.getLogger(__name__)
@@ -33,7 +42,14 @@ class OpennemDataSetSerializeS3:
 
     # @TODO return a full OpennemDataSet
     def load(self, key: str) -> Any:
-        return json.load(self.bucket.Object(key=key).get()["Body"])
+        response = self.bucket.Object(key=key).get()
+        content = response["Body"].read()
+
+        # large exports are uploaded gzip encoded, see export_gzip_min_bytes
+        if response.get("ContentEncoding") == "gzip":
+            content = gzip.decompress(content)
+
+        return json.loads(content)
 
     def dump(self, key: str, stat_set: OpennemDataSet, exclude: set | None = None) -> Any:
         indent = None
@@ -41,41 +57,56 @@ class OpennemDataSetSerializeS3:
         if settings.debug:
             indent = 4
 
-        stat_set_content = stat_set.json(exclude_unset=self.exclude_unset, indent=indent, exclude=exclude)
+        stat_set_content = serialize_stat_set(stat_set, exclude_unset=self.exclude_unset, indent=indent, exclude=exclude)
 
+        return self.write(key, stat_set_content)
+
+    def write(
+        self, key: str, content: str | bytes, content_type: str = "application/json", content_encoding: str | None = None
+    ) -> Any:
         obj = self.bucket.Object(key=key)
-        _write_response = obj.put(Body=stat_set_content, ContentType="application/json")
 
-        _write_response["length"] = len(stat_set_content)
+        put_args = {"Body": content, "ContentType": content_type}
 
-        return _write_response
+        if content_encoding:
+            put_args["ContentEncoding"] = content_encoding
 
-    def write(self, key: str, content: str, content_type: str = "application/json") -> Any:
-        obj = self.bucket.Object(key=key)
-        _write_response = obj.put(Body=content, ContentType=content_type)
+        _write_response = obj.put(**put_args)
 
         _write_response["length"] = len(content)
 
         return _write_response
 
 
-def write_statset_to_s3(stat_set: OpennemDataSet, file_path: str, exclude: set = None, exclude_unset: bool = False) -> int:
+def _manifest_key(file_path: str) -> str:
+    return f"s3:{settings.s3_bucket_path}/{file_path}"
+
+
+def _put_to_s3(
+    file_path: str,
+    content: str | bytes,
+    content_type: str = "application/json",
+    digest: str | None = None,
+    encode: bool = True,
+) -> int:
     """
-    Write an Opennem data set to an s3 bucket using boto
+    Write content to s3, encoded per the export settings unless encode is false, and record it in the export manifest
     """
     s3_save_path = urljoin(f"https://{settings.s3_bucket_path}", file_path)
 
-    if file_path.startswith("/"):
-        file_path = file_path[1:]
-
     if not settings.s3_bucket_path:
         raise Exception("Require an S3 bucket to write to")
 
-    s3bucket = OpennemDataSetSerializeS3(settings.s3_bucket_path, exclude_unset=exclude_unset)
+    s3bucket = OpennemDataSetSerializeS3(settings.s3_bucket_path)
     write_response = None
 
+    if encode:
+        body, content_encoding = encode_export_content(content)
+    else:
+        body, content_encoding = content.encode("utf-8") if isinstance(content, str) else content, None
+
     try:
-        write_response = s3bucket.dump(file_path, stat_set, exclude=exclude)
+        write_response = s3bucket.write(file_path, body, content_type=content_type, content_encoding=content_encoding)
     except ClientError as e:
         logging.error(e)
         return 0
@@ -93,45 +124,81 @@ def write_statset_to_s3(stat_set: OpennemDataSet, file_path: str, exclude: set =
             )
         )
 
-    logger.info("Wrote {} to {}".format(write_response["length"], s3_save_path))
+    if manifest := get_export_manifest():
+        manifest.record(
+            _manifest_key(file_path),
+            digest or content_hash(content),
+            export_encoding_mode() if encode else "identity",
+            write_response["length"],
+        )
+
+    record_export_write(write_response["length"])
+
+    logger.info("Wrote {} to {}{}".format(write_response["length"], s3_save_path, " (gzip)" if content_encoding else ""))
 
     return write_response["length"]
 
 
-def write_to_s3(content: str, file_path: str, content_type: str = "application/json") -> int:
+def _unchanged_on_s3(file_path: str, digest: str, encoding_mode: str | None = None) -> int | None:
+    """Length of the existing output if the manifest has the same content for it"""
+    if not (manifest := get_export_manifest()):
+        return None
+
+    encoding_mode = encoding_mode or export_encoding_mode()
+
+    if (length := manifest.unchanged_length(_manifest_key(file_path), digest, encoding_mode)) is None:
+        return None
+
+    record_export_write(skipped=True)
+
+    logger.info(f"Skipped writing unchanged {file_path}")
+
+    return length
+
+
+def write_statset_to_s3(stat_set: OpennemDataSet, file_path: str, exclude: set = None, exclude_unset: bool = False) -> int:
     """
-    Write a string to s3
+    Write an Opennem data set to an s3 bucket using boto. Skipped if the data is unchanged
     """
-    s3_save_path = urljoin(f"https://{settings.s3_bucket_path}", file_path)
+    file_path = file_path.lstrip("/")
+    indent = None
 
-    if file_path.startswith("/"):
-        file_path = file_path[1:]
+    if settings.debug:
+        indent = 4
 
-    if not settings.s3_bucket_path:
-        raise Exception("Require an S3 bucket to write to")
+    content = serialize_stat_set(stat_set, exclude_unset=exclude_unset, indent=indent, exclude=exclude)
+    digest: str | None = None
 
-    s3bucket = OpennemDataSetSerializeS3(settings.s3_bucket_path)
-    write_response = None
+    if get_export_manifest():
+        digest = stat_set_content_hash(stat_set, content)
 
-    try:
-        write_response = s3bucket.write(file_path, content, content_type=content_type)
-    except ClientError as e:
-        logging.error(e)
-        return 0
+        if (length := _unchanged_on_s3(file_path, digest)) is not None:
+            return length
 
-    if "ResponseMetadata" not in write_response:
-        raise Exception(f"Error writing stat set to {file_path} invalid write response")
+    return _put_to_s3(file_path, content, digest=digest)
 
-    if "HTTPStatusCode" not in write_response["ResponseMetadata"]:
-        raise Exception(f"Error writing stat set to {file_path} invalid write response")
 
-    if write_response["ResponseMetadata"]["HTTPStatusCode"] != 200:
-        raise Exception(
-            "Error writing stat set to {} - response code {}".format(
-                file_path, write_response["ResponseMetadata"]["HTTPStatusCode"]
-            )
-        )
+def write_to_s3(content: str, file_path: str, content_type: str = "application/json") -> int:
+    """
+    Write a string to s3. Skipped if the content is unchanged
+    """
+    file_path = file_path.lstrip("/")
+    digest = content_hash(content)
 
-    logger.info("Wrote {} to {}".format(write_response["length"], s3_save_path))
+    if (length := _unchanged_on_s3(file_path, digest)) is not None:
+        return length
 
-    return write_response["length"]
+    return _put_to_s3(file_path, content, content_type=content_type, digest=digest)
+
+
+def write_bytes_to_s3(content: bytes, file_path: str, content_type: str) -> int:
+    """
+    Write binary content to s3 as is, for formats that are already compressed. Skipped if the content is unchanged
+    """
+    file_path = file_path.lstrip("/")
+    digest = content_hash(content)
+
+    if (length := _unchanged_on_s3(file_path, digest, encoding_mode="identity")) is not None:
+        return length
+
+    return _put_to_s3(file_path, content, content_type=content_type, digest=digest, encode=False)
@@ -6,9 +6,14 @@ For each network, this exports:
  - 5min (or network.interval_size) data in weekly buckets
 
 This is called from the scheduler in opennem.workers.scheduler to run every morning
+
+Weeks that have passed are recorded in the historic week cache along with their
+source data watermark and are only rebuilt if their data changes. See
+opennem.exporter.historic_cache
 """
 
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 
 from opennem import settings
@@ -26,6 +31,12 @@ from opennem.core.network_region_bom_station_map import get_network_region_weath
 from opennem.core.profiler import profile_task
 from opennem.db import get_scoped_session
 from opennem.db.models.opennem import NetworkRegion
+from opennem.exporter.historic_cache import (
+    HistoricWeek,
+    HistoricWeekCache,
+    get_historic_week_cache,
+    get_historic_week_watermarks,
+)
 from opennem.schema.network import NetworkNEM, NetworkSchema, NetworkWEM
 from opennem.utils.dates import (
     get_last_complete_day_for_network,
@@ -53,12 +64,26 @@ def export_network_intervals_for_week(
     network: NetworkSchema,
     network_region: NetworkRegion,
     week_number: int | None = None,
+    week_cache: HistoricWeekCache | None = None,
+    watermark: datetime | str | None = None,
 ) -> int | None:
-    """ """
+    """Export the intervals for a network region and week
+
+    If a week cache is passed and the week has passed it is recorded as final at the
+    source data watermark once written"""
 
     if not week_number:
         week_number = get_week_number_from_datetime(week_start)
 
+    week = HistoricWeek(
+        network_code=network.code,
+        network_region_code=network_region.code,
+        week_start=week_start,
+        week_end=week_end,
+        week_number=week_number,
+    )
+    is_complete = True
+
     logging.info(
         f"Exporting historic intervals for network {network.code} and region "
         f"{network_region.code} and year {week_start.year} and week {week_number} ({week_start} => {week_end})"
@@ -133,22 +158,52 @@ def export_network_intervals_for_week(
         stat_set.append_set(weather_stats)
     except Exception as e:
         logger.error(f"Error getting weather stats for {network_region.code}: {e}")
+        is_complete = False
 
     # save out on s3 (or locally for dev)
-    save_path = f"v3/stats/historic/weekly/{network.code}/{network_region.code}/year/{week_start.year}/week/{week_number}.json"
+    bytes_written = write_output(week.path, stat_set)
 
-    return write_output(save_path, stat_set)
+    if week_cache and is_complete and week.is_final(get_last_complete_day_for_network(network)):
+        week_cache.mark_final(week, watermark)
+
+    return bytes_written
+
+
+def _get_week_watermarks(network: NetworkSchema, weeks: list[HistoricWeek]) -> dict | None:
+    """Source data watermarks for the weeks or None if they can't be read, in which case no weeks are skipped"""
+    if not weeks:
+        return {}
+
+    try:
+        return get_historic_week_watermarks(
+            network,
+            start=min(w.week_start for w in weeks),
+            end=max(w.week_end for w in weeks) + timedelta(days=1),
+        )
+    except Exception as e:
+        logger.error(f"Could not get historic week watermarks for {network.code}: {e}")
+
+    return None
 
 
 @profile_task(send_slack=False)
 def export_historic_intervals(
-    limit: int | None = None, networks: list[NetworkSchema] | None = None, network_region_code: str | None = None
+    limit: int | None = None,
+    networks: list[NetworkSchema] | None = None,
+    network_region_code: str | None = None,
+    force: bool = False,
+    max_workers: int | None = None,
 ) -> None:
-    """ """
+    """Export the weekly historic intervals for networks
+
+    Weeks that have passed and whose source data is unchanged since they were last
+    exported are skipped unless force is set. The remaining weeks are exported
+    concurrently on `export_workers` threads"""
     if networks is None:
         networks = [NetworkNEM, NetworkWEM]
 
     session = get_scoped_session()
+    week_cache = get_historic_week_cache()
 
     for network in networks:
         if not network.data_first_seen:
@@ -166,20 +221,64 @@ def export_historic_intervals(
 
         network_regions: list[NetworkRegion] = query.all()
 
-        # loop through the networks
-        for network_region in network_regions:
-            for week_start, week_end in week_series_datetimes(
-                start=network_last_completed_week_start, end=network.data_first_seen, length=limit
-            ):
-                if week_end > network_last_complete_day:
-                    week_end = network_last_complete_day
+        week_ranges = []
+
+        for week_start, week_end in week_series_datetimes(
+            start=network_last_completed_week_start, end=network.data_first_seen, length=limit
+        ):
+            if week_end > network_last_complete_day:
+                week_end = network_last_complete_day
+
+            week_ranges.append((week_start, week_end))
+
+        weeks = [
+            (network_region, HistoricWeek(network.code, network_region.code, week_start, week_end))
+            for network_region in network_regions
+            for week_start, week_end in week_ranges
+        ]
+
+        watermarks = _get_week_watermarks(network, [w for _, w in weeks]) if week_cache else None
+
+        if week_cache and watermarks is not None and not force:
+            weeks = [
+                (network_region, week)
+                for network_region, week in weeks
+                if not (
+                    week.is_final(network_last_complete_day)
+                    and week_cache.is_current(week, watermarks.get(week.week_start.date()))
+                )
+            ]
+
+        logger.info(
+            f"Exporting {len(weeks)} historic weeks for {network.code} "
+            f"({len(network_regions) * len(week_ranges) - len(weeks)} unchanged)"
+        )
 
+        with ThreadPoolExecutor(max_workers=max_workers or settings.export_workers) as executor:
+            futures = [
+                executor.submit(
+                    export_network_intervals_for_week,
+                    week_start=week.week_start,
+                    week_end=week.week_end,
+                    network=network,
+                    network_region=network_region,
+                    week_number=week.week_number,
+                    week_cache=week_cache if watermarks is not None else None,
+                    watermark=watermarks.get(week.week_start.date()) if watermarks else None,
+                )
+                for network_region, week in weeks
+            ]
+
+            errors = []
+
+            for future in as_completed(futures):
                 try:
-                    export_network_intervals_for_week(
-                        week_start=week_start, week_end=week_end, network=network, network_region=network_region
-                    )
+                    future.result()
                 except Exception as e:
-                    raise ExporterHistoricException(f"export_historic_intervals error: {e}") from None
+                    errors.append(e)
+
+        if errors:
+            raise ExporterHistoricException(f"export_historic_intervals error: {errors[0]}") from None
 
 
 @profile_task(send_slack=False)
@@ -0,0 +1,226 @@
+"""
+Materialized cache of historic weekly exports
+
+Weeks that have fully passed are final - once exported their output only changes
+if the source data for the week changes. For each (network, region, year, week)
+output this records that the week was exported as final along with the source
+data watermark at the time, which is a digest of:
+
+    * the latest crawl history processed time for intervals in the week
+    * the latest facility_scada and balancing_summary updated (or created) time
+      for intervals in the week, including subnetworks such as rooftop
+    * the at_network_flows and bom_observation totals for the week. These tables
+      have no update times and are recomputed or upserted in place, so their
+      values are used instead
+    * the latest facility updated time for the network, which covers changes to
+      emission factors
+
+Historic exports skip weeks whose recorded watermark matches the current one and
+only rebuild open weeks, weeks never exported as final and weeks whose data has
+changed since.
+
+Entries are stored in the export manifest (see opennem.exporter.manifest) so
+clearing the manifest also forces every historic week to be rebuilt.
+"""
+import hashlib
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from textwrap import dedent
+
+from sqlalchemy import text as sql
+
+from opennem.core.network_region_bom_station_map import NETWORK_REGION_BOM_STATION
+from opennem.db import get_database_engine
+from opennem.exporter.manifest import ExportManifest, get_export_manifest
+from opennem.schema.network import NetworkSchema
+from opennem.utils.dates import get_week_number_from_datetime
+
+logger = logging.getLogger("opennem.exporter.historic_cache")
+
+HISTORIC_CACHE_KEY_PREFIX = "historic"
+
+
+@dataclass
+class HistoricWeek:
+    """A weekly historic export for a network region"""
+
+    network_code: str
+    network_region_code: str
+    week_start: datetime
+    week_end: datetime
+    week_number: int | None = None
+
+    def __post_init__(self) -> None:
+        if not self.week_number:
+            self.week_number = get_week_number_from_datetime(self.week_start)
+
+    @property
+    def year(self) -> int:
+        return self.week_start.year
+
+    @property
+    def key(self) -> str:
+        return f"{HISTORIC_CACHE_KEY_PREFIX}:{self.network_code}:{self.network_region_code}:{self.year}:{self.week_number}"
+
+    @property
+    def path(self) -> str:
+        return f"v3/stats/historic/weekly/{self.network_code}/{self.network_region_code}/year/{self.year}/week/{self.week_number}.json"
+
+    def is_final(self, last_complete_day: datetime) -> bool:
+        """The week has fully passed so its output won't change unless the source data does"""
+        return self.week_start + timedelta(days=7) <= last_complete_day
+
+
+def format_watermark(watermark: datetime | str | None) -> str:
+    if not watermark:
+        return "none"
+
+    if isinstance(watermark, str):
+        return watermark
+
+    return watermark.isoformat()
+
+
+class HistoricWeekCache:
+    """Records which historic weeks were exported as final and at which watermark"""
+
+    def __init__(self, manifest: ExportManifest) -> None:
+        self._manifest = manifest
+
+    def is_current(self, week: HistoricWeek, watermark: datetime | str | None) -> bool:
+        """The week was exported as final and its source data hasn't changed since"""
+        return self._manifest.get(week.key) == f"final@{format_watermark(watermark)}"
+
+    def mark_final(self, week: HistoricWeek, watermark: datetime | str | None) -> None:
+        self._manifest.set(week.key, f"final@{format_watermark(watermark)}")
+
+
+def get_historic_week_cache() -> HistoricWeekCache | None:
+    """The historic week cache or None if the export manifest is disabled"""
+    if not (manifest := get_export_manifest()):
+        return None
+
+    return HistoricWeekCache(manifest)
+
+
+def _query_week_rows(query: str, **params: object) -> dict[date, tuple]:
+    """Rows of a query keyed by the week start in the first column"""
+    engine = get_database_engine()
+    stmt = sql(query).bindparams(**params)
+
+    logger.debug(dedent(str(stmt)))
+
+    with engine.connect() as c:
+        return {row[0]: tuple(row[1:]) for row in c.execute(stmt)}
+
+
+def _get_facilities_updated(network_ids: list[str]) -> datetime | None:
+    """Latest facility update time for the networks"""
+    engine = get_database_engine()
+    stmt = sql("select max(coalesce(f.updated_at, f.created_at)) from facility f where f.network_id = any(:network_ids)")
+
+    with engine.connect() as c:
+        return c.execute(stmt.bindparams(network_ids=network_ids)).scalar()
+
+
+def get_historic_week_watermarks(network: NetworkSchema, start: datetime, end: datetime) -> dict[date, str]:
+    """Source data watermark for each week between start and end keyed by the week start date in network time"""
+    params = {
+        "timezone": network.timezone_database,
+        "network_ids": [n.code for n in network.get_networks_query()],
+        "start": start,
+        "end": end,
+    }
+
+    updated = _query_week_rows(
+        """
+        select
+            date_trunc('week', w.interval at time zone :timezone)::date as week_start,
+            max(w.watermark) as watermark
+        from (
+            select ch.interval, ch.processed_time as watermark
+            from crawl_history ch
+            where
+                ch.network_id = any(:network_ids)
+                and ch.interval >= :start
+                and ch.interval < :end
+                and ch.inserted_records is not null
+
+            union all
+
+            select fs.trading_interval, max(coalesce(fs.updated_at, fs.created_at))
+            from facility_scada fs
+            where
+                fs.network_id = any(:network_ids)
+                and fs.trading_interval >= :start
+                and fs.trading_interval < :end
+            group by 1
+
+            union all
+
+            select bs.trading_interval, max(coalesce(bs.updated_at, bs.created_at))
+            from balancing_summary bs
+            where
+                bs.network_id = any(:network_ids)
+                and bs.trading_interval >= :start
+                and bs.trading_interval < :end
+            group by 1
+        ) as w
+        group by 1
+    """,
+        **params,
+    )
+
+    flows = _query_week_rows(
+        """
+        select
+            date_trunc('week', f.trading_interval at time zone :timezone)::date as week_start,
+            count(*),
+            sum(f.energy_imports),
+            sum(f.energy_exports),
+            sum(f.emissions_imports),
+            sum(f.emissions_exports)
+        from at_network_flows f
+        where
+            f.network_id = any(:network_ids)
+            and f.trading_interval >= :start
+            and f.trading_interval < :end
+        group by 1
+    """,
+        **params,
+    )
+
+    weather = _query_week_rows(
+        """
+        select
+            date_trunc('week', bo.observation_time at time zone :timezone)::date as week_start,
+            count(*),
+            sum(bo.temp_air),
+            sum(bo.temp_apparent)
+        from bom_observation bo
+        where
+            bo.station_id = any(:station_ids)
+            and bo.observation_time >= :start
+            and bo.observation_time < :end
+        group by 1
+    """,
+        station_ids=list(set(NETWORK_REGION_BOM_STATION.values())),  # type: ignore
+        **params,
+    )
+
+    facilities_updated = _get_facilities_updated(params["network_ids"])  # type: ignore
+
+    watermarks = {}
+
+    for week_start, (watermark,) in updated.items():
+        if not watermark:
+            continue
+
+        digest = "|".join(
+            str(i) for i in [watermark.isoformat(), flows.get(week_start), weather.get(week_start), facilities_updated]
+        )
+
+        watermarks[week_start] = f"{watermark.isoformat()}/{hashlib.md5(digest.encode()).hexdigest()}"
+
+    return watermarks
@@ -4,12 +4,35 @@ from os import makedirs
 from pathlib import Path
 
 from opennem import settings
+from opennem.api.stats.schema import OpennemDataSet
+from opennem.api.stats.serialize import serialize_stat_set, stat_set_content_hash
+from opennem.exporter.manifest import content_hash, get_export_manifest, record_export_write
 from opennem.utils.mime import decode_bytes
 
 logger = logging.getLogger(__name__)
 
 
-def write_to_local(file_path: str, data: StringIO | bytes | BytesIO | str) -> int:
+def _manifest_key(file_path: str) -> str:
+    return f"local:{file_path.lstrip('/')}"
+
+
+def _unchanged_on_local(file_path: str, save_file_path: Path, digest: str) -> int | None:
+    """Length of the existing file if the manifest has the same content for it"""
+    if not (manifest := get_export_manifest()) or not save_file_path.is_file():
+        return None
+
+    # local outputs are never encoded
+    if (length := manifest.unchanged_length(_manifest_key(file_path), digest, "identity")) is None:
+        return None
+
+    record_export_write(skipped=True)
+
+    logger.info(f"Skipped writing unchanged {save_file_path}")
+
+    return length
+
+
+def write_to_local(file_path: str, data: StringIO | bytes | BytesIO | str, digest: str | None = None) -> int:
     save_folder = settings.static_folder_path
 
     save_file_path = Path(save_folder) / file_path.lstrip("/")
@@ -36,9 +59,67 @@ def write_to_local(file_path: str, data: StringIO | bytes | BytesIO | str) -> in
         logger.info(f"No data to write to {file_path}")
         return 0
 
+    digest = digest or content_hash(write_data)
+
+    if (length := _unchanged_on_local(file_path, save_file_path, digest)) is not None:
+        return length
+
     with open(save_file_path, "w") as fh:
         bytes_written += fh.write(write_data)
 
+    if manifest := get_export_manifest():
+        manifest.record(_manifest_key(file_path), digest, "identity", bytes_written)
+
+    record_export_write(bytes_written)
+
+    logger.info(f"Wrote {bytes_written} to {save_file_path}")
+
+    return bytes_written
+
+
+def write_bytes_to_local(file_path: str, content: bytes) -> int:
+    """Write binary content to the local static folder. Skipped if the content is unchanged"""
+    save_file_path = Path(settings.static_folder_path) / file_path.lstrip("/")
+    digest = content_hash(content)
+
+    if (length := _unchanged_on_local(file_path, save_file_path, digest)) is not None:
+        return length
+
+    dir_path = save_file_path.resolve().parent
+
+    if not dir_path.is_dir():
+        makedirs(dir_path)
+
+    with open(save_file_path, "wb") as fh:
+        bytes_written = fh.write(content)
+
+    if manifest := get_export_manifest():
+        manifest.record(_manifest_key(file_path), digest, "identity", bytes_written)
+
+    record_export_write(bytes_written)
+
     logger.info(f"Wrote {bytes_written} to {save_file_path}")
 
     return bytes_written
+
+
+def write_statset_to_local(
+    stat_set: OpennemDataSet, file_path: str, exclude: set | None = None, exclude_unset: bool = False
+) -> int:
+    """Write an Opennem data set to the local static folder. Skipped if the data is unchanged"""
+    save_file_path = Path(settings.static_folder_path) / file_path.lstrip("/")
+    indent = None
+
+    if settings.debug:
+        indent = 4
+
+    content = serialize_stat_set(stat_set, exclude_unset=exclude_unset, indent=indent, exclude=exclude)
+    digest: str | None = None
+
+    if get_export_manifest():
+        digest = stat_set_content_hash(stat_set, content)
+
+        if (length := _unchanged_on_local(file_path, save_file_path, digest)) is not None:
+            return length
+
+    return write_to_local(file_path, content, digest=digest)
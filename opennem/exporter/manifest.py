@@ -0,0 +1,211 @@
+"""
+Export output manifest
+
+Keeps the content hash of every output written by the exporters so that writes
+whose content has not changed since the last run can be skipped. The manifest is
+stored either in a local JSON file or in a redis hash, see the `export_manifest`
+setting. It is disabled by default. Use redis wherever exports run from more than
+one process, such as the huey workers.
+
+Entries are keyed by destination and path and store the encoding mode along with
+the md5 of the content, so changing the gzip upload setting rewrites every output
+once.
+
+The manifest is trusted - outputs changed or removed outside of the exporters are
+not detected for s3. Clear the manifest to force a full rewrite.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+import redis
+
+from opennem import settings
+
+logger = logging.getLogger("opennem.exporter.manifest")
+
+REDIS_MANIFEST_KEY = "opennem:export_manifest"
+
+
+class ExportManifestException(Exception):
+    pass
+
+
+def content_hash(content: str | bytes) -> str:
+    """md5 of content, which is also the s3 ETag for single part uploads"""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+
+    return hashlib.md5(content).hexdigest()
+
+
+def export_encoding_mode() -> str:
+    """The encoding mode exports are currently written with"""
+    if settings.export_gzip_min_bytes:
+        return f"gzip>={settings.export_gzip_min_bytes}"
+
+    return "identity"
+
+
+def encode_export_content(content: str | bytes) -> tuple[bytes, str | None]:
+    """Encode content for upload, returning the body and the content encoding if any
+
+    gzip output has a fixed mtime so identical content always encodes to identical bytes"""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+
+    if settings.export_gzip_min_bytes and len(content) >= settings.export_gzip_min_bytes:
+        return gzip.compress(content, mtime=0), "gzip"
+
+    return content, None
+
+
+class ExportManifest(ABC):
+    """Base export manifest. Subclasses implement get, set and clear
+
+    Entries are stored as `mode:digest:length`"""
+
+    @abstractmethod
+    def get(self, key: str) -> str | None:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, entry: str) -> None:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+    def unchanged_length(self, key: str, digest: str, mode: str) -> int | None:
+        """Length of the output written for key if its digest and mode match, otherwise None"""
+        if not (entry := self.get(key)):
+            return None
+
+        entry_mode, entry_digest, entry_length = entry.rsplit(":", 2)
+
+        if entry_mode != mode or entry_digest != digest:
+            return None
+
+        return int(entry_length)
+
+    def record(self, key: str, digest: str, mode: str, length: int) -> None:
+        self.set(key, f"{mode}:{digest}:{length}")
+
+
+class LocalExportManifest(ExportManifest):
+    """Manifest stored as a JSON file
+
+    For local development only. The entries are cached per process and every set
+    rewrites the whole file, so concurrent processes overwrite each other"""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._entries: dict[str, str] | None = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict[str, str]:
+        if self._entries is None:
+            self._entries = {}
+
+            if self.path.is_file():
+                try:
+                    self._entries = json.loads(self.path.read_text())
+                except ValueError as e:
+                    logger.error(f"Could not read export manifest {self.path}: {e}")
+
+        return self._entries
+
+    def _save(self) -> None:
+        # write to a temp file and swap so a concurrent reader never sees a partial file
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(self._entries))
+        os.replace(tmp_path, self.path)
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            return self._load().get(key)
+
+    def set(self, key: str, entry: str) -> None:
+        with self._lock:
+            self._load()[key] = entry
+            self._save()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries = {}
+            self._save()
+
+
+class RedisExportManifest(ExportManifest):
+    """Manifest stored in a redis hash"""
+
+    def __init__(self, url: str, key: str = REDIS_MANIFEST_KEY) -> None:
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self.key = key
+
+    def get(self, key: str) -> str | None:
+        return self._redis.hget(self.key, key)
+
+    def set(self, key: str, entry: str) -> None:
+        self._redis.hset(self.key, key, entry)
+
+    def clear(self) -> None:
+        self._redis.delete(self.key)
+
+
+_export_manifest: ExportManifest | None = None
+_export_manifest_lock = threading.Lock()
+
+
+def get_export_manifest() -> ExportManifest | None:
+    """The configured export manifest or None if write skipping is disabled"""
+    global _export_manifest
+
+    if not settings.export_manifest:
+        return None
+
+    with _export_manifest_lock:
+        if _export_manifest is None:
+            if settings.export_manifest == "local":
+                _export_manifest = LocalExportManifest(settings.export_manifest_path)
+            elif settings.export_manifest == "redis":
+                _export_manifest = RedisExportManifest(settings.cache_url)
+            else:
+                raise ExportManifestException(f"Unknown export manifest backend: {settings.export_manifest}")
+
+    return _export_manifest
+
+
+@dataclass
+class ExportWriteStats:
+    """Counts of outputs written and skipped by the exporters"""
+
+    written: int = 0
+    skipped: int = 0
+    bytes_written: int = 0
+
+
+_export_write_stats = ExportWriteStats()
+_export_write_stats_lock = threading.Lock()
+
+
+def record_export_write(bytes_written: int = 0, skipped: bool = False) -> None:
+    with _export_write_stats_lock:
+        if skipped:
+            _export_write_stats.skipped += 1
+        else:
+            _export_write_stats.written += 1
+            _export_write_stats.bytes_written += bytes_written
+
+
+def get_export_write_stats() -> ExportWriteStats:
+    """Snapshot of the process wide export write counts"""
+    with _export_write_stats_lock:
+        return replace(_export_write_stats)
@@ -0,0 +1,361 @@
+"""
+Bulk Parquet exports of interval and aggregate data
+
+Writes partitioned Parquet datasets alongside the JSON exports so that years of
+data can be pulled in a handful of files rather than by crawling the JSON outputs:
+
+    * facility_scada - by network and month
+    * balancing_summary - by network and month
+    * at_network_flows - by network and month
+    * at_facility_daily - by network and year
+
+Partitions use hive style paths under `settings.parquet_export_path`, for example
+
+    parquet/v1/facility_scada/network=NEM/month=2023-03/part-0.parquet
+
+Files are written with zstd compression, dictionary encoded codes (DUIDs,
+regions, fueltechs) and row group statistics. Rows are sorted by interval so
+readers can skip row groups by time.
+
+Rows are read through a server side cursor and written a row group at a time,
+so only one row group of rows is held in memory along with the compressed file.
+
+Partitions whose content has not changed are skipped through the export manifest
+(see opennem.exporter.manifest), so re-running over closed months only costs the
+queries.
+
+Requires the optional pyarrow dependency, installed with the parquet extra:
+
+    pip install opennem-backend[parquet]
+"""
+import logging
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from textwrap import dedent
+from typing import Any
+
+from sqlalchemy import text as sql
+
+from opennem import settings
+from opennem.api.stats.stream import iter_query_rows
+from opennem.core.profiler import profile_task
+from opennem.db import get_database_engine
+from opennem.exporter.aws import write_bytes_to_s3
+from opennem.exporter.local import write_bytes_to_local
+from opennem.schema.network import NetworkNEM, NetworkSchema, NetworkWEM
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
+
+logger = logging.getLogger("opennem.exporter.parquet")
+
+PARQUET_CONTENT_TYPE = "application/vnd.apache.parquet"
+
+
+class ExporterParquetException(Exception):
+    """Specific exception for the parquet exporter"""
+
+    pass
+
+
+@dataclass(frozen=True)
+class ParquetTable:
+    """A table exported to parquet
+
+    Columns are (name, kind) where kind is one of timestamp, code, text, float or bool.
+    Code columns are dictionary encoded. The query selects the columns in order for
+    :network_id between :date_start and :date_end"""
+
+    name: str
+    columns: tuple[tuple[str, str], ...]
+    query: str
+    partition: str = "month"
+
+    @property
+    def dictionary_columns(self) -> list[str]:
+        return [name for name, kind in self.columns if kind == "code"]
+
+
+def _table_query(table: str, time_column: str, key_column: str, columns: tuple[tuple[str, str], ...]) -> str:
+    select_columns = ", ".join(f"{name}::double precision as {name}" if kind == "float" else name for name, kind in columns)
+
+    return dedent(
+        f"""
+        select {select_columns}
+        from {table}
+        where
+            network_id = :network_id
+            and {time_column} >= :date_start
+            and {time_column} < :date_end
+        order by {time_column}, {key_column}
+        """
+    )
+
+
+_FACILITY_SCADA_COLUMNS = (
+    ("trading_interval", "timestamp"),
+    ("network_id", "code"),
+    ("facility_code", "code"),
+    ("is_forecast", "bool"),
+    ("generated", "float"),
+    ("eoi_quantity", "float"),
+    ("energy_quality_flag", "float"),
+)
+
+_BALANCING_SUMMARY_COLUMNS = (
+    ("trading_interval", "timestamp"),
+    ("network_id", "code"),
+    ("network_region", "code"),
+    ("is_forecast", "bool"),
+    ("forecast_load", "float"),
+    ("generation_scheduled", "float"),
+    ("generation_non_scheduled", "float"),
+    ("generation_total", "float"),
+    ("net_interchange", "float"),
+    ("net_interchange_trading", "float"),
+    ("demand", "float"),
+    ("demand_total", "float"),
+    ("price", "float"),
+    ("price_dispatch", "float"),
+)
+
+_FACILITY_DAILY_COLUMNS = (
+    ("trading_day", "timestamp"),
+    ("network_id", "code"),
+    ("facility_code", "code"),
+    ("network_region", "code"),
+    ("fueltech_id", "code"),
+    ("energy", "float"),
+    ("market_value", "float"),
+    ("emissions", "float"),
+)
+
+_NETWORK_FLOWS_COLUMNS = (
+    ("trading_interval", "timestamp"),
+    ("network_id", "code"),
+    ("network_region", "code"),
+    ("energy_imports", "float"),
+    ("energy_exports", "float"),
+    ("market_value_imports", "float"),
+    ("market_value_exports", "float"),
+    ("emissions_imports", "float"),
+    ("emissions_exports", "float"),
+)
+
+PARQUET_TABLES: dict[str, ParquetTable] = {
+    table.name: table
+    for table in [
+        ParquetTable(
+            "facility_scada",
+            _FACILITY_SCADA_COLUMNS,
+            _table_query("facility_scada", "trading_interval", "facility_code", _FACILITY_SCADA_COLUMNS),
+        ),
+        ParquetTable(
+            "balancing_summary",
+            _BALANCING_SUMMARY_COLUMNS,
+            _table_query("balancing_summary", "trading_interval", "network_region", _BALANCING_SUMMARY_COLUMNS),
+        ),
+        ParquetTable(
+            "at_network_flows",
+            _NETWORK_FLOWS_COLUMNS,
+            _table_query("at_network_flows", "trading_interval", "network_region", _NETWORK_FLOWS_COLUMNS),
+        ),
+        ParquetTable(
+            "at_facility_daily",
+            _FACILITY_DAILY_COLUMNS,
+            _table_query("at_facility_daily", "trading_day", "facility_code", _FACILITY_DAILY_COLUMNS),
+            partition="year",
+        ),
+    ]
+}
+
+
+@dataclass
+class ParquetPartition:
+    """A partition of a parquet table for a network and a month or year in network time"""
+
+    table: ParquetTable
+    network: NetworkSchema
+    date_start: datetime
+    date_end: datetime
+
+    @property
+    def path(self) -> str:
+        if self.table.partition == "year":
+            partition = f"year={self.date_start.year}"
+        else:
+            partition = f"month={self.date_start.strftime('%Y-%m')}"
+
+        return f"{settings.parquet_export_path}/{self.table.name}/network={self.network.code}/{partition}/part-0.parquet"
+
+
+def _next_partition_start(date_start: datetime, partition: str) -> datetime:
+    if partition == "year":
+        return date_start.replace(year=date_start.year + 1)
+
+    if date_start.month == 12:
+        return date_start.replace(year=date_start.year + 1, month=1)
+
+    return date_start.replace(month=date_start.month + 1)
+
+
+def get_parquet_export_start(days: int, network: NetworkSchema = NetworkNEM) -> datetime:
+    """Start of an export window covering the last days, from now in network time"""
+    return datetime.now(network.get_fixed_offset()) - timedelta(days=days)
+
+
+def get_parquet_partitions(table: ParquetTable, network: NetworkSchema, start: datetime, end: datetime) -> list[ParquetPartition]:
+    """Partitions of table for network covering start to end, in network time"""
+    tz = network.get_fixed_offset()
+
+    start = start.astimezone(tz) if start.tzinfo else start.replace(tzinfo=tz)
+    end = end.astimezone(tz) if end.tzinfo else end.replace(tzinfo=tz)
+
+    date_start = start.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    if table.partition == "year":
+        date_start = date_start.replace(month=1)
+
+    partitions = []
+
+    while date_start <= end:
+        date_end = _next_partition_start(date_start, table.partition)
+        partitions.append(ParquetPartition(table=table, network=network, date_start=date_start, date_end=date_end))
+        date_start = date_end
+
+    return partitions
+
+
+def _arrow_type(kind: str) -> Any:
+    if kind == "timestamp":
+        return pyarrow.timestamp("ms", tz="UTC")
+
+    if kind == "code":
+        return pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+
+    if kind == "bool":
+        return pyarrow.bool_()
+
+    if kind == "float":
+        return pyarrow.float64()
+
+    return pyarrow.string()
+
+
+def build_arrow_schema(table: ParquetTable) -> Any:
+    return pyarrow.schema([(name, _arrow_type(kind)) for name, kind in table.columns])
+
+
+def build_arrow_table(table: ParquetTable, rows: Sequence[Sequence]) -> Any:
+    """Arrow table for query rows in the column order of table"""
+    schema = build_arrow_schema(table)
+    columns = list(zip(*rows, strict=True)) if rows else [[] for _ in table.columns]
+
+    return pyarrow.Table.from_arrays(
+        [pyarrow.array(values, type=field.type) for values, field in zip(columns, schema, strict=True)], schema=schema
+    )
+
+
+def serialize_parquet(table: ParquetTable, batches: Iterable[Sequence[Sequence]]) -> bytes | None:
+    """Parquet file content written a row group per batch of rows, or None if there are no rows"""
+    sink = pyarrow.BufferOutputStream()
+    num_rows = 0
+
+    with pyarrow.parquet.ParquetWriter(
+        sink,
+        build_arrow_schema(table),
+        compression="zstd",
+        use_dictionary=table.dictionary_columns,
+        write_statistics=True,
+    ) as writer:
+        for rows in batches:
+            if not rows:
+                continue
+
+            writer.write_table(build_arrow_table(table, rows), row_group_size=settings.parquet_row_group_size)
+            num_rows += len(rows)
+
+    if not num_rows:
+        return None
+
+    return sink.getvalue().to_pybytes()
+
+
+def _iter_partition_batches(partition: ParquetPartition) -> Iterator[Sequence[Sequence]]:
+    """Batches of rows for a partition, one row group in size, read through a server side cursor"""
+    query = sql(partition.table.query).bindparams(
+        network_id=partition.network.code, date_start=partition.date_start, date_end=partition.date_end
+    )
+
+    yield from iter_query_rows(get_database_engine(), query, batch_size=settings.parquet_row_group_size)
+
+
+def export_parquet_partition(partition: ParquetPartition, is_local: bool = False) -> int:
+    """Export a partition, returning the bytes written. Partitions with no rows are not written"""
+    if not HAVE_PYARROW:
+        raise ExporterParquetException("Parquet exports require pyarrow")
+
+    content = serialize_parquet(partition.table, _iter_partition_batches(partition))
+
+    if not content:
+        logger.debug(f"No rows for {partition.path}")
+        return 0
+
+    if is_local or settings.export_local:
+        return write_bytes_to_local(partition.path, content)
+
+    return write_bytes_to_s3(content, partition.path, content_type=PARQUET_CONTENT_TYPE)
+
+
+@profile_task(send_slack=False)
+def export_parquet(
+    networks: list[NetworkSchema] | None = None,
+    tables: list[str] | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    is_local: bool = False,
+) -> int:
+    """Export parquet partitions for networks and tables
+
+    Args:
+        networks: defaults to NEM and WEM
+        tables: names of tables in PARQUET_TABLES, defaults to all
+        start: defaults to the network data first seen date
+        end: defaults to now
+
+    Returns:
+        total bytes written
+    """
+    if not HAVE_PYARROW:
+        raise ExporterParquetException("Parquet exports require pyarrow")
+
+    if not networks:
+        networks = [NetworkNEM, NetworkWEM]
+
+    if not tables:
+        tables = list(PARQUET_TABLES.keys())
+
+    if unknown_tables := set(tables) - set(PARQUET_TABLES.keys()):
+        raise ExporterParquetException(f"Unknown parquet tables: {', '.join(sorted(unknown_tables))}")
+
+    bytes_written = 0
+
+    for network in networks:
+        network_start = start or network.data_first_seen
+
+        if not network_start:
+            raise ExporterParquetException(f"No start date for network {network.code}")
+
+        network_end = end or datetime.now(network.get_fixed_offset())
+
+        for table_name in tables:
+            for partition in get_parquet_partitions(PARQUET_TABLES[table_name], network, network_start, network_end):
+                bytes_written += export_parquet_partition(partition, is_local=is_local)
+
+    return bytes_written
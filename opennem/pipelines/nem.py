@@ -11,6 +11,7 @@ from opennem import settings
 from opennem.aggregates.network_flows import run_flow_update_for_interval
 from opennem.aggregates.network_flows_v3 import run_flows_for_last_intervals
 from opennem.api.export.tasks import export_all_daily, export_all_monthly
+from opennem.api.stats.power_buffer import update_power_buffer
 from opennem.controllers.schema import ControllerReturn
 from opennem.core.profiler import profile_task
 from opennem.crawl import run_crawl
@@ -25,7 +26,8 @@ from opennem.crawlers.nemweb import (
 )
 from opennem.exporter.historic import export_historic_intervals
 from opennem.pipelines.export import run_export_all, run_export_current_year, run_export_power_latest_for_network
-from opennem.schema.network import NetworkAU, NetworkNEM, NetworkWEM
+from opennem.schema.network import NetworkAEMORooftop, NetworkAU, NetworkNEM, NetworkWEM
+from opennem.utils.cache import invalidate_range_cache
 from opennem.workers.daily import daily_runner
 
 logger = logging.getLogger("opennem.pipelines.nem")
@@ -45,6 +47,8 @@ def nem_dispatch_is_crawl() -> None:
     if not dispatch_is or not dispatch_is.inserted_records:
         raise RetryTask("No new dispatch is data")
 
+    invalidate_range_cache(networks=[NetworkNEM])
+
     if dispatch_is and dispatch_is.crawls_run:
         # switch between v3 and v2 for flows here
         if settings.flows_and_emissions_v3:
@@ -61,6 +65,8 @@ def nem_trading_is_crawl() -> None:
     if not cr or not cr.inserted_records:
         raise RetryTask("No new dispatch is data")
 
+    invalidate_range_cache(networks=[NetworkNEM])
+
 
 @profile_task(
     send_slack=True,
@@ -76,6 +82,13 @@ def nem_dispatch_scada_crawl() -> ControllerReturn:
     if not dispatch_scada or not dispatch_scada.inserted_records:
         raise RetryTask("No new dispatch scada data")
 
+    invalidate_range_cache(networks=[NetworkNEM])
+
+    try:
+        update_power_buffer(network=NetworkNEM)
+    except Exception as e:
+        logger.error(f"Could not update power buffer: {e}")
+
     run_export_power_latest_for_network(network=NetworkNEM)
     run_export_power_latest_for_network(network=NetworkAU)
 
@@ -90,6 +103,8 @@ def nem_rooftop_crawl() -> None:
     if not rooftop or not rooftop.inserted_records:
         raise RetryTask("No new rooftop data")
 
+    invalidate_range_cache(networks=[NetworkAEMORooftop])
+
     run_export_power_latest_for_network(network=NetworkNEM)
     run_export_power_latest_for_network(network=NetworkAU)
 
@@ -114,6 +129,8 @@ def nem_per_day_check() -> ControllerReturn:
         total_records = dispatch_actuals.inserted_records if dispatch_actuals and dispatch_actuals.inserted_records else 0
         total_records += dispatch_gen.inserted_records if dispatch_gen and dispatch_gen.inserted_records else 0
 
+        invalidate_range_cache(networks=[NetworkNEM])
+
         if not settings.per_interval_aggregate_processing:
             daily_runner()
         else:
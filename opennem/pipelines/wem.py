@@ -8,7 +8,8 @@ from opennem.crawlers.apvi import APVIRooftopTodayCrawler
 from opennem.crawlers.wem import WEMBalancing, WEMBalancingLive, WEMFacilityScada, WEMFacilityScadaLive
 from opennem.pipelines.export import run_export_power_latest_for_network
 from opennem.pipelines.nem import NemPipelineNoNewData
-from opennem.schema.network import NetworkWEM
+from opennem.schema.network import NetworkAPVI, NetworkWEM
+from opennem.utils.cache import invalidate_range_cache
 
 logger = logging.getLogger("opennem.pipelines.wem")
 
@@ -33,6 +34,8 @@ def wem_per_interval_check() -> ControllerReturn:
     if not wem_scada or not wem_scada.inserted_records:
         raise NemPipelineNoNewData("No WEM pipeline data")
 
+    invalidate_range_cache(networks=[NetworkWEM, NetworkAPVI])
+
     run_export_power_latest_for_network(network=NetworkWEM)
 
     return wem_scada
@@ -43,6 +43,12 @@ class OpennemSettings(BaseSettings):
     # This is the module where crawlers are found
     crawlers_module: str = "opennem.crawlers"
 
+    # crawler pipeline concurrency
+    # see opennem.core.crawlers.pipeline
+    crawler_fetch_workers: int = 8
+    crawler_parse_workers: int = 4
+    crawler_max_pending: int = 16
+
     google_places_api_key: str | None = None
 
     requests_cache_path: str = ".requests"
@@ -59,6 +65,22 @@ class OpennemSettings(BaseSettings):
 
     export_local: bool = False
 
+    # skip export writes whose content hasn't changed
+    # redis, local (single process dev only) or empty to disable. see opennem.exporter.manifest
+    export_manifest: str | None = None
+    export_manifest_path: str = ".export_manifest.json"
+
+    # upload exports larger than this many bytes gzip encoded. 0 to disable
+    export_gzip_min_bytes: int = 0
+
+    # number of export queries run concurrently
+    # see opennem.api.export.engine
+    export_workers: int = 4
+
+    # bulk parquet exports. see opennem.exporter.parquet
+    parquet_export_path: str = "parquet/v1"
+    parquet_row_group_size: int = 100_000
+
     s3_bucket_path: str = "s3://data.opennem.org.au/"
     backup_bucket_path: str = "backups.opennem.org.au"
     photos_bucket_path: str = "s3://photos.opennem.org.au/"
@@ -74,6 +96,11 @@ class OpennemSettings(BaseSettings):
     # cache scada values for
     cache_scada_values_ttl_sec: int = 60 * 5
 
+    # serve latest power from the in-memory power buffer. see opennem.api.stats.power_buffer
+    power_buffer_enabled: bool = True
+    power_buffer_days: int = 7
+    power_buffer_max_lag_minutes: int = 15
+
     # asgi server settings
     server_host: str = "0.0.0.0"
     server_port: int = 8000
@@ -87,11 +114,24 @@ class OpennemSettings(BaseSettings):
     # number of retries by default
     http_retries: int = 5
 
+    # connection limits for the async http client. see opennem.utils.http_async
+    http_max_connections: int = 20
+    http_max_connections_per_host: int = 4
+
     # cache http requests locally
     http_cache_local: bool = False
     http_verify_ssl: bool = True
     https_proxy_url: str | None = None  # @note don't let it confict with env HTTP_PROXY
 
+    # local content addressed cache of downloads. see opennem.utils.archive
+    archive_cache_enabled: bool = False
+    archive_cache_path: str = ".opennem_archive_cache"
+    archive_cache_max_bytes: int = 50 * 1024**3
+    # seconds before non archive urls such as CURRENT listings are fetched again
+    archive_cache_current_ttl: int = 60
+    # never fetch, serve only from the cache
+    archive_cache_offline: bool = False
+
     _static_folder_path: str = "opennem/static/"
 
     # output schema options
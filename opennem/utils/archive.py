@@ -1,13 +1,38 @@
 """
-Module to handle zip files and nested zip files.
-
+Module to handle zip files and nested zip files, and the local archive cache.
+
+Archive cache
+-------------
+
+Downloads can be kept in a local content addressed cache (settings.archive_cache_*)
+so backfills and re-imports don't fetch from nemweb again:
+
+    * file contents are stored once by sha256 under objects/, and each url has
+      an entry under urls/ pointing at its content
+    * files under ARCHIVE and MMSDM paths never change so are kept permanently.
+      Other urls, such as CURRENT listings, are revalidated with a conditional
+      get once they are older than archive_cache_current_ttl
+    * contents are checked against their hash the first time they're read in
+      each process, corrupt files are fetched again
+    * the least recently used urls are evicted once the cache is larger than
+      archive_cache_max_bytes. The cache size is kept as a running total and
+      the cache is only scanned on first use and when evicting
+    * in offline mode nothing is fetched, expired entries are served and
+      uncached urls raise ArchiveCacheMiss
 """
+import dataclasses
+import hashlib
 import io
+import json
+import logging
 import os
-from asyncio.log import logger
+import re
+import threading
+import time
+from dataclasses import dataclass
 from io import BytesIO
 from pathlib import Path
-from tempfile import mkdtemp
+from tempfile import NamedTemporaryFile, mkdtemp
 from typing import IO, Any
 from zipfile import ZipFile
 
@@ -16,6 +41,8 @@ from opennem.utils.url import get_filename_from_url
 
 from .http import http
 
+logger = logging.getLogger("opennem.utils.archive")
+
 # limit how many zips within zips we'll parse
 # 0 means all
 ZIP_LIMIT = 0
@@ -213,6 +240,301 @@ def download_and_unzip(url: str) -> str:
     return dest_dir
 
 
+# archive files are immutable once published. directory listings under them are not
+_IMMUTABLE_URL_MATCH = re.compile(r"/(archive|mmsdm|data_archive)/", re.IGNORECASE)
+
+ARCHIVE_CACHE_CHUNK_SIZE = 1024 * 1024
+
+
+class ArchiveCacheMiss(Exception):
+    """Raised for urls that aren't cached in offline mode"""
+
+    pass
+
+
+def is_immutable_archive_url(url: str) -> bool:
+    return bool(_IMMUTABLE_URL_MATCH.search(url)) and not url.endswith("/")
+
+
+@dataclass
+class ArchiveCacheEntry:
+    url: str
+    sha256: str
+    size: int
+    fetched_at: float
+    immutable: bool
+    etag: str | None = None
+    last_modified: str | None = None
+
+
+class ArchiveCache:
+    """Local content addressed cache of downloaded files"""
+
+    def __init__(
+        self,
+        path: Path,
+        max_bytes: int = 50 * 1024**3,
+        current_ttl: int = 60,
+        offline: bool = False,
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.current_ttl = current_ttl
+        self.offline = offline
+
+        # content verified against its hash in this process
+        self._verified: set[str] = set()
+        self._lock = threading.Lock()
+
+        # running total of cached bytes, None until the cache is first scanned
+        self._size: int | None = None
+
+    def _entry_path(self, url: str) -> Path:
+        return self.path / "urls" / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.json"
+
+    def _object_path(self, digest: str) -> Path:
+        return self.path / "objects" / digest[:2] / digest
+
+    def _load_entry(self, url: str) -> ArchiveCacheEntry | None:
+        try:
+            return ArchiveCacheEntry(**json.loads(self._entry_path(url).read_text()))
+        except FileNotFoundError:
+            return None
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Invalid archive cache entry for {url}: {e}")
+            return None
+
+    def _save_entry(self, entry: ArchiveCacheEntry) -> None:
+        entry_path = self._entry_path(entry.url)
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # unique temp file so concurrent writers of the same url don't race
+        with NamedTemporaryFile("w", dir=entry_path.parent, prefix=".entry_", suffix=".tmp", delete=False) as fh:
+            try:
+                fh.write(json.dumps(dataclasses.asdict(entry)))
+            except Exception:
+                os.unlink(fh.name)
+                raise
+
+        os.replace(fh.name, entry_path)
+
+    def _is_fresh(self, entry: ArchiveCacheEntry) -> bool:
+        return entry.immutable or time.time() - entry.fetched_at < self.current_ttl
+
+    def _verify(self, digest: str) -> bool:
+        """Check an object matches its hash, once per process"""
+        if digest in self._verified:
+            return True
+
+        object_path = self._object_path(digest)
+
+        if not object_path.is_file():
+            return False
+
+        content_hash = hashlib.sha256()
+
+        with object_path.open("rb") as fh:
+            while chunk := fh.read(ARCHIVE_CACHE_CHUNK_SIZE):
+                content_hash.update(chunk)
+
+        if content_hash.hexdigest() != digest:
+            logger.error(f"Archive cache object {digest} is corrupt, removing")
+            self._add_size(-object_path.stat().st_size)
+            object_path.unlink(missing_ok=True)
+            return False
+
+        self._verified.add(digest)
+
+        return True
+
+    def get(self, url: str) -> Path | None:
+        """Path of the cached content for url if it is cached and fresh, or cached at all when offline"""
+        if not (entry := self._load_entry(url)):
+            return None
+
+        if not self.offline and not self._is_fresh(entry):
+            return None
+
+        if not self._verify(entry.sha256):
+            return None
+
+        # entry mtime is the last access time for eviction
+        os.utime(self._entry_path(url))
+
+        return self._object_path(entry.sha256)
+
+    def fetch(self, url: str) -> Path:
+        """Path of the content for url, downloaded if it isn't cached"""
+        if cached_path := self.get(url):
+            logger.debug(f"Archive cache hit: {url}")
+            return cached_path
+
+        if self.offline:
+            raise ArchiveCacheMiss(f"Not in archive cache and offline: {url}")
+
+        return self._download(url, self._load_entry(url))
+
+    def _download(self, url: str, stale_entry: ArchiveCacheEntry | None = None) -> Path:
+        headers = {}
+
+        # revalidate expired entries whose content is intact
+        if stale_entry and self._verify(stale_entry.sha256):
+            if stale_entry.etag:
+                headers["If-None-Match"] = stale_entry.etag
+
+            if stale_entry.last_modified:
+                headers["If-Modified-Since"] = stale_entry.last_modified
+
+        logger.debug(f"Archive cache miss, downloading: {url}")
+
+        objects_path = self.path / "objects"
+        objects_path.mkdir(parents=True, exist_ok=True)
+
+        with http.get(url, headers=headers, verify=settings.http_verify_ssl, stream=True) as r:
+            if stale_entry and r.status_code == 304:
+                self._save_entry(dataclasses.replace(stale_entry, fetched_at=time.time()))
+                return self._object_path(stale_entry.sha256)
+
+            if not r.ok:
+                raise Exception(f"Bad link returned {r.status_code}: {url}")
+
+            content_hash = hashlib.sha256()
+            size = 0
+
+            with NamedTemporaryFile(dir=objects_path, prefix=".download_", delete=False) as fh:
+                try:
+                    for chunk in r.iter_content(chunk_size=ARCHIVE_CACHE_CHUNK_SIZE):
+                        fh.write(chunk)
+                        content_hash.update(chunk)
+                        size += len(chunk)
+                except Exception:
+                    os.unlink(fh.name)
+                    raise
+
+            digest = content_hash.hexdigest()
+            object_path = self._object_path(digest)
+            object_path.parent.mkdir(parents=True, exist_ok=True)
+
+            # content shared with another url is already counted
+            if not object_path.is_file():
+                self._add_size(size)
+
+            os.replace(fh.name, object_path)
+
+            self._verified.add(digest)
+
+            self._save_entry(
+                ArchiveCacheEntry(
+                    url=url,
+                    sha256=digest,
+                    size=size,
+                    fetched_at=time.time(),
+                    immutable=is_immutable_archive_url(url),
+                    etag=r.headers.get("ETag"),
+                    last_modified=r.headers.get("Last-Modified"),
+                )
+            )
+
+        logger.info(f"Archive cached {size} bytes for {url}")
+
+        self.evict(keep_digest=digest)
+
+        return object_path
+
+    def _scan_size(self) -> int:
+        return sum(i.stat().st_size for i in (self.path / "objects").glob("*/*"))
+
+    def _add_size(self, size: int) -> None:
+        with self._lock:
+            if self._size is not None:
+                self._size += size
+
+    def size(self) -> int:
+        """Total bytes of cached content. Scanned on first use and kept as a running total after"""
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+
+            return self._size
+
+    def evict(self, keep_digest: str | None = None) -> int:
+        """Evict the least recently used urls until the cache is under max_bytes. Returns bytes freed"""
+        if self.size() <= self.max_bytes:
+            return 0
+
+        with self._lock:
+            entries: list[tuple[float, Path, ArchiveCacheEntry]] = []
+
+            for entry_path in (self.path / "urls").glob("*.json"):
+                try:
+                    entry = ArchiveCacheEntry(**json.loads(entry_path.read_text()))
+                except (OSError, ValueError, TypeError):
+                    entry_path.unlink(missing_ok=True)
+                    continue
+
+                entries.append((entry_path.stat().st_mtime, entry_path, entry))
+
+            entries.sort(key=lambda i: i[0])
+
+            references: dict[str, int] = {}
+
+            for _, _, entry in entries:
+                references[entry.sha256] = references.get(entry.sha256, 0) + 1
+
+            # other processes can share the cache so rescan rather than trust the running total
+            cache_size = self._scan_size()
+            bytes_freed = 0
+
+            for _, entry_path, entry in entries:
+                if cache_size - bytes_freed <= self.max_bytes:
+                    break
+
+                if entry.sha256 == keep_digest:
+                    continue
+
+                entry_path.unlink(missing_ok=True)
+                references[entry.sha256] -= 1
+
+                # content shared with other urls stays until they are all evicted
+                if references[entry.sha256]:
+                    continue
+
+                object_path = self._object_path(entry.sha256)
+
+                if object_path.is_file():
+                    bytes_freed += object_path.stat().st_size
+                    object_path.unlink()
+
+                self._verified.discard(entry.sha256)
+
+            self._size = cache_size - bytes_freed
+
+        logger.info(f"Archive cache evicted {bytes_freed} bytes")
+
+        return bytes_freed
+
+
+_archive_cache: ArchiveCache | None = None
+
+
+def get_archive_cache() -> ArchiveCache | None:
+    """The archive cache for the current settings or None if it is disabled"""
+    global _archive_cache
+
+    if not settings.archive_cache_enabled:
+        return None
+
+    if _archive_cache is None:
+        _archive_cache = ArchiveCache(
+            Path(settings.archive_cache_path),
+            max_bytes=settings.archive_cache_max_bytes,
+            current_ttl=settings.archive_cache_current_ttl,
+            offline=settings.archive_cache_offline,
+        )
+
+    return _archive_cache
+
+
 if __name__ == "__main__":
     u = "https://nemweb.com.au/Reports/Archive/DispatchIS_Reports/PUBLIC_DISPATCHIS_20220612.zip"
     d = download_and_unzip(u)
@@ -1,68 +1,242 @@
 """
 OpenNEM cache utilities
 
+Shared range cache for the scada, balancing and latest interval lookups that
+are run for almost every export and API request.
+
+Results are stored in redis (settings.cache_url) so that every api and worker
+process shares them, with an in-process LRU in front. Keys include every
+argument of the cached function.
+
+Entries are tagged with the network codes in their arguments. Each tag has a
+generation counter in redis which is part of the entry key, so invalidating a
+network (see `invalidate_range_cache`, called by the crawl pipelines when new
+intervals land) makes every process miss on its next lookup. Reading the
+generations is the one redis round trip for a local hit. If redis is not
+available the cache falls back to in-process only.
 """
+import hashlib
+import inspect
 import logging
-from collections.abc import Callable
+import threading
+import time
+from collections.abc import Callable, Iterable
+from datetime import datetime
 from functools import wraps
+from typing import Any
 
+import redis
 from cachetools import TTLCache
 
 from opennem import settings
 from opennem.api.stats.schema import ScadaDateRange
 from opennem.schema.network import NetworkSchema
 
-logger = logging.getLogger(__name__)
+logger = logging.getLogger("opennem.utils.cache")
 
 CACHE_AGE = settings.cache_scada_values_ttl_sec
 
-scada_cache: TTLCache = TTLCache(maxsize=100, ttl=CACHE_AGE)
+CACHE_KEY_PREFIX = "opennem:range_cache"
 
+# tag for entries with no network in their arguments. invalidated along with every network
+CACHE_TAG_ALL = "*"
 
-def cache_scada_result(func: Callable) -> Callable:
-    """
-    Caches the scada_range results in memory since they're called so often
-    by wrapping the function.
-    """
+# seconds to wait before retrying redis after a connection error
+REDIS_RETRY_SECONDS = 30
 
-    @wraps(func)
-    def _cache_scada_wrapper(
-        network: NetworkSchema | None = None,
-        networks: list[NetworkSchema] | None = None,
-        network_region: str | None = None,
-        facilities: list[str] | None = None,
-        energy: bool = False,
-    ) -> ScadaDateRange | None:
-        key_list = []
 
-        if network:
-            key_list = [network.code]
+def _freeze_cache_argument(value: Any) -> str:
+    """Stable string representation of a cached function argument"""
+    if isinstance(value, NetworkSchema):
+        return value.code
 
-        if networks:
-            key_list += [n.code for n in networks]
+    if isinstance(value, list | tuple):
+        return "[" + ",".join(_freeze_cache_argument(i) for i in value) + "]"
 
-        if facilities:
-            key_list += facilities
+    if isinstance(value, datetime):
+        return value.isoformat()
 
-        key_list.append(str(energy))
+    return repr(value)
 
-        key = frozenset(key_list)
-        ret: ScadaDateRange | None = None
+
+def _cache_argument_tags(value: Any) -> set[str]:
+    if isinstance(value, NetworkSchema):
+        return {value.code}
+
+    if isinstance(value, list | tuple):
+        return set().union(*[_cache_argument_tags(i) for i in value])
+
+    return set()
+
+
+class RangeCache:
+    """Two level cache: an in-process LRU in front of redis, invalidated by network tag"""
+
+    def __init__(self, client: Any = None, maxsize: int = 256) -> None:
+        self._client = client
+        self._client_lock = threading.Lock()
+        self._redis_retry_at = 0.0
+
+        self._local: TTLCache = TTLCache(maxsize=maxsize, ttl=CACHE_AGE)
+        self._local_lock = threading.Lock()
+
+        # bumped on invalidation so this process misses even without redis
+        self._local_generations: dict[str, int] = {}
+
+    def _redis(self) -> Any:
+        """The redis client or None while backing off after an error"""
+        if time.monotonic() < self._redis_retry_at:
+            return None
+
+        with self._client_lock:
+            if self._client is None:
+                self._client = redis.Redis.from_url(
+                    settings.cache_url, decode_responses=True, socket_timeout=1, socket_connect_timeout=1
+                )
+
+        return self._client
+
+    def _redis_error(self, e: Exception) -> None:
+        logger.warning(f"Range cache redis unavailable, using in-process cache only: {e}")
+        self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+
+    @staticmethod
+    def _generation_key(tag: str) -> str:
+        return f"{CACHE_KEY_PREFIX}:generation:{tag}"
+
+    def _generations(self, tags: list[str]) -> str | None:
+        """Current generation of each tag or None if redis is unavailable"""
+        if not (client := self._redis()):
+            return None
+
+        try:
+            generations = client.mget([self._generation_key(tag) for tag in tags])
+        except redis.RedisError as e:
+            self._redis_error(e)
+            return None
+
+        return ".".join(i or "0" for i in generations)
+
+    def get_or_set(
+        self,
+        key: str,
+        tags: list[str],
+        func: Callable[[], Any],
+        loads: Callable[[str], Any],
+        dumps: Callable[[Any], str],
+    ) -> Any:
+        """Cached value for key or the result of func, which is cached if it is not None"""
+        local_generations = ".".join(str(self._local_generations.get(tag, 0)) for tag in tags)
+        generations = self._generations(tags)
+
+        entry_key = f"{CACHE_KEY_PREFIX}:{key}:{generations}"
+        local_key = (entry_key, local_generations)
+
+        with self._local_lock:
+            if local_key in self._local:
+                logger.debug(f"range cache local HIT at key: {key}")
+                return self._local[local_key]
+
+        value = None
+
+        if generations is not None and (client := self._redis()):
+            try:
+                if (content := client.get(entry_key)) is not None:
+                    logger.debug(f"range cache HIT at key: {key}")
+                    value = loads(content)
+            except redis.RedisError as e:
+                self._redis_error(e)
+
+        if value is None:
+            logger.debug(f"range cache MISS at key: {key}")
+            value = func()
+
+            if value is None:
+                return None
+
+            if generations is not None and (client := self._redis()):
+                try:
+                    client.setex(entry_key, CACHE_AGE, dumps(value))
+                except redis.RedisError as e:
+                    self._redis_error(e)
+
+        with self._local_lock:
+            self._local[local_key] = value
+
+        return value
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        """Invalidate every entry tagged with any of tags in this and every other process"""
+        tags = set(tags) | {CACHE_TAG_ALL}
+
+        for tag in tags:
+            self._local_generations[tag] = self._local_generations.get(tag, 0) + 1
+
+        if not (client := self._redis()):
+            return
 
         try:
-            _val: dict = scada_cache[key]
-            ret = ScadaDateRange(**_val)
+            pipeline = client.pipeline()
+
+            for tag in tags:
+                pipeline.incr(self._generation_key(tag))
+
+            pipeline.execute()
+        except redis.RedisError as e:
+            self._redis_error(e)
+
+    def clear_local(self) -> None:
+        with self._local_lock:
+            self._local.clear()
+
+
+range_cache = RangeCache()
+
+
+def cache_range_result(
+    namespace: str,
+    loads: Callable[[str], Any],
+    dumps: Callable[[Any], str],
+) -> Callable:
+    """Cache the results of a function in the shared range cache
+
+    The key is built from every argument, bound to the function signature so
+    positional and keyword calls share entries. Entries are tagged with the codes
+    of the networks in the arguments."""
+
+    def _cache_range_decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        def _cache_range_wrapper(*args: Any, **kwargs: Any) -> Any:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+
+            key_arguments = ",".join(f"{k}={_freeze_cache_argument(v)}" for k, v in bound.arguments.items())
+            key = f"{namespace}:{hashlib.md5(key_arguments.encode('utf-8')).hexdigest()}"
+
+            tags = sorted(set().union(*[_cache_argument_tags(v) for v in bound.arguments.values()]) or {CACHE_TAG_ALL})
+
+            return range_cache.get_or_set(
+                key, tags=tags, func=lambda: func(*bound.args, **bound.kwargs), loads=loads, dumps=dumps
+            )
+
+        return _cache_range_wrapper
+
+    return _cache_range_decorator
+
+
+def invalidate_range_cache(networks: list[NetworkSchema]) -> None:
+    """Invalidate the cached ranges for networks, called when new intervals are stored"""
+    network_codes = [n.code for n in networks]
+
+    logger.debug(f"Invalidating range cache for {', '.join(network_codes)}")
 
-            logger.debug(f"scada range HIT at key: {key}")
+    range_cache.invalidate(network_codes)
 
-            return ret
-        except KeyError:
-            ret = func(network, networks, network_region, facilities, energy)
 
-            logger.debug(f"scada range MISS at key: {key}")
+cache_scada_result = cache_range_result("scada_range", loads=ScadaDateRange.parse_raw, dumps=lambda v: v.json())
 
-            if ret:
-                scada_cache[key] = ret.dict()
-            return ret
+cache_balancing_result = cache_range_result("balancing_range", loads=ScadaDateRange.parse_raw, dumps=lambda v: v.json())
 
-    return _cache_scada_wrapper
+cache_latest_interval_result = cache_range_result("latest_interval", loads=datetime.fromisoformat, dumps=lambda v: v.isoformat())
@@ -1,12 +1,14 @@
 import logging
 import math
-from collections.abc import Generator
+from collections.abc import Generator, Sequence
 from datetime import UTC, date, datetime, timedelta
 from datetime import timezone as pytimezone
 from functools import lru_cache
 from typing import Any
 from zoneinfo import ZoneInfo
 
+import numpy as np
+import pandas as pd
 from datedelta import datedelta
 from dateutil.parser import ParserError, parse  # type: ignore
 from dateutil.relativedelta import relativedelta
@@ -132,6 +134,50 @@ def parse_date(
     return dt_return
 
 
+# the format used in AEMO MMS files which is parsed without falling back to parse_date
+MMS_DATE_FORMAT = "%Y/%m/%d %H:%M:%S"
+
+
+def parse_date_column(
+    date_strs: Sequence[str | None] | np.ndarray, network: NetworkSchema | None = None, date_format: str = MMS_DATE_FORMAT
+) -> pd.arrays.DatetimeArray:
+    """Parse a whole column of date strings in a single vectorized pass
+
+    Returns the same values as calling parse_date on each value with the
+    network set, as a datetime64 array in the network timezone. Values that
+    don't match date_format fall back to parse_date and blank or unparseable
+    values are returned as NaT rather than raising.
+    """
+    codes, uniques = pd.factorize(np.asarray(date_strs, dtype=object))
+
+    dates = pd.to_datetime(pd.Index(uniques, dtype=object), format=date_format, errors="coerce")
+
+    fallback_dates = {}
+
+    for idx in np.flatnonzero(dates.isna()):
+        try:
+            dt = parse_date(uniques[idx], network=network)
+        except ValueError:
+            continue
+
+        # parse_date replaces rather than converts timezones so keep the wall time
+        if dt:
+            fallback_dates[idx] = dt.replace(tzinfo=None)
+
+    if fallback_dates:
+        dates = pd.DatetimeIndex([fallback_dates.get(idx, dt) for idx, dt in enumerate(dates)])
+
+    tz = network.get_timezone() if network else None
+
+    if tz:
+        dates = dates.tz_localize(tz)
+
+    # missing values have a code of -1 which indexes this trailing NaT
+    dates = dates.append(pd.DatetimeIndex([pd.NaT], tz=dates.tz))
+
+    return dates[codes].array
+
+
 def date_series(
     start: datetime | date | None = None,
     end: datetime | date | None = None,
@@ -6,6 +6,8 @@
     from opennem.utils.http import http
     http.get(`url`) etc.
 
+    for concurrent fetches see opennem.utils.http_async
+
 """
 import logging
 from pathlib import Path
@@ -112,11 +114,9 @@ http = requests.Session()
 http.headers.update({"User-Agent": USER_AGENT})
 
 adapter_timeout = TimeoutHTTPAdapter()
-http.mount("https://", adapter_timeout)
-http.mount("http://", adapter_timeout)
-
 
-adapter_retry = HTTPAdapter(max_retries=retry_strategy)
+# a session has one adapter per prefix so retries and the timeout have to share one
+adapter_retry = TimeoutHTTPAdapter(max_retries=retry_strategy)
 http.mount("https://", adapter_retry)
 http.mount("http://", adapter_retry)
 
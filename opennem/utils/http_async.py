@@ -0,0 +1,184 @@
+"""
+Async HTTP client for crawlers
+
+Connection pooled httpx client for fetching many files concurrently, such as the
+5 minute nemweb files or BOM station observations, while staying within the
+politeness limits of the source:
+
+    * at most settings.http_max_connections_per_host requests in flight to any
+      one host, and settings.http_max_connections in total
+    * connections are kept alive and reused between requests
+    * every attempt has settings.http_timeout, timeouts, connection errors and
+      retryable statuses are retried with exponential backoff, honouring
+      Retry-After
+    * bodies can be streamed
+
+usage:
+
+    async with AsyncHTTPClient() as client:
+        responses = await client.get_many(urls)
+
+or from sync code:
+
+    responses = fetch_many(urls)
+"""
+import asyncio
+import logging
+from collections.abc import AsyncIterator, Awaitable, Coroutine
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, TypeVar
+from urllib.parse import urlparse
+
+import httpx
+
+from opennem import settings
+from opennem.utils.http import USER_AGENT
+
+logger = logging.getLogger("opennem.utils.http_async")
+
+T = TypeVar("T")
+
+
+class HTTPClientException(Exception):
+    """Raised when a request fails after all retries"""
+
+    pass
+
+
+@dataclass
+class HTTPRetryPolicy:
+    """Retries for failed attempts. Attempt n waits backoff_factor * 2 ** (n - 1) seconds up to backoff_max"""
+
+    retries: int = settings.http_retries
+    backoff_factor: float = 2
+    backoff_max: float = 60
+    status_forcelist: frozenset[int] = field(default_factory=lambda: frozenset([403, 429, 500, 502, 503, 504]))
+
+    def delay(self, attempt: int, response: httpx.Response | None = None) -> float:
+        if response is not None and (retry_after := response.headers.get("Retry-After", "")).isdigit():
+            return min(float(retry_after), self.backoff_max)
+
+        return min(self.backoff_factor * 2 ** (attempt - 1), self.backoff_max)
+
+
+class AsyncHTTPClient:
+    """Pooled async http client with per host connection limits and retries"""
+
+    def __init__(
+        self,
+        max_connections: int | None = None,
+        max_connections_per_host: int | None = None,
+        timeout: float | None = None,
+        retry: HTTPRetryPolicy | None = None,
+        headers: dict[str, str] | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.max_connections = max_connections or settings.http_max_connections
+        self.max_connections_per_host = max_connections_per_host or settings.http_max_connections_per_host
+        self.retry = retry or HTTPRetryPolicy()
+
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+            timeout=httpx.Timeout(timeout or settings.http_timeout),
+            headers={"User-Agent": USER_AGENT, **(headers or {})},
+            verify=settings.http_verify_ssl,
+            follow_redirects=True,
+            transport=transport,
+        )
+
+        self._host_semaphores: dict[str, asyncio.Semaphore] = {}
+
+    async def __aenter__(self) -> "AsyncHTTPClient":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.max_connections_per_host)
+
+        return self._host_semaphores[host]
+
+    async def _send(self, request: httpx.Request, stream: bool = False) -> httpx.Response:
+        """Send a request with retries. Streamed responses are returned unread"""
+        attempt = 0
+
+        while True:
+            attempt += 1
+            response: httpx.Response | None = None
+
+            try:
+                response = await self._client.send(request, stream=stream)
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                if attempt > self.retry.retries:
+                    raise HTTPClientException(f"Request to {request.url} failed after {attempt} attempts: {e}") from e
+
+                logger.debug(f"Retrying {request.url} after error: {e}")
+            else:
+                if response.status_code not in self.retry.status_forcelist or attempt > self.retry.retries:
+                    return response
+
+                logger.debug(f"Retrying {request.url} after status {response.status_code}")
+                await response.aclose()
+
+            await asyncio.sleep(self.retry.delay(attempt, response))
+
+    async def get(self, url: str, headers: dict[str, str] | None = None) -> httpx.Response:
+        """GET url, returning the response with its body read"""
+        async with self._host_semaphore(url):
+            return await self._send(self._client.build_request("GET", url, headers=headers))
+
+    @asynccontextmanager
+    async def stream(self, url: str, headers: dict[str, str] | None = None) -> AsyncIterator[httpx.Response]:
+        """GET url with a streamed body, read with response.aiter_bytes(). Holds a host connection until closed"""
+        async with self._host_semaphore(url):
+            response = await self._send(self._client.build_request("GET", url, headers=headers), stream=True)
+
+            try:
+                yield response
+            finally:
+                await response.aclose()
+
+    async def get_many(self, urls: list[str], headers: dict[str, str] | None = None) -> list[httpx.Response | Exception]:
+        """GET every url concurrently within the connection limits. Failed requests return their exception"""
+        return await asyncio.gather(*[self.get(url, headers=headers) for url in urls], return_exceptions=True)
+
+
+def run_sync(coroutine: Coroutine[Any, Any, T] | Awaitable[T]) -> T:
+    """Run a coroutine from sync code, including from a thread with a running event loop"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)  # type: ignore
+
+    # asyncio.run can't be nested so use a loop in another thread
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()  # type: ignore
+
+
+def fetch(url: str, headers: dict[str, str] | None = None) -> httpx.Response:
+    """Sync GET of a single url with the async client retry policy"""
+
+    async def _fetch() -> httpx.Response:
+        async with AsyncHTTPClient() as client:
+            return await client.get(url, headers=headers)
+
+    return run_sync(_fetch())
+
+
+def fetch_many(urls: list[str], headers: dict[str, str] | None = None, **client_args: Any) -> list[httpx.Response | Exception]:
+    """Sync concurrent GET of urls, in the order of urls. Failed requests return their exception"""
+
+    async def _fetch_many() -> list[httpx.Response | Exception]:
+        async with AsyncHTTPClient(**client_args) as client:
+            return await client.get_many(urls, headers=headers)
+
+    return run_sync(_fetch_many())
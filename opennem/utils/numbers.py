@@ -6,6 +6,8 @@ from datetime import datetime
 from math import floor, log, pow  # noqa: no-name-module
 from typing import Any
 
+import numpy as np
+
 from opennem import settings
 
 logger = logging.getLogger("opennem.utils.numbers")
@@ -144,6 +146,32 @@ def trim_nulls(series: dict) -> dict:
     return series
 
 
+def trim_null_array(values: np.ndarray, cast_trailing: bool = False) -> tuple[int, np.ndarray]:
+    """
+    Vectorized cast_trailing_nulls and trim_nulls for an object array of series values
+
+    Returns the offset of the first value kept and the trimmed values. Trailing nulls are
+    either trimmed or, with cast_trailing, cast to 0's
+    """
+    present = np.flatnonzero(np.not_equal(values, None))
+
+    if present.size:
+        first, last = int(present[0]), int(present[-1])
+    elif cast_trailing:
+        # every value is a trailing null
+        first, last = 0, -1
+    else:
+        return len(values), values[:0]
+
+    if not cast_trailing:
+        return first, values[first : last + 1]
+
+    trimmed = values[first:].copy()
+    trimmed[last - first + 1 :] = 0
+
+    return first, trimmed
+
+
 def pad_time_series(series: dict, start_date: datetime, end_date: datetime, pad_with: int | None = 0) -> dict:
     """Pad out time series to start and end date"""
 
@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from opennem.aggregates.network_flows_v3 import calculate_demand_region_for_intervals, invert_interconnectors_invert_all_flows
+
+TEST_INTERVAL_ONE = datetime.fromisoformat("2023-07-01T00:30:00")
+TEST_INTERVAL_TWO = TEST_INTERVAL_ONE + timedelta(minutes=5)
+
+
+def test_calculate_demand_region_for_intervals() -> None:
+    energy_and_emissions = pd.DataFrame(
+        {
+            "trading_interval": [TEST_INTERVAL_ONE, TEST_INTERVAL_ONE, TEST_INTERVAL_TWO, TEST_INTERVAL_TWO],
+            "network_id": ["NEM"] * 4,
+            "network_region": ["NSW1", "QLD1", "NSW1", "QLD1"],
+            "energy": [600.0, 500.0, 610.0, 490.0],
+            "emissions": [330.0, 325.0, 331.0, 320.0],
+        }
+    )
+
+    interconnector_data = pd.DataFrame(
+        {
+            "trading_interval": [TEST_INTERVAL_ONE, TEST_INTERVAL_TWO],
+            "interconnector_region_from": ["NSW1", "NSW1"],
+            "interconnector_region_to": ["QLD1", "QLD1"],
+            "generated": [-660.0, 120.0],
+            "energy": [-55.0, 10.0],
+        }
+    )
+
+    interconnector_data_net = invert_interconnectors_invert_all_flows(interconnector_data)
+
+    result = calculate_demand_region_for_intervals(energy_and_emissions, interconnector_data_net)
+    result = result.set_index(["trading_interval", "network_region"])
+
+    # interval one QLD exports 55 to NSW, interval two NSW exports 10 to QLD
+    assert result.loc[(TEST_INTERVAL_ONE, "NSW1")].demand == 655.0
+    assert result.loc[(TEST_INTERVAL_ONE, "QLD1")].demand == 445.0
+    assert result.loc[(TEST_INTERVAL_TWO, "NSW1")].demand == 600.0
+    assert result.loc[(TEST_INTERVAL_TWO, "QLD1")].demand == 500.0
+    assert result.loc[(TEST_INTERVAL_TWO, "NSW1")].energy_exports == 10.0
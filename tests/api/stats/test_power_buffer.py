@@ -0,0 +1,253 @@
+"""
+Tests for the latest power snapshot in opennem.api.stats.power_buffer
+
+
+"""
+import random
+import zlib
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from opennem import settings
+from opennem.api.stats import power_buffer
+from opennem.api.stats.power_buffer import PowerBufferFacility, PowerRingBuffer
+from opennem.schema.network import NetworkNEM
+
+NEM_TZ = NetworkNEM.get_fixed_offset()
+STEP = timedelta(minutes=5)
+LATEST = datetime(2023, 3, 1, 12, 0, tzinfo=NEM_TZ)
+
+FACILITIES = [
+    PowerBufferFacility("BW01", "NSW1", "coal_black", 0.9),
+    PowerBufferFacility("BW02", "NSW1", "coal_black", 0.91),
+    PowerBufferFacility("WIND1", "NSW1", "wind", 0),
+    PowerBufferFacility("GAS1", "QLD1", "gas_ccgt", None),
+    PowerBufferFacility("BATT1", "QLD1", "battery_discharging", 0),
+    PowerBufferFacility("ROOF1", "NSW1", "solar_rooftop", 0),
+    PowerBufferFacility("IC1", None, None, None),
+]
+
+
+class _MemoryRedis:
+    def __init__(self) -> None:
+        self.hashes: dict[str, dict] = {}
+
+    def hset(self, key: str, mapping: dict) -> None:
+        self.hashes.setdefault(key, {}).update({k: v if isinstance(v, bytes) else str(v).encode() for k, v in mapping.items()})
+
+    def hget(self, key: str, field: str) -> bytes | None:
+        return self.hashes.get(key, {}).get(field)
+
+    def hmget(self, key: str, fields: list[str]) -> list[bytes | None]:
+        return [self.hget(key, f) for f in fields]
+
+
+def _random_buffer(days: int = 1, seed: int = 0) -> PowerRingBuffer:
+    rng = np.random.default_rng(seed)
+    buffer = PowerRingBuffer.empty("NEM", latest=LATEST, step=STEP, days=days, facilities=FACILITIES)
+
+    values = rng.uniform(-20, 500, size=buffer.values.shape)
+    values[rng.random(values.shape) < 0.2] = np.nan
+
+    # a facility with no data
+    values[:, 2] = np.nan
+    buffer.values = values
+
+    return buffer
+
+
+def _reference_fueltech_rows(buffer: PowerRingBuffer, start: datetime, end: datetime, region: str | None) -> set:
+    """Mirrors the gap filled aggregation in power_network_fueltech_query"""
+    rows = set()
+    positions = [i for i in range(len(buffer.values)) if start <= buffer.start + STEP * i <= end]
+    fueltechs: dict[str, list[int]] = {}
+
+    for column, facility in enumerate(buffer.facilities):
+        if facility.fueltech_id in (None, "solar_rooftop", "imports", "exports", "interconnector"):
+            continue
+
+        if region and facility.network_region != region:
+            continue
+
+        if all(np.isnan(buffer.values[p, column]) for p in positions):
+            continue
+
+        fueltechs.setdefault(facility.fueltech_id, []).append(column)
+
+    for fueltech_id, columns in fueltechs.items():
+        for p in positions:
+            power = sum(0 if np.isnan(buffer.values[p, c]) else buffer.values[p, c] for c in columns)
+            emissions = sum(
+                buffer.values[p, c] * buffer.facilities[c].emissions_factor_co2
+                for c in columns
+                if not np.isnan(buffer.values[p, c]) and buffer.facilities[c].emissions_factor_co2 is not None
+            )
+
+            if power > 0:
+                rows.add(
+                    (buffer.start + STEP * p, fueltech_id, round(power, 6), round(emissions, 6), round(emissions / power, 4))
+                )
+            else:
+                rows.add((buffer.start + STEP * p, fueltech_id, round(power, 6), 0, 0))
+
+    return rows
+
+
+def _rounded(rows: list[tuple]) -> set:
+    return {(r[0], r[1], round(r[2], 6), round(r[3], 6), r[4]) for r in rows}
+
+
+def test_power_buffer_advance() -> None:
+    buffer = PowerRingBuffer.empty("NEM", latest=LATEST, step=STEP, days=1, facilities=FACILITIES)
+
+    assert len(buffer.values) == 289
+    assert buffer.start == LATEST - timedelta(days=1)
+
+    assert buffer.set_values([(LATEST, "BW01", 100), (LATEST - STEP, "BW01", 90), (LATEST, "UNKNOWN", 1)]) == 2
+    assert buffer.set_values([(LATEST + STEP, "BW01", 1), (LATEST - timedelta(minutes=2), "BW01", 1)]) == 0
+
+    assert buffer.can_advance_to(LATEST + STEP * 2)
+    assert not buffer.can_advance_to(LATEST + timedelta(minutes=7))
+
+    buffer.advance_to(LATEST + STEP * 2)
+
+    assert buffer.latest == LATEST + STEP * 2
+    assert buffer.values[-3, 0] == 100
+    assert buffer.values[-4, 0] == 90
+    assert np.isnan(buffer.values[-2:, 0]).all()
+
+
+@pytest.mark.parametrize("region", [None, "NSW1", "QLD1"])
+@pytest.mark.parametrize("seed", range(5))
+def test_power_buffer_fueltech_rows_match_query(region: str | None, seed: int) -> None:
+    buffer = _random_buffer(seed=seed)
+
+    random.seed(seed)
+    start = buffer.start + STEP * random.randint(0, 100)
+    end = start + STEP * random.randint(0, 150)
+
+    assert _rounded(buffer.fueltech_rows(start, end, network_region=region)) == _reference_fueltech_rows(
+        buffer, start, end, region
+    )
+
+
+def test_power_buffer_facility_rows_gap_filled() -> None:
+    buffer = PowerRingBuffer.empty("NEM", latest=LATEST, step=STEP, days=1, facilities=FACILITIES)
+    buffer.set_values([(LATEST - STEP * 2, "BW01", 100), (LATEST, "BW01", 80)])
+
+    rows = buffer.facility_rows(["BW01", "BW02", "UNKNOWN"], LATEST - STEP * 3, LATEST + STEP * 10)
+
+    assert rows == [
+        (LATEST - STEP * 3, 0.0, "BW01"),
+        (LATEST - STEP * 2, 100.0, "BW01"),
+        (LATEST - STEP, 0.0, "BW01"),
+        (LATEST, 80.0, "BW01"),
+    ]
+
+
+def test_power_buffer_meta_round_trip() -> None:
+    buffer = _random_buffer()
+    buffer.version = 4
+
+    loaded = PowerRingBuffer.from_meta(buffer.meta(), zlib.compress(buffer.values.tobytes()))
+
+    assert loaded.start == buffer.start
+    assert loaded.latest == buffer.latest
+    assert loaded.facilities == buffer.facilities
+    assert loaded.version == 4
+    np.testing.assert_array_equal(loaded.values, buffer.values)
+
+
+def test_update_power_buffer_incremental(monkeypatch: pytest.MonkeyPatch) -> None:
+    queries: list[datetime] = []
+    scada = {LATEST - STEP * i: 100 + i for i in range(300)}
+
+    def _query_power(network: object, since: datetime) -> list[tuple]:
+        queries.append(since)
+        return [(interval, "BW01", value) for interval, value in scada.items() if interval >= since]
+
+    client = _MemoryRedis()
+    monkeypatch.setattr(settings, "power_buffer_enabled", True)
+    monkeypatch.setattr(settings, "power_buffer_days", 1)
+    monkeypatch.setattr(power_buffer, "_redis", lambda: client)
+    monkeypatch.setattr(power_buffer, "_power_buffers", {})
+    monkeypatch.setattr(power_buffer, "_query_facilities", lambda network: FACILITIES)
+    monkeypatch.setattr(power_buffer, "_query_power", _query_power)
+
+    buffer = power_buffer.update_power_buffer(NetworkNEM, now=LATEST + timedelta(minutes=1))
+
+    assert buffer and buffer.version == 1
+    assert queries == [LATEST - timedelta(days=1)]
+
+    scada[LATEST + STEP] = 50
+    buffer = power_buffer.update_power_buffer(NetworkNEM, now=LATEST + STEP + timedelta(minutes=1))
+
+    assert buffer and buffer.version == 2
+    assert queries[-1] == LATEST - STEP * 3
+    assert buffer.values[-1, 0] == 50
+    assert buffer.values[-2, 0] == 100
+
+    # another process loads the published buffer
+    monkeypatch.setattr(power_buffer, "_power_buffers", {})
+    monkeypatch.setattr(
+        power_buffer, "datetime", type("_datetime", (datetime,), {"now": staticmethod(lambda tz: LATEST + STEP * 2)})
+    )
+
+    loaded = power_buffer.get_power_buffer(NetworkNEM, start=LATEST - timedelta(hours=12))
+
+    assert loaded and loaded.version == 2
+    np.testing.assert_array_equal(loaded.values, buffer.values)
+
+    # doesn't cover the range
+    assert not power_buffer.get_power_buffer(NetworkNEM, start=LATEST - timedelta(days=2))
+
+
+def test_get_power_buffer_stale(monkeypatch: pytest.MonkeyPatch) -> None:
+    buffer = _random_buffer()
+    buffer.updated_at = datetime.now(NEM_TZ) - timedelta(hours=1)
+
+    monkeypatch.setattr(settings, "power_buffer_enabled", True)
+    monkeypatch.setattr(power_buffer, "_redis", lambda: _MemoryRedis())
+    monkeypatch.setattr(power_buffer, "_power_buffers", {"NEM": buffer})
+
+    assert power_buffer.get_power_buffer(NetworkNEM) is None
+
+    buffer.updated_at = datetime.now(NEM_TZ)
+
+    assert power_buffer.get_power_buffer(NetworkNEM) is buffer
+
+
+def test_update_power_buffer_requery_since(monkeypatch: pytest.MonkeyPatch) -> None:
+    scada = {LATEST - STEP * i: 100 + i for i in range(300)}
+
+    monkeypatch.setattr(settings, "power_buffer_enabled", True)
+    monkeypatch.setattr(settings, "power_buffer_days", 1)
+    monkeypatch.setattr(power_buffer, "_redis", lambda: _MemoryRedis())
+    monkeypatch.setattr(power_buffer, "_power_buffers", {})
+    monkeypatch.setattr(power_buffer, "_query_facilities", lambda network: FACILITIES)
+    monkeypatch.setattr(
+        power_buffer,
+        "_query_power",
+        lambda network, since: [(interval, "BW01", value) for interval, value in scada.items() if interval >= since],
+    )
+
+    power_buffer.update_power_buffer(NetworkNEM, now=LATEST + timedelta(minutes=1))
+
+    # a backfill revises intervals older than the ones re-queried on each update
+    revised = LATEST - timedelta(hours=6)
+    scada[revised] = 5
+
+    buffer = power_buffer.update_power_buffer(NetworkNEM, now=LATEST + timedelta(minutes=2))
+
+    assert buffer and buffer.facility_rows(["BW01"], revised, revised)[0][1] != 5
+
+    buffer = power_buffer.update_power_buffer(NetworkNEM, now=LATEST + timedelta(minutes=3), since=revised)
+
+    assert buffer and buffer.facility_rows(["BW01"], revised, revised) == [(revised, 5.0, "BW01")]
+
+    # since before the window is limited to the window
+    buffer = power_buffer.update_power_buffer(NetworkNEM, now=LATEST + timedelta(minutes=4), since=LATEST - timedelta(days=5))
+
+    assert buffer and buffer.start == LATEST - timedelta(days=1)
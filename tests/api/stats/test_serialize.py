@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from opennem.api.stats.controllers import stats_factory
+from opennem.api.stats.schema import DataQueryResult, OpennemDataSet
+from opennem.api.stats.serialize import serialize_stat_set, stat_set_to_dict
+from opennem.api.time import human_to_interval
+from opennem.core.networks import network_from_network_code
+from opennem.core.units import get_unit
+
+
+def get_stat_set() -> OpennemDataSet:
+    dt = datetime.fromisoformat("2023-01-15 10:00:00")
+
+    stats = [
+        DataQueryResult(interval=dt + timedelta(minutes=5 * i), result=v, group_by=ft)
+        for ft in ["coal_black", "solar_utility"]
+        for i, v in enumerate([None, 1.23456, 0, 1000.5, None])
+    ]
+
+    stat_set = stats_factory(
+        stats,
+        network=network_from_network_code("NEM"),
+        interval=human_to_interval("5m"),
+        units=get_unit("power"),
+        region="NSW1",
+        fueltech_group=True,
+    )
+
+    stat_set.data[0].x_capacity_at_present = 12.5
+
+    return stat_set
+
+
+@pytest.mark.parametrize("exclude_unset", [True, False])
+@pytest.mark.parametrize("indent", [None, 4])
+@pytest.mark.parametrize("exclude", [None, {"messages", "feature_flags"}])
+def test_serialize_stat_set_matches_pydantic(exclude_unset: bool, indent: int | None, exclude: set | None) -> None:
+    stat_set = get_stat_set()
+
+    expected = stat_set.json(exclude_unset=exclude_unset, indent=indent, exclude=exclude)
+
+    assert serialize_stat_set(stat_set, exclude_unset=exclude_unset, indent=indent, exclude=exclude) == expected
+
+
+def test_serialize_stat_set_byte_identical_with_nan() -> None:
+    stat_set = get_stat_set()
+    stat_set.data[0].history.data[1] = float("nan")
+
+    expected = stat_set.json(exclude_unset=True).encode("utf-8")
+
+    assert serialize_stat_set(stat_set, exclude_unset=True).encode("utf-8") == expected
+    assert b"NaN" in expected
+
+
+def test_stat_set_to_dict_passes_series_through() -> None:
+    stat_set = get_stat_set()
+
+    tree = stat_set_to_dict(stat_set, exclude_unset=True)
+
+    assert "response_status" not in tree, "Unset fields are excluded"
+    assert tree["data"][0]["history"]["data"] is stat_set.data[0].history.data, "Series are not copied"
+
+
+def test_serialize_stat_set_nested_exclude_falls_back() -> None:
+    stat_set = get_stat_set()
+    exclude = {"data": {"__all__": {"history"}}}
+
+    assert serialize_stat_set(stat_set, exclude=exclude) == stat_set.json(exclude=exclude)
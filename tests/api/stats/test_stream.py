@@ -0,0 +1,106 @@
+"""
+Tests for the streaming stats response formats in opennem.api.stats.stream
+
+
+"""
+import asyncio
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+
+from opennem.api.stats import stream
+from opennem.api.stats.stream import StatsResponseFormat, is_streaming_format, stream_rows_response
+from opennem.schema.network import NetworkNEM
+
+COLUMNS = ["interval", "power", "facility_code"]
+
+BATCHES = [
+    [(datetime(2023, 3, 1, 12, 0), Decimal("100.5"), "BW01"), (datetime(2023, 3, 1, 12, 5), None, "BW01")],
+    [],
+    [(datetime(2023, 3, 1, 12, 10), 80.0, "BW01")],
+]
+
+
+def _read_response(response_format: StatsResponseFormat) -> tuple[str, list[bytes]]:
+    response = stream_rows_response(iter(BATCHES), columns=COLUMNS, response_format=response_format, network=NetworkNEM)
+
+    async def _read() -> list[bytes]:
+        return [chunk async for chunk in response.body_iterator]
+
+    return response.media_type, asyncio.run(_read())
+
+
+def test_stream_ndjson() -> None:
+    media_type, chunks = _read_response(StatsResponseFormat.ndjson)
+
+    assert media_type == "application/x-ndjson"
+
+    records = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+
+    assert records == [
+        {"interval": "2023-03-01T12:00:00+10:00", "power": 100.5, "facility_code": "BW01"},
+        {"interval": "2023-03-01T12:05:00+10:00", "power": None, "facility_code": "BW01"},
+        {"interval": "2023-03-01T12:10:00+10:00", "power": 80.0, "facility_code": "BW01"},
+    ]
+
+
+def test_stream_csv() -> None:
+    media_type, chunks = _read_response(StatsResponseFormat.csv)
+
+    assert media_type == "text/csv"
+
+    # header goes out with the first batch
+    assert chunks[0].decode().splitlines()[0] == "interval,power,facility_code"
+    assert b"".join(chunks).decode().splitlines() == [
+        "interval,power,facility_code",
+        "2023-03-01T12:00:00+10:00,100.5,BW01",
+        "2023-03-01T12:05:00+10:00,,BW01",
+        "2023-03-01T12:10:00+10:00,80.0,BW01",
+    ]
+
+
+def test_stream_arrow_requires_pyarrow(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(stream, "HAVE_PYARROW", False)
+
+    with pytest.raises(HTTPException) as e:
+        stream_rows_response(iter(BATCHES), columns=COLUMNS, response_format=StatsResponseFormat.arrow)
+
+    assert e.value.status_code == 406
+
+
+def test_stream_json_not_streaming() -> None:
+    assert not is_streaming_format(StatsResponseFormat.json)
+    assert is_streaming_format(StatsResponseFormat.ndjson)
+
+    with pytest.raises(HTTPException) as e:
+        stream_rows_response(iter(BATCHES), columns=COLUMNS, response_format=StatsResponseFormat.json)
+
+    assert e.value.status_code == 400
+
+
+def test_cache_unless_streaming_bypasses_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    cached_calls = []
+
+    def _cache(expire: int):  # type: ignore
+        def _decorator(func):  # type: ignore
+            async def _cached(*args, **kwargs):  # type: ignore
+                cached_calls.append(kwargs)
+                return await func(**{k: v for k, v in kwargs.items() if k != "request"})
+
+            return _cached
+
+        return _decorator
+
+    monkeypatch.setattr(stream, "cache", _cache)
+
+    @stream.cache_unless_streaming(expire=60)
+    async def _endpoint(response_format: StatsResponseFormat = StatsResponseFormat.json) -> str:
+        return response_format.value
+
+    assert asyncio.run(_endpoint(response_format=StatsResponseFormat.json, request=None)) == "json"
+    assert asyncio.run(_endpoint(response_format=StatsResponseFormat.csv, request=None)) == "csv"
+
+    assert len(cached_calls) == 1
@@ -2,7 +2,8 @@ from datetime import datetime
 
 import pytest
 
-from opennem.utils.dates import optimized_data_parser
+from opennem.schema.network import NetworkNEM
+from opennem.utils.dates import optimized_data_parser, parse_date, parse_date_column
 
 
 @pytest.mark.parametrize(
@@ -20,3 +21,32 @@ from opennem.utils.dates import optimized_data_parser
 def test_dateparser_optimized(benchmark, date_str, date_dt):
     date_subject_dt = optimized_data_parser(date_str)
     assert date_subject_dt == date_dt
+
+
+MMS_DATE_COLUMN = [
+    f"2021/09/{day:02d} {hour:02d}:{minute:02d}:00" for day in range(1, 31) for hour in range(24) for minute in range(0, 60, 5)
+] * 10
+
+
+def parse_date_rows(date_strs: list[str]) -> list[datetime | None]:
+    return [parse_date(i, network=NetworkNEM) for i in date_strs]
+
+
+@pytest.mark.benchmark(
+    group="date_parser_column",
+    min_rounds=5,
+)
+def test_dateparser_rows(benchmark):
+    parse_date.cache_clear()
+    dates_parsed = benchmark(parse_date_rows, MMS_DATE_COLUMN)
+    assert len(dates_parsed) == len(MMS_DATE_COLUMN)
+
+
+@pytest.mark.benchmark(
+    group="date_parser_column",
+    min_rounds=5,
+)
+def test_dateparser_column(benchmark):
+    dates_parsed = benchmark(parse_date_column, MMS_DATE_COLUMN, network=NetworkNEM)
+    assert len(dates_parsed) == len(MMS_DATE_COLUMN)
+    assert dates_parsed[0].to_pydatetime() == parse_date(MMS_DATE_COLUMN[0], network=NetworkNEM)
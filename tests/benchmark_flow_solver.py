@@ -0,0 +1,137 @@
+"""Flow solver benchmarks
+
+Solve time per interval should stay flat as the number of intervals grows now
+that region and interconnector lookups are indexed by (interval, code). The
+range solver solves all intervals in one stacked call.
+"""
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from opennem.core.flow_solver import (
+    InterconnectorNetEmissionsEnergy,
+    NetworkInterconnectorEnergyEmissions,
+    NetworkRegionsDemandEmissions,
+    Region,
+    RegionDemandEmissions,
+    RegionFlow,
+    solve_flow_emissions_for_interval,
+    solve_flow_emissions_for_interval_range,
+)
+from opennem.schema.network import NetworkNEM
+
+INTERVAL_START = datetime.fromisoformat("2023-07-01T00:05:00+10:00")
+
+REGION_ENERGY_EMISSIONS = {
+    "NSW1": (600.0, 330.0),
+    "QLD1": (500.0, 325.0),
+    "VIC1": (300.0, 180.0),
+    "SA1": (100.0, 15.0),
+    "TAS1": (80.0, 4.0),
+}
+
+REGION_FLOWS = [
+    "NSW1->QLD1",
+    "NSW1->VIC1",
+    "VIC1->TAS1",
+    "VIC1->SA1",
+    "VIC1->NSW1",
+    "QLD1->NSW1",
+    "TAS1->VIC1",
+    "SA1->VIC1",
+]
+
+
+def build_solver_inputs(num_intervals: int) -> tuple[NetworkInterconnectorEnergyEmissions, NetworkRegionsDemandEmissions]:
+    intervals = [INTERVAL_START + timedelta(minutes=5 * i) for i in range(num_intervals)]
+
+    region_data = NetworkRegionsDemandEmissions(
+        network=NetworkNEM,
+        data=[
+            RegionDemandEmissions(interval=interval, region_code=Region(region), energy_mwh=energy, emissions_t=emissions)
+            for interval in intervals
+            for region, (energy, emissions) in REGION_ENERGY_EMISSIONS.items()
+        ],
+    )
+
+    interconnector_data = NetworkInterconnectorEnergyEmissions(
+        network=NetworkNEM,
+        data=[
+            InterconnectorNetEmissionsEnergy(
+                interval=interval, region_flow=RegionFlow(region_flow), generated_mw=120, energy_mwh=10
+            )
+            for interval in intervals
+            for region_flow in REGION_FLOWS
+        ],
+    )
+
+    return interconnector_data, region_data
+
+
+def solve_all_intervals(
+    interconnector_data: NetworkInterconnectorEnergyEmissions, region_data: NetworkRegionsDemandEmissions
+) -> int:
+    intervals = region_data.intervals
+
+    for interval in intervals:
+        solve_flow_emissions_for_interval(interval=interval, interconnector_data=interconnector_data, region_data=region_data)
+
+    return len(intervals)
+
+
+@pytest.mark.benchmark(
+    group="flow_solver",
+    min_rounds=3,
+)
+@pytest.mark.parametrize("num_intervals", [288, 576, 1152])
+def test_benchmark_solve_flow_emissions(benchmark, num_intervals: int) -> None:
+    interconnector_data, region_data = build_solver_inputs(num_intervals)
+
+    assert benchmark(solve_all_intervals, interconnector_data, region_data) == num_intervals
+
+
+def test_solve_time_scales_linearly() -> None:
+    per_interval: dict[int, float] = {}
+
+    for num_intervals in [288, 1152]:
+        interconnector_data, region_data = build_solver_inputs(num_intervals)
+
+        start = time.perf_counter()
+        solve_all_intervals(interconnector_data, region_data)
+        per_interval[num_intervals] = (time.perf_counter() - start) / num_intervals
+
+    for num_intervals, seconds in per_interval.items():
+        print(f"{num_intervals} intervals: {seconds * 1000:.3f} ms per interval")
+
+    # 4x the intervals at O(n²) would be 4x the time per interval
+    assert per_interval[1152] < per_interval[288] * 2, "Solve time per interval is roughly constant"
+
+
+@pytest.mark.benchmark(
+    group="flow_solver",
+    min_rounds=3,
+)
+@pytest.mark.parametrize("num_intervals", [288, 576, 1152])
+def test_benchmark_solve_flow_emissions_range(benchmark, num_intervals: int) -> None:
+    interconnector_data, region_data = build_solver_inputs(num_intervals)
+
+    result = benchmark(solve_flow_emissions_for_interval_range, interconnector_data, region_data)
+
+    assert len(result) == num_intervals * len(REGION_ENERGY_EMISSIONS)
+
+
+def test_range_solver_faster_than_per_interval() -> None:
+    interconnector_data, region_data = build_solver_inputs(288 * 7)
+
+    start = time.perf_counter()
+    solve_all_intervals(interconnector_data, region_data)
+    per_interval_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    solve_flow_emissions_for_interval_range(interconnector_data, region_data)
+    range_elapsed = time.perf_counter() - start
+
+    print(f"week of intervals: per interval {per_interval_elapsed:.3f}s range {range_elapsed:.3f}s")
+
+    assert range_elapsed < per_interval_elapsed, "Stacked solve is faster than solving each interval"
@@ -1,10 +1,15 @@
+import multiprocessing
+import resource
+import time
+from collections.abc import Callable
 from pathlib import Path
 from typing import Any
+from zipfile import ZipFile
 
 import pytest
 
 from opennem.core.downloader import file_opener
-from opennem.core.parsers.aemo.mms import parse_aemo_mms_csv
+from opennem.core.parsers.aemo.mms import parse_aemo_mms_csv, parse_aemo_mms_zip
 
 NEM_FILE_PATH = Path("data/NEM_FACILITY_SCADA_DAY.zip")
 
@@ -20,9 +25,63 @@ def load_nem_scada_records() -> dict[str, Any]:
     return ts.get_table("unit_scada").records
 
 
+def count_nem_scada_records() -> int:
+    return len(load_nem_scada_records())
+
+
+def count_nem_scada_records_stream() -> int:
+    num_records = 0
+
+    with NEM_FILE_PATH.open("rb") as fh:
+        for batch in parse_aemo_mms_zip(fh):
+            if batch.name == "unit_scada":
+                num_records += len(batch)
+
+    return num_records
+
+
+def _measure_parser(parser_func: Callable[[], int]) -> tuple[int, float, int]:
+    """Run a parser and return the row count, seconds taken and peak RSS in kb"""
+    start = time.perf_counter()
+    num_records = parser_func()
+    elapsed = time.perf_counter() - start
+
+    return num_records, elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure_parser(parser_func: Callable[[], int]) -> tuple[int, float, int]:
+    """Measure a parser in a fresh process so peak RSS is not shared between runs"""
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(_measure_parser, (parser_func,))
+
+
+@pytest.mark.skipif(not NEM_FILE_PATH.is_file(), reason="benchmark data file not available")
 @pytest.mark.benchmark(
     group="load_nem_scada_records",
     min_rounds=1,
 )
 def test_benchmark_generate_facility_scada_base(benchmark) -> None:
     benchmark(load_nem_scada_records)
+
+
+@pytest.mark.skipif(not NEM_FILE_PATH.is_file(), reason="benchmark data file not available")
+@pytest.mark.benchmark(
+    group="load_nem_scada_records",
+    min_rounds=1,
+)
+def test_benchmark_generate_facility_scada_stream(benchmark) -> None:
+    benchmark(count_nem_scada_records_stream)
+
+
+@pytest.mark.skipif(not NEM_FILE_PATH.is_file(), reason="benchmark data file not available")
+def test_compare_mms_parsers_throughput_and_rss() -> None:
+    with ZipFile(NEM_FILE_PATH) as zf:
+        assert zf.namelist(), "benchmark file has members"
+
+    base_records, base_elapsed, base_rss = measure_parser(count_nem_scada_records)
+    stream_records, stream_elapsed, stream_rss = measure_parser(count_nem_scada_records_stream)
+
+    print(f"parse_aemo_mms_csv: {base_records / base_elapsed:,.0f} rows/sec peak rss {base_rss / 1024:,.1f} MB")
+    print(f"parse_aemo_mms_zip: {stream_records / stream_elapsed:,.0f} rows/sec peak rss {stream_rss / 1024:,.1f} MB")
+
+    assert base_records == stream_records, "Parsers return the same number of records"
@@ -0,0 +1,42 @@
+"""OpennemDataSet serialization benchmarks
+
+Compares pydantic .json() with the fast path serializer on a week of 5 minute data
+for 400 facilities.
+"""
+import pytest
+
+from opennem.api.stats.controllers import stats_factory
+from opennem.api.stats.schema import OpennemDataSet
+from opennem.api.stats.serialize import serialize_stat_set
+from opennem.api.time import human_to_interval
+from opennem.core.networks import network_from_network_code
+from opennem.core.units import get_unit
+from tests.benchmark_stats_factory import build_facility_stats
+
+
+@pytest.fixture(scope="module")
+def facility_stat_set() -> OpennemDataSet:
+    return stats_factory(
+        build_facility_stats(400),
+        network=network_from_network_code("NEM"),
+        interval=human_to_interval("5m"),
+        units=get_unit("power"),
+        region="NSW1",
+        include_group_code=True,
+    )
+
+
+@pytest.mark.benchmark(
+    group="serialize_stat_set",
+    min_rounds=3,
+)
+def test_benchmark_pydantic_json(benchmark, facility_stat_set: OpennemDataSet) -> None:
+    assert benchmark(facility_stat_set.json, exclude_unset=True)
+
+
+@pytest.mark.benchmark(
+    group="serialize_stat_set",
+    min_rounds=3,
+)
+def test_benchmark_serialize_stat_set(benchmark, facility_stat_set: OpennemDataSet) -> None:
+    assert benchmark(serialize_stat_set, facility_stat_set, exclude_unset=True)
@@ -0,0 +1,77 @@
+"""stats_factory benchmarks
+
+Grouping query results is a single pass over the rows regardless of the number of
+groups, so a week of 5 minute facility data for a few hundred DUIDs is built in
+roughly the time it takes to touch each row once.
+"""
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from opennem.api.stats.controllers import stats_factory
+from opennem.api.stats.schema import DataQueryResult
+from opennem.api.time import human_to_interval
+from opennem.core.networks import network_from_network_code
+from opennem.core.units import get_unit
+
+INTERVAL_START = datetime.fromisoformat("2023-07-01 00:05:00")
+
+INTERVALS_PER_WEEK = 288 * 7
+
+
+def build_facility_stats(num_facilities: int, num_intervals: int = INTERVALS_PER_WEEK) -> list[DataQueryResult]:
+    intervals = [INTERVAL_START + timedelta(minutes=5 * i) for i in range(num_intervals)]
+
+    # construct skips validation so building the fixture doesn't dominate the run
+    return [
+        DataQueryResult.construct(
+            interval=interval,
+            result=None if i < facility_number else round((facility_number + i) % 100 * 1.1, 2),
+            group_by=f"DUID{facility_number:04d}",
+        )
+        for facility_number in range(num_facilities)
+        for i, interval in enumerate(intervals)
+    ]
+
+
+def build_facility_power(stats: list[DataQueryResult]) -> int:
+    result = stats_factory(
+        stats,
+        network=network_from_network_code("NEM"),
+        interval=human_to_interval("5m"),
+        units=get_unit("power"),
+        region="NSW1",
+        fueltech_group=False,
+        include_group_code=True,
+    )
+
+    return len(result.data)
+
+
+@pytest.mark.benchmark(
+    group="stats_factory",
+    min_rounds=3,
+)
+@pytest.mark.parametrize("num_facilities", [50, 400])
+def test_benchmark_stats_factory_facilities(benchmark, num_facilities: int) -> None:
+    stats = build_facility_stats(num_facilities)
+
+    assert benchmark(build_facility_power, stats) == num_facilities
+
+
+def test_stats_factory_scales_with_rows() -> None:
+    per_row: dict[int, float] = {}
+
+    for num_facilities in [25, 400]:
+        stats = build_facility_stats(num_facilities)
+
+        start = time.perf_counter()
+        build_facility_power(stats)
+        per_row[num_facilities] = (time.perf_counter() - start) / len(stats)
+
+    for num_facilities, seconds in per_row.items():
+        print(f"{num_facilities} facilities: {seconds * 1e6:.3f} us per row")
+
+    # 16x the groups at O(groups × rows) would be 16x the time per row
+    assert per_row[400] < per_row[25] * 3, "Time per row is roughly constant as groups grow"
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+from opennem.core.crawlers.history import CrawlerSeenIntervals, CrawlHistoryEntry, _dedupe_histories
+
+_STEP = timedelta(minutes=5)
+_LATEST = datetime.fromisoformat("2023-07-01T12:00:00")
+_LOADED_AT = datetime.fromisoformat("2023-07-01T12:01:00")
+
+
+def test_seen_intervals_missing() -> None:
+    seen = CrawlerSeenIntervals.empty(latest=_LATEST, step=_STEP, days=1, loaded_at=_LOADED_AT)
+
+    assert len(seen.seen) == 289, "Covers the series inclusive of both ends"
+    assert seen.start == _LATEST - timedelta(days=1)
+
+    seen.mark([_LATEST - _STEP * i for i in range(1, 288)])
+
+    assert seen.missing() == [_LATEST, _LATEST - timedelta(days=1)], "Only unmarked intervals are missing"
+
+
+def test_seen_intervals_ignores_off_series_intervals() -> None:
+    seen = CrawlerSeenIntervals.empty(latest=_LATEST, step=_STEP, days=1, loaded_at=_LOADED_AT)
+
+    seen.mark([_LATEST - timedelta(minutes=2), _LATEST - timedelta(days=2), _LATEST + _STEP])
+
+    assert not seen.seen.any(), "Intervals outside or between the series are ignored"
+
+
+def test_seen_intervals_advance() -> None:
+    seen = CrawlerSeenIntervals.empty(latest=_LATEST, step=_STEP, days=1, loaded_at=_LOADED_AT)
+    seen.mark([_LATEST - _STEP * i for i in range(289)])
+
+    new_latest = _LATEST + _STEP * 2
+
+    assert seen.can_advance_to(new_latest)
+    assert not seen.can_advance_to(_LATEST + timedelta(minutes=3)), "Can't advance off the series"
+
+    seen.advance_to(new_latest)
+
+    assert seen.start == new_latest - timedelta(days=1)
+    assert seen.missing() == [new_latest, new_latest - _STEP], "New intervals are missing, old ones kept"
+
+
+def test_dedupe_histories_keeps_last() -> None:
+    histories = [
+        CrawlHistoryEntry(interval=_LATEST, records=None),
+        CrawlHistoryEntry(interval=_LATEST - _STEP, records=1),
+        CrawlHistoryEntry(interval=_LATEST, records=10),
+    ]
+
+    deduped = _dedupe_histories(histories)
+
+    assert len(deduped) == 2
+    assert {i.interval: i.records for i in deduped}[_LATEST] == 10
@@ -0,0 +1,112 @@
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from opennem.core.crawlers.pipeline import CrawlPipelineException, _get_parse_mp_context, run_ordered_pipeline
+from opennem.core.parsers.aemo.mms import parse_aemo_mms_csv
+from tests.parsers.test_aemo_mms import AEMO_MMS_UNIT_SCADA_CSV
+
+
+def _fetch_slow_first(item: int) -> int:
+    # earlier items finish last so ordering has to be restored by the pipeline
+    time.sleep(0.01 * (5 - item))
+    return item
+
+
+def _parse_square(content: int) -> int:
+    return content * content
+
+
+def _parse_mms(content: bytes):
+    return parse_aemo_mms_csv(content)
+
+
+def _run_pipeline_to_queue(queue: multiprocessing.Queue) -> None:
+    results = run_ordered_pipeline(range(5), fetch=_fetch_slow_first, parse=_parse_square, fetch_workers=5, parse_workers=2)
+    queue.put([(i.result, repr(i.error)) for i in results])
+
+
+@pytest.mark.parametrize("parse_workers", [0, 2])
+def test_pipeline_yields_in_input_order(parse_workers: int) -> None:
+    results = list(
+        run_ordered_pipeline(range(5), fetch=_fetch_slow_first, parse=_parse_square, fetch_workers=5, parse_workers=parse_workers)
+    )
+
+    assert [i.item for i in results] == list(range(5)), "Results are in input order"
+    assert [i.result for i in results] == [0, 1, 4, 9, 16], "Results are parsed"
+
+
+def test_pipeline_captures_errors() -> None:
+    def _fetch(item: int) -> int:
+        if item == 2:
+            raise ValueError("bad file")
+        return item
+
+    results = list(run_ordered_pipeline(range(4), fetch=_fetch, fetch_workers=2, max_pending=2))
+
+    assert [i.ok for i in results] == [True, True, False, True], "Error captured on the failing item only"
+    assert isinstance(results[2].error, ValueError)
+
+
+def test_pipeline_bounds_items_in_flight() -> None:
+    lock = threading.Lock()
+    fetched: list[int] = []
+
+    def _fetch(item: int) -> int:
+        with lock:
+            fetched.append(item)
+        return item
+
+    max_pending = 3
+    pipeline = run_ordered_pipeline(range(100), fetch=_fetch, fetch_workers=4, max_pending=max_pending)
+
+    next(pipeline)
+    time.sleep(0.05)
+
+    # the consumed item plus a full window of pending items
+    assert len(fetched) <= max_pending + 1, "Back-pressure caps items fetched ahead of the writer"
+
+    pipeline.close()
+
+
+def test_pipeline_invalid_config() -> None:
+    with pytest.raises(CrawlPipelineException):
+        list(run_ordered_pipeline(range(2), fetch=_fetch_slow_first, fetch_workers=0))
+
+
+def test_pipeline_parses_mms_in_worker_process() -> None:
+    results = list(
+        run_ordered_pipeline(
+            [AEMO_MMS_UNIT_SCADA_CSV, AEMO_MMS_UNIT_SCADA_CSV],
+            fetch=lambda i: i,
+            parse=_parse_mms,
+            fetch_workers=2,
+            parse_workers=1,
+        )
+    )
+
+    assert all(i.ok for i in results), "Parsed without error"
+
+    table = results[0].result.get_table("unit_scada")
+
+    assert table, "Table set survives the process boundary"
+    assert table.num_records == len(table.records) > 0, "Table records survive the process boundary"
+
+
+def test_pipeline_parse_workers_are_not_forked() -> None:
+    # forking while fetch threads are running can deadlock the parse workers
+    assert _get_parse_mp_context().get_start_method() in ["forkserver", "spawn"]
+
+
+def test_pipeline_parses_in_daemonic_process() -> None:
+    # huey process workers are daemonic and can't start a process pool
+    queue: multiprocessing.Queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run_pipeline_to_queue, args=(queue,), daemon=True)
+    process.start()
+
+    results = queue.get(timeout=30)
+    process.join(timeout=30)
+
+    assert results == [(i * i, "None") for i in range(5)], "Parsed without error"
@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from opennem.core.flow_solver import (
+    FlowSolverException,
+    InterconnectorNetEmissionsEnergy,
+    NetworkInterconnectorEnergyEmissions,
+    NetworkRegionsDemandEmissions,
+    Region,
+    RegionDemandEmissions,
+    RegionFlow,
+)
+from opennem.schema.network import NetworkNEM
+
+TEST_INTERVAL_ONE = datetime.fromisoformat("2023-07-01T00:30:00+10:00")
+TEST_INTERVAL_TWO = TEST_INTERVAL_ONE + timedelta(minutes=5)
+
+
+def _region_data() -> NetworkRegionsDemandEmissions:
+    return NetworkRegionsDemandEmissions(
+        network=NetworkNEM,
+        data=[
+            RegionDemandEmissions(interval=TEST_INTERVAL_ONE, region_code=Region("NSW1"), energy_mwh=600, emissions_t=330),
+            RegionDemandEmissions(interval=TEST_INTERVAL_ONE, region_code=Region("QLD1"), energy_mwh=500, emissions_t=325),
+            RegionDemandEmissions(interval=TEST_INTERVAL_TWO, region_code=Region("NSW1"), energy_mwh=610, emissions_t=331),
+        ],
+    )
+
+
+def _interconnector_data() -> NetworkInterconnectorEnergyEmissions:
+    return NetworkInterconnectorEnergyEmissions(
+        network=NetworkNEM,
+        data=[
+            InterconnectorNetEmissionsEnergy(
+                interval=TEST_INTERVAL_ONE, region_flow=RegionFlow("QLD1->NSW1"), generated_mw=660, energy_mwh=55
+            ),
+            InterconnectorNetEmissionsEnergy(
+                interval=TEST_INTERVAL_TWO, region_flow=RegionFlow("QLD1->NSW1"), generated_mw=600, energy_mwh=50
+            ),
+        ],
+    )
+
+
+def test_get_region_by_interval_and_code() -> None:
+    region_data = _region_data()
+
+    assert region_data.get_region(TEST_INTERVAL_TWO, Region("NSW1")).energy_mwh == 610
+    assert region_data.get_region(TEST_INTERVAL_ONE.astimezone(None), Region("QLD1")).emissions_t == 325, "Equal instants match"
+
+    with pytest.raises(FlowSolverException):
+        region_data.get_region(TEST_INTERVAL_TWO, Region("QLD1"))
+
+
+def test_region_index_follows_data_changes() -> None:
+    region_data = _region_data()
+
+    region_data.data.append(
+        RegionDemandEmissions(interval=TEST_INTERVAL_TWO, region_code=Region("QLD1"), energy_mwh=510, emissions_t=320)
+    )
+
+    assert region_data.get_region(TEST_INTERVAL_TWO, Region("QLD1")).energy_mwh == 510
+
+
+def test_region_get_array() -> None:
+    region_data = _region_data()
+
+    assert region_data.intervals == [TEST_INTERVAL_ONE, TEST_INTERVAL_TWO]
+    assert region_data.region_codes == ["NSW1", "QLD1"]
+
+    energy = region_data.get_array("energy_mwh")
+
+    assert energy.shape == (2, 2)
+    np.testing.assert_array_equal(energy, np.array([[600, 500], [610, np.nan]]))
+
+    emissions = region_data.get_array("emissions_t", regions=[Region("QLD1")])
+
+    np.testing.assert_array_equal(emissions, np.array([[325], [np.nan]]))
+
+
+def test_get_interconnector() -> None:
+    interconnector_data = _interconnector_data()
+
+    assert interconnector_data.get_interconnector(TEST_INTERVAL_TWO, RegionFlow("QLD1->NSW1")).energy_mwh == 50
+    assert interconnector_data.get_interconnector(TEST_INTERVAL_TWO, RegionFlow("SA1->VIC1"), default=1).energy_mwh == 1
+
+    with pytest.raises(FlowSolverException):
+        interconnector_data.get_interconnector(TEST_INTERVAL_TWO, RegionFlow("SA1->VIC1"))
+
+    np.testing.assert_array_equal(interconnector_data.get_array("energy_mwh"), np.array([[55], [50]]))
+
+
+def test_get_interconnector_duplicate_raises() -> None:
+    interconnector_data = _interconnector_data()
+    interconnector_data.data.append(
+        InterconnectorNetEmissionsEnergy(
+            interval=TEST_INTERVAL_ONE, region_flow=RegionFlow("QLD1->NSW1"), generated_mw=1, energy_mwh=1
+        )
+    )
+
+    with pytest.raises(FlowSolverException):
+        interconnector_data.get_interconnector(TEST_INTERVAL_ONE, RegionFlow("QLD1->NSW1"))
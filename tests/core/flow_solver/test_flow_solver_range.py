@@ -0,0 +1,204 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from opennem.core.flow_solver import (
+    InterconnectorNetEmissionsEnergy,
+    NetworkInterconnectorEnergyEmissions,
+    NetworkRegionsDemandEmissions,
+    Region,
+    RegionDemandEmissions,
+    RegionFlow,
+    build_flow_emissions_system,
+    build_flow_topology,
+    solve_flow_emissions_for_interval,
+    solve_flow_emissions_for_interval_range,
+    solve_flow_emissions_system,
+)
+from opennem.schema.network import NetworkNEM, NetworkWEM
+
+TEST_INTERVAL_ONE = datetime.fromisoformat("2023-07-01T00:30:00+10:00")
+TEST_INTERVAL_TWO = TEST_INTERVAL_ONE + timedelta(minutes=5)
+
+# generated energy and emissions for each region
+NEM_REGION_GENERATION = {
+    "NSW1": (600.0, 330.0),
+    "QLD1": (500.0, 325.0),
+    "VIC1": (300.0, 180.0),
+    "SA1": (100.0, 15.0),
+    "TAS1": (80.0, 4.0),
+}
+
+# net directed flows
+NEM_FLOWS = {
+    "QLD1->NSW1": 55.0,
+    "NSW1->VIC1": 27.5,
+    "VIC1->SA1": 22.0,
+    "TAS1->VIC1": 11.0,
+}
+
+# the reverse directions with no flow, as output by invert_interconnectors_invert_all_flows
+NEM_FLOWS_REVERSE = {"NSW1->QLD1": 0.0, "VIC1->NSW1": 0.0, "SA1->VIC1": 0.0, "VIC1->TAS1": 0.0}
+
+
+def _build_nem_inputs(intervals: list[datetime]) -> tuple[NetworkInterconnectorEnergyEmissions, NetworkRegionsDemandEmissions]:
+    region_demand = {region: energy for region, (energy, _) in NEM_REGION_GENERATION.items()}
+
+    for region_flow, energy in NEM_FLOWS.items():
+        region_from, region_to = region_flow.split("->")
+        region_demand[region_from] -= energy
+        region_demand[region_to] += energy
+
+    region_data = NetworkRegionsDemandEmissions(
+        network=NetworkNEM,
+        data=[
+            RegionDemandEmissions(
+                interval=interval,
+                region_code=Region(region),
+                energy_mwh=region_demand[region],
+                emissions_t=emissions,
+            )
+            for interval in intervals
+            for region, (_, emissions) in NEM_REGION_GENERATION.items()
+        ],
+    )
+
+    interconnector_data = NetworkInterconnectorEnergyEmissions(
+        network=NetworkNEM,
+        data=[
+            InterconnectorNetEmissionsEnergy(
+                interval=interval, region_flow=RegionFlow(region_flow), generated_mw=energy * 12, energy_mwh=energy
+            )
+            for interval in intervals
+            for region_flow, energy in {**NEM_FLOWS, **NEM_FLOWS_REVERSE}.items()
+        ],
+    )
+
+    return interconnector_data, region_data
+
+
+def test_build_flow_topology() -> None:
+    topology = build_flow_topology([RegionFlow("VIC1->SA1"), RegionFlow("SA1->VIC1")], regions=[Region("NSW1")])
+
+    assert topology.regions == ["NSW1", "SA1", "VIC1"], "Regions from flows and extra regions"
+    assert topology.region_flows == ["SA1->VIC1", "VIC1->SA1"]
+    assert topology.size == 5
+
+    flow_from, flow_to = topology.flow_region_positions()
+
+    assert flow_from.tolist() == [1, 2]
+    assert flow_to.tolist() == [2, 1]
+
+
+def test_two_region_exports_carry_generation_intensity() -> None:
+    topology = build_flow_topology([RegionFlow("A->B")])
+
+    # A generates 100 MWh at 50t and exports 10 MWh to B
+    a, b = build_flow_emissions_system(
+        topology,
+        region_demand=np.array([[90.0, 60.0]]),
+        region_emissions=np.array([[50.0, 0.0]]),
+        flow_energy=np.array([[10.0]]),
+    )
+
+    assert a.shape == (1, 3, 3)
+
+    solution = solve_flow_emissions_system(a, b)
+
+    np.testing.assert_allclose(solution[0], [45.0, 5.0, 5.0])
+
+
+def test_solve_range_matches_single_interval_solves() -> None:
+    intervals = [TEST_INTERVAL_ONE, TEST_INTERVAL_TWO]
+    interconnector_data, region_data = _build_nem_inputs(intervals)
+
+    result = solve_flow_emissions_for_interval_range(interconnector_data=interconnector_data, region_data=region_data)
+
+    assert len(result) == len(intervals) * len(NEM_REGION_GENERATION), "A row for each interval and region"
+    assert set(result.columns) >= {
+        "trading_interval",
+        "network_id",
+        "network_region",
+        "energy_imports",
+        "energy_exports",
+        "emissions_imports",
+        "emissions_exports",
+        "market_value_imports",
+        "market_value_exports",
+    }, "Has the at_network_flows columns"
+
+    for interval in intervals:
+        single_interconnector_data, single_region_data = _build_nem_inputs([interval])
+        single_result = solve_flow_emissions_for_interval_range(
+            interconnector_data=single_interconnector_data, region_data=single_region_data
+        )
+
+        interval_result = result[result.trading_interval == interval].reset_index(drop=True)
+
+        np.testing.assert_allclose(interval_result.emissions_exports, single_result.emissions_exports)
+
+
+def test_solve_range_matches_solve_for_interval() -> None:
+    intervals = [TEST_INTERVAL_ONE, TEST_INTERVAL_TWO]
+    interconnector_data, region_data = _build_nem_inputs(intervals)
+
+    result = solve_flow_emissions_for_interval_range(interconnector_data=interconnector_data, region_data=region_data)
+
+    for interval in intervals:
+        emissions_exports = dict.fromkeys(NEM_REGION_GENERATION, 0.0)
+        emissions_imports = dict.fromkeys(NEM_REGION_GENERATION, 0.0)
+
+        for flow in solve_flow_emissions_for_interval(
+            interval=interval, interconnector_data=interconnector_data, region_data=region_data
+        ).data:
+            emissions_exports[flow.interconnector_region_from] += flow.emissions_t
+            emissions_imports[flow.interconnector_region_to] += flow.emissions_t
+
+        interval_result = result[result.trading_interval == interval].set_index("network_region")
+
+        for region in NEM_REGION_GENERATION:
+            assert interval_result.loc[region].emissions_exports == pytest.approx(emissions_exports[region]), region
+            assert interval_result.loc[region].emissions_imports == pytest.approx(emissions_imports[region]), region
+
+
+def test_solve_range_conserves_emissions() -> None:
+    interconnector_data, region_data = _build_nem_inputs([TEST_INTERVAL_ONE])
+
+    result = solve_flow_emissions_for_interval_range(interconnector_data=interconnector_data, region_data=region_data)
+    result = result.set_index("network_region")
+
+    assert result.emissions_exports.sum() == pytest.approx(result.emissions_imports.sum()), "Exports equal imports"
+    assert (result[["emissions_imports", "emissions_exports"]] >= 0).all().all(), "No negative emissions"
+
+    # exports carry the emissions intensity of the region demand
+    assert result.loc["QLD1"].emissions_exports == pytest.approx(55.0 * 325.0 / (500.0 - 55.0))
+    assert result.loc["NSW1"].energy_imports == 55.0
+    assert result.loc["VIC1"].energy_exports == 22.0
+
+
+def test_solve_range_trace_flows() -> None:
+    interconnector_data, region_data = _build_nem_inputs([TEST_INTERVAL_ONE])
+
+    result = solve_flow_emissions_for_interval_range(
+        interconnector_data=interconnector_data, region_data=region_data, trace_flows=True
+    )
+    result = result.set_index("network_region")
+
+    assert result.emissions_exports.sum() == pytest.approx(result.emissions_imports.sum()), "Exports equal imports"
+
+    # QLD has no imports so its exports carry its generation intensity
+    assert result.loc["QLD1"].emissions_exports == pytest.approx(55.0 * 325.0 / 500.0)
+
+
+def test_solve_range_without_interconnectors() -> None:
+    region_data = NetworkRegionsDemandEmissions(
+        network=NetworkWEM,
+        data=[RegionDemandEmissions(interval=TEST_INTERVAL_ONE, region_code=Region("WEM"), energy_mwh=100, emissions_t=70)],
+    )
+    interconnector_data = NetworkInterconnectorEnergyEmissions(network=NetworkWEM, data=[])
+
+    result = solve_flow_emissions_for_interval_range(interconnector_data=interconnector_data, region_data=region_data)
+
+    assert result.network_region.tolist() == ["WEM"]
+    assert result.emissions_exports.tolist() == [0.0]
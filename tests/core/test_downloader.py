@@ -0,0 +1,118 @@
+"""
+Tests for the streaming downloader in opennem.core.downloader
+
+
+"""
+import io
+from pathlib import Path
+from zipfile import ZIP_DEFLATED, ZipFile
+
+import pytest
+
+from opennem.core import downloader
+from opennem.core.downloader import file_opener, iter_file_members, iter_url_members, url_downloader
+from opennem.core.parsers.aemo import mms
+
+AEMO_MMS_CSV = b"""C,NEMP.WORLD,DISPATCHSCADA,AEMO,PUBLIC,2021/09/02,12:50:17,0000000348376188,DISPATCHSCADA,0000000348376182
+I,DISPATCH,UNIT_SCADA,1,SETTLEMENTDATE,DUID,SCADAVALUE,LASTCHANGED
+D,DISPATCH,UNIT_SCADA,1,"2021/09/02 12:55:00",ADPBA1G,0,"2021/09/02 12:50:08"
+D,DISPATCH,UNIT_SCADA,1,"2021/09/02 12:55:00",ADPPV1,12.5,"2021/09/02 12:50:08"
+C,"END OF REPORT",4
+"""
+
+
+def _zip(members: dict[str, bytes]) -> bytes:
+    content = io.BytesIO()
+
+    with ZipFile(content, "w", ZIP_DEFLATED) as zf:
+        for name, member_content in members.items():
+            zf.writestr(name, member_content)
+
+    return content.getvalue()
+
+
+@pytest.fixture
+def nested_zip(tmp_path: Path) -> Path:
+    zip_path = tmp_path / "PUBLIC_DISPATCHSCADA_20210902.zip"
+    zip_path.write_bytes(
+        _zip(
+            {
+                "PUBLIC_DISPATCHSCADA_202109021255.zip": _zip({"PUBLIC_DISPATCHSCADA_202109021255.CSV": AEMO_MMS_CSV}),
+                "PUBLIC_DISPATCHSCADA_202109021300.zip": _zip({"PUBLIC_DISPATCHSCADA_202109021300.CSV": AEMO_MMS_CSV}),
+                "README.txt": b"readme",
+            }
+        )
+    )
+
+    return zip_path
+
+
+class _Response:
+    def __init__(self, content: bytes, status_code: int = 200) -> None:
+        self.content = content
+        self.status_code = status_code
+        self.ok = status_code < 400
+
+    def __enter__(self) -> "_Response":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        pass
+
+    def iter_content(self, chunk_size: int) -> list[bytes]:
+        return [self.content[i : i + chunk_size] for i in range(0, len(self.content), chunk_size)]
+
+
+def test_iter_file_members_nested(nested_zip: Path) -> None:
+    members = [(m.path, m.file_size, m.stream.read()) for m in iter_file_members(nested_zip)]
+
+    assert members == [
+        (
+            "PUBLIC_DISPATCHSCADA_20210902.zip/PUBLIC_DISPATCHSCADA_202109021255.zip/PUBLIC_DISPATCHSCADA_202109021255.CSV",
+            len(AEMO_MMS_CSV),
+            AEMO_MMS_CSV,
+        ),
+        (
+            "PUBLIC_DISPATCHSCADA_20210902.zip/PUBLIC_DISPATCHSCADA_202109021300.zip/PUBLIC_DISPATCHSCADA_202109021300.CSV",
+            len(AEMO_MMS_CSV),
+            AEMO_MMS_CSV,
+        ),
+        ("PUBLIC_DISPATCHSCADA_20210902.zip/README.txt", 6, b"readme"),
+    ]
+
+    assert file_opener(nested_zip) == AEMO_MMS_CSV * 2 + b"readme"
+
+
+def test_file_opener_plain_files(tmp_path: Path) -> None:
+    (tmp_path / "plain.csv").write_bytes(AEMO_MMS_CSV)
+    (tmp_path / "empty.csv").write_bytes(b"")
+
+    assert file_opener(tmp_path / "plain.csv") == AEMO_MMS_CSV
+    assert file_opener(tmp_path / "empty.csv") == b""
+
+
+def test_url_members_spooled(monkeypatch: pytest.MonkeyPatch, nested_zip: Path) -> None:
+    monkeypatch.setattr(downloader, "DOWNLOAD_SPOOL_MAX_BYTES", 64)
+    monkeypatch.setattr(downloader, "DOWNLOAD_CHUNK_SIZE", 100)
+    monkeypatch.setattr(downloader.http, "get", lambda url, verify, stream: _Response(nested_zip.read_bytes()))
+
+    url = "https://nemweb.com.au/Reports/Archive/DispatchIS_Reports/PUBLIC_DISPATCHSCADA_20210902.zip"
+
+    assert [m.name for m in iter_url_members(url)] == [
+        "PUBLIC_DISPATCHSCADA_202109021255.CSV",
+        "PUBLIC_DISPATCHSCADA_202109021300.CSV",
+        "README.txt",
+    ]
+    assert url_downloader(url) == AEMO_MMS_CSV * 2 + b"readme"
+
+    # members are parsed into one table set as they are streamed
+    table_set = mms.parse_aemo_url(url)
+
+    assert len(table_set.get_table("unit_scada").records) == 4
+
+
+def test_url_downloader_bad_response(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(downloader.http, "get", lambda url, verify, stream: _Response(b"", status_code=404))
+
+    with pytest.raises(Exception, match="Bad link returned 404"):
+        url_downloader("https://nemweb.com.au/missing.zip")
@@ -0,0 +1,115 @@
+"""
+Tests for the export execution engine in opennem.api.export.engine
+
+
+"""
+import threading
+from collections import Counter
+from datetime import datetime
+
+import pytest
+
+from opennem.api.export.controllers import NoResults
+from opennem.api.export.engine import ExportEngineException, ExportJob, ExportQuery, run_export_jobs
+from opennem.api.export.tasks import compose_energy_stat_set
+from opennem.api.stats.schema import OpennemDataSet
+from opennem.api.time import human_to_interval, human_to_period
+from opennem.controllers.output.schema import OpennemExportSeries
+from opennem.schema.network import NetworkNEM
+from tests.test_scada_factory import get_power_example
+
+_query_calls: Counter = Counter()
+_query_lock = threading.Lock()
+
+
+def stat_set_query(code: str, time_series: OpennemExportSeries | None = None) -> OpennemDataSet:
+    with _query_lock:
+        _query_calls[code] += 1
+
+    return OpennemDataSet(version="test", code=code, data=[])
+
+
+def no_results_query() -> None:
+    raise NoResults("nothing here")
+
+
+def get_time_series() -> OpennemExportSeries:
+    return OpennemExportSeries(
+        start=datetime.fromisoformat("2023-01-01T00:00:00+10:00"),
+        end=datetime.fromisoformat("2023-02-01T00:00:00+10:00"),
+        network=NetworkNEM,
+        interval=human_to_interval("1d"),
+        period=human_to_period("all"),
+    )
+
+
+def compose_codes(results: dict[str, OpennemDataSet | None]) -> OpennemDataSet | None:
+    if not results.get("primary"):
+        return None
+
+    return OpennemDataSet(version="test", code=",".join(r.code if r else "none" for r in results.values()), data=[])
+
+
+def test_export_query_key_matches_equal_arguments() -> None:
+    query = ExportQuery(stat_set_query, {"code": "NSW1", "time_series": get_time_series()})
+    query_same = ExportQuery(stat_set_query, {"time_series": get_time_series(), "code": "NSW1"})
+    query_other = ExportQuery(stat_set_query, {"code": "VIC1", "time_series": get_time_series()})
+
+    assert query.key == query_same.key
+    assert query.key != query_other.key
+
+
+def test_run_export_jobs_shares_queries() -> None:
+    _query_calls.clear()
+    written: dict[str, OpennemDataSet] = {}
+
+    jobs = [
+        ExportJob(
+            path=f"{region}.json",
+            inputs={
+                "primary": ExportQuery(stat_set_query, {"code": region, "time_series": get_time_series()}),
+                "shared": ExportQuery(stat_set_query, {"code": "cpi", "time_series": get_time_series()}),
+                "optional": ExportQuery(no_results_query),
+            },
+            compose=compose_codes,
+        )
+        for region in ["NSW1", "QLD1", "VIC1"]
+    ]
+
+    outputs = run_export_jobs(jobs, max_workers=2, writer=written.__setitem__)
+
+    assert outputs == 3
+    assert _query_calls == {"NSW1": 1, "QLD1": 1, "VIC1": 1, "cpi": 1}, "Shared query runs once"
+    assert written["QLD1.json"].code == "QLD1,cpi,none", "Failed optional input is passed as None"
+
+
+def test_run_export_jobs_skips_and_reports_failures() -> None:
+    written: dict[str, OpennemDataSet] = {}
+
+    def bad_writer(path: str, stat_set: OpennemDataSet) -> None:
+        if path == "bad.json":
+            raise Exception("write failed")
+
+        written[path] = stat_set
+
+    jobs = [
+        ExportJob(path="empty.json", inputs={"primary": ExportQuery(no_results_query)}, compose=compose_codes),
+        ExportJob(path="bad.json", inputs={"primary": ExportQuery(stat_set_query, {"code": "a"})}, compose=compose_codes),
+        ExportJob(path="good.json", inputs={"primary": ExportQuery(stat_set_query, {"code": "b"})}, compose=compose_codes),
+    ]
+
+    with pytest.raises(ExportEngineException, match="bad.json"):
+        run_export_jobs(jobs, max_workers=2, writer=bad_writer)
+
+    assert list(written) == ["good.json"], "Other outputs are still written"
+
+
+def test_compose_energy_stat_set_does_not_modify_shared_results() -> None:
+    energy = OpennemDataSet(version="test", code="energy", data=[])
+    demand = get_power_example()
+
+    stat_set = compose_energy_stat_set({"energy": energy, "demand": demand, "weather": None})
+
+    assert stat_set is not None
+    assert len(stat_set.data) == len(demand.data)
+    assert energy.data == [], "Shared energy result is not appended to"
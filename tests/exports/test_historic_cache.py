@@ -0,0 +1,167 @@
+"""
+Tests for the historic weekly export cache in opennem.exporter.historic_cache
+
+
+"""
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from opennem.exporter import historic, historic_cache
+from opennem.exporter.historic_cache import HistoricWeek, HistoricWeekCache
+from opennem.exporter.manifest import LocalExportManifest
+from opennem.schema.network import NetworkNEM
+
+NEM_TZ = NetworkNEM.get_fixed_offset()
+
+
+def _week(week_start: datetime) -> HistoricWeek:
+    return HistoricWeek("NEM", "NSW1", week_start, week_start + timedelta(days=6))
+
+
+def test_historic_week_key_and_path() -> None:
+    week = _week(datetime(2023, 1, 9, tzinfo=NEM_TZ))
+
+    assert week.week_number == 3
+    assert week.key == "historic:NEM:NSW1:2023:3"
+    assert week.path == "v3/stats/historic/weekly/NEM/NSW1/year/2023/week/3.json"
+
+
+@pytest.mark.parametrize(
+    ["last_complete_day", "is_final"],
+    [
+        (datetime(2023, 1, 16, tzinfo=NEM_TZ), True),
+        (datetime(2023, 1, 15, tzinfo=NEM_TZ), False),
+        (datetime(2023, 1, 10, tzinfo=NEM_TZ), False),
+    ],
+)
+def test_historic_week_is_final(last_complete_day: datetime, is_final: bool) -> None:
+    assert _week(datetime(2023, 1, 9, tzinfo=NEM_TZ)).is_final(last_complete_day) is is_final
+
+
+def test_historic_week_cache_watermark(tmp_path: Path) -> None:
+    week_cache = HistoricWeekCache(LocalExportManifest(tmp_path / "manifest.json"))
+    week = _week(datetime(2023, 1, 9, tzinfo=NEM_TZ))
+    watermark = datetime(2023, 1, 16, 4, 5, tzinfo=NEM_TZ)
+
+    assert not week_cache.is_current(week, watermark)
+
+    week_cache.mark_final(week, watermark)
+
+    assert week_cache.is_current(week, watermark)
+    assert not week_cache.is_current(week, watermark + timedelta(minutes=5))
+    assert not week_cache.is_current(week, None)
+
+
+class _FakeRegion:
+    def __init__(self, code: str) -> None:
+        self.code = code
+
+
+class _FakeQuery:
+    def filter(self, *args: Any) -> "_FakeQuery":
+        return self
+
+    def all(self) -> list[_FakeRegion]:
+        return [_FakeRegion("NSW1")]
+
+
+class _FakeSession:
+    def query(self, *args: Any) -> _FakeQuery:
+        return _FakeQuery()
+
+
+def test_export_historic_intervals_skips_unchanged_weeks(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    week_cache = HistoricWeekCache(LocalExportManifest(tmp_path / "manifest.json"))
+    last_complete_day = datetime(2023, 1, 18, tzinfo=NEM_TZ)
+    watermarks = {
+        datetime(2023, 1, 9).date(): datetime(2023, 1, 16, 4, tzinfo=NEM_TZ),
+        datetime(2023, 1, 2).date(): datetime(2023, 1, 9, 4, tzinfo=NEM_TZ),
+        datetime(2023, 1, 16).date(): datetime(2023, 1, 18, tzinfo=NEM_TZ),
+    }
+    exported: list[datetime] = []
+
+    def _export_week(week_start: datetime, week_cache: HistoricWeekCache | None = None, **kwargs: Any) -> int:
+        exported.append(week_start)
+        week = HistoricWeek("NEM", "NSW1", week_start, kwargs["week_end"])
+
+        if week_cache and week.is_final(last_complete_day):
+            week_cache.mark_final(week, kwargs["watermark"])
+
+        return 1
+
+    monkeypatch.setattr(historic, "get_scoped_session", _FakeSession)
+    monkeypatch.setattr(historic, "get_historic_week_cache", lambda: week_cache)
+    monkeypatch.setattr(historic, "get_historic_week_watermarks", lambda *args, **kwargs: watermarks)
+    monkeypatch.setattr(historic, "get_last_complete_day_for_network", lambda network: last_complete_day)
+    monkeypatch.setattr(historic, "export_network_intervals_for_week", _export_week)
+
+    # skip the task profiler which logs to the database
+    export_historic_intervals = historic.export_historic_intervals.__wrapped__
+
+    export_historic_intervals(limit=3, networks=[NetworkNEM], max_workers=2)
+
+    assert len(exported) == 3
+
+    # closed weeks are skipped, the open week is rebuilt
+    exported.clear()
+    export_historic_intervals(limit=3, networks=[NetworkNEM], max_workers=2)
+
+    assert exported == [datetime(2023, 1, 16, tzinfo=NEM_TZ)]
+
+    # data changed in a closed week
+    exported.clear()
+    watermarks[datetime(2023, 1, 2).date()] = datetime(2023, 1, 17, tzinfo=NEM_TZ)
+    export_historic_intervals(limit=3, networks=[NetworkNEM], max_workers=2)
+
+    assert sorted(exported) == [datetime(2023, 1, 2, tzinfo=NEM_TZ), datetime(2023, 1, 16, tzinfo=NEM_TZ)]
+
+    exported.clear()
+    export_historic_intervals(limit=3, networks=[NetworkNEM], force=True, max_workers=2)
+
+    assert len(exported) == 3
+
+
+def test_historic_week_watermarks_include_derived_tables(monkeypatch: pytest.MonkeyPatch) -> None:
+    week_one, week_two = date(2023, 1, 2), date(2023, 1, 9)
+    updated = datetime(2023, 1, 16, 4, tzinfo=NEM_TZ)
+    tables: dict[str, dict[date, tuple]] = {
+        "crawl_history": {week_one: (updated,), week_two: (updated,)},
+        "at_network_flows": {week_one: (2016, Decimal("10.5"), Decimal("10.5"), Decimal("3.2"), Decimal("3.2"))},
+        "bom_observation": {week_one: (336, Decimal("6720.0"), Decimal("6500.0"))},
+    }
+    facilities_updated = datetime(2023, 1, 1, tzinfo=NEM_TZ)
+
+    def _query_week_rows(query: str, **params: Any) -> dict[date, tuple]:
+        return next(rows for table, rows in tables.items() if f"from {table}" in query)
+
+    monkeypatch.setattr(historic_cache, "_query_week_rows", _query_week_rows)
+    monkeypatch.setattr(historic_cache, "_get_facilities_updated", lambda network_ids: facilities_updated)
+
+    def _watermarks() -> dict[date, str]:
+        return historic_cache.get_historic_week_watermarks(NetworkNEM, datetime(2023, 1, 2), datetime(2023, 1, 16))
+
+    watermarks = _watermarks()
+
+    assert watermarks.keys() == {week_one, week_two}
+    assert watermarks == _watermarks(), "Watermarks are stable"
+
+    # flows recomputed for the first week
+    tables["at_network_flows"][week_one] = (2016, Decimal("10.5"), Decimal("10.5"), Decimal("3.4"), Decimal("3.4"))
+    flows_changed = _watermarks()
+
+    assert flows_changed[week_one] != watermarks[week_one]
+    assert flows_changed[week_two] == watermarks[week_two]
+
+    # weather observations backfilled
+    tables["bom_observation"][week_two] = (12, Decimal("240.0"), Decimal("230.0"))
+
+    assert _watermarks()[week_two] != watermarks[week_two]
+
+    # emission factors updated applies to every week
+    facilities_updated = datetime(2023, 1, 17, tzinfo=NEM_TZ)
+
+    assert not set(_watermarks().values()) & set(flows_changed.values())
@@ -0,0 +1,147 @@
+"""
+Tests for incremental exports in opennem.api.export.incremental
+
+
+"""
+from datetime import datetime, timedelta
+
+from opennem.api.export.engine import ExportJob, ExportQuery
+from opennem.api.export.incremental import (
+    IncrementalExport,
+    get_incremental_start,
+    get_incremental_time_series,
+    patch_stat_set,
+)
+from opennem.api.export.tasks import compose_energy_stat_set
+from opennem.api.stats.controllers import stats_factory
+from opennem.api.stats.schema import DataQueryResult, OpennemDataSet
+from opennem.api.time import human_to_interval, human_to_period
+from opennem.controllers.output.schema import OpennemExportSeries
+from opennem.core.units import get_unit
+from opennem.schema.network import NetworkNEM
+
+YEAR_START = datetime.fromisoformat("2023-01-01 00:00:00")
+
+
+def get_energy_set(day_start: int, day_end: int, values: dict[str, list[float | None]]) -> OpennemDataSet:
+    """Energy set with a daily series per fueltech for the days from day_start to day_end inclusive"""
+    stats = [
+        DataQueryResult(interval=YEAR_START + timedelta(days=day), result=fueltech_values[day], group_by=fueltech)
+        for fueltech, fueltech_values in values.items()
+        for day in range(day_start, day_end + 1)
+    ]
+
+    return stats_factory(
+        stats,
+        network=NetworkNEM,
+        interval=human_to_interval("1d"),
+        units=get_unit("energy_giga"),
+        region="NSW1",
+        fueltech_group=True,
+    )
+
+
+def get_series_histories(stat_set: OpennemDataSet) -> dict[str, tuple]:
+    return {i.id: (i.history.start, i.history.last, i.history.data) for i in stat_set.data}
+
+
+def test_patch_stat_set_matches_full_rebuild() -> None:
+    values_previous = {
+        "coal_black": [10.5 + i for i in range(10)],
+        "solar_utility": [None, None, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0, 1.0],
+    }
+
+    # last day was incomplete when previously exported and two more days have since completed
+    values_current = {
+        "coal_black": values_previous["coal_black"][:9] + [30.0, 31.0, 32.0],
+        "solar_utility": values_previous["solar_utility"][:9] + [None, 2.5, None],
+    }
+
+    previous = get_energy_set(0, 9, values_previous)
+    full_rebuild = get_energy_set(0, 11, values_current)
+
+    start = get_incremental_start(previous, 2023)
+
+    assert start is not None
+    assert start.date() == (YEAR_START + timedelta(days=9)).date()
+
+    patch = get_energy_set(9, 11, values_current)
+
+    patched = patch_stat_set(previous, patch, start)
+
+    assert patched is not None
+    assert get_series_histories(patched) == get_series_histories(full_rebuild)
+
+
+def test_patch_stat_set_fallback_on_new_series() -> None:
+    previous = get_energy_set(0, 4, {"coal_black": [1.0] * 5})
+    patch = get_energy_set(4, 5, {"coal_black": [1.0] * 6, "wind": [2.0] * 6})
+
+    start = get_incremental_start(previous, 2023)
+
+    assert start is not None
+    assert patch_stat_set(previous, patch, start) is None, "New series requires a full rebuild"
+
+
+def test_incremental_start_requires_same_year() -> None:
+    previous = get_energy_set(0, 4, {"coal_black": [1.0] * 5})
+
+    assert get_incremental_start(previous, 2024) is None
+
+
+def test_incremental_time_series() -> None:
+    time_series = OpennemExportSeries(
+        start=datetime.fromisoformat("2023-01-01T00:00:00+10:00"),
+        end=datetime.fromisoformat("2023-03-15T10:35:00+10:00"),
+        network=NetworkNEM,
+        year=2023,
+        interval=human_to_interval("1d"),
+        period=human_to_period("1Y"),
+    )
+
+    incremental_time_series = get_incremental_time_series(time_series, datetime.fromisoformat("2023-03-13T00:00:00+10:00"))
+
+    assert incremental_time_series.year is None
+    assert incremental_time_series.start.isoformat() == "2023-03-13T00:00:00+10:00"
+    assert incremental_time_series.end.isoformat() == "2023-03-14T23:59:59+10:00"
+
+    date_range = incremental_time_series.get_range()
+
+    assert date_range.start.isoformat() == "2023-03-13T00:00:00+10:00", "Query range starts at the incremental start"
+    assert date_range.end.date().isoformat() == "2023-03-14"
+    assert time_series.year == 2023, "Original time series is unchanged"
+
+
+def test_incremental_export_job_and_rebuild() -> None:
+    previous = get_energy_set(0, 4, {"coal_black": [1.0] * 5})
+    time_series = OpennemExportSeries(
+        start=datetime.fromisoformat("2023-01-05T00:00:00+10:00"),
+        end=datetime.fromisoformat("2023-01-06T23:59:59+10:00"),
+        network=NetworkNEM,
+        interval=human_to_interval("1d"),
+    )
+    time_series_full = time_series.copy(update={"year": 2023})
+
+    full_job = ExportJob(
+        path="v3/stats/au/NEM/NSW1/energy/2023.json",
+        inputs={
+            "energy": ExportQuery(get_energy_set, {"time_series": time_series_full, "day_start": 0}),
+            "cpi": ExportQuery(OpennemDataSet, {"version": "test"}),
+        },
+        compose=compose_energy_stat_set,
+    )
+
+    incremental_export = IncrementalExport(full_job=full_job, previous=previous, time_series=time_series)
+    job = incremental_export.job
+
+    assert job.inputs["energy"].kwargs == {"time_series": time_series, "day_start": 0}
+    assert job.inputs["cpi"] is full_job.inputs["cpi"], "Queries without a time series are unchanged"
+
+    patched = job.compose({"energy": get_energy_set(4, 5, {"coal_black": [2.0] * 6})})
+
+    assert patched is not None
+    assert patched.data[0].history.data == [1.0, 1.0, 1.0, 1.0, 2.0, 2.0]
+    assert not incremental_export.needs_rebuild
+
+    assert job.compose({"energy": get_energy_set(4, 5, {"wind": [2.0] * 6})}) is None
+    assert incremental_export.needs_rebuild
@@ -0,0 +1,195 @@
+"""
+Tests for export write skipping in opennem.exporter.manifest
+
+
+"""
+import gzip
+import io
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from opennem import settings
+from opennem.api.export.incremental import load_exported_stat_set
+from opennem.api.stats.schema import OpennemDataSet
+from opennem.api.stats.serialize import serialize_stat_set, stat_set_content_hash
+from opennem.exporter import aws, local, manifest
+from opennem.exporter.manifest import (
+    ExportManifest,
+    LocalExportManifest,
+    content_hash,
+    encode_export_content,
+    export_encoding_mode,
+    get_export_manifest,
+    get_export_write_stats,
+)
+from tests.test_scada_factory import get_power_example
+
+
+class FakeS3Object:
+    """In memory stand in for a boto3 s3 object"""
+
+    def __init__(self, store: dict[str, dict], key: str) -> None:
+        self.store = store
+        self.key = key
+
+    def put(self, Body: bytes, ContentType: str, ContentEncoding: str | None = None) -> dict:
+        self.store[self.key] = {"Body": Body, "ContentType": ContentType, "ContentEncoding": ContentEncoding}
+        return {"ResponseMetadata": {"HTTPStatusCode": 200}}
+
+    def get(self) -> dict:
+        stored = self.store[self.key]
+        response: dict[str, Any] = {"Body": io.BytesIO(stored["Body"]), "ContentType": stored["ContentType"]}
+
+        if stored["ContentEncoding"]:
+            response["ContentEncoding"] = stored["ContentEncoding"]
+
+        return response
+
+
+class FakeS3Bucket:
+    def __init__(self, store: dict[str, dict]) -> None:
+        self.store = store
+
+    def Object(self, key: str) -> FakeS3Object:
+        return FakeS3Object(self.store, key)
+
+
+@pytest.fixture
+def local_manifest(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> LocalExportManifest:
+    export_manifest = LocalExportManifest(tmp_path / "manifest.json")
+
+    monkeypatch.setattr(settings, "export_manifest", "local")
+    monkeypatch.setattr(manifest, "_export_manifest", export_manifest)
+    monkeypatch.setattr(type(settings), "_static_folder_path", str(tmp_path))
+
+    return export_manifest
+
+
+def test_local_manifest_unchanged_length(tmp_path: Path) -> None:
+    export_manifest = LocalExportManifest(tmp_path / "manifest.json")
+    export_manifest.record("s3:bucket/a.json", "abc", "identity", 120)
+
+    assert export_manifest.unchanged_length("s3:bucket/a.json", "abc", "identity") == 120
+    assert export_manifest.unchanged_length("s3:bucket/a.json", "abd", "identity") is None, "Changed content"
+    assert export_manifest.unchanged_length("s3:bucket/a.json", "abc", "gzip>=1024") is None, "Changed encoding mode"
+    assert export_manifest.unchanged_length("s3:bucket/b.json", "abc", "identity") is None
+
+    # entries persist
+    assert LocalExportManifest(tmp_path / "manifest.json").get("s3:bucket/a.json") == "identity:abc:120"
+
+
+def test_encode_export_content(monkeypatch: pytest.MonkeyPatch) -> None:
+    content = '{"data": [' + ", ".join(["1.5"] * 1000) + "]}"
+
+    monkeypatch.setattr(settings, "export_gzip_min_bytes", 0)
+    assert encode_export_content(content) == (content.encode("utf-8"), None)
+    assert export_encoding_mode() == "identity"
+
+    monkeypatch.setattr(settings, "export_gzip_min_bytes", 1024)
+    body, content_encoding = encode_export_content(content)
+
+    assert content_encoding == "gzip"
+    assert gzip.decompress(body).decode("utf-8") == content
+    assert encode_export_content(content)[0] == body, "gzip output is deterministic"
+    assert encode_export_content("{}") == (b"{}", None), "Small content is not encoded"
+
+
+@pytest.mark.parametrize("indent", [None, 4])
+def test_stat_set_content_hash_ignores_created_at(indent: int | None) -> None:
+    def _hash(stat_set: OpennemDataSet) -> str:
+        return stat_set_content_hash(stat_set, serialize_stat_set(stat_set, exclude_unset=True, indent=indent))
+
+    stat_set = get_power_example()
+    digest = _hash(stat_set)
+
+    stat_set.created_at = datetime.now() + timedelta(hours=1)
+    assert _hash(stat_set) == digest
+
+    stat_set.data[0].history.data[0] = 1000.5
+    assert _hash(stat_set) != digest
+
+
+def test_write_to_local_skips_unchanged(local_manifest: LocalExportManifest, tmp_path: Path) -> None:
+    stats_start = get_export_write_stats()
+
+    assert local.write_to_local("v3/test.json", '{"a": 1}') == 8
+    assert local.write_to_local("v3/test.json", '{"a": 1}') == 8
+    assert local.write_to_local("v3/test.json", '{"a": 2}') == 8
+
+    stats_end = get_export_write_stats()
+
+    assert stats_end.written - stats_start.written == 2
+    assert stats_end.skipped - stats_start.skipped == 1
+    assert local_manifest.get("local:v3/test.json") == "identity:" + content_hash('{"a": 2}') + ":8"
+
+    # removed outputs are rewritten
+    (tmp_path / "v3" / "test.json").unlink()
+
+    assert local.write_to_local("v3/test.json", '{"a": 2}') == 8
+    assert (tmp_path / "v3" / "test.json").read_text() == '{"a": 2}'
+
+
+def test_write_statset_to_local_skips_unchanged_data(
+    local_manifest: LocalExportManifest, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    serialized: list[str] = []
+
+    def _serialize_stat_set(*args: Any, **kwargs: Any) -> str:
+        serialized.append(content := serialize_stat_set(*args, **kwargs))
+        return content
+
+    monkeypatch.setattr(local, "serialize_stat_set", _serialize_stat_set)
+
+    stat_set = get_power_example()
+
+    bytes_written = local.write_statset_to_local(stat_set, "v3/power.json", exclude_unset=True)
+    written_content = (tmp_path / "v3" / "power.json").read_text()
+
+    # a rebuilt set with the same data only differs in created_at
+    stat_set.created_at = datetime.now() + timedelta(hours=1)
+    stats_start = get_export_write_stats()
+
+    assert local.write_statset_to_local(stat_set, "v3/power.json", exclude_unset=True) == bytes_written
+    assert get_export_write_stats().skipped - stats_start.skipped == 1
+    assert (tmp_path / "v3" / "power.json").read_text() == written_content
+    assert len(serialized) == 2, "Each write serializes the data set once"
+
+
+def test_export_manifest_disabled_by_default(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "export_manifest", type(settings).__fields__["export_manifest"].default)
+    monkeypatch.setattr(manifest, "_export_manifest", None)
+
+    assert get_export_manifest() is None
+
+
+def test_export_manifest_is_abstract() -> None:
+    with pytest.raises(TypeError):
+        ExportManifest()  # type: ignore
+
+
+def test_s3_gzip_export_round_trip(monkeypatch: pytest.MonkeyPatch) -> None:
+    store: dict[str, dict] = {}
+
+    class FakeS3Resource:
+        def Bucket(self, name: str) -> FakeS3Bucket:
+            return FakeS3Bucket(store)
+
+    monkeypatch.setattr(aws.boto3, "resource", lambda service: FakeS3Resource())
+    monkeypatch.setattr(settings, "s3_bucket_path", "data.test.opennem.org.au")
+    monkeypatch.setattr(settings, "export_local", False)
+    monkeypatch.setattr(settings, "export_manifest", None)
+    monkeypatch.setattr(settings, "export_gzip_min_bytes", 128)
+
+    stat_set = get_power_example()
+    content = stat_set.json(exclude_unset=True)
+
+    assert aws._put_to_s3("v3/power.json", content) > 0
+    assert store["v3/power.json"]["ContentEncoding"] == "gzip"
+
+    loaded = load_exported_stat_set("/v3/power.json")
+
+    assert loaded is not None, "Gzipped export loads rather than falling back to a rebuild"
+    assert loaded.json(exclude_unset=True) == content
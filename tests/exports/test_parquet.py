@@ -0,0 +1,136 @@
+"""
+Tests for the bulk parquet exports in opennem.exporter.parquet
+
+
+"""
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from opennem import settings
+from opennem.exporter import manifest, parquet
+from opennem.exporter.local import write_bytes_to_local
+from opennem.exporter.manifest import LocalExportManifest
+from opennem.exporter.parquet import (
+    PARQUET_TABLES,
+    ExporterParquetException,
+    ParquetPartition,
+    get_parquet_export_start,
+    get_parquet_partitions,
+)
+from opennem.schema.network import NetworkNEM, NetworkSchema, NetworkWEM
+
+NEM_TZ = NetworkNEM.get_fixed_offset()
+
+
+@pytest.fixture
+def local_manifest(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> LocalExportManifest:
+    export_manifest = LocalExportManifest(tmp_path / "manifest.json")
+
+    monkeypatch.setattr(settings, "export_manifest", "local")
+    monkeypatch.setattr(manifest, "_export_manifest", export_manifest)
+    monkeypatch.setattr(type(settings), "_static_folder_path", str(tmp_path))
+
+    return export_manifest
+
+
+def test_parquet_partitions_monthly() -> None:
+    partitions = get_parquet_partitions(
+        PARQUET_TABLES["facility_scada"], NetworkNEM, datetime(2022, 11, 15, 3, 0), datetime(2023, 2, 1, 0, 0)
+    )
+
+    assert [(p.date_start, p.date_end) for p in partitions] == [
+        (datetime(2022, 11, 1, tzinfo=NEM_TZ), datetime(2022, 12, 1, tzinfo=NEM_TZ)),
+        (datetime(2022, 12, 1, tzinfo=NEM_TZ), datetime(2023, 1, 1, tzinfo=NEM_TZ)),
+        (datetime(2023, 1, 1, tzinfo=NEM_TZ), datetime(2023, 2, 1, tzinfo=NEM_TZ)),
+        (datetime(2023, 2, 1, tzinfo=NEM_TZ), datetime(2023, 3, 1, tzinfo=NEM_TZ)),
+    ]
+
+    assert partitions[0].path == f"{settings.parquet_export_path}/facility_scada/network=NEM/month=2022-11/part-0.parquet"
+
+
+def test_parquet_partitions_yearly_network_time() -> None:
+    # 2022-12-31 15:00 UTC is 2023-01-01 in NEM time
+    partitions = get_parquet_partitions(
+        PARQUET_TABLES["at_facility_daily"],
+        NetworkNEM,
+        datetime.fromisoformat("2022-12-31T15:00:00+00:00"),
+        datetime.fromisoformat("2023-06-01T00:00:00+00:00"),
+    )
+
+    assert len(partitions) == 1
+    assert partitions[0].date_start == datetime(2023, 1, 1, tzinfo=NEM_TZ)
+    assert partitions[0].path.endswith("at_facility_daily/network=NEM/year=2023/part-0.parquet")
+
+
+def test_write_bytes_to_local_skips_unchanged(local_manifest: LocalExportManifest, tmp_path: Path) -> None:
+    content = bytes(range(256)) * 4
+
+    assert write_bytes_to_local("parquet/test.parquet", content) == 1024
+    assert (tmp_path / "parquet" / "test.parquet").read_bytes() == content
+
+    (tmp_path / "parquet" / "test.parquet").write_bytes(b"")
+
+    # unchanged content isn't rewritten
+    assert write_bytes_to_local("parquet/test.parquet", content) == 1024
+    assert (tmp_path / "parquet" / "test.parquet").read_bytes() == b""
+
+
+def test_export_parquet_requires_pyarrow(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(parquet, "HAVE_PYARROW", False)
+
+    with pytest.raises(ExporterParquetException):
+        parquet.export_parquet.__wrapped__(networks=[NetworkNEM])
+
+
+@pytest.mark.parametrize("network", [NetworkNEM, NetworkWEM])
+def test_get_parquet_export_start_network_time(network: NetworkSchema) -> None:
+    start = get_parquet_export_start(2, network)
+
+    assert start.utcoffset() == network.get_fixed_offset().utcoffset(None)
+    assert abs(start - (datetime.now(network.get_fixed_offset()) - timedelta(days=2))) < timedelta(minutes=1)
+
+
+def test_export_parquet_partition(local_manifest: LocalExportManifest, monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    pyarrow_parquet = pytest.importorskip("pyarrow.parquet")
+
+    rows = [
+        (datetime(2023, 3, 1, 0, 5, tzinfo=NEM_TZ), "NEM", "BW01", False, 650.5, None, 0.0),
+        (datetime(2023, 3, 1, 0, 5, tzinfo=NEM_TZ), "NEM", "BW02", False, 640.0, 53.3, 0.0),
+        (datetime(2023, 3, 1, 0, 10, tzinfo=NEM_TZ), "NEM", "BW01", False, None, None, 0.0),
+    ]
+
+    monkeypatch.setattr(parquet, "_iter_partition_batches", lambda partition: iter([rows[:2], rows[2:]]))
+
+    partition = get_parquet_partitions(PARQUET_TABLES["facility_scada"], NetworkNEM, datetime(2023, 3, 1), datetime(2023, 3, 2))[
+        0
+    ]
+
+    assert isinstance(partition, ParquetPartition)
+    assert parquet.export_parquet_partition(partition, is_local=True) > 0
+
+    parquet_file = pyarrow_parquet.ParquetFile(tmp_path / partition.path)
+
+    assert parquet_file.metadata.num_rows == 3
+    assert parquet_file.metadata.num_row_groups == 2, "A row group per batch"
+    assert parquet_file.metadata.row_group(0).column(0).compression == "ZSTD"
+    assert parquet_file.metadata.row_group(0).column(0).statistics.has_min_max
+
+    table = parquet_file.read()
+
+    assert table.schema.field("facility_code").type.value_type == "string"
+    assert table.column("facility_code").to_pylist() == ["BW01", "BW02", "BW01"]
+    assert table.column("generated").to_pylist() == [650.5, 640.0, None]
+
+
+def test_export_parquet_partition_without_rows(monkeypatch: pytest.MonkeyPatch) -> None:
+    pytest.importorskip("pyarrow.parquet")
+
+    monkeypatch.setattr(parquet, "_iter_partition_batches", lambda partition: iter([]))
+
+    partition = get_parquet_partitions(PARQUET_TABLES["facility_scada"], NetworkNEM, datetime(2023, 3, 1), datetime(2023, 3, 2))[
+        0
+    ]
+
+    assert parquet.export_parquet_partition(partition, is_local=True) == 0
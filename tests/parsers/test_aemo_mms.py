@@ -1,4 +1,17 @@
-from opennem.core.parsers.aemo.mms import parse_aemo_mms_csv
+import io
+from datetime import datetime
+from zipfile import ZipFile
+
+import numpy as np
+import pytest
+
+from opennem.core.parsers.aemo.mms import (
+    AEMOTableSchema,
+    AEMOTableSet,
+    parse_aemo_mms_csv,
+    parse_aemo_mms_stream,
+    parse_aemo_mms_zip,
+)
 
 
 def test_parse_aemo_mms_dispatch_scada(aemo_nemweb_dispatch_scada: str) -> None:
@@ -24,3 +37,162 @@ def test_parse_aemo_mms_dispatch_scada(aemo_nemweb_dispatch_scada: str) -> None:
         raise Exception("Invalid record")
 
     # assert record.settlementdate, "Record has settlement date"  # type: ignore
+
+
+AEMO_MMS_UNIT_SCADA_CSV = b"""C,NEMP.WORLD,DISPATCHSCADA,AEMO,PUBLIC,2021/09/02,12:50:17,0000000348376188,DISPATCHSCADA,0000000348376182
+I,DISPATCH,UNIT_SCADA,1,SETTLEMENTDATE,DUID,SCADAVALUE,LASTCHANGED
+D,DISPATCH,UNIT_SCADA,1,"2021/09/02 12:55:00",ADPBA1G,0,"2021/09/02 12:50:08"
+D,DISPATCH,UNIT_SCADA,1,"2021/09/02 12:55:00",ADPPV1,12.5,"2021/09/02 12:50:08"
+D,DISPATCH,UNIT_SCADA,1,"2021/09/02 12:55:00",AGLHAL,,"2021/09/02 12:50:08"
+D,DISPATCH,UNIT_SCADA,1,"2021/09/02 12:55:00",MALFORMED
+I,DISPATCH,INTERCONNECTORRES,3,SETTLEMENTDATE,INTERCONNECTORID,MWFLOW
+D,DISPATCH,INTERCONNECTORRES,3,"2021/09/02 12:55:00",N-Q-MNSP1,-25.1
+C,"END OF REPORT",8
+"""
+
+
+@pytest.mark.parametrize("batch_size,num_batches", [(1, 4), (2, 3), (1000, 2)])
+def test_parse_aemo_mms_stream_batches(batch_size: int, num_batches: int) -> None:
+    batches = list(parse_aemo_mms_stream(io.BytesIO(AEMO_MMS_UNIT_SCADA_CSV), batch_size=batch_size))
+
+    assert len(batches) == num_batches, "Has correct number of batches"
+    assert all(len(i) <= batch_size for i in batches), "Batches are bounded by batch size"
+
+    scada_batches = [i for i in batches if i.full_name == "dispatch_unit_scada"]
+
+    assert sum(len(i) for i in scada_batches) == 3, "Skips malformed rows"
+
+    duids = np.concatenate([i.columns["duid"] for i in scada_batches])
+    scada_values = np.concatenate([i.columns["scadavalue"] for i in scada_batches])
+
+    assert list(duids) == ["ADPBA1G", "ADPPV1", "AGLHAL"]
+    assert scada_batches[0].columns["settlementdate"][0] == datetime.fromisoformat("2021-09-02T12:55:00+10:00")
+    assert scada_values.dtype == np.float64, "Numeric columns are typed"
+    assert scada_values[1] == 12.5
+    assert np.isnan(scada_values[2]), "Blank numeric values are nan"
+
+
+def test_parse_aemo_mms_stream_namespace_filter() -> None:
+    fh = io.BytesIO(AEMO_MMS_UNIT_SCADA_CSV)
+    batches = list(parse_aemo_mms_stream(fh, namespace_filter=["trading"]))
+
+    assert not batches, "Filtered out all tables"
+    assert not fh.closed, "Does not close the callers stream"
+
+
+def test_parse_aemo_mms_zip_nested() -> None:
+    inner = io.BytesIO()
+
+    with ZipFile(inner, "w") as zf:
+        zf.writestr("PUBLIC_DISPATCHSCADA_202109021255.CSV", AEMO_MMS_UNIT_SCADA_CSV)
+
+    outer = io.BytesIO()
+
+    with ZipFile(outer, "w") as zf:
+        zf.writestr("PUBLIC_DISPATCHSCADA_202109021255.zip", inner.getvalue())
+        zf.writestr("PUBLIC_DISPATCHSCADA_202109021300.CSV", AEMO_MMS_UNIT_SCADA_CSV)
+
+    outer.seek(0)
+
+    batches = [i for i in parse_aemo_mms_zip(outer) if i.name == "unit_scada"]
+
+    assert sum(len(i) for i in batches) == 6, "Reads records from nested zip members"
+
+
+def test_parse_aemo_mms_csv_table_store() -> None:
+    table_set = parse_aemo_mms_csv(AEMO_MMS_UNIT_SCADA_CSV.decode("utf-8"))
+
+    assert table_set.table_names == ["dispatch_unit_scada", "dispatch_interconnectorres"]
+
+    table = table_set.get_table("unit_scada")
+
+    assert table, "Has table"
+    assert len(table.records) == 3, "Table has correct number of records"
+
+    record = table.records[0]
+
+    assert record["duid"] == "ADPBA1G"
+    assert record["settlementdate"] == datetime.fromisoformat("2021-09-02T12:55:00+10:00")
+    assert [i["duid"] for i in table.records] == ["ADPBA1G", "ADPPV1", "AGLHAL"]
+
+    df = table.to_frame()
+
+    assert list(df.columns) == table.fieldnames
+    assert df.scadavalue.dtype == np.float64
+
+
+def test_aemo_table_set_merges_chunks() -> None:
+    table_set = parse_aemo_mms_csv(AEMO_MMS_UNIT_SCADA_CSV)
+    table_set = parse_aemo_mms_csv(io.BytesIO(AEMO_MMS_UNIT_SCADA_CSV), table_set=table_set)
+
+    table = table_set.get_table("unit_scada")
+
+    assert table, "Has table"
+    assert len(table_set.tables) == 2, "Tables are merged across files"
+    assert len(table.records) == 6, "Records are merged across files"
+    assert table.store.num_chunks == 2, "Merging only appends chunks"
+
+    columns = table.store.columns()
+
+    assert len(columns["duid"]) == 6
+    assert table.store.num_chunks == 1, "Chunks are concatenated on read"
+
+
+AEMO_MMS_TEXT_CODES_CSV = b"""C,NEMP.WORLD,DISPATCHSCADA,AEMO,PUBLIC,2021/09/02,12:50:17,0000000348376188,DISPATCHSCADA,0000000348376182
+I,DISPATCH,CODES,1,SETTLEMENTDATE,CODE,VALUE
+D,DISPATCH,CODES,1,"2021/09/02 12:55:00",01,1
+D,DISPATCH,CODES,1,"2021/09/02 12:55:00",002,2
+D,DISPATCH,CODES,1,"2021/09/02 12:55:00",A3,
+C,"END OF REPORT",3
+"""
+
+
+def test_parse_aemo_mms_column_types_from_schema() -> None:
+    batches = list(parse_aemo_mms_stream(io.BytesIO(AEMO_MMS_TEXT_CODES_CSV), batch_size=2))
+
+    assert [i.columns["code"].dtype for i in batches] == [object, object], "Same column type in every batch"
+    assert list(np.concatenate([i.columns["code"] for i in batches])) == ["01", "002", "A3"], "Keeps leading zeros"
+    assert batches[0].columns["value"].dtype == object, "Tables without a schema have no numeric fields"
+
+
+def test_aemo_table_records_missing_numeric_values() -> None:
+    table_set = parse_aemo_mms_csv(AEMO_MMS_UNIT_SCADA_CSV)
+    table = table_set.get_table("unit_scada")
+
+    assert table, "Has table"
+    assert [i["scadavalue"] for i in table.records] == [0.0, 12.5, None], "Missing numerics are None"
+    assert table.records[2]["scadavalue"] is None
+    assert table.records[1]["scadavalue"] == 12.5
+    assert table.to_frame().scadavalue.isna().sum() == 1
+
+
+def test_aemo_table_schema_validates_batches() -> None:
+    table_set = parse_aemo_mms_csv(AEMO_MMS_UNIT_SCADA_CSV, parse_table_schemas=True)
+
+    table = table_set.get_table("interconnectorres")
+
+    assert table, "Has table"
+    assert len(table.records) == 0, "Drops records missing required schema fields"
+
+
+def test_aemo_table_set_lookup_and_stats() -> None:
+    table_set = AEMOTableSet()
+
+    for _ in range(50):
+        table_set = parse_aemo_mms_csv(AEMO_MMS_UNIT_SCADA_CSV, table_set=table_set)
+
+    assert len(table_set.tables) == 2, "Tables are merged"
+    assert table_set.has_table("dispatch_unit_scada"), "Lookup by full name"
+    assert table_set.has_table("unit_scada"), "Lookup by short name"
+    assert not table_set.has_table("trading_price")
+    assert table_set.get_table("unit_scada") is table_set.get_table("dispatch_unit_scada")
+
+    assert table_set.table_record_counts == {"dispatch_unit_scada": 150, "dispatch_interconnectorres": 50}
+    assert table_set.table_sizes["dispatch_unit_scada"] > 0
+
+
+def test_aemo_table_set_indexes_tables_passed_in() -> None:
+    table = AEMOTableSchema(name="UNIT_SCADA", namespace="DISPATCH", fieldnames=["SETTLEMENTDATE", "DUID"])
+    table_set = AEMOTableSet(tables=[table])
+
+    assert table_set.get_table("unit_scada") is table_set.tables[0]
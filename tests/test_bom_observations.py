@@ -0,0 +1,125 @@
+"""
+Tests for the concurrent BOM observations client and bulk store
+
+
+"""
+import json
+from datetime import UTC, datetime
+
+import httpx
+import pytest
+
+from opennem.clients.bom import BOMParsingException, get_bom_observations_many, parse_bom_observations
+from opennem.controllers import bom as bom_controller
+from opennem.utils.http_async import AsyncHTTPClient, HTTPRetryPolicy
+
+
+def _bom_response(*aifstimes: str, state: str = "NSW") -> dict:
+    return {
+        "observations": {
+            "header": [{"state_time_zone": state}],
+            "data": [
+                {
+                    "aifstime_utc": aifstime,
+                    "apparent_t": 20.1,
+                    "air_temp": 21.5,
+                    "press_qnh": 1012.0,
+                    "wind_dir": "NE",
+                    "wind_spd_kmh": 11,
+                    "gust_kmh": 15,
+                    "rel_hum": 60,
+                    "cloud": "-",
+                    "cloud_type": "-",
+                }
+                for aifstime in aifstimes
+            ]
+            # observations without a temperature are dropped
+            + [{"aifstime_utc": "20230301000000", "air_temp": None}],
+        }
+    }
+
+
+def test_parse_bom_observations() -> None:
+    observations = parse_bom_observations(_bom_response("20230301010000"), "http://bom/1.json", "066214")
+
+    assert observations.station_code == "066214"
+    assert observations.state == "NSW"
+    assert len(observations.observations) == 1
+    assert observations.observations[0].observation_time == datetime(2023, 3, 1, 1, 0, tzinfo=UTC)
+    assert observations.observations[0].cloud is None
+
+
+@pytest.mark.parametrize("resp_object", [[], {"header": []}, None])
+def test_parse_bom_observations_invalid(resp_object: object) -> None:
+    with pytest.raises(BOMParsingException):
+        parse_bom_observations(resp_object, "http://bom/1.json", "066214")
+
+
+def test_get_bom_observations_many() -> None:
+    def _handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/missing.json":
+            return httpx.Response(404)
+
+        if request.url.path == "/bad.json":
+            return httpx.Response(200, content=b"<html>")
+
+        return httpx.Response(200, content=json.dumps(_bom_response("20230301010000", "20230301013000")).encode())
+
+    client = AsyncHTTPClient(transport=httpx.MockTransport(_handler), retry=HTTPRetryPolicy(retries=0))
+
+    results = get_bom_observations_many(
+        [("http://bom/1.json", "066214"), ("http://bom/missing.json", "066215"), ("http://bom/bad.json", "066216")],
+        client=client,
+    )
+
+    assert len(results) == 3
+    assert not isinstance(results[0], Exception)
+    assert results[0].station_code == "066214"
+    assert len(results[0].observations) == 2
+    assert isinstance(results[1], Exception)
+    assert isinstance(results[2], BOMParsingException)
+
+
+def test_store_bom_observations_bulk(monkeypatch: pytest.MonkeyPatch) -> None:
+    stored: list[dict] = []
+
+    monkeypatch.setattr(
+        bom_controller, "get_bom_last_observation_times", lambda codes: {"066214": datetime(2023, 3, 1, 1, 0, tzinfo=UTC)}
+    )
+    monkeypatch.setattr(bom_controller, "bulkload_records", lambda table, records, update_fields: stored.extend(records))
+
+    observation_sets = [
+        parse_bom_observations(
+            _bom_response("20230301003000", "20230301010000", "20230301013000"), "http://bom/1.json", "066214"
+        ),
+        # the same observation repeated in the feed
+        parse_bom_observations(_bom_response("20230301010000", "20230301010000"), "http://bom/2.json", "066215"),
+    ]
+
+    cr = bom_controller.store_bom_observations_bulk(observation_sets)
+
+    assert cr.total_records == 5
+    assert cr.processed_records == 3
+    assert cr.inserted_records == 3
+    assert cr.server_latest == datetime(2023, 3, 1, 1, 30, tzinfo=UTC)
+    assert sorted((i["station_id"], i["observation_time"].minute) for i in stored) == [
+        ("066214", 0),
+        ("066214", 30),
+        ("066215", 0),
+    ]
+
+
+def test_store_bom_observations_bulk_error(monkeypatch: pytest.MonkeyPatch) -> None:
+    def _bulkload_records(*args: object) -> None:
+        raise bom_controller.BulkInsertException("copy failed")
+
+    monkeypatch.setattr(bom_controller, "get_bom_last_observation_times", lambda codes: {})
+    monkeypatch.setattr(bom_controller, "bulkload_records", _bulkload_records)
+
+    cr = bom_controller.store_bom_observations_bulk(
+        [parse_bom_observations(_bom_response("20230301010000"), "http://bom/1.json", "066214")]
+    )
+
+    assert cr.errors == 1
+    assert cr.inserted_records == 0
+    assert cr.error_detail == ["copy failed"]
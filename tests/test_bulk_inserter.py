@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+
+from opennem.db.bulk_insert_csv import _iter_record_chunks, build_insert_query, serialize_records_chunk
+from opennem.db.models.opennem import FacilityScada
+
+NEM_TZ = timezone(timedelta(hours=10))
+
+SCADA_RECORDS = [
+    {
+        "network_id": "NEM",
+        "trading_interval": datetime(2021, 9, 2, 12, 55, tzinfo=NEM_TZ),
+        "facility_code": "ADPPV1",
+        "generated": 12.5,
+        "eoi_quantity": None,
+        "is_forecast": False,
+    },
+    {
+        "network_id": "NEM",
+        "trading_interval": datetime(2021, 9, 2, 13, 0, tzinfo=NEM_TZ),
+        "facility_code": "AGLHAL",
+        "generated": None,
+        "eoi_quantity": 1.0,
+        "is_forecast": False,
+    },
+]
+
+
+def test_serialize_records_chunk() -> None:
+    column_names = list(SCADA_RECORDS[0].keys())
+    csv_buffer = serialize_records_chunk(SCADA_RECORDS, column_names)
+
+    assert csv_buffer.read().splitlines() == [
+        "NEM,2021-09-02T12:55:00+10:00,ADPPV1,12.5,,False",
+        "NEM,2021-09-02T13:00:00+10:00,AGLHAL,,1.0,False",
+    ]
+
+
+def test_serialize_dataframe_chunk_matches_records() -> None:
+    column_names = list(SCADA_RECORDS[0].keys())
+    df = pd.DataFrame.from_records(SCADA_RECORDS)
+
+    assert serialize_records_chunk(df, column_names).read() == serialize_records_chunk(SCADA_RECORDS, column_names).read()
+
+
+@pytest.mark.parametrize("chunk_size,num_chunks", [(1, 5), (2, 3), (5, 1), (100, 1)])
+def test_iter_record_chunks(chunk_size: int, num_chunks: int) -> None:
+    records = [{"i": i} for i in range(5)]
+
+    chunks = list(_iter_record_chunks(records, chunk_size))
+    frame_chunks = list(_iter_record_chunks(pd.DataFrame.from_records(records), chunk_size))
+
+    assert len(chunks) == num_chunks
+    assert len(frame_chunks) == num_chunks
+    assert sum(len(i) for i in chunks) == 5
+
+
+def test_build_insert_query_tmp_tables_are_unique() -> None:
+    queries = {build_insert_query(FacilityScada, ["generated"]) for _ in range(100)}
+
+    assert len(queries) == 100, "Temp table names never collide"
@@ -1,8 +1,10 @@
 from datetime import UTC, datetime, timedelta
 
+import pandas as pd
 import pytest
 
-from opennem.utils.dates import date_series, parse_date
+from opennem.schema.network import NetworkNEM
+from opennem.utils.dates import date_series, parse_date, parse_date_column
 from opennem.utils.timezone import is_aware
 
 
@@ -85,3 +87,31 @@ class TestUtilDates:
         assert len(series) == 30, "There are 30 dates"
         assert series[0] == date_today, "First entry is today"
         assert series[29] == date_29_days_ago, "Last entry is 29 days ago"
+
+
+@pytest.mark.parametrize(
+    "date_strs",
+    [
+        ["2021/09/02 12:55:00", "2021/09/02 13:00:00", "2021/09/02 12:55:00"],
+        ["2021-09-02T13:05:00", "2021/09/02 13:00:00"],
+        ["1/9/19 4:00", "27/9/2019  2:55:00 pm", "20201008133000"],
+    ],
+)
+def test_parse_date_column_matches_parse_date(date_strs: list[str]) -> None:
+    subject = parse_date_column(date_strs, network=NetworkNEM)
+
+    assert len(subject) == len(date_strs), "Same number of values"
+
+    for date_str, date_parsed in zip(date_strs, subject, strict=True):
+        comparator = parse_date(date_str, network=NetworkNEM)
+
+        assert date_parsed.to_pydatetime() == comparator, "Matches parse_date"
+        assert date_parsed.utcoffset() == comparator.utcoffset(), "Has network timezone"
+
+
+def test_parse_date_column_blanks() -> None:
+    subject = parse_date_column(["2021/09/02 12:55:00", "", None], network=NetworkNEM)
+
+    assert not pd.isna(subject[0])
+    assert pd.isna(subject[1]), "Blank value is NaT"
+    assert pd.isna(subject[2]), "Missing value is NaT"
@@ -1,9 +1,18 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 
 import pytest
 
-from opennem.core.parsers.dirlisting import DirlistingEntry, parse_dirlisting_datetime, parse_dirlisting_line
+from opennem.core.parsers import dirlisting
+from opennem.core.parsers.dirlisting import (
+    DirectoryListing,
+    DirlistingEntry,
+    get_dirlisting_changes,
+    parse_dirlisting,
+    parse_dirlisting_datetime,
+    parse_dirlisting_line,
+    save_dirlisting_cursor,
+)
 
 from .conftest import PATH_TESTS_FIXTURES
 
@@ -68,3 +77,132 @@ def test_dirlisting_line(line: str, result: dict[str, str | datetime | int]) ->
     dirlisting_line_result = parse_dirlisting_line(line)
 
     assert result_model == dirlisting_line_result, "Models match for dirlisting line"
+
+
+DIRLISTING_URL = "http://nemweb.com.au/Reports/Current/DispatchIS_Reports/"
+
+
+def test_parse_dirlisting_fixture() -> None:
+    listing = parse_dirlisting(DIRLISTING_URL, load_fixture(), timezone="Australia/Brisbane")
+
+    assert listing.count == 578
+    assert listing.file_count == 577
+    assert listing.directory_count == 1
+
+    entry = listing.get_entry("PUBLIC_DISPATCHIS_202111081435_0000000352251582.zip")
+
+    assert entry and entry.file_size == 18166
+    assert entry.link == DIRLISTING_URL + "PUBLIC_DISPATCHIS_202111081435_0000000352251582.zip"
+    assert listing.get_entry("MISSING.zip") is None
+
+
+def test_dirlisting_aemo_intervals_indexed() -> None:
+    listing = parse_dirlisting(DIRLISTING_URL, load_fixture(), timezone="Australia/Brisbane")
+
+    files = listing.get_files()
+    intervals = [files[10].aemo_interval_date, files[2].aemo_interval_date, datetime(2000, 1, 1)]
+
+    # listing order regardless of interval order
+    assert listing.get_files_aemo_intervals(intervals) == [files[2], files[10]]
+
+    listing.apply_filter(".*DISPATCHIS_2021110814.*")
+
+    assert listing.get_files_aemo_intervals(intervals) == [files[2]]
+
+
+class _MemoryRedis:
+    def __init__(self) -> None:
+        self.values: dict[str, str] = {}
+
+    def get(self, key: str) -> str | None:
+        return self.values.get(key)
+
+    def set(self, key: str, value: str) -> None:
+        self.values[key] = value
+
+
+class _Response:
+    def __init__(self, status_code: int, content: str = "", headers: dict | None = None) -> None:
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.content = content.encode("utf-8")
+        self.headers = headers or {}
+
+
+def test_dirlisting_changes(monkeypatch: pytest.MonkeyPatch) -> None:
+    fixture = load_fixture()
+    listing = parse_dirlisting(DIRLISTING_URL, fixture)
+    last_entry = listing.get_files()[-1]
+
+    # a new entry at the same modified time and one after
+    added_line = "    {modified}        18201 " '<a href="/Reports/Current/DispatchIS_Reports/{filename}">{filename}</a><br>'
+    added = "".join(
+        added_line.format(modified=modified.strftime("%A, %B %-d, %Y %-I:%M %p"), filename=filename)
+        for modified, filename in [
+            (last_entry.modified_date, "PUBLIC_DISPATCHIS_209901010000_0000000000000001.zip"),
+            (last_entry.modified_date + timedelta(minutes=5), "PUBLIC_DISPATCHIS_209901010005_0000000000000002.zip"),
+        ]
+    )
+
+    requests: list[dict] = []
+    responses = [
+        _Response(200, fixture, {"ETag": '"a"', "Last-Modified": "Mon, 08 Nov 2021 04:00:00 GMT"}),
+        _Response(304),
+        _Response(200, fixture.replace("</pre>", added + "</pre>"), {"ETag": '"b"'}),
+    ]
+
+    def _get(url: str, headers: dict, verify: bool) -> _Response:
+        requests.append(headers)
+        return responses.pop(0)
+
+    monkeypatch.setattr(dirlisting, "_redis_client", _MemoryRedis())
+    monkeypatch.setattr(dirlisting.http, "get", _get)
+
+    listing, cursor = get_dirlisting_changes(DIRLISTING_URL)
+
+    assert listing.count == 578
+    assert cursor, "Has a cursor to save"
+
+    save_dirlisting_cursor(cursor)
+
+    not_modified, cursor = get_dirlisting_changes(DIRLISTING_URL)
+
+    assert isinstance(not_modified, DirectoryListing)
+    assert not_modified.not_modified and not_modified.count == 0
+    assert cursor is None, "Nothing to save for an unchanged listing"
+    assert requests[1] == {"If-None-Match": '"a"', "If-Modified-Since": "Mon, 08 Nov 2021 04:00:00 GMT"}
+
+    changes, _ = get_dirlisting_changes(DIRLISTING_URL)
+
+    assert [i.filename.name for i in changes.entries] == [
+        "PUBLIC_DISPATCHIS_209901010000_0000000000000001.zip",
+        "PUBLIC_DISPATCHIS_209901010005_0000000000000002.zip",
+    ]
+
+
+def test_dirlisting_changes_cursor_saved_by_caller(monkeypatch: pytest.MonkeyPatch) -> None:
+    fixture = load_fixture()
+    requests: list[dict] = []
+
+    def _get(url: str, headers: dict, verify: bool) -> _Response:
+        requests.append(headers)
+        return _Response(200, fixture, {"ETag": '"a"'})
+
+    monkeypatch.setattr(dirlisting, "_redis_client", _MemoryRedis())
+    monkeypatch.setattr(dirlisting.http, "get", _get)
+
+    listing, _ = get_dirlisting_changes(DIRLISTING_URL)
+
+    # the crawl fails before the cursor is saved so the same entries are listed again
+    retry_listing, cursor = get_dirlisting_changes(DIRLISTING_URL)
+
+    assert requests[1] == {}, "No conditional get without a saved cursor"
+    assert retry_listing.count == listing.count == 578
+
+    assert cursor
+    save_dirlisting_cursor(cursor)
+
+    listing, _ = get_dirlisting_changes(DIRLISTING_URL)
+
+    assert requests[2] == {"If-None-Match": '"a"'}
+    assert listing.count == 0, "Processed entries aren't listed again once the cursor is saved"
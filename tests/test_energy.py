@@ -1,7 +1,10 @@
 import csv
+from datetime import datetime, timedelta
 from pathlib import Path
 
-from opennem.core.energy import energy_sum, shape_energy_dataframe
+import pytest
+
+from opennem.core.energy import _energy_aggregate, energy_sum, shape_energy_dataframe
 from opennem.schema.network import NetworkNEM
 
 # from opennem.workers.emissions import load_factors
@@ -53,3 +56,61 @@ def _test_energy_sum_outputs() -> None:
     assert es.eoi_quantity.sum() > 1000, "Has energy value"
 
     return es
+
+
+def _constant_power_records(facility_code: str, power: float, num_readings: int = 14) -> list[dict]:
+    interval_start = datetime.fromisoformat("2023-01-01T00:00:00")
+
+    return [
+        {
+            "trading_interval": interval_start + timedelta(minutes=5 * i),
+            "facility_code": facility_code,
+            "network_id": "NEM",
+            "fueltech_id": "coal_black",
+            "generated": power,
+        }
+        for i in range(num_readings)
+    ]
+
+
+def test_shape_energy_dataframe_localizes_to_network() -> None:
+    power_df = shape_energy_dataframe(_constant_power_records("BW01", 120.0))
+
+    assert str(power_df.trading_interval.dt.tz) == str(NetworkNEM.get_fixed_offset()), "Localized to network offset"
+    assert power_df.trading_interval.iloc[0].hour == 0, "Wall time is kept"
+
+
+def test_energy_sum_hours_integrates_trading_intervals() -> None:
+    records = _constant_power_records("BW01", 120.0)
+
+    # a second unit with a gap in its readings
+    records += [i for i in _constant_power_records("BW02", 60.0) if i["trading_interval"].minute != 15]
+
+    power_df = shape_energy_dataframe(records)
+
+    es = energy_sum(power_df, NetworkNEM).set_index(["trading_interval", "facility_code"])
+
+    tz = NetworkNEM.get_fixed_offset()
+    first_interval = datetime(2023, 1, 1, 0, 25, tzinfo=tz)
+    second_interval = datetime(2023, 1, 1, 0, 55, tzinfo=tz)
+
+    assert len(es) == 4, "Each unit has a value for both trading intervals"
+
+    # 30 minutes at 120MW, shifted back by the network interval shift
+    assert es.loc[(first_interval, "BW01")].eoi_quantity == pytest.approx(60.0)
+    assert es.loc[(second_interval, "BW01")].eoi_quantity == pytest.approx(60.0)
+
+    # missing reading is zero filled
+    assert es.loc[(first_interval, "BW02")].eoi_quantity == pytest.approx(0.5 * 60.0 * 10 / 12)
+    assert es.loc[(second_interval, "BW02")].eoi_quantity == pytest.approx(30.0)
+
+
+def test_energy_aggregate_variable_buckets() -> None:
+    power_df = shape_energy_dataframe(_constant_power_records("BW01", 120.0, num_readings=13))
+    power_df = power_df.set_index(["trading_interval", "network_id", "facility_code"])
+
+    es = _energy_aggregate(power_df)
+
+    # buckets close on the reading after each stop (00:00 and 00:30)
+    assert es.trading_interval.dt.minute.tolist() == [0, 30]
+    assert es.eoi_quantity.tolist() == pytest.approx([60.0, 60.0])
@@ -1,6 +1,6 @@
 import pytest
 
-from opennem.core.normalizers import normalize_duid
+from opennem.core.normalizers import normalize_duid, normalize_duid_column
 
 
 @pytest.mark.parametrize(
@@ -18,3 +18,11 @@ from opennem.core.normalizers import normalize_duid
 def test_duid_cleaner(duid: str, duid_expected: str) -> None:
     duid_return = normalize_duid(duid)
     assert duid_return == duid_expected, "Matched duid"
+
+
+def test_duid_column_cleaner() -> None:
+    duids = ["TARONG#1", " LIMOSF11 ", "limosf11", "", "-", None, "TARONG#1"]
+    duids_return = normalize_duid_column(duids)
+
+    assert list(duids_return) == [normalize_duid(i) for i in duids], "Matches normalize_duid"
+    assert duids_return[1] is duids_return[2], "Duids are interned"
@@ -1,6 +1,7 @@
+import numpy as np
 import pytest
 
-from opennem.utils.numbers import sigfig_compact, trim_nulls
+from opennem.utils.numbers import sigfig_compact, trim_null_array, trim_nulls
 
 
 @pytest.mark.parametrize(
@@ -40,3 +41,25 @@ def test_trim_nulls() -> None:
     res = trim_nulls(subject)
 
     assert res == expected, "Got expected return"
+
+
+@pytest.mark.parametrize(
+    ["series", "cast_trailing", "offset_expected", "series_expected"],
+    [
+        ([None, 1, None, 2, None], False, 1, [1, None, 2]),
+        ([None, 1, None, 2, None], True, 1, [1, None, 2, 0]),
+        ([1, 2], True, 0, [1, 2]),
+        ([None, None], False, 2, []),
+        ([None, None], True, 0, [0, 0]),
+        ([], True, 0, []),
+    ],
+)
+def test_trim_null_array(series: list, cast_trailing: bool, offset_expected: int, series_expected: list) -> None:
+    values = np.empty(len(series), dtype=object)
+    values[:] = series
+
+    offset, trimmed = trim_null_array(values, cast_trailing=cast_trailing)
+
+    assert offset == offset_expected
+    assert trimmed.tolist() == series_expected
+    assert values.tolist() == series, "Input is not modified"
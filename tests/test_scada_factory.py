@@ -121,3 +121,40 @@ def test_power_returns_json() -> None:
 
     assert isinstance(r, dict), "JSON is a dict"
     assert "version" in r, "Has a version string"
+
+
+def test_power_grouped_series_trimmed() -> None:
+    network = network_from_network_code("NEM")
+    interval = human_to_interval("5m")
+    dt = datetime.fromisoformat("2021-01-15 10:00:00")
+
+    series = {
+        "coal_black": [None, 1, None, 3, None],
+        "coal_brown": [None, None, None, None, None],
+        "solar_utility": [2, 4, 6, 8, 10],
+    }
+
+    stats = [
+        DataQueryResult(interval=dt + timedelta(minutes=5 * i), result=v, group_by=ft)
+        for ft, values in series.items()
+        for i, v in enumerate(values)
+    ]
+
+    # rows out of order group the same
+    stats.reverse()
+
+    # later duplicate interval replaces the earlier result
+    stats.append(DataQueryResult(interval=dt + timedelta(minutes=5), result=5, group_by="coal_black"))
+
+    result = stats_factory(stats, network=network, interval=interval, units=get_unit("power"), fueltech_group=True)
+
+    data_sets = {i.fuel_tech: i for i in result.data}
+
+    assert "coal_brown" not in data_sets, "Null series are excluded"
+
+    coal_black = data_sets["coal_black"]
+    assert coal_black.history.data == [5, None, 3, 0], "Leading nulls trimmed and trailing nulls cast"
+    assert coal_black.history.start.isoformat() == "2021-01-15T10:05:00+10:00"
+    assert coal_black.history.last.isoformat() == "2021-01-15T10:20:00+10:00"
+
+    assert data_sets["solar_utility"].history.data == [2, 4, 6, 8, 10]
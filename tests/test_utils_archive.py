@@ -0,0 +1,199 @@
+"""
+Tests for the local archive cache in opennem.utils.archive
+
+
+"""
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from opennem.core import downloader
+from opennem.utils import archive
+from opennem.utils.archive import ArchiveCache, ArchiveCacheEntry, ArchiveCacheMiss, is_immutable_archive_url
+
+ARCHIVE_URL = "https://nemweb.com.au/Reports/Archive/DispatchIS_Reports/PUBLIC_DISPATCHIS_20220612.zip"
+CURRENT_URL = "https://nemweb.com.au/Reports/Current/DispatchIS_Reports/"
+
+
+class _Response:
+    def __init__(self, content: bytes = b"", status_code: int = 200, headers: dict | None = None) -> None:
+        self.content = content
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.headers = headers or {}
+
+    def __enter__(self) -> "_Response":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        pass
+
+    def iter_content(self, chunk_size: int) -> list[bytes]:
+        return [self.content[i : i + chunk_size] for i in range(0, len(self.content), chunk_size)]
+
+
+class _Server:
+    """Serves content by url and records requests"""
+
+    def __init__(self, content: dict[str, bytes]) -> None:
+        self.content = content
+        self.requests: list[tuple[str, dict]] = []
+
+    def get(self, url: str, headers: dict, verify: bool, stream: bool) -> _Response:
+        self.requests.append((url, headers))
+
+        if headers.get("If-None-Match") == f'"{len(self.content[url])}"':
+            return _Response(status_code=304)
+
+        return _Response(self.content[url], headers={"ETag": f'"{len(self.content[url])}"'})
+
+
+@pytest.fixture
+def server(monkeypatch: pytest.MonkeyPatch) -> _Server:
+    server = _Server({ARCHIVE_URL: b"archive" * 100, CURRENT_URL: b"<pre>listing</pre>"})
+    monkeypatch.setattr(archive.http, "get", server.get)
+
+    return server
+
+
+@pytest.mark.parametrize(
+    ["url", "immutable"],
+    [
+        (ARCHIVE_URL, True),
+        ("https://nemweb.com.au/Data_Archive/Wholesale_Electricity/MMSDM/2021/MMSDM_2021_01.zip", True),
+        ("https://nemweb.com.au/Reports/ARCHIVE/DispatchIS_Reports/", False),
+        (CURRENT_URL, False),
+        ("https://nemweb.com.au/Reports/Current/DispatchIS_Reports/PUBLIC_DISPATCHIS_202206121205.zip", False),
+    ],
+)
+def test_is_immutable_archive_url(url: str, immutable: bool) -> None:
+    assert is_immutable_archive_url(url) == immutable
+
+
+def test_archive_cache_immutable(tmp_path: Path, server: _Server) -> None:
+    cache = ArchiveCache(tmp_path, current_ttl=0)
+
+    assert cache.fetch(ARCHIVE_URL).read_bytes() == server.content[ARCHIVE_URL]
+    assert cache.fetch(ARCHIVE_URL).read_bytes() == server.content[ARCHIVE_URL]
+
+    # a new process with the same cache
+    assert ArchiveCache(tmp_path, current_ttl=0).fetch(ARCHIVE_URL).read_bytes() == server.content[ARCHIVE_URL]
+
+    assert len(server.requests) == 1
+
+
+def test_archive_cache_current_revalidated(tmp_path: Path, server: _Server) -> None:
+    cache = ArchiveCache(tmp_path, current_ttl=60)
+
+    cache.fetch(CURRENT_URL)
+    cache.fetch(CURRENT_URL)
+    assert len(server.requests) == 1
+
+    cache.current_ttl = 0
+    assert cache.fetch(CURRENT_URL).read_bytes() == server.content[CURRENT_URL]
+
+    assert len(server.requests) == 2
+    assert server.requests[-1][1] == {"If-None-Match": f'"{len(server.content[CURRENT_URL])}"'}
+
+
+def test_archive_cache_corrupt_refetched(tmp_path: Path, server: _Server) -> None:
+    cache_path = ArchiveCache(tmp_path).fetch(ARCHIVE_URL)
+    cache_path.write_bytes(b"corrupt")
+
+    assert ArchiveCache(tmp_path).fetch(ARCHIVE_URL).read_bytes() == server.content[ARCHIVE_URL]
+    assert len(server.requests) == 2
+
+
+def test_archive_cache_offline(tmp_path: Path, server: _Server) -> None:
+    ArchiveCache(tmp_path).fetch(CURRENT_URL)
+
+    cache = ArchiveCache(tmp_path, current_ttl=0, offline=True)
+
+    # expired entries are served offline
+    assert cache.fetch(CURRENT_URL).read_bytes() == server.content[CURRENT_URL]
+
+    with pytest.raises(ArchiveCacheMiss):
+        cache.fetch(ARCHIVE_URL)
+
+    assert len(server.requests) == 1
+
+
+def test_archive_cache_evicts_least_recently_used(tmp_path: Path, server: _Server) -> None:
+    server.content = {f"https://nemweb.com.au/Reports/Archive/{i}.zip": bytes([i]) * 100 for i in range(5)}
+    cache = ArchiveCache(tmp_path, max_bytes=300)
+
+    for i, url in enumerate(server.content):
+        cache.fetch(url)
+
+        # spread out access times
+        entry_path = cache._entry_path(url)
+        os.utime(entry_path, (time.time() - 100 + i, time.time() - 100 + i))
+
+    assert cache.size() <= 300
+    assert cache.get("https://nemweb.com.au/Reports/Archive/0.zip") is None
+    assert cache.get("https://nemweb.com.au/Reports/Archive/4.zip")
+
+
+def test_archive_cache_size_running_total(tmp_path: Path, server: _Server, monkeypatch: pytest.MonkeyPatch) -> None:
+    server.content = {f"https://nemweb.com.au/Reports/Archive/{i}.zip": bytes([i]) * 100 for i in range(5)}
+    server.content["https://nemweb.com.au/Reports/Archive/copy.zip"] = bytes([0]) * 100
+
+    cache = ArchiveCache(tmp_path, max_bytes=300)
+    scans: list[int] = []
+    scan_size = cache._scan_size
+
+    def _scan_size() -> int:
+        scans.append(size := scan_size())
+        return size
+
+    monkeypatch.setattr(cache, "_scan_size", _scan_size)
+
+    for url in list(server.content)[:3]:
+        cache.fetch(url)
+
+    assert len(scans) == 1, "Only scanned on first use while under max_bytes"
+    assert cache.size() == scan_size() == 300
+
+    cache.fetch("https://nemweb.com.au/Reports/Archive/copy.zip")
+    assert cache.size() == 300, "Shared content is counted once"
+
+    cache.fetch("https://nemweb.com.au/Reports/Archive/3.zip")
+
+    assert len(scans) == 2, "Rescanned when evicting"
+    assert cache.size() == scan_size() <= 300
+
+
+def test_archive_cache_concurrent_entry_writes(tmp_path: Path) -> None:
+    cache = ArchiveCache(tmp_path)
+    errors: list[Exception] = []
+
+    def _save(worker: int) -> None:
+        try:
+            for i in range(50):
+                cache._save_entry(ArchiveCacheEntry(ARCHIVE_URL, f"{worker}-{i}", 1, time.time(), True))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=_save, args=(i,)) for i in range(8)]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert not errors, "Concurrent writers of the same url don't race"
+    assert cache._load_entry(ARCHIVE_URL), "Entry is intact"
+    assert not list((tmp_path / "urls").glob("*.tmp")), "No temp files left behind"
+
+
+def test_downloader_uses_archive_cache(tmp_path: Path, server: _Server, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(downloader, "get_archive_cache", lambda: ArchiveCache(tmp_path))
+
+    assert downloader.url_downloader(ARCHIVE_URL) == server.content[ARCHIVE_URL]
+    assert downloader.url_downloader(ARCHIVE_URL) == server.content[ARCHIVE_URL]
+
+    assert len(server.requests) == 1
@@ -0,0 +1,153 @@
+"""
+Tests for the shared range cache in opennem.utils.cache
+
+
+"""
+from datetime import datetime
+from typing import Any
+
+import pytest
+import redis
+
+from opennem.api.stats.schema import ScadaDateRange
+from opennem.schema.network import NetworkNEM, NetworkSchema, NetworkWEM
+from opennem.utils import cache
+from opennem.utils.cache import RangeCache, cache_range_result, cache_scada_result, invalidate_range_cache
+
+
+class _MemoryRedis:
+    """The subset of the redis client used by the range cache, shared between caches like a server"""
+
+    def __init__(self) -> None:
+        self.values: dict[str, str] = {}
+
+    def mget(self, keys: list[str]) -> list[str | None]:
+        return [self.values.get(k) for k in keys]
+
+    def get(self, key: str) -> str | None:
+        return self.values.get(key)
+
+    def setex(self, key: str, ttl: int, value: str) -> None:
+        self.values[key] = value
+
+    def incr(self, key: str) -> None:
+        self.values[key] = str(int(self.values.get(key, 0)) + 1)
+
+    def pipeline(self) -> "_MemoryRedis":
+        return self
+
+    def execute(self) -> None:
+        pass
+
+
+class _DownRedis(_MemoryRedis):
+    def mget(self, keys: list[str]) -> list[str | None]:
+        raise redis.ConnectionError("down")
+
+
+@pytest.fixture
+def calls() -> list[tuple]:
+    return []
+
+
+@pytest.fixture
+def scada_range(calls: list[tuple]) -> Any:
+    @cache_scada_result
+    def _get_scada_range(
+        network: NetworkSchema | None = None,
+        networks: list[NetworkSchema] | None = None,
+        network_region: str | None = None,
+        facilities: list[str] | None = None,
+        energy: bool = False,
+    ) -> ScadaDateRange | None:
+        calls.append((network, networks, network_region, facilities, energy))
+
+        return ScadaDateRange(start=datetime(2023, 1, 1), end=datetime(2023, 2, 1, 12, 5), network=network)
+
+    return _get_scada_range
+
+
+def _use_cache(monkeypatch: pytest.MonkeyPatch, client: Any) -> RangeCache:
+    range_cache = RangeCache(client=client)
+    monkeypatch.setattr(cache, "range_cache", range_cache)
+
+    return range_cache
+
+
+def test_range_cache_key_includes_all_arguments(monkeypatch: pytest.MonkeyPatch, scada_range: Any, calls: list) -> None:
+    _use_cache(monkeypatch, _MemoryRedis())
+
+    scada_range(network=NetworkNEM)
+    scada_range(NetworkNEM)
+    assert len(calls) == 1
+
+    scada_range(network=NetworkNEM, network_region="NSW1")
+    scada_range(network=NetworkNEM, network_region="QLD1")
+    assert len(calls) == 3
+
+    # facility order is significant
+    scada_range(network=NetworkNEM, facilities=["A", "B"])
+    scada_range(network=NetworkNEM, facilities=["B", "A"])
+    scada_range(network=NetworkNEM, facilities=["A", "B"])
+    assert len(calls) == 5
+
+
+def test_range_cache_shared_between_processes(monkeypatch: pytest.MonkeyPatch, scada_range: Any, calls: list) -> None:
+    client = _MemoryRedis()
+    _use_cache(monkeypatch, client)
+
+    first = scada_range(network=NetworkNEM)
+
+    # a second process with its own local cache
+    _use_cache(monkeypatch, client)
+    second = scada_range(network=NetworkNEM)
+
+    assert len(calls) == 1
+    assert second == first
+    assert second.network.code == NetworkNEM.code
+
+
+def test_range_cache_invalidate_network(monkeypatch: pytest.MonkeyPatch, scada_range: Any, calls: list) -> None:
+    client = _MemoryRedis()
+    _use_cache(monkeypatch, client)
+
+    scada_range(network=NetworkNEM)
+    scada_range(network=NetworkWEM)
+    assert len(calls) == 2
+
+    # invalidated from another process
+    _use_cache(monkeypatch, client)
+    invalidate_range_cache(networks=[NetworkNEM])
+
+    _use_cache(monkeypatch, client)
+    scada_range(network=NetworkNEM)
+    scada_range(network=NetworkWEM)
+
+    assert len(calls) == 3
+    assert calls[-1][0] == NetworkNEM
+
+
+def test_range_cache_without_redis(monkeypatch: pytest.MonkeyPatch, scada_range: Any, calls: list) -> None:
+    _use_cache(monkeypatch, _DownRedis())
+
+    scada_range(network=NetworkNEM)
+    scada_range(network=NetworkNEM)
+    assert len(calls) == 1
+
+    invalidate_range_cache(networks=[NetworkNEM])
+    scada_range(network=NetworkNEM)
+    assert len(calls) == 2
+
+
+def test_range_cache_skips_none(monkeypatch: pytest.MonkeyPatch) -> None:
+    _use_cache(monkeypatch, _MemoryRedis())
+    calls = []
+
+    @cache_range_result("test_none", loads=str, dumps=str)
+    def _no_result(network: NetworkSchema) -> None:
+        calls.append(network)
+
+    _no_result(NetworkNEM)
+    _no_result(NetworkNEM)
+
+    assert len(calls) == 2
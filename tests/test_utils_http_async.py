@@ -0,0 +1,124 @@
+"""
+Tests for the async http client in opennem.utils.http_async
+
+
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from opennem.utils.http import DEFAULT_RETRIES, DEFAULT_TIMEOUT, http
+from opennem.utils.http_async import AsyncHTTPClient, HTTPClientException, HTTPRetryPolicy, fetch_many, run_sync
+
+NO_BACKOFF = HTTPRetryPolicy(retries=2, backoff_factor=0)
+
+
+def test_sync_session_adapter_has_timeout_and_retries() -> None:
+    adapter = http.get_adapter("https://nemweb.com.au/")
+
+    assert adapter.timeout == DEFAULT_TIMEOUT
+    assert adapter.max_retries.total == DEFAULT_RETRIES
+
+
+def test_retry_policy_delay() -> None:
+    policy = HTTPRetryPolicy(backoff_factor=2, backoff_max=10)
+
+    assert [policy.delay(i) for i in range(1, 5)] == [2, 4, 8, 10]
+    assert policy.delay(1, httpx.Response(429, headers={"Retry-After": "3"})) == 3
+
+
+def test_client_retries_status_and_errors() -> None:
+    attempts: list[str] = []
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        attempts.append(request.url.path)
+
+        if request.url.path == "/flaky" and len(attempts) == 1:
+            return httpx.Response(503)
+
+        if request.url.path == "/flaky" and len(attempts) == 2:
+            raise httpx.ConnectError("reset", request=request)
+
+        if request.url.path == "/down":
+            return httpx.Response(502)
+
+        return httpx.Response(200, content=b"data")
+
+    async def _run() -> tuple[httpx.Response, httpx.Response]:
+        async with AsyncHTTPClient(retry=NO_BACKOFF, transport=httpx.MockTransport(_handler)) as client:
+            return await client.get("https://nemweb.com.au/flaky"), await client.get("https://nemweb.com.au/down")
+
+    flaky, down = asyncio.run(_run())
+
+    assert flaky.status_code == 200 and flaky.content == b"data"
+    assert down.status_code == 502
+    assert attempts == ["/flaky"] * 3 + ["/down"] * 3
+
+
+def test_client_raises_after_retries() -> None:
+    def _handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ReadTimeout("timeout", request=request)
+
+    async def _run() -> httpx.Response:
+        async with AsyncHTTPClient(retry=NO_BACKOFF, transport=httpx.MockTransport(_handler)) as client:
+            return await client.get("https://nemweb.com.au/slow")
+
+    with pytest.raises(HTTPClientException):
+        asyncio.run(_run())
+
+
+def test_client_per_host_limit() -> None:
+    in_flight: dict[str, int] = {}
+    max_in_flight: dict[str, int] = {}
+
+    async def _handler(request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        in_flight[host] = in_flight.get(host, 0) + 1
+        max_in_flight[host] = max(max_in_flight.get(host, 0), in_flight[host])
+
+        await asyncio.sleep(0.01)
+
+        in_flight[host] -= 1
+
+        return httpx.Response(200, content=request.url.path.encode())
+
+    urls = [f"https://{host}/{i}" for i in range(10) for host in ["nemweb.com.au", "bom.gov.au"]]
+
+    async def _run() -> list:
+        async with AsyncHTTPClient(max_connections_per_host=3, transport=httpx.MockTransport(_handler)) as client:
+            return await client.get_many(urls)
+
+    responses = asyncio.run(_run())
+
+    assert [r.content.decode() for r in responses] == [f"/{i}" for i in range(10) for _ in range(2)]
+    assert max_in_flight == {"nemweb.com.au": 3, "bom.gov.au": 3}
+
+
+def test_client_stream() -> None:
+    content = b"x" * 100_000
+
+    async def _run() -> bytes:
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, content=content))
+
+        async with AsyncHTTPClient(transport=transport) as client, client.stream("https://nemweb.com.au/big.zip") as response:
+            return b"".join([chunk async for chunk in response.aiter_bytes()])
+
+    assert asyncio.run(_run()) == content
+
+
+def test_fetch_many_sync_facade() -> None:
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=request.url.path.encode()))
+    urls = ["https://nemweb.com.au/a", "https://nemweb.com.au/b"]
+
+    assert [r.content for r in fetch_many(urls, transport=transport)] == [b"/a", b"/b"]
+
+    # also usable from within a running event loop
+    async def _in_loop() -> list:
+        return run_sync(_fetch())
+
+    async def _fetch() -> list:
+        async with AsyncHTTPClient(transport=transport) as client:
+            return await client.get_many(urls)
+
+    assert [r.content for r in asyncio.run(_in_loop())] == [b"/a", b"/b"]